@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, UserProfile, Wallet, AgentProfile, EnterpriseProfile
+from .models import User, UserProfile, Wallet, WalletBalance, AgentProfile, EnterpriseProfile
 
 @admin.register(User)
 class UserAdmin(BaseUserAdmin):
@@ -22,12 +22,18 @@ class UserProfileAdmin(admin.ModelAdmin):
     search_fields = ('first_name', 'last_name', 'user__username', 'user__email')
     readonly_fields = ('created_at', 'updated_at')
 
+class WalletBalanceInline(admin.TabularInline):
+    model = WalletBalance
+    extra = 0
+    readonly_fields = ('created_at', 'updated_at')
+
 @admin.register(Wallet)
 class WalletAdmin(admin.ModelAdmin):
     list_display = ('user', 'balance', 'currency', 'is_active', 'updated_at')
     list_filter = ('currency', 'is_active')
     search_fields = ('user__username', 'user__email')
     readonly_fields = ('created_at', 'updated_at')
+    inlines = [WalletBalanceInline]
 
 @admin.register(AgentProfile)
 class AgentProfileAdmin(admin.ModelAdmin):
@@ -0,0 +1,75 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import DocumentImageHash, IdentityDocument
+from accounts.utils.image_utils import is_image_name
+from accounts.utils.dhash_utils import DOCUMENT_IMAGE_FIELDS, dhash_path, source_key, to_signed
+
+
+def _hash_file(path):
+    """Worker process entry point: plain file path in, unsigned hash (or None) out."""
+    try:
+        return dhash_path(path)
+    except Exception:
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Compute difference hashes for identity-document images uploaded before hashing existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Hashing processes')
+        parser.add_argument('--batch-size', type=int, default=500, help='Images per bulk insert')
+        parser.add_argument('--rehash', action='store_true', help='Recompute hashes that already exist')
+
+    def handle(self, *args, **options):
+        existing = set() if options['rehash'] else set(DocumentImageHash.objects.values_list('source_key', flat=True))
+        jobs = []
+        for label, fields in DOCUMENT_IMAGE_FIELDS.items():
+            model = apps.get_model(label)
+            for row in model.objects.values('pk', 'user_id', *fields).iterator(chunk_size=2000):
+                for field in fields:
+                    name = row[field]
+                    key = source_key(label, row['pk'], field)
+                    if not name or not is_image_name(name) or key in existing:
+                        continue
+                    document_id = row['pk'] if model is IdentityDocument else None
+                    jobs.append((key, field, name, row['user_id'], document_id))
+
+        workers = max(1, options['workers'])
+        batch_size = max(1, options['batch_size'])
+        hashed = failed = 0
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and len(jobs) > 1 else None
+        try:
+            for start in range(0, len(jobs), batch_size):
+                batch = jobs[start:start + batch_size]
+                paths = [default_storage.path(job[2]) for job in batch]
+                if pool is not None:
+                    results = list(pool.map(_hash_file, paths, chunksize=max(1, len(paths) // (workers * 4))))
+                else:
+                    results = [_hash_file(path) for path in paths]
+
+                rows = []
+                for (key, field, name, user_id, document_id), value in zip(batch, results):
+                    if value is None:
+                        failed += 1
+                        continue
+                    rows.append(DocumentImageHash(
+                        user_id=user_id, document_id=document_id, source_key=key,
+                        field=field, name=name, dhash=to_signed(value),
+                    ))
+                with transaction.atomic():
+                    DocumentImageHash.objects.filter(source_key__in=[r.source_key for r in rows]).delete()
+                    DocumentImageHash.objects.bulk_create(rows)
+                hashed += len(rows)
+                self.stdout.write(f"  {min(start + batch_size, len(jobs))}/{len(jobs)} images")
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(f"Hashed {hashed} document images with {workers} workers. Unreadable: {failed}"))
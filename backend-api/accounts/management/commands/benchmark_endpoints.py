@@ -0,0 +1,157 @@
+import json
+import os
+import uuid
+from contextlib import nullcontext
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from accounts.management.commands.generate_dataset import PASSWORD, PIN
+from accounts.models import User
+from cash_ti_machann import loadtest
+from transactions.models import Transaction
+
+
+
+class Command(BaseCommand):
+    help = ('Load-test send_money, login, user search and the admin transaction list and dashboard; '
+            'writes a JSON latency report, or compares two reports with --compare')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenarios', default=','.join(loadtest.SCENARIOS), help='Comma-separated subset of the scenarios')
+        parser.add_argument('--duration', type=float, default=30, help='Measured seconds')
+        parser.add_argument('--warmup', type=float, default=2, help='Seconds of unmeasured requests first')
+        parser.add_argument('--processes', type=int, default=os.cpu_count(), help='Load driver processes')
+        parser.add_argument('--base-url', help='Running server to load (default: Django test client, in process)')
+        parser.add_argument('--no-velocity', action='store_true',
+                            help='Run the in-process test client without the velocity rules (VELOCITY_RULES)')
+        parser.add_argument('--actors', type=int, default=200, help='Generated users to act as (manage.py generate_dataset)')
+        parser.add_argument('--admin', help='Existing admin username for the admin scenarios (required with --base-url; '
+                                             'in process a temporary admin is created and removed)')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Report path (default: benchmark-<timestamp>.json)')
+        parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help='Diff two reports; fails on a regression')
+        parser.add_argument('--threshold', type=float, default=10, help='Regression threshold in percent (--compare)')
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            return self._compare(*options['compare'], options['threshold'])
+
+        names = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = [name for name in names if name not in loadtest.SCENARIOS]
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(unknown)} (known: {', '.join(loadtest.SCENARIOS)})")
+        if options['no_velocity'] and options['base_url']:
+            raise CommandError("--no-velocity only applies in process; set VELOCITY_RULES on the server instead")
+        actors = self._actors(options['actors'])
+        context = {
+            'password': PASSWORD,
+            'pin': PIN,
+            'phones': [actor['phone'] for actor in actors],
+            'queries': sorted({actor['first_name'] for actor in actors} | {actor['phone'][:7] for actor in actors}),
+        }
+        cleanup = None
+        if any(loadtest.SCENARIOS[name].auth == 'admin' for name in names):
+            context['admin_token'], cleanup = self._admin_token(options['admin'], options['base_url'])
+        try:
+            self._benchmark(names, actors, context, options)
+        finally:
+            if cleanup is not None:
+                cleanup.delete()
+
+    def _benchmark(self, names, actors, context, options):
+        processes = max(options['processes'] or 1, 1)
+        if not options['base_url'] and connection.vendor == 'sqlite' and processes > 1 and {'login', 'send_money'} & set(names):
+            self.stdout.write('SQLite serializes writers: in-process send_money errors under several processes are lock timeouts')
+
+        meta = {
+            'started_at': timezone.now().isoformat(),
+            'target': options['base_url'] or 'test-client',
+            'database': connection.vendor,
+            'processes': processes,
+            'duration': options['duration'],
+            'warmup': options['warmup'],
+            'actors': len(actors),
+            'velocity_rules': not options['no_velocity'],
+            'users': User.objects.count(),
+            'transactions': Transaction.objects.count(),
+        }
+        # Forked workers inherit the override
+        with override_settings(VELOCITY_RULES=[]) if options['no_velocity'] else nullcontext():
+            results = loadtest.run(
+                names, actors, context, processes=processes, duration=options['duration'], warmup=options['warmup'],
+                base_url=options['base_url'], seed=options['seed'],
+            )
+        report = {'meta': meta, 'scenarios': loadtest.summarize(results, options['duration'])}
+
+        path = options['output'] or f"benchmark-{datetime.now():%Y%m%d-%H%M%S}.json"
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        for name, row in report['scenarios'].items():
+            latency = row['latency_ms']
+            line = (f"{name}: {row['throughput_rps']} req/s, p50 {latency['p50']} ms, p90 {latency['p90']} ms, "
+                    f"p99 {latency['p99']} ms, errors {row['errors']}/{row['requests']}")
+            self.stdout.write(self.style.WARNING(line) if row['errors'] else line)
+        self.stdout.write(self.style.SUCCESS(f'Report written to {path}'))
+
+    def _actors(self, count):
+        """Generated clients with a PIN and a wallet, each with an API token."""
+        rows = list(
+            User.objects.filter(
+                username__startswith='gen', user_type='client', is_active=True,
+                profile__transaction_pin__isnull=False, wallet__isnull=False,
+            ).order_by('username').values('id', 'username', 'phone_number', 'profile__first_name')[:count]
+        )
+        if len(rows) < 2:
+            raise CommandError('Not enough generated users; run manage.py generate_dataset first')
+        tokens = dict(Token.objects.filter(user_id__in=[row['id'] for row in rows]).values_list('user_id', 'key'))
+        missing = [Token(user_id=row['id'], key=Token.generate_key()) for row in rows if row['id'] not in tokens]
+        Token.objects.bulk_create(missing)
+        tokens.update((token.user_id, token.key) for token in missing)
+        return [
+            {
+                'username': row['username'], 'phone': row['phone_number'], 'first_name': row['profile__first_name'],
+                'token': tokens[row['id']], 'ip': f'10.{index // 250 % 250}.{index % 250}.1',
+            }
+            for index, row in enumerate(rows)
+        ]
+
+    def _admin_token(self, username, base_url):
+        """(token key, what to delete afterwards). An explicit admin keeps its account; only a
+        token made for the run is removed. Without one, in process only, a throwaway admin
+        with no usable password is created and removed."""
+        if username:
+            admin = User.objects.filter(username=username, user_type='admin', is_active=True).first()
+            if admin is None:
+                raise CommandError(f'No active admin named {username}')
+            token, created = Token.objects.get_or_create(user=admin)
+            return token.key, token if created else None
+        if base_url:
+            raise CommandError('The admin scenarios need --admin <admin username> when loading a server')
+        name = f'bench-admin-{uuid.uuid4().hex[:8]}'
+        admin = User.objects.create_user(username=name, email=f'{name}@example.com', user_type='admin')
+        return Token.objects.create(user=admin).key, admin
+
+    def _compare(self, base_path, new_path, threshold):
+        with open(base_path) as f:
+            base = json.load(f)
+        with open(new_path) as f:
+            new = json.load(f)
+        rows, regressions = loadtest.compare(base, new, threshold)
+        for key in ('target', 'database', 'processes', 'velocity_rules', 'users', 'transactions'):
+            if base['meta'].get(key) != new['meta'].get(key):
+                self.stdout.write(f"Note: the runs differ in {key} ({base['meta'].get(key)} vs {new['meta'].get(key)})")
+        for row in rows:
+            cells = []
+            for metric, unit in (('p50', 'ms'), ('p99', 'ms'), ('throughput_rps', 'req/s')):
+                old, current = row[metric]
+                cells.append(f"{metric} {old} -> {current} {unit} ({loadtest.percent_change(old, current):+.1f}%)")
+            self.stdout.write(f"{row['scenario']}: " + ', '.join(cells))
+        if regressions:
+            listed = '\n  '.join(regressions)
+            raise CommandError(f'Regressions over {threshold}%:\n  {listed}')
+        self.stdout.write(self.style.SUCCESS(f'No regression over {threshold}%'))
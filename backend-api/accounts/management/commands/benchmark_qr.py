@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.models import User
+from accounts.utils.qr_utils import invalidate_personal_qr
+from accounts.views import generate_personal_qr_code
+
+
+class Command(BaseCommand):
+    help = 'Benchmark personal QR requests/sec with a cold render cache versus a warm one'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per phase')
+        parser.add_argument('--username', help='User to render for (defaults to the first user)')
+        parser.add_argument('--image-format', choices=['png', 'svg'], default='png')
+        parser.add_argument('--size', type=int, default=10, help='PNG box size')
+
+    def handle(self, *args, **options):
+        qs = User.objects.all()
+        if options['username']:
+            qs = qs.filter(username=options['username'])
+        user = qs.order_by('date_joined').first()
+        if user is None:
+            raise CommandError('No user found to benchmark with')
+
+        factory = APIRequestFactory()
+        params = {'image_format': options['image_format'], 'size': options['size']}
+        total = options['requests']
+
+        def run(cold):
+            started = time.perf_counter()
+            for _ in range(total):
+                if cold:
+                    invalidate_personal_qr(user.pk)
+                request = factory.get('/api/auth/qr/personal/', params)
+                force_authenticate(request, user=user)
+                response = generate_personal_qr_code(request)
+                if response.status_code != 200:
+                    raise CommandError(f'QR request failed: {response.status_code} {response.data}')
+            return time.perf_counter() - started
+
+        cold = run(cold=True)
+        warm = run(cold=False)
+
+        self.stdout.write(f"user={user.username} format={options['image_format']} size={options['size']} requests={total}")
+        self.stdout.write(f"cold: {total / cold:,.1f} req/s ({cold / total * 1000:.2f} ms/req)")
+        self.stdout.write(f"warm: {total / warm:,.1f} req/s ({warm / total * 1000:.2f} ms/req)")
+        self.stdout.write(self.style.SUCCESS(f"Warm cache speedup: {cold / warm:.1f}x"))
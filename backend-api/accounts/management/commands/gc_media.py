@@ -0,0 +1,83 @@
+import os
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.models import StoredBlob
+from accounts.storage import CAS_PREFIX, is_addressed_name
+from accounts.utils.blob_utils import count_references
+from accounts.utils.image_utils import delete_variants
+
+
+class Command(BaseCommand):
+    help = 'Delete content-addressed media blobs that no row references (and stray files under media/cas)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recount', action='store_true', help='Rebuild refcounts from the tables before collecting')
+        parser.add_argument('--grace-minutes', type=int, default=60,
+                            help='Leave blobs/files younger than this alone (uploads still in flight)')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        cutoff = timezone.now() - timedelta(minutes=options['grace_minutes'])
+
+        if options['recount']:
+            self.recount(dry_run)
+
+        removed = 0
+        for blob in StoredBlob.objects.filter(refcount__lte=0, updated_at__lt=cutoff).iterator():
+            if not dry_run:
+                default_storage.delete(blob.name)
+                delete_variants(blob.name)
+                blob.delete()
+            removed += 1
+
+        strays = self.sweep_strays(cutoff, dry_run)
+        prefix = '[dry-run] ' if dry_run else ''
+        self.stdout.write(self.style.SUCCESS(f"{prefix}Removed {removed} unreferenced blobs and {strays} stray files"))
+
+    def recount(self, dry_run):
+        counts = count_references()
+        existing = {b.name: b for b in StoredBlob.objects.all()}
+        changed = []
+        for name, blob in existing.items():
+            refcount = counts.pop(name, 0)
+            if blob.refcount != refcount:
+                blob.refcount = refcount
+                blob.updated_at = timezone.now()
+                changed.append(blob)
+        missing = [StoredBlob(name=name, refcount=refcount) for name, refcount in counts.items()]
+        if not dry_run:
+            StoredBlob.objects.bulk_update(changed, ['refcount', 'updated_at'], batch_size=500)
+            StoredBlob.objects.bulk_create(missing, batch_size=500, ignore_conflicts=True)
+        self.stdout.write(f"Recount: {len(changed)} corrected, {len(missing)} missing rows added")
+
+    def sweep_strays(self, cutoff, dry_run):
+        """Blob files on disk with no StoredBlob row (e.g. saved by an upload whose row never committed)."""
+        root = default_storage.path(CAS_PREFIX)
+        if not os.path.isdir(root):
+            return 0
+        known = set(StoredBlob.objects.values_list('name', flat=True))
+        known_stems = {os.path.splitext(name)[0] for name in known}
+        cutoff_ts = cutoff.timestamp()
+        swept = 0
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                full_path = os.path.join(dirpath, filename)
+                name = os.path.relpath(full_path, default_storage.location).replace(os.sep, '/')
+                if not is_addressed_name(name) or os.path.getmtime(full_path) >= cutoff_ts:
+                    continue
+                stem = os.path.splitext(name)[0]
+                # Variants belong to their blob; drop them only if no blob with that stem is known
+                if '__' in os.path.basename(stem):
+                    if stem.rsplit('__', 1)[0] in known_stems:
+                        continue
+                elif name in known:
+                    continue
+                if not dry_run:
+                    os.remove(full_path)
+                swept += 1
+        return swept
@@ -0,0 +1,406 @@
+"""Synthetic dataset for benchmarks: users with profiles, wallets, countries, identity
+documents and login/security history, and a power-law transaction graph between them.
+
+Everything is written with bulk_create in chunks, one database transaction per chunk.
+Every chunk draws from its own RNG seeded with (--seed, phase, chunk), and ids are
+sequential UUIDs under a seed-derived prefix, so a seed always produces the same
+dataset whatever the number of workers. Users are written first (every worker takes user
+chunks), then transactions, which only need the user indexes.
+
+Activity follows a Pareto law: a few payers and payees make most of the transactions,
+as in a real wallet graph; agents take deposits and withdrawals, enterprises draw
+payments. Every generated user logs in with PASSWORD and pays with PIN.
+"""
+
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+from functools import lru_cache
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.db.models.functions import Length
+from django.utils import timezone
+
+from accounts.management.commands.seed_countries import COUNTRIES
+from accounts.models import (
+    AgentProfile, Country, EnterpriseProfile, IdentityDocument, LoginActivity, SecurityActivity, User, UserProfile, Wallet,
+    normalize_document_number,
+)
+from accounts.utils.review_queue import forget_counts
+from transactions.fees import compute_fee
+from transactions.models import BillPayment, PhoneTopUp, Transaction
+
+PASSWORD = 'Benchmark123!'
+PIN = '1234'
+USER_CHUNK = 10_000
+TRANSACTION_CHUNK = 50_000
+BATCH_SIZE = 5000
+# Largest --seed: keeps agent codes within 20 characters and document numbers fixed-width (unique)
+MAX_SEED = 2 ** 32 - 1
+
+FIRST_NAMES = [
+    'Jean', 'Marie', 'Pierre', 'Rose', 'Jacques', 'Nadège', 'Wilson', 'Guerline', 'Frantz', 'Mirlande', 'Ricardo',
+    'Stéphanie', 'Junior', 'Fabienne', 'Emmanuel', 'Darline', 'Jude', 'Sabine', 'Reginald', 'Vanessa',
+]
+LAST_NAMES = [
+    'Baptiste', 'Joseph', 'Pierre', 'Louis', 'Jean-Louis', 'Charles', 'Etienne', 'Desir', 'François', 'Celestin',
+    'Augustin', 'Toussaint', 'Dorvil', 'Alexis', 'Noel', 'Michel', 'Saint-Fleur', 'Lamour', 'Bien-Aimé', 'Dorsainvil',
+]
+CITIES = ['Port-au-Prince', 'Delmas', 'Pétion-Ville', 'Carrefour', 'Cap-Haïtien', 'Gonaïves', 'Les Cayes', 'Saint-Marc',
+          'Jacmel', 'Jérémie', 'Hinche', 'Port-de-Paix', 'Fort-Liberté', 'Miragoâne']
+LANGUAGES = ['kreyol', 'french', 'english', 'spanish']
+LANGUAGE_SHARES = [0.7, 0.2, 0.07, 0.03]
+DOCUMENT_TYPES = ['national_id', 'passport', 'drivers_license']
+USER_AGENTS = [
+    'CashTiMachann/2.3 (Android 13)', 'CashTiMachann/2.3 (Android 11)', 'CashTiMachann/2.2 (iOS 17.4)',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/124.0',
+]
+BUSINESS_TYPES = ['Komès', 'Restoran', 'Transpò', 'Lekòl', 'Famasi', 'Boutik']
+BILL_PROVIDERS = {
+    'electricity': 'EDH', 'water': 'DINEPA', 'internet': 'Natcom', 'cable': 'Canal+ Haïti', 'school': 'Lekòl', 'other': 'Lòt',
+}
+# transaction_type, share, fee operation, lognormal mu and sigma of the amount (HTG)
+KINDS = (
+    ('send', 0.55, 'send', 7.3, 1.0),
+    ('topup', 0.15, 'topup', 5.0, 0.6),
+    ('bill_payment', 0.10, 'bill_payment', 7.5, 0.7),
+    ('deposit', 0.10, None, 8.0, 0.8),
+    ('withdrawal', 0.10, 'agent_withdrawal', 7.8, 0.8),
+)
+# Share of the day's transactions per local hour
+HOUR_PROFILE = np.array([1, 1, 1, 1, 1, 2, 4, 6, 8, 9, 9, 8, 8, 7, 7, 8, 9, 9, 8, 6, 5, 4, 2, 1], dtype=np.float64)
+STATUSES = np.array(['completed', 'failed', 'pending'])
+STATUS_SHARES = [0.97, 0.02, 0.01]
+
+
+class Population:
+    """Who is who among `users` generated users, rebuilt identically in every worker."""
+
+    def __init__(self, seed, users):
+        index = np.arange(users)
+        # Every 20th user an agent, every 100th an enterprise: fixed by index, not drawn
+        self.kind = np.where(index % 100 == 3, 'enterprise', np.where(index % 20 == 1, 'agent', 'client'))
+        rng = np.random.default_rng([seed, 0])
+        activity = rng.pareto(1.16, users) + 1  # ~80/20
+        popularity = (rng.pareto(1.16, users) + 1) * np.where(self.kind == 'enterprise', 20, 1)
+        self.user_prefix, self.transaction_prefix = (int(p) for p in rng.integers(1, 2 ** 62, 2))
+        self.payers = self._sampler(np.flatnonzero(self.kind == 'client'), activity)
+        self.payees = self._sampler(np.flatnonzero(self.kind != 'agent'), popularity)
+        self.agents = self._sampler(np.flatnonzero(self.kind == 'agent'), activity)
+        self.seed = seed
+
+    @staticmethod
+    def _sampler(members, weights):
+        if not len(members):
+            return None
+        cdf = np.cumsum(weights[members])
+        return members, cdf / cdf[-1]
+
+    @staticmethod
+    def draw(sampler, rng, count):
+        members, cdf = sampler
+        return members[np.minimum(np.searchsorted(cdf, rng.random(count)), len(members) - 1)]
+
+    def user_id(self, index):
+        return uuid.UUID(int=(self.user_prefix << 64) | int(index))
+
+    def transaction_id(self, index):
+        return uuid.UUID(int=(self.transaction_prefix << 64) | int(index))
+
+    def phone(self, index):
+        # 13 characters: only two digits of the seed fit, so seeds 100 apart share numbers
+        # (the command refuses a seed whose numbers are taken)
+        return f'509{self.seed % 100:02d}{int(index):08d}'
+
+
+@lru_cache(maxsize=4)
+def population(seed, users):
+    return Population(seed, users)
+
+
+@lru_cache(maxsize=4096)
+def _fee(operation, amount):
+    return compute_fee(operation, Decimal(amount)) if operation else Decimal('0.00')
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create keep the created_at/updated_at values it is given (historical rows)."""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _moment(anchor, seconds_before):
+    return datetime.fromtimestamp(anchor - int(seconds_before), dt_timezone.utc)
+
+
+def generate_users(config, chunk):
+    """Users [chunk * USER_CHUNK, ...) with everything hanging off them. Returns row counts."""
+    seed, users, anchor, days = config['seed'], config['users'], config['anchor'], config['days']
+    pop = population(seed, users)
+    rng = np.random.default_rng([seed, 1, chunk])
+    indexes = range(chunk * USER_CHUNK, min((chunk + 1) * USER_CHUNK, users))
+    size = len(indexes)
+    span = days * 86400
+
+    first = rng.choice(FIRST_NAMES, size)
+    last = rng.choice(LAST_NAMES, size)
+    city = rng.choice(CITIES, size)
+    joined = span + 86400 + rng.integers(0, 365 * 86400, size)  # seconds before anchor, ahead of any transaction
+    seen = rng.integers(0, min(span, 30 * 86400), size)
+    abroad = rng.random(size) < 0.1
+    countries = config['countries']
+    verified = rng.random(size)
+    language = rng.choice(LANGUAGES, size, p=LANGUAGE_SHARES)
+    balance = np.round(rng.lognormal(8, 1.5, size), 2)
+    has_document = rng.random(size) < 0.7
+    document_status = rng.choice(['verified', 'pending', 'rejected'], size, p=[0.7, 0.25, 0.05])
+    logins = np.minimum(rng.poisson(4, size), 50)
+    security_event = rng.random(size) < 0.08
+
+    rows = {model: [] for model in (User, UserProfile, Wallet, AgentProfile, EnterpriseProfile, IdentityDocument, LoginActivity, SecurityActivity)}
+    for position, index in enumerate(indexes):
+        user_id = pop.user_id(index)
+        kind = pop.kind[index]
+        created = _moment(anchor, joined[position])
+        last_login = _moment(anchor, seen[position])
+        username = f'gen{seed}_{index}'
+        rows[User].append(User(
+            id=user_id, username=username, email=f'{username}@example.com', phone_number=pop.phone(index),
+            password=config['password'], user_type=kind, first_name=first[position], last_name=last[position],
+            is_verified=verified[position] < 0.8, date_joined=created, created_at=created, updated_at=last_login,
+            last_login=last_login,
+        ))
+        country = countries[1 + position % (len(countries) - 1)] if abroad[position] else countries[0]
+        rows[UserProfile].append(UserProfile(
+            user_id=user_id, first_name=first[position], last_name=last[position], city=city[position],
+            country=country[1], residence_country_id=country[0],
+            verification_status='verified' if verified[position] < 0.6 else 'pending',
+            is_email_verified=verified[position] < 0.8, is_phone_verified=verified[position] < 0.9,
+            transaction_pin=config['pin'], preferred_language=language[position],
+        ))
+        rows[Wallet].append(Wallet(user_id=user_id, balance=Decimal(str(balance[position]))))
+        if kind == 'agent':
+            rows[AgentProfile].append(AgentProfile(
+                user_id=user_id, agent_code=f'G{seed}-{index}', is_approved=True, location=city[position],
+            ))
+        elif kind == 'enterprise':
+            rows[EnterpriseProfile].append(EnterpriseProfile(
+                user_id=user_id, company_name=f'{last[position]} & Fils', company_registration_number=f'RC-{seed}-{index}',
+                business_type=BUSINESS_TYPES[index % len(BUSINESS_TYPES)], is_approved=True,
+            ))
+        if has_document[position]:
+            number = f'{seed:010d}-{index:08d}'
+            rows[IdentityDocument].append(IdentityDocument(
+                user_id=user_id, document_type=DOCUMENT_TYPES[index % len(DOCUMENT_TYPES)], document_number=number,
+                normalized_number=normalize_document_number(number), status=document_status[position],
+                created_at=created, updated_at=created + timedelta(days=1),
+            ))
+        for at in rng.integers(int(seen[position]), int(joined[position]) + 1, logins[position]):
+            rows[LoginActivity].append(LoginActivity(
+                user_id=user_id, timestamp=_moment(anchor, at), success=rng.random() < 0.92,
+                ip_address=f'10.{index % 250}.{int(at) % 250}.{position % 250 + 1}',
+                user_agent=USER_AGENTS[int(at) % len(USER_AGENTS)],
+            ))
+        if security_event[position]:
+            rows[SecurityActivity].append(SecurityActivity(
+                user_id=user_id, event_type='password_change' if index % 2 else 'phone_change',
+                timestamp=_moment(anchor, seen[position]), user_agent=USER_AGENTS[0],
+            ))
+
+    with explicit_timestamps(User, IdentityDocument, LoginActivity, SecurityActivity), transaction.atomic():
+        for model, objects in rows.items():
+            model.objects.bulk_create(objects, batch_size=BATCH_SIZE)
+    return {model.__name__: len(objects) for model, objects in rows.items()}
+
+
+def generate_transactions(config, chunk):
+    """Transactions [chunk * TRANSACTION_CHUNK, ...), with their top-up and bill details."""
+    seed, anchor, days = config['seed'], config['anchor'], config['days']
+    pop = population(seed, config['users'])
+    rng = np.random.default_rng([seed, 2, chunk])
+    first = chunk * TRANSACTION_CHUNK
+    size = min(TRANSACTION_CHUNK, config['transactions'] - first)
+
+    kinds = rng.choice(len(KINDS), size, p=[kind[1] for kind in KINDS])
+    if pop.agents is None:
+        kinds[kinds >= 3] = 0  # no agents to deposit or withdraw with
+    sender = np.empty(size, dtype=np.int64)
+    receiver = np.full(size, -1, dtype=np.int64)
+    amount = np.empty(size, dtype=np.int64)
+    for code, (name, _, _, mu, sigma) in enumerate(KINDS):
+        rows = np.flatnonzero(kinds == code)
+        count = len(rows)
+        if name == 'deposit':
+            sender[rows], receiver[rows] = pop.draw(pop.agents, rng, count), pop.draw(pop.payers, rng, count)
+        elif name == 'withdrawal':
+            sender[rows], receiver[rows] = pop.draw(pop.payers, rng, count), pop.draw(pop.agents, rng, count)
+        else:
+            sender[rows] = pop.draw(pop.payers, rng, count)
+            if name == 'send':
+                receiver[rows] = pop.draw(pop.payees, rng, count)
+                for _ in range(10):
+                    again = rows[sender[rows] == receiver[rows]]
+                    if not len(again):
+                        break
+                    receiver[again] = pop.draw(pop.payees, rng, len(again))
+        amount[rows] = np.maximum(np.round(rng.lognormal(mu, sigma, count) / 5) * 5, 10)
+    hour = rng.choice(24, size, p=HOUR_PROFILE / HOUR_PROFILE.sum())
+    # Whole days ending before the anchor; local hours are UTC-5 (UTC-4 in summer)
+    midnight = (anchor - days * 86400) // 86400 * 86400
+    at = midnight + rng.integers(0, days, size) * 86400 + (hour + 5) % 24 * 3600 + rng.integers(0, 3600, size)
+    status = STATUSES[rng.choice(len(STATUSES), size, p=STATUS_SHARES)]
+    carrier = rng.choice(['digicel', 'natcom'], size, p=[0.7, 0.3])
+    bill_type = rng.choice(list(BILL_PROVIDERS), size)
+
+    transactions, topups, bills = [], [], []
+    for position in range(size):
+        number = first + position
+        name, _, operation = KINDS[kinds[position]][:3]
+        value = int(amount[position])
+        fee = _fee(operation, value)
+        created = datetime.fromtimestamp(int(at[position]), dt_timezone.utc)
+        state = status[position]
+        transaction_id = pop.transaction_id(number)
+        transactions.append(Transaction(
+            id=transaction_id, transaction_type=name, sender_id=pop.user_id(sender[position]),
+            receiver_id=pop.user_id(receiver[position]) if receiver[position] >= 0 else None,
+            amount=Decimal(value), fee=fee, total_amount=value + fee, reference_number=f'GEN{seed}-{number:09d}',
+            status=state, created_at=created, updated_at=created, processed_at=created if state == 'completed' else None,
+        ))
+        if name == 'topup':
+            topups.append(PhoneTopUp(
+                transaction_id=transaction_id, recipient_phone=pop.phone(sender[position]), carrier=carrier[position],
+                carrier_reference=f'{carrier[position][:3].upper()}{number}' if state == 'completed' else None,
+            ))
+        elif name == 'bill_payment':
+            bills.append(BillPayment(
+                transaction_id=transaction_id, bill_type=bill_type[position], account_number=f'{sender[position]:09d}',
+                service_provider=BILL_PROVIDERS[bill_type[position]],
+                provider_reference=f'BP{number}' if state == 'completed' else None,
+            ))
+
+    with explicit_timestamps(Transaction), transaction.atomic():
+        Transaction.objects.bulk_create(transactions, batch_size=BATCH_SIZE)
+        PhoneTopUp.objects.bulk_create(topups, batch_size=BATCH_SIZE)
+        BillPayment.objects.bulk_create(bills, batch_size=BATCH_SIZE)
+    return {'Transaction': len(transactions), 'PhoneTopUp': len(topups), 'BillPayment': len(bills)}
+
+
+def _init_worker():
+    import django
+
+    django.setup()
+    connections.close_all()
+    _tune(connection)
+
+
+def _tune(conn):
+    """SQLite: a bulk load does not need per-commit fsyncs, and wants a large page cache."""
+    if conn.vendor == 'sqlite' and not conn.in_atomic_block:
+        with conn.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous = OFF')
+            cursor.execute('PRAGMA cache_size = -262144')
+            cursor.execute('PRAGMA temp_store = MEMORY')
+
+
+class Command(BaseCommand):
+    help = 'Generate a large synthetic dataset (users, documents, activity, power-law transactions) for benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--transactions', type=int, help='Default: 20 per user')
+        parser.add_argument('--days', type=int, default=180, help='Transaction history span')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Writer processes (SQLite: always 1)')
+
+    def handle(self, *args, **options):
+        users = options['users']
+        transactions = options['transactions'] if options['transactions'] is not None else users * 20
+        if users < 2:
+            raise CommandError('Need at least 2 users')
+        if transactions < 0:
+            raise CommandError('--transactions cannot be negative')
+        seed = options['seed']
+        if not 0 <= seed <= MAX_SEED:
+            raise CommandError(f'--seed must be between 0 and {MAX_SEED}')
+        if User.objects.filter(username=f'gen{seed}_0').exists():
+            raise CommandError(f'Seed {seed} was already generated here; use another --seed')
+        pop = population(seed, users)
+        first, last = pop.phone(0), pop.phone(users - 1)
+        taken = User.objects.annotate(length=Length('phone_number')).filter(length=len(first), phone_number__range=(first, last))
+        if taken.exists():
+            raise CommandError(f'Phone numbers {first}-{last} are already in use (phone numbers repeat every 100 seeds); use another --seed')
+        workers = max(options['workers'] or 1, 1)
+        if connection.vendor == 'sqlite' and workers > 1:
+            self.stdout.write('SQLite has a single writer: using 1 worker')
+            workers = 1
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            workers = 1  # workers inherit the configured Django process
+
+        config = {
+            'seed': seed, 'users': users, 'transactions': transactions, 'days': options['days'],
+            'anchor': int(timezone.now().timestamp()), 'countries': self._countries(),
+            'password': make_password(PASSWORD), 'pin': make_password(PIN),
+        }
+        started = time.perf_counter()
+        self._phase('users', generate_users, config, -(-users // USER_CHUNK), workers)
+        self._phase('transactions', generate_transactions, config, -(-transactions // TRANSACTION_CHUNK), workers)
+        forget_counts()
+        self.stdout.write(self.style.SUCCESS(
+            f'users={users} transactions={transactions} seconds={time.perf_counter() - started:.1f} '
+            f'(password {PASSWORD!r}, PIN {PIN!r})'
+        ))
+
+    def _countries(self):
+        """(id, name) per seeded country, Haiti first."""
+        for iso2, name, kreol in COUNTRIES:
+            Country.objects.get_or_create(iso2=iso2, defaults={'name': name, 'name_kreol': kreol, 'allowed_for_registration': True})
+        by_iso = {row[0]: row[1:] for row in Country.objects.filter(iso2__in=[c[0] for c in COUNTRIES]).values_list('iso2', 'id', 'name')}
+        return [by_iso[iso2] for iso2, _, _ in COUNTRIES]
+
+    def _phase(self, label, generate, config, chunks, workers):
+        started = time.perf_counter()
+        totals = {}
+
+        def add(counts):
+            for name, count in counts.items():
+                totals[name] = totals.get(name, 0) + count
+
+        if workers == 1:
+            _tune(connection)
+            for chunk in range(chunks):
+                add(generate(config, chunk))
+                self._progress(label, chunk + 1, chunks, started)
+        else:
+            connections.close_all()  # forked workers must not share our connection
+            with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork'), initializer=_init_worker) as pool:
+                futures = [pool.submit(generate, config, chunk) for chunk in range(chunks)]
+                for done, future in enumerate(as_completed(futures), 1):
+                    add(future.result())
+                    self._progress(label, done, chunks, started)
+        self.stdout.write(f"{label}: {' '.join(f'{name}={count}' for name, count in totals.items())} "
+                          f'in {time.perf_counter() - started:.1f}s')
+
+    def _progress(self, label, done, chunks, started):
+        if done == chunks or done % 10 == 0:
+            self.stdout.write(f'  {label} {done}/{chunks} chunks, {time.perf_counter() - started:.0f}s')
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import IdentityDocument, UserProfile
+from accounts.utils.image_utils import is_image_name, process_image, variants_ready
+
+
+class Command(BaseCommand):
+    help = 'Generate thumb/medium/full WebP+JPEG variants for images uploaded before the pipeline existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Rebuild variants that already exist')
+
+    def handle(self, *args, **options):
+        names = set()
+        profile_fields = ['profile_picture', 'id_document_image', 'id_document_front', 'id_document_back']
+        for row in UserProfile.objects.values_list(*profile_fields).iterator():
+            names.update(row)
+        for row in IdentityDocument.objects.values_list('front_image', 'back_image', 'legacy_single_image').iterator():
+            names.update(row)
+
+        processed = skipped = 0
+        for name in sorted(n for n in names if n and is_image_name(n)):
+            if not options['force'] and variants_ready(name):
+                skipped += 1
+                continue
+            if process_image(name):
+                processed += 1
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} images. Already done: {skipped}"))
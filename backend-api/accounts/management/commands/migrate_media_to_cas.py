@@ -0,0 +1,61 @@
+from collections import Counter
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.storage import is_addressed_name
+from accounts.utils.blob_utils import incref, media_models
+from accounts.utils.image_utils import delete_variants, is_image_name, process_image
+
+
+class Command(BaseCommand):
+    help = 'Move media stored under legacy upload_to paths into the content-addressed tree and re-point rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--keep-originals', action='store_true', help='Do not delete the legacy files afterwards')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        moved = {}  # legacy name -> addressed name (a legacy file shared by rows is copied once)
+        missing = 0
+        rows = Counter()
+
+        for model, fields in media_models():
+            for field in fields:
+                qs = (
+                    model.objects.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''})
+                    .exclude(**{f'{field}__startswith': 'cas/'})
+                    .values_list('pk', field)
+                )
+                for pk, legacy in qs.iterator(chunk_size=options['batch_size']):
+                    if legacy not in moved:
+                        if not default_storage.exists(legacy):
+                            missing += 1
+                            continue
+                        if options['dry_run']:
+                            moved[legacy] = legacy
+                        else:
+                            with default_storage.open(legacy, 'rb') as fh:
+                                moved[legacy] = default_storage.save(legacy, fh)
+                    if not options['dry_run']:
+                        # queryset.update: no signals, refcount is bumped explicitly
+                        model.objects.filter(pk=pk).update(**{field: moved[legacy], 'updated_at': timezone.now()})
+                        incref(moved[legacy])
+                    rows[model.__name__] += 1
+
+        if not options['dry_run']:
+            for addressed in set(moved.values()):
+                if is_image_name(addressed):
+                    process_image(addressed)
+            for legacy in moved:
+                if not options['keep_originals'] and not is_addressed_name(legacy):
+                    delete_variants(legacy)
+                    default_storage.delete(legacy)
+
+        prefix = '[dry-run] ' if options['dry_run'] else ''
+        summary = ', '.join(f"{name}: {count}" for name, count in rows.items()) or 'nothing to move'
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}Moved {len(moved)} files ({summary}). Missing on disk: {missing}"
+        ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.models import UploadSession
+from accounts.utils.upload_utils import forget_session
+
+
+class Command(BaseCommand):
+    help = 'Abort expired resumable upload sessions and delete their staged bytes'
+
+    def handle(self, *args, **options):
+        expired = list(
+            UploadSession.objects.filter(status='open', expires_at__lte=timezone.now()).values_list('id', flat=True)
+        )
+        for session_id in expired:
+            forget_session(session_id)
+        UploadSession.objects.filter(id__in=expired).update(status='aborted', updated_at=timezone.now())
+        self.stdout.write(self.style.SUCCESS(f"Aborted {len(expired)} expired upload sessions"))
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:35
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0017_storedblob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentImageHash',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_key', models.CharField(max_length=120, unique=True)),
+                ('field', models.CharField(max_length=30)),
+                ('name', models.CharField(max_length=255)),
+                ('phash', models.BigIntegerField(db_index=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('document', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='image_hashes', to='accounts.identitydocument')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='document_image_hashes', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:39
+
+import re
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+_SEPARATORS = re.compile(r'[\s\-_./]+')
+
+
+def _normalize(number):
+    # Frozen copy of accounts.models.normalize_document_number
+    return _SEPARATORS.sub('', number or '').upper() or None
+
+
+def backfill_normalized_numbers(apps, schema_editor):
+    """Fill normalized_number in pk batches, then fold numbers that only exist on
+    UserProfile.id_document_number into IdentityDocument so one table answers the check.
+
+    Oldest row wins when two spellings normalize to the same number; later ones keep
+    normalized_number NULL (still visible in admin, just not claiming the number).
+    """
+    IdentityDocument = apps.get_model('accounts', 'IdentityDocument')
+    UserProfile = apps.get_model('accounts', 'UserProfile')
+    db_alias = schema_editor.connection.alias
+    documents = IdentityDocument.objects.using(db_alias)
+
+    claimed = set()
+    last_pk = 0
+    while True:
+        batch = list(documents.filter(pk__gt=last_pk).order_by('pk').only('pk', 'document_number')[:BATCH_SIZE])
+        if not batch:
+            break
+        changed = []
+        for doc in batch:
+            key = _normalize(doc.document_number)
+            if key in claimed:
+                key = None
+            elif key:
+                claimed.add(key)
+            if key:
+                doc.normalized_number = key
+                changed.append(doc)
+        documents.bulk_update(changed, ['normalized_number'])
+        last_pk = batch[-1].pk
+
+    profiles = (
+        UserProfile.objects.using(db_alias)
+        .exclude(id_document_number__isnull=True).exclude(id_document_number='')
+        .order_by('pk').values_list('pk', 'user_id', 'id_document_number', 'id_document_type', 'verification_status')
+    )
+    last_pk = 0
+    while True:
+        batch = list(profiles.filter(pk__gt=last_pk)[:BATCH_SIZE])
+        if not batch:
+            break
+        for _, user_id, number, document_type, verification_status in batch:
+            key = _normalize(number)
+            if not key or key in claimed:
+                continue
+            claimed.add(key)
+            # Reuse the user's latest document when it has no number yet
+            blank = documents.filter(user_id=user_id, normalized_number__isnull=True).filter(
+                models.Q(document_number__isnull=True) | models.Q(document_number='')
+            ).order_by('-created_at').first()
+            if blank is not None:
+                blank.document_number = number
+                blank.normalized_number = key
+                blank.save(update_fields=['document_number', 'normalized_number'])
+            else:
+                documents.create(
+                    user_id=user_id,
+                    document_type=document_type or 'unknown',
+                    document_number=number,
+                    normalized_number=key,
+                    status=verification_status or 'pending',
+                    notes='Folded from UserProfile.id_document_number during migration',
+                )
+        last_pk = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0018_documentimagehash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='identitydocument',
+            name='normalized_number',
+            field=models.CharField(blank=True, editable=False, max_length=100, null=True),
+        ),
+        migrations.RunPython(backfill_normalized_numbers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0019_identitydocument_normalized_number'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='identitydocument',
+            constraint=models.UniqueConstraint(condition=models.Q(('normalized_number__isnull', False)), fields=('normalized_number',), name='uniq_identity_document_normalized_number'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0020_identitydocument_uniq_identity_document_normalized_number'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='identitydocument',
+            name='claim_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='identitydocument',
+            name='claimed_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='claimed_documents', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='identitydocument',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='accounts_id_status_fb6e15_idx'),
+        ),
+    ]
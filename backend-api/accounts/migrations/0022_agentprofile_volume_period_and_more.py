@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0021_identitydocument_claim_expires_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agentprofile',
+            name='volume_period',
+            field=models.CharField(blank=True, default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='enterpriseprofile',
+            name='current_month_volume',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=15),
+        ),
+        migrations.AddField(
+            model_name='enterpriseprofile',
+            name='volume_period',
+            field=models.CharField(blank=True, default='', max_length=10),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 18:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0023_walletbalance'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='documentimagehash',
+            old_name='phash',
+            new_name='dhash',
+        ),
+    ]
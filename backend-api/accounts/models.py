@@ -1,6 +1,7 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.core.validators import RegexValidator
+import re
 import uuid
 
 class Country(models.Model):
@@ -136,6 +137,16 @@ class UserProfile(models.Model):
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
+_DOCUMENT_NUMBER_SEPARATORS = re.compile(r'[\s\-_./]+')
+_NOT_LOADED = object()
+
+
+def normalize_document_number(number):
+    """Canonical form used for uniqueness: upper-cased, spaces and separators removed
+    ('cin 01-23.456' -> 'CIN0123456'). None when nothing is left."""
+    return _DOCUMENT_NUMBER_SEPARATORS.sub('', number or '').upper() or None
+
+
 class IdentityDocument(models.Model):
     STATUS_CHOICES = (
         ('pending', 'Pending'),
@@ -145,11 +156,17 @@ class IdentityDocument(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='identity_documents')
     document_type = models.CharField(max_length=50)
     document_number = models.CharField(max_length=100, null=True, blank=True)
+    # normalize_document_number(document_number), maintained by save() when the number changes;
+    # uniqueness is enforced here. NULL on rows the 0019 backfill found duplicating an older number.
+    normalized_number = models.CharField(max_length=100, null=True, blank=True, editable=False)
     front_image = models.ImageField(upload_to='documents/', null=True, blank=True)
     back_image = models.ImageField(upload_to='documents/', null=True, blank=True)
     legacy_single_image = models.ImageField(upload_to='documents/', null=True, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     notes = models.TextField(null=True, blank=True)
+    # Review queue lease (see utils/review_queue.py): held by one reviewer until it expires
+    claimed_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='claimed_documents')
+    claim_expires_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -157,15 +174,48 @@ class IdentityDocument(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['document_number']),
+            models.Index(fields=['status', 'created_at', 'id']),
         ]
         constraints = [
             models.UniqueConstraint(
                 fields=['document_number'],
                 name='uniq_identity_document_number',
                 condition=models.Q(document_number__isnull=False) & ~models.Q(document_number='')
-            )
+            ),
+            models.UniqueConstraint(
+                fields=['normalized_number'],
+                name='uniq_identity_document_normalized_number',
+                condition=models.Q(normalized_number__isnull=False)
+            ),
         ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_document_number = instance.__dict__.get('document_number', _NOT_LOADED)
+        return instance
+
+    def save(self, *args, **kwargs):
+        loaded = getattr(self, '_loaded_document_number', _NOT_LOADED)
+        update_fields = kwargs.get('update_fields')
+        if self._state.adding or (
+            self.document_number != loaded if loaded is not _NOT_LOADED
+            else update_fields is not None and 'document_number' in update_fields
+        ):
+            # Only a changed number claims a normalized one: a row left NULL beside an older
+            # spelling keeps saving (status changes, notes) without tripping the unique index
+            self.normalized_number = normalize_document_number(self.document_number)
+        if self.status != 'pending':
+            # A decided document leaves the review queue
+            self.claimed_by = None
+            self.claim_expires_at = None
+        if update_fields is not None and 'document_number' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'normalized_number'}
+        if update_fields is not None and 'status' in update_fields:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'claimed_by', 'claim_expires_at'}
+        super().save(*args, **kwargs)
+        self._loaded_document_number = self.document_number
+
     def __str__(self):
         return f"{self.user.email} - {self.document_type} ({self.status})"
 
@@ -185,12 +235,28 @@ class Wallet(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.balance} {self.currency}"
 
+class WalletBalance(models.Model):
+    """A wallet's pocket in a currency other than Wallet.currency (whose balance stays on
+    Wallet.balance). Moved with conditional UPDATEs by transactions/fx.py."""
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name='balances')
+    currency = models.CharField(max_length=3, choices=Wallet.CURRENCY_CHOICES)
+    balance = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['wallet', 'currency']
+    
+    def __str__(self):
+        return f"{self.wallet.user.username} - {self.balance} {self.currency}"
+
 class AgentProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='agent_profile')
     agent_code = models.CharField(max_length=20, unique=True)
     commission_rate = models.DecimalField(max_digits=5, decimal_places=2, default=2.50)  # Percentage
     monthly_limit = models.DecimalField(max_digits=12, decimal_places=2, default=100000.00)
     current_month_volume = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
+    volume_period = models.CharField(max_length=10, blank=True, default='')  # 'YYYY-MM' of current_month_volume
     is_approved = models.BooleanField(default=False)
     location = models.CharField(max_length=200, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -206,6 +272,8 @@ class EnterpriseProfile(models.Model):
     tax_id = models.CharField(max_length=100, null=True, blank=True)
     business_type = models.CharField(max_length=100)
     monthly_transaction_limit = models.DecimalField(max_digits=15, decimal_places=2, default=1000000.00)
+    current_month_volume = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    volume_period = models.CharField(max_length=10, blank=True, default='')  # 'YYYY-MM' of current_month_volume
     is_approved = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -264,3 +332,81 @@ class SecurityActivity(models.Model):
 
     def __str__(self):
         return f"{self.user.username} {self.event_type} @ {self.timestamp.isoformat()}"
+
+
+class UploadSession(models.Model):
+    """Resumable (chunked) upload: init -> append chunks at offsets -> finalize.
+    Bytes are staged in a temp file until finalize attaches them to the target image field.
+    """
+    TARGET_CHOICES = (
+        ('profile_picture', 'Profile Picture'),
+        ('id_document', 'ID Document (single)'),
+        ('id_document_front', 'ID Document Front'),
+        ('id_document_back', 'ID Document Back'),
+        ('document_front', 'IdentityDocument Front'),
+        ('document_back', 'IdentityDocument Back'),
+    )
+    STATUS_CHOICES = (
+        ('open', 'Open'),
+        ('complete', 'Complete'),
+        ('aborted', 'Aborted'),
+    )
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    target = models.CharField(max_length=30, choices=TARGET_CHOICES)
+    document = models.ForeignKey(IdentityDocument, null=True, blank=True, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255, blank=True, default='')
+    total_size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    content_type = models.CharField(max_length=100, blank=True, default='')
+    expected_sha256 = models.CharField(max_length=64, blank=True, default='')
+    sha256 = models.CharField(max_length=64, blank=True, default='')
+    metadata = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'expires_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} {self.target} {self.received}/{self.total_size} ({self.status})"
+
+
+class StoredBlob(models.Model):
+    """Reference count for a content-addressed media file (see accounts.storage).
+    Maintained by model signals on image fields; `gc_media --recount` rebuilds it from the tables.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    refcount = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['refcount']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount})"
+
+
+class DocumentImageHash(models.Model):
+    """64-bit difference hash (dHash) of an identity-document image, for spotting the same
+    ID photo uploaded by several accounts. Rows are immutable: a replaced image gets a new row.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='document_image_hashes')
+    document = models.ForeignKey(IdentityDocument, null=True, blank=True, on_delete=models.CASCADE, related_name='image_hashes')
+    # '<model>:<pk>:<field>' of the image this hash was computed from
+    source_key = models.CharField(max_length=120, unique=True)
+    field = models.CharField(max_length=30)
+    name = models.CharField(max_length=255)
+    dhash = models.BigIntegerField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.source_key} {self.dhash & 0xFFFFFFFFFFFFFFFF:016x}"
@@ -0,0 +1,160 @@
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from cash_ti_machann import tasks
+from .models import IdentityDocument, User, UserProfile
+from .utils.blob_utils import decref, drop_unused_variants, incref
+from .utils.image_utils import is_image_name, process_image
+from .utils.dhash_utils import DOCUMENT_IMAGE_FIELDS, index_document_image
+from .utils.qr_utils import encode_payload, invalidate_personal_qr, payload_digest, personal_qr_payload
+from .utils.review_queue import bump_count
+from .utils.user360 import invalidate_stats
+
+QR_IDENTITY_FIELDS = {'phone_number', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=User, dispatch_uid='accounts.invalidate_personal_qr')
+def invalidate_personal_qr_on_identity_change(sender, instance, created, update_fields=None, **kwargs):
+    """Drop cached personal QR renders once the phone or name they encode changes."""
+    if created or (update_fields is not None and not QR_IDENTITY_FIELDS.intersection(update_fields)):
+        return
+    current = payload_digest(encode_payload(personal_qr_payload(instance)))
+    invalidate_personal_qr(instance.pk, keep_digest=current)
+
+
+@receiver(pre_save, sender=UserProfile, dispatch_uid='accounts.note_new_images.profile')
+@receiver(pre_save, sender=IdentityDocument, dispatch_uid='accounts.note_new_images.document')
+def note_new_images(sender, instance, **kwargs):
+    """Remember which ImageFields carry a fresh upload (not yet committed to storage)."""
+    instance._new_image_fields = [
+        field.name for field in sender._meta.get_fields()
+        if isinstance(field, models.ImageField)
+        and getattr(instance, field.name)
+        and not getattr(instance, field.name)._committed
+    ]
+
+
+@receiver(post_save, sender=UserProfile, dispatch_uid='accounts.queue_image_variants.profile')
+@receiver(post_save, sender=IdentityDocument, dispatch_uid='accounts.queue_image_variants.document')
+def queue_image_variants(sender, instance, **kwargs):
+    """Build resized, EXIF-free variants (and document difference hashes) of new uploads off the request path."""
+    document_fields = DOCUMENT_IMAGE_FIELDS.get(sender._meta.label, ())
+    for field_name in getattr(instance, '_new_image_fields', ()):
+        name = getattr(instance, field_name).name
+        if is_image_name(name):
+            tasks.submit(process_image, name)
+            if field_name in document_fields:
+                tasks.submit(index_document_image, sender._meta.label, instance.pk, field_name)
+    instance._new_image_fields = []
+
+
+_UNKNOWN = object()
+
+
+def _image_field_names(model):
+    return [f.attname for f in model._meta.concrete_fields if isinstance(f, models.ImageField)]
+
+
+def _stored_name(value):
+    name = getattr(value, 'name', value)
+    return name or None
+
+
+@receiver(post_init, sender=UserProfile, dispatch_uid='accounts.track_blob_names.profile')
+@receiver(post_init, sender=IdentityDocument, dispatch_uid='accounts.track_blob_names.document')
+def track_blob_names(sender, instance, **kwargs):
+    """Snapshot loaded file names so post_save can tell which blobs gained/lost a reference."""
+    loaded = instance.__dict__
+    instance._blob_names = {
+        attname: _stored_name(loaded[attname]) if attname in loaded else _UNKNOWN
+        for attname in _image_field_names(sender)
+    }
+
+
+@receiver(post_save, sender=UserProfile, dispatch_uid='accounts.update_blob_refcounts.profile')
+@receiver(post_save, sender=IdentityDocument, dispatch_uid='accounts.update_blob_refcounts.document')
+def update_blob_refcounts(sender, instance, created, update_fields=None, **kwargs):
+    previous = getattr(instance, '_blob_names', {})
+    for attname in _image_field_names(sender):
+        if update_fields is not None and attname not in update_fields:
+            continue
+        old = None if created else previous.get(attname, _UNKNOWN)
+        new = _stored_name(getattr(instance, attname))
+        if old is _UNKNOWN:
+            # Deferred field: nothing to compare against; gc_media --recount corrects drift
+            previous[attname] = new
+            continue
+        if new != old:
+            incref(new)
+            decref(old)
+            if old:
+                tasks.submit(drop_unused_variants, old)
+        previous[attname] = new
+    instance._blob_names = previous
+
+
+@receiver(post_delete, sender=UserProfile, dispatch_uid='accounts.release_blobs.profile')
+@receiver(post_delete, sender=IdentityDocument, dispatch_uid='accounts.release_blobs.document')
+def release_blobs(sender, instance, **kwargs):
+    for attname in _image_field_names(sender):
+        name = _stored_name(getattr(instance, attname))
+        decref(name)
+        if name:
+            tasks.submit(drop_unused_variants, name)
+
+
+@receiver(post_init, sender=IdentityDocument, dispatch_uid='accounts.track_review_status')
+def track_review_status(sender, instance, **kwargs):
+    instance._loaded_status = instance.__dict__.get('status', _UNKNOWN)
+
+
+@receiver(post_save, sender=IdentityDocument, dispatch_uid='accounts.count_review_status')
+def count_review_status(sender, instance, created, update_fields=None, **kwargs):
+    """Keep the cached per-status queue depth (review_queue.queue_counts) current without a COUNT(*)."""
+    if update_fields is not None and 'status' not in update_fields:
+        return
+    old = None if created else getattr(instance, '_loaded_status', _UNKNOWN)
+    new = instance.status
+    instance._loaded_status = new
+    if old is _UNKNOWN or old == new:
+        return
+
+    def apply():
+        bump_count(old, -1)
+        bump_count(new, 1)
+    transaction.on_commit(apply)
+
+
+@receiver(post_delete, sender=IdentityDocument, dispatch_uid='accounts.uncount_review_status')
+def uncount_review_status(sender, instance, **kwargs):
+    status = instance.__dict__.get('status')
+    transaction.on_commit(lambda: bump_count(status, -1))
+
+
+@receiver(post_save, sender='transactions.Transaction', dispatch_uid='accounts.user360_stats.transaction')
+@receiver(post_delete, sender='transactions.Transaction', dispatch_uid='accounts.user360_stats.transaction_delete')
+def drop_user_stats_on_transaction(sender, instance, **kwargs):
+    """New money movement changes the cached agent/enterprise stats of both parties."""
+    transaction.on_commit(lambda: invalidate_stats(instance.sender_id, instance.receiver_id))
+
+
+@receiver(post_save, sender='transactions.AgentTransaction', dispatch_uid='accounts.user360_stats.commission')
+def drop_user_stats_on_commission(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_stats(instance.agent_id))
+
+
+@receiver(post_save, sender='transactions.FeeSchedule', dispatch_uid='accounts.fee_schedule.save')
+@receiver(post_delete, sender='transactions.FeeSchedule', dispatch_uid='accounts.fee_schedule.delete')
+def reload_fee_schedule(sender, **kwargs):
+    """Every worker recompiles its fee table once the change is committed."""
+    from transactions.fees import fee_table
+    transaction.on_commit(fee_table.bump)
+
+
+@receiver(post_save, sender='transactions.ExchangeRate', dispatch_uid='accounts.exchange_rate.save')
+@receiver(post_delete, sender='transactions.ExchangeRate', dispatch_uid='accounts.exchange_rate.delete')
+def reload_exchange_rates(sender, **kwargs):
+    """Every worker reloads its rate table once the change is committed."""
+    from transactions.fx import exchange_rates
+    transaction.on_commit(exchange_rates.bump)
@@ -0,0 +1,91 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+CAS_PREFIX = 'cas'
+
+
+def is_addressed_name(name) -> bool:
+    return bool(name) and name.replace('\\', '/').startswith(CAS_PREFIX + '/')
+
+
+def addressed_name(digest: str, ext: str) -> str:
+    """`cas/ab/cd/abcd…<ext>`: two shard levels keep each directory to a few hundred entries."""
+    return f"{CAS_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{ext.lower()}"
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Filesystem storage that names uploads by the SHA-256 of their bytes.
+
+    A new upload (any name outside `cas/`) is streamed to a temp file while being hashed,
+    then moved to its sharded content address; if that blob already exists the temp copy is
+    dropped and the existing name returned, so identical uploads share one file. Reference
+    counts live in accounts.StoredBlob (kept by model signals) and unreferenced blobs are
+    removed by `manage.py gc_media`.
+
+    Names already inside `cas/` are written in place (atomically replaced): this is how
+    derived files next to a blob (image variants) and EXIF-stripped rewrites are stored.
+    The address is therefore the hash of the bytes as uploaded.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            from django.core.files import File
+            content = File(content, name)
+        if is_addressed_name(name):
+            return self._write_atomic(name, content)
+        return self._save_addressed(name, content)
+
+    def _staging_file(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        return tempfile.mkstemp(dir=directory, prefix='.incoming-')
+
+    def _finish(self, tmp_path, full_path):
+        if self.file_permissions_mode is not None:
+            os.chmod(tmp_path, self.file_permissions_mode)
+        os.replace(tmp_path, full_path)
+
+    def _save_addressed(self, name, content):
+        fd, tmp_path = self._staging_file(self.path(CAS_PREFIX))
+        hasher = hashlib.sha256()
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    hasher.update(chunk)
+                    fh.write(chunk)
+            target = addressed_name(hasher.hexdigest(), os.path.splitext(name)[1])
+            full_path = self.path(target)
+            if os.path.exists(full_path):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                self._finish(tmp_path, full_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return target
+
+    def _write_atomic(self, name, content):
+        full_path = self.path(name)
+        fd, tmp_path = self._staging_file(os.path.dirname(full_path))
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    fh.write(chunk)
+            self._finish(tmp_path, full_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return name.replace('\\', '/')
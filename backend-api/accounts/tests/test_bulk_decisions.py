@@ -0,0 +1,89 @@
+from datetime import timedelta
+
+from django.core import mail
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from accounts.models import IdentityDocument, User, UserProfile
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class BulkDocumentDecisionTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='bulkadmin', email='bulkadmin@example.com', password='Adminpass123!', user_type='admin')
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {Token.objects.create(user=self.admin).key}'}
+        self.count = 0
+
+    def applicant(self, docs=1, status='pending'):
+        self.count += 1
+        user = User.objects.create_user(username=f'bulk{self.count}', email=f'bulk{self.count}@example.com', password='Applicant123!')
+        UserProfile.objects.create(user=user, first_name=f'Bulk{self.count}', last_name='Test')
+        return user, [
+            IdentityDocument.objects.create(user=user, document_type='cin', status=status) for _ in range(docs)
+        ]
+
+    def decide(self, decisions):
+        return self.client.post(reverse('admin_bulk_document_decision'), {'decisions': decisions}, format='json', **self.auth)
+
+    def test_mixed_batch_updates_documents_profiles_and_notifies_once_per_user(self):
+        approved_user, (approved_doc,) = self.applicant()
+        kept_user, (kept_doc,) = self.applicant()
+        IdentityDocument.objects.create(user=kept_user, document_type='passport', status='verified')
+        rejected_user, (rejected_doc,) = self.applicant()
+
+        resp = self.decide([
+            {'document_id': approved_doc.id, 'action': 'approve'},
+            {'document_id': kept_doc.id, 'action': 'reject', 'reason': 'Foto twò flou'},
+            {'document_id': rejected_doc.id, 'action': 'reject'},
+            {'document_id': approved_doc.id + 1000, 'action': 'approve'},
+            {'document_id': 'abc', 'action': 'approve'},
+            {'document_id': approved_doc.id, 'action': 'maybe'},
+        ])
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual((resp.data['processed'], resp.data['approved'], resp.data['rejected']), (3, 1, 2))
+        self.assertEqual(len(resp.data['errors']), 3)
+
+        kept_doc.refresh_from_db()
+        self.assertEqual(kept_doc.status, 'rejected')
+        self.assertIn('Rezon Rejte: Foto twò flou', kept_doc.notes)
+        # still has another verified document, so the account stays verified
+        for user, expected in ((approved_user, 'verified'), (kept_user, 'verified'), (rejected_user, 'rejected')):
+            user.refresh_from_db()
+            self.assertEqual(user.profile.verification_status, expected)
+            self.assertEqual(user.is_verified, expected == 'verified')
+
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), sorted(u.email for u in (approved_user, kept_user, rejected_user)))
+        self.assertIn('Pa gen rezon ki bay', next(m.body for m in mail.outbox if m.to == [rejected_user.email]))
+
+    def test_query_count_does_not_grow_with_batch(self):
+        def run(size):
+            docs = [self.applicant()[1][0] for _ in range(size)]
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.decide([{'document_id': d.id, 'action': 'approve'} for d in docs]).data['processed'], size)
+            return len(queries)
+
+        self.assertEqual(run(2), run(20))
+
+    def test_documents_leased_by_another_reviewer_are_skipped(self):
+        other = User.objects.create_user(username='otherrev', email='otherrev@example.com', password='Adminpass123!', user_type='admin')
+        _, (doc,) = self.applicant()
+        IdentityDocument.objects.filter(id=doc.id).update(claimed_by=other, claim_expires_at=timezone.now() + timedelta(minutes=5))
+
+        resp = self.decide([{'document_id': doc.id, 'action': 'approve'}])
+        self.assertEqual(resp.data['processed'], 0)
+        self.assertEqual(resp.data['errors'][0]['document_id'], doc.id)
+        doc.refresh_from_db()
+        self.assertEqual(doc.status, 'pending')
+
+    def test_requires_admin_and_bounded_batch(self):
+        user, _ = self.applicant()
+        token = Token.objects.create(user=user)
+        resp = self.client.post(reverse('admin_bulk_document_decision'), {'decisions': []}, format='json',
+                                HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(resp.status_code, 403)
+        with self.settings(KYC_BULK_DECISION_MAX=1):
+            self.assertEqual(self.decide([{'document_id': 1, 'action': 'approve'}] * 2).status_code, 400)
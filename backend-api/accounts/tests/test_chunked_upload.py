@@ -0,0 +1,127 @@
+import hashlib
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.db.models.signals import post_save
+from django.test import override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from accounts.models import StoredBlob, User, UserProfile, UploadSession
+
+MEDIA_ROOT = tempfile.mkdtemp()
+STAGING = tempfile.mkdtemp()
+
+
+def png_bytes():
+    buffer = BytesIO()
+    Image.effect_noise((120, 120), 64).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, CHUNKED_UPLOAD_DIR=STAGING, CHUNKED_UPLOAD_MAX_CHUNK=1024, BACKGROUND_TASKS_EAGER=True)
+class ChunkedUploadTests(APITestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        shutil.rmtree(STAGING, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='chunkuser', email='chunk@example.com', password='Chunkpass123!')
+        UserProfile.objects.create(user=self.user, first_name='Chunk', last_name='User')
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {Token.objects.create(user=self.user).key}'}
+        self.data = png_bytes()
+
+    def init(self, **extra):
+        body = {'target': 'id_document_front', 'size': len(self.data), 'filename': 'front.png',
+                'sha256': hashlib.sha256(self.data).hexdigest(), 'id_document_type': 'cin', **extra}
+        resp = self.client.post(reverse('chunked_upload_init'), body, format='json', **self.auth)
+        self.assertEqual(resp.status_code, 201)
+        return resp.data['upload_id']
+
+    def append(self, upload_id, offset, chunk):
+        return self.client.generic('PATCH', reverse('chunked_upload_detail', args=[upload_id]), chunk,
+                                   content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET=str(offset), **self.auth)
+
+    def append_all(self, upload_id):
+        for offset in range(0, len(self.data), 1024):
+            self.assertEqual(self.append(upload_id, offset, self.data[offset:offset + 1024]).status_code, 200)
+
+    def test_resume_after_dropped_chunk_and_finalize(self):
+        upload_id = self.init()
+        self.assertEqual(self.append(upload_id, 0, self.data[:1000]).data['offset'], 1000)
+
+        # a gap is refused; the client asks for the offset and resumes from there
+        self.assertEqual(self.append(upload_id, 1500, self.data[1500:2000]).status_code, 409)
+        status_resp = self.client.get(reverse('chunked_upload_detail', args=[upload_id]), **self.auth)
+        self.assertEqual(status_resp['Upload-Offset'], '1000')
+
+        # retransmitted overlap (lost ack) is discarded, not duplicated
+        offset = 900
+        while offset < len(self.data):
+            resp = self.append(upload_id, offset, self.data[offset:offset + 1000])
+            self.assertEqual(resp.status_code, 200)
+            offset = resp.data['offset']
+
+        done = self.client.post(reverse('chunked_upload_finalize', args=[upload_id]), **self.auth)
+        self.assertEqual(done.status_code, 200)
+        self.assertEqual(done.data['sha256'], hashlib.sha256(self.data).hexdigest())
+        self.assertEqual(done.data['content_type'], 'image/png')
+        self.assertIsNotNone(done.data['variants'])
+
+        profile = UserProfile.objects.get(user=self.user)
+        with profile.id_document_front.open('rb') as fh:
+            self.assertEqual(fh.read(), self.data)
+        self.assertEqual(profile.id_document_type, 'cin')
+        self.assertEqual(UploadSession.objects.get(id=upload_id).status, 'complete')
+
+    def test_sniffed_type_must_match_target(self):
+        self.data = b'MZ' + b'\x00' * 500
+        upload_id = self.init()
+        self.assertEqual(self.append(upload_id, 0, self.data).status_code, 415)
+        self.assertEqual(UploadSession.objects.get(id=upload_id).status, 'aborted')
+
+    def test_type_is_sniffed_once_enough_bytes_arrive(self):
+        upload_id = self.init()
+        # shorter than the PNG signature: not judged yet
+        first = self.append(upload_id, 0, self.data[:5])
+        self.assertEqual((first.status_code, first.data['content_type']), (200, None))
+        second = self.append(upload_id, 5, self.data[5:1000])
+        self.assertEqual((second.status_code, second.data['content_type']), (200, 'image/png'))
+
+    def test_finalize_requires_all_bytes(self):
+        upload_id = self.init()
+        self.append(upload_id, 0, self.data[:1000])
+        resp = self.client.post(reverse('chunked_upload_finalize', args=[upload_id]), **self.auth)
+        self.assertEqual(resp.status_code, 409)
+        self.assertEqual(resp.data['offset'], 1000)
+
+    def test_failed_save_keeps_a_blob_other_rows_share(self):
+        upload_id = self.init(target='profile_picture')
+        self.append_all(upload_id)
+        self.assertEqual(self.client.post(reverse('chunked_upload_finalize', args=[upload_id]), **self.auth).status_code, 200)
+        name = UserProfile.objects.get(user=self.user).profile_picture.name
+
+        other = User.objects.create_user(username='chunkother', email='chunkother@example.com', password='Chunkpass123!')
+        UserProfile.objects.create(user=other, first_name='Other', last_name='User')
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {Token.objects.create(user=other).key}'}
+        upload_id = self.init(target='profile_picture')
+        self.append_all(upload_id)
+
+        def fail(sender, instance, **kwargs):
+            raise RuntimeError('disk full')
+        post_save.connect(fail, sender=UserProfile, dispatch_uid='test.fail_profile_save')
+        try:
+            resp = self.client.post(reverse('chunked_upload_finalize', args=[upload_id]), **self.auth)
+        finally:
+            post_save.disconnect(sender=UserProfile, dispatch_uid='test.fail_profile_save')
+        self.assertEqual(resp.status_code, 500)
+
+        profile = UserProfile.objects.get(user=self.user)
+        with profile.profile_picture.open('rb') as fh:
+            self.assertEqual(fh.read(), self.data)
+        self.assertEqual(StoredBlob.objects.get(name=name).refcount, 1)
+        self.assertEqual(UploadSession.objects.get(id=upload_id).status, 'open')
@@ -0,0 +1,102 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from accounts.models import LoginActivity, SecurityActivity, User, UserProfile, Wallet
+from transactions.models import Transaction
+
+
+class ConditionalResponseTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='etaguser', email='etag@example.com', password='Etagpass123!')
+        self.profile = UserProfile.objects.create(user=self.user, first_name='Etag', last_name='User')
+        Wallet.objects.create(user=self.user, balance=Decimal('100.00'))
+        self.admin = User.objects.create_user(username='etagadmin', email='etagadmin@example.com', password='Adminpass123!', user_type='admin')
+        self.token = Token.objects.create(user=self.user).key
+        self.admin_token = Token.objects.create(user=self.admin).key
+
+    def get(self, url, token=None, **extra):
+        return self.client.get(url, HTTP_AUTHORIZATION=f'Token {token or self.token}', **extra)
+
+    def test_profile_revalidates_with_etag_and_last_modified(self):
+        first = self.get(reverse('profile'))
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first.has_header('Last-Modified'))
+        self.assertEqual(self.get(reverse('profile'), HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        self.assertEqual(self.get(reverse('profile'), HTTP_IF_MODIFIED_SINCE=first['Last-Modified']).status_code, 304)
+
+        self.profile.city = 'Jacmel'
+        self.profile.save()
+        self.assertEqual(self.get(reverse('profile'), HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
+
+    def test_language_and_user_profile_share_the_layer(self):
+        for name in ('get_user_language', 'get_user_profile'):
+            etag = self.get(reverse(name))['ETag']
+            self.assertEqual(self.get(reverse(name), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_transaction_list_etag_follows_status_changes_and_query(self):
+        tx = Transaction.objects.create(
+            transaction_type='send', sender=self.user, amount=Decimal('5.00'), total_amount=Decimal('5.00'),
+            reference_number='TXNETAG1', status='pending'
+        )
+        url = reverse('user_transactions')
+        etag = self.get(url)['ETag']
+        self.assertEqual(self.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.get(url + '?limit=5', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        tx.status = 'completed'
+        tx.save()
+        self.assertEqual(self.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_is_per_user(self):
+        other = User.objects.create_user(username='etagother', email='etagother@example.com', password='Etagpass123!')
+        other_token = Token.objects.create(user=other).key
+        url = reverse('user_transactions')
+        mine = self.get(url)
+        self.assertIn('Authorization', mine['Vary'])
+        # Both lists are empty, but they are different users' lists
+        theirs = self.get(url, other_token, HTTP_IF_NONE_MATCH=mine['ETag'])
+        self.assertEqual(theirs.status_code, 200)
+        self.assertNotEqual(theirs['ETag'], mine['ETag'])
+
+    def test_admin_detail_checks_role_before_revalidating(self):
+        url = reverse('admin_user_details', kwargs={'user_id': self.user.id})
+        etag = self.get(url, token=self.admin_token)['ETag']
+        self.assertEqual(self.get(url, token=self.admin_token, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 403)
+
+    def test_admin_detail_last_modified_follows_activity(self):
+        url = reverse('admin_user_details', kwargs={'user_id': self.user.id})
+        since = self.get(url, token=self.admin_token)['Last-Modified']
+        self.assertEqual(self.get(url, token=self.admin_token, HTTP_IF_MODIFIED_SINCE=since).status_code, 304)
+
+        later = timezone.now() + timedelta(seconds=5)
+        for model, extra in ((SecurityActivity, {'event_type': 'password_change'}), (LoginActivity, {'success': False})):
+            model.objects.filter(pk=model.objects.create(user=self.user, **extra).pk).update(timestamp=later)
+            resp = self.get(url, token=self.admin_token, HTTP_IF_MODIFIED_SINCE=since)
+            self.assertEqual(resp.status_code, 200)
+            since = resp['Last-Modified']
+            later += timedelta(seconds=5)
+
+    def test_security_overview_revalidates_by_etag_only(self):
+        first = self.get(reverse('security_overview'))
+        self.assertFalse(first.has_header('Last-Modified'))
+        self.assertEqual(self.get(reverse('security_overview'), HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        SecurityActivity.objects.create(user=self.user, event_type='password_change')
+        self.assertEqual(self.get(reverse('security_overview'), HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
+
+    def test_admin_detail_with_signed_urls_revalidates_within_one_window(self):
+        documents = reverse('admin_user_details', kwargs={'user_id': self.user.id}) + '?sections=documents'
+        wallet = reverse('admin_user_details', kwargs={'user_id': self.user.id}) + '?sections=wallet'
+        now = time.time()
+        with mock.patch('accounts.utils.media_utils.time.time', return_value=now):
+            etags = {url: self.get(url, token=self.admin_token)['ETag'] for url in (documents, wallet)}
+            self.assertEqual(self.get(documents, token=self.admin_token, HTTP_IF_NONE_MATCH=etags[documents]).status_code, 304)
+        with mock.patch('accounts.utils.media_utils.time.time', return_value=now + 120):
+            self.assertEqual(self.get(documents, token=self.admin_token, HTTP_IF_NONE_MATCH=etags[documents]).status_code, 200)
+            self.assertEqual(self.get(wallet, token=self.admin_token, HTTP_IF_NONE_MATCH=etags[wallet]).status_code, 304)
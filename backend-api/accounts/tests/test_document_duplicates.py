@@ -0,0 +1,91 @@
+import random
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from PIL import Image, ImageDraw
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from accounts.models import DocumentImageHash, User, UserProfile
+from accounts.utils.dhash_utils import BKTree, hamming, reset_document_hash_index
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def id_card(seed, size=None, quality=90):
+    rng = random.Random(seed)
+    img = Image.new('RGB', (600, 380), (230, 230, 220))
+    draw = ImageDraw.Draw(img)
+    for _ in range(12):
+        x, y = rng.randrange(600), rng.randrange(380)
+        draw.rectangle([x, y, x + rng.randrange(40, 200), y + rng.randrange(20, 120)],
+                       fill=(rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    if size:
+        img = img.resize(size)
+    buffer = BytesIO()
+    img.save(buffer, format='JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, BACKGROUND_TASKS_EAGER=True)
+class DocumentDuplicateTests(APITestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        reset_document_hash_index()
+        self.admin = User.objects.create_user(username='kycadmin', email='kycadmin@example.com', password='Adminpass123!', user_type='admin')
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {Token.objects.create(user=self.admin).key}'}
+
+    def applicant(self, username, image):
+        user = User.objects.create_user(username=username, email=f'{username}@example.com', password='Kycpass123!')
+        UserProfile.objects.create(
+            user=user, first_name=username, last_name='Test', verification_status='pending',
+            id_document_front=SimpleUploadedFile(f'{username}.jpg', image, content_type='image/jpeg'),
+        )
+        return user
+
+    def test_review_queue_flags_recompressed_copies(self):
+        original = self.applicant('kyc_first', id_card(1))
+        # same card, re-encoded smaller and at lower quality: different bytes, same picture
+        copy = self.applicant('kyc_copy', id_card(1, size=(450, 285), quality=60))
+        self.applicant('kyc_other', id_card(2))
+        self.assertEqual(DocumentImageHash.objects.count(), 3)
+
+        resp = self.client.get(reverse('admin_review_documents'), **self.auth)
+        by_user = {d['user_id']: d['possible_duplicates'] for d in resp.data['documents']}
+        self.assertEqual([d['user_id'] for d in by_user[str(original.id)]], [str(copy.id)])
+        self.assertEqual([d['user_id'] for d in by_user[str(copy.id)]], [str(original.id)])
+        self.assertEqual(len([d for d in by_user.values() if d]), 2)
+
+    def test_duplicate_lookup_is_batched(self):
+        from accounts.views import _document_duplicates
+
+        users = [self.applicant(f'kyc_batch{i}', id_card(10 + i % 2)) for i in range(6)]
+        _document_duplicates([u.id for u in users])
+        # hash rows, index catch-up, live-id check, matched users: independent of the row count
+        with self.assertNumQueries(4):
+            found = _document_duplicates([u.id for u in users])
+        self.assertEqual(sorted(d['user_id'] for d in found[str(users[0].id)]), sorted(str(u.id) for u in users[2::2]))
+
+    def test_backfill_command_hashes_existing_documents(self):
+        self.applicant('kyc_old', id_card(3))
+        DocumentImageHash.objects.all().delete()
+        call_command('backfill_document_hashes', '--workers', '2', stdout=StringIO())
+        self.assertEqual(DocumentImageHash.objects.count(), 1)
+
+    def test_bk_tree_matches_linear_scan(self):
+        rng = random.Random(7)
+        values = [rng.getrandbits(64) for _ in range(2000)]
+        tree = BKTree()
+        for i, value in enumerate(values):
+            tree.add(value, i)
+        query = values[123] ^ 0b1011  # 3 bits away
+        expected = sorted(i for i, v in enumerate(values) if hamming(v, query) <= 6)
+        self.assertEqual(sorted(p for _, p in tree.search(query, 6)), expected)
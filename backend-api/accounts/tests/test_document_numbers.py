@@ -0,0 +1,119 @@
+import importlib
+import shutil
+import tempfile
+from io import BytesIO
+from types import SimpleNamespace
+
+from django.apps import apps
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from accounts.models import IdentityDocument, User, UserProfile, normalize_document_number
+from accounts.views import _document_number_taken
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def png_upload(name='id.png'):
+    buffer = BytesIO()
+    Image.new('RGB', (40, 30), (200, 10, 10)).save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+def make_user(username):
+    user = User.objects.create_user(username=username, email=f'{username}@example.com', password='Docpass123!')
+    UserProfile.objects.create(user=user, first_name=username, last_name='Test')
+    return user
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, BACKGROUND_TASKS_EAGER=True)
+class DocumentNumberUniquenessTests(APITestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def upload(self, user, number):
+        token = Token.objects.get_or_create(user=user)[0]
+        return self.client.post(reverse('upload_document'), {
+            'id_document': png_upload(), 'id_document_type': 'cin', 'id_document_number': number,
+        }, HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def test_normalization(self):
+        self.assertEqual(normalize_document_number(' cin 01-23.456/7_8 '), 'CIN012345678')
+        self.assertIsNone(normalize_document_number(' - '))
+        self.assertIsNone(normalize_document_number(None))
+
+    def test_legacy_upload_claims_normalized_number(self):
+        first, second = make_user('docfirst'), make_user('docsecond')
+        self.assertEqual(self.upload(first, 'CIN 123-456').status_code, 200)
+        doc = IdentityDocument.objects.get(user=first)
+        self.assertEqual((doc.document_number, doc.normalized_number), ('CIN 123-456', 'CIN123456'))
+
+        resp = self.upload(second, 'cin123456')
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.data['error'], 'Nimewo dokiman sa a deja egziste.')
+
+        # resubmitting your own number is not a duplicate and does not add rows
+        self.assertEqual(self.upload(first, 'cin-123456').status_code, 200)
+        self.assertEqual(IdentityDocument.objects.filter(user=first).count(), 1)
+
+    def test_backfilled_duplicate_still_saves(self):
+        first, second = make_user('dupfirst'), make_user('dupsecond')
+        IdentityDocument.objects.create(user=first, document_type='cin', document_number='CIN0123')
+        dup = IdentityDocument.objects.create(user=second, document_type='cin', document_number='other')
+        # what the 0019 backfill leaves for a later spelling of an existing number
+        IdentityDocument.objects.filter(pk=dup.pk).update(document_number='cin 01-23', normalized_number=None)
+
+        dup = IdentityDocument.objects.get(pk=dup.pk)
+        dup.status = 'rejected'
+        dup.save(update_fields=['status'])
+        dup.notes = 'same card as dupfirst'
+        dup.save()
+        self.assertIsNone(IdentityDocument.objects.get(pk=dup.pk).normalized_number)
+
+        # a real change of number is normalized again
+        dup.document_number = 'CIN 999'
+        dup.save(update_fields=['document_number'])
+        self.assertEqual(IdentityDocument.objects.get(pk=dup.pk).normalized_number, 'CIN999')
+
+    def test_check_is_a_single_query(self):
+        owner, other = make_user('docowner'), make_user('docother')
+        IdentityDocument.objects.create(user=owner, document_type='passport', document_number='PA 998877')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(_document_number_taken('pa-998877', other))
+        self.assertEqual(len(queries), 1)
+        self.assertIn('normalized_number', queries[0]['sql'])
+        self.assertFalse(_document_number_taken('PA998877', owner))
+
+
+class DocumentNumberBackfillTests(TestCase):
+    def test_backfill_batches_and_folds_profile_numbers(self):
+        migration = importlib.import_module('accounts.migrations.0019_identitydocument_normalized_number')
+        old, clash, blank_doc, fresh = (make_user(name) for name in ('bfold', 'bfclash', 'bfblank', 'bffresh'))
+        # bulk_create skips save(): rows look like they did before the column existed
+        IdentityDocument.objects.bulk_create([
+            IdentityDocument(user=old, document_type='cin', document_number='ab-12'),
+            IdentityDocument(user=clash, document_type='cin', document_number='AB12'),
+            IdentityDocument(user=blank_doc, document_type='cin', document_number=''),
+        ])
+        UserProfile.objects.filter(user=blank_doc).update(id_document_number='zz 77', id_document_type='cin')
+        UserProfile.objects.filter(user=fresh).update(id_document_number='nif.555', id_document_type='nif')
+
+        migration.BATCH_SIZE = 1
+        try:
+            migration.backfill_normalized_numbers(apps, SimpleNamespace(connection=connection))
+        finally:
+            migration.BATCH_SIZE = 1000
+
+        self.assertEqual(IdentityDocument.objects.get(user=old).normalized_number, 'AB12')
+        self.assertIsNone(IdentityDocument.objects.get(user=clash).normalized_number)
+        folded = IdentityDocument.objects.get(user=blank_doc)
+        self.assertEqual((folded.document_number, folded.normalized_number), ('zz 77', 'ZZ77'))
+        created = IdentityDocument.objects.get(user=fresh)
+        self.assertEqual((created.document_type, created.normalized_number), ('nif', 'NIF555'))
@@ -0,0 +1,71 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count, F
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts.management.commands.generate_dataset import PASSWORD, population
+from accounts.models import AgentProfile, IdentityDocument, LoginActivity, User
+from accounts.utils.review_queue import queue_counts
+from transactions.models import BillPayment, PhoneTopUp, Transaction
+
+
+class GenerateDatasetTests(TestCase):
+    def generate(self, **options):
+        call_command('generate_dataset', users=200, transactions=3000, seed=5, workers=1, days=30, stdout=StringIO(), **options)
+
+    def test_dataset_is_complete_and_historical(self):
+        queue_counts()  # cached counters must not survive the bulk load
+        self.generate()
+        users = User.objects.filter(username__startswith='gen5_')
+        self.assertEqual(users.count(), 200)
+        self.assertEqual(users.filter(profile__isnull=False, wallet__isnull=False).count(), 200)
+        self.assertEqual(AgentProfile.objects.count(), users.filter(user_type='agent').count())
+        self.assertEqual(queue_counts()['pending'], IdentityDocument.objects.filter(status='pending').count())
+        self.assertTrue(LoginActivity.objects.filter(user__in=users).exists())
+        self.assertEqual(users.get(username='gen5_0').pk, population(5, 200).user_id(0))
+        self.assertTrue(users.get(username='gen5_7').check_password(PASSWORD))
+
+        self.assertEqual(Transaction.objects.count(), 3000)
+        self.assertEqual(PhoneTopUp.objects.count(), Transaction.objects.filter(transaction_type='topup').count())
+        self.assertEqual(BillPayment.objects.count(), Transaction.objects.filter(transaction_type='bill_payment').count())
+        self.assertFalse(Transaction.objects.filter(sender=F('receiver')).exists())
+        self.assertFalse(Transaction.objects.filter(transaction_type='deposit').exclude(sender__user_type='agent').exists())
+        self.assertFalse(Transaction.objects.filter(transaction_type='withdrawal').exclude(receiver__user_type='agent').exists())
+        now = timezone.now()
+        self.assertFalse(Transaction.objects.filter(created_at__gt=now).exists())
+        self.assertFalse(Transaction.objects.filter(created_at__lt=now - timedelta(days=32)).exists())
+        self.assertFalse(Transaction.objects.filter(created_at__lt=F('sender__date_joined')).exists())
+
+    def test_activity_follows_a_power_law(self):
+        self.generate()
+        per_sender = sorted(
+            Transaction.objects.filter(transaction_type='send').values('sender').annotate(n=Count('id')).values_list('n', flat=True),
+            reverse=True,
+        )
+        # The busiest tenth of the payers makes well over a tenth of the payments
+        self.assertGreater(sum(per_sender[:len(per_sender) // 10]), 0.3 * sum(per_sender))
+
+    def test_a_seed_is_generated_once(self):
+        self.generate()
+        with self.assertRaises(CommandError):
+            self.generate()
+
+    def test_seeds_sharing_phone_digits_are_refused_before_writing(self):
+        call_command('generate_dataset', users=30, transactions=0, seed=5, workers=1, stdout=StringIO())
+        # Document numbers and agent codes carry the whole seed; only the phones can clash
+        self.assertNotEqual(population(5, 30).phone(0), population(6, 30).phone(0))
+        with self.assertRaisesMessage(CommandError, 'Phone numbers'):
+            call_command('generate_dataset', users=30, transactions=0, seed=105, workers=1, stdout=StringIO())
+        self.assertFalse(User.objects.filter(username__startswith='gen105_').exists())
+        call_command('generate_dataset', users=30, transactions=0, seed=1005 * 1000 + 6, workers=1, stdout=StringIO())
+        self.assertEqual(IdentityDocument.objects.values('normalized_number').distinct().count(), IdentityDocument.objects.count())
+
+    def test_bad_counts_are_named(self):
+        with self.assertRaisesMessage(CommandError, '--transactions cannot be negative'):
+            call_command('generate_dataset', users=10, transactions=-1, stdout=StringIO())
+        with self.assertRaisesMessage(CommandError, 'Need at least 2 users'):
+            call_command('generate_dataset', users=1, stdout=StringIO())
@@ -0,0 +1,86 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from accounts.models import User, UserProfile
+from accounts.utils.image_utils import variant_name
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def jpeg_with_exif(size=(1200, 800)):
+    img = Image.new('RGB', size, (200, 30, 30))
+    exif = Image.Exif()
+    exif[0x0110] = 'Test Camera'  # Model
+    buffer = BytesIO()
+    img.save(buffer, format='JPEG', exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, BACKGROUND_TASKS_EAGER=True)
+class ImagePipelineTests(APITestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='photouser', email='photo@example.com', password='Photopass123!')
+        UserProfile.objects.create(user=self.user, first_name='Foto', last_name='Moun')
+        self.token = Token.objects.create(user=self.user).key
+
+    def test_profile_photo_gets_stripped_resized_variants(self):
+        upload = SimpleUploadedFile('me.jpg', jpeg_with_exif(), content_type='image/jpeg')
+        resp = self.client.post(reverse('upload_profile_photo'), {'profile_picture': upload},
+                                HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertEqual(resp.status_code, 200)
+        variants = resp.data['profile_picture_variants']
+        self.assertEqual(set(variants), {'thumb', 'medium', 'full'})
+        self.assertTrue(variants['thumb']['webp'].endswith('__thumb.webp'))
+
+        name = UserProfile.objects.get(user=self.user).profile_picture.name
+        with default_storage.open(variant_name(name, 'thumb', 'jpeg')) as fh:
+            thumb = Image.open(fh)
+            self.assertLessEqual(max(thumb.size), 160)
+            self.assertFalse(thumb.getexif())
+        with default_storage.open(name) as fh:
+            self.assertFalse(Image.open(fh).getexif())
+
+        profile = self.client.get(reverse('profile'), HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertTrue(profile.data['profile']['profile_picture_variants']['medium']['jpeg'].startswith('http'))
+
+    def test_pdf_documents_are_left_alone(self):
+        upload = SimpleUploadedFile('id.pdf', b'%PDF-1.4 test', content_type='application/pdf')
+        resp = self.client.post(reverse('upload_document'), {'id_document': upload, 'id_document_type': 'passport'},
+                                HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertEqual(resp.status_code, 200)
+        self.assertIsNone(resp.data['document_variants'])
+
+    def upload_photo(self, token, data):
+        upload = SimpleUploadedFile('me.jpg', data, content_type='image/jpeg')
+        resp = self.client.post(reverse('upload_profile_photo'), {'profile_picture': upload}, HTTP_AUTHORIZATION=f'Token {token}')
+        self.assertEqual(resp.status_code, 200)
+
+    def test_replaced_photo_loses_its_variants_unless_shared(self):
+        self.upload_photo(self.token, jpeg_with_exif())
+        first = UserProfile.objects.get(user=self.user).profile_picture.name
+        other = User.objects.create_user(username='photoshare', email='photoshare@example.com', password='Photopass123!')
+        UserProfile.objects.create(user=other, first_name='Lot', last_name='Moun')
+        other_token = Token.objects.create(user=other).key
+        self.upload_photo(other_token, jpeg_with_exif())
+        self.assertEqual(UserProfile.objects.get(user=other).profile_picture.name, first)
+
+        # the other account still shows the same blob: its variants stay
+        self.upload_photo(self.token, jpeg_with_exif(size=(900, 900)))
+        self.assertTrue(default_storage.exists(variant_name(first, 'thumb', 'webp')))
+        # the last reference goes: so do the variants
+        self.upload_photo(other_token, jpeg_with_exif(size=(700, 500)))
+        self.assertFalse(default_storage.exists(variant_name(first, 'thumb', 'webp')))
+        self.assertTrue(default_storage.exists(variant_name(UserProfile.objects.get(user=other).profile_picture.name, 'thumb', 'webp')))
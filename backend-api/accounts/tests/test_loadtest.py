@@ -0,0 +1,92 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from accounts.models import User
+from cash_ti_machann.loadtest import Histogram, compare
+
+
+def _report(p50, p99, rps, errors=0, requests=100):
+    return {'meta': {}, 'scenarios': {'search_users': {
+        'requests': requests, 'errors': errors, 'throughput_rps': rps, 'latency_ms': {'p50': p50, 'p99': p99},
+    }}}
+
+
+class HistogramTests(TestCase):
+    def test_percentiles_are_within_a_bucket(self):
+        histogram = Histogram()
+        for ms in range(1, 1001):
+            histogram.record(ms / 1000)
+        for percent, exact in ((50, 0.5), (90, 0.9), (99, 0.99)):
+            self.assertLessEqual(abs(histogram.percentile(percent) - exact) / exact, 0.1)
+        self.assertEqual(histogram.percentile(100), 1.0)
+
+    def test_merge_survives_the_report_round_trip(self):
+        first, second = Histogram(), Histogram()
+        for seconds in (0.001, 0.002, 0.004):
+            first.record(seconds)
+        second.record(0.2)
+        first.merge(Histogram.from_dict(json.loads(json.dumps(second.to_dict()))))
+        self.assertEqual((first.count, first.max), (4, 0.2))
+        self.assertAlmostEqual(first.total, 0.207)
+
+    def test_compare_flags_slower_or_failing_runs(self):
+        rows, regressions = compare(_report(10, 50, 100), _report(10.5, 52, 98))
+        self.assertEqual((rows[0]['p99'], regressions), ((50, 52), []))
+        _, regressions = compare(_report(10, 50, 100), _report(10, 80, 70, errors=5))
+        self.assertEqual([line.split(':')[1].split()[0] for line in regressions], ['p99', 'throughput', 'error'])
+
+
+class BenchmarkEndpointsTests(TestCase):
+    def setUp(self):
+        call_command('generate_dataset', users=40, transactions=300, seed=11, workers=1, stdout=StringIO())
+        handle, self.path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+
+    def test_run_writes_a_report_and_compare_reads_it(self):
+        call_command('benchmark_endpoints', duration=1.5, warmup=0, processes=1, actors=10, output=self.path, stdout=StringIO())
+        with open(self.path) as f:
+            report = json.load(f)
+        self.assertEqual(set(report['scenarios']), {'login', 'send_money', 'search_users', 'admin_all_transactions', 'admin_dashboard_stats'})
+        self.assertEqual((report['meta']['target'], report['meta']['actors'], report['meta']['transactions'] >= 300), ('test-client', 10, True))
+        self.assertTrue(report['meta']['velocity_rules'])
+        # the throwaway admin behind the admin scenarios is gone
+        self.assertGreater(report['scenarios']['admin_dashboard_stats']['requests'], 0)
+        self.assertFalse(User.objects.filter(user_type='admin').exists())
+        searches = report['scenarios']['search_users']
+        self.assertGreater(searches['requests'], 0)
+        self.assertEqual(searches['statuses'], {'200': searches['requests']})
+        self.assertLessEqual(searches['latency_ms']['p50'], searches['latency_ms']['p99'])
+
+        out = StringIO()
+        call_command('benchmark_endpoints', compare=[self.path, self.path], stdout=out)
+        self.assertIn('No regression', out.getvalue())
+
+    def test_unknown_scenario_is_refused(self):
+        with self.assertRaises(CommandError):
+            call_command('benchmark_endpoints', scenarios='search_users,nope', output=self.path, stdout=StringIO())
+
+    def test_a_server_run_needs_an_explicit_admin(self):
+        with self.assertRaisesMessage(CommandError, '--admin'):
+            call_command('benchmark_endpoints', base_url='http://127.0.0.1:9', output=self.path, stdout=StringIO())
+        with self.assertRaisesMessage(CommandError, 'No active admin'):
+            call_command('benchmark_endpoints', base_url='http://127.0.0.1:9', admin='nobody', output=self.path, stdout=StringIO())
+        self.assertFalse(User.objects.filter(user_type='admin').exists())
+
+    def test_velocity_rules_can_be_left_out_in_process(self):
+        statuses = {}
+        with self.settings(VELOCITY_RULES=[{'name': 'none', 'dimension': 'user', 'window': '1m', 'max_count': 0, 'action': 'block'}]):
+            for no_velocity in (False, True):
+                call_command('benchmark_endpoints', scenarios='send_money', no_velocity=no_velocity, duration=0.5, warmup=0,
+                             processes=1, actors=4, output=self.path, stdout=StringIO())
+                with open(self.path) as f:
+                    report = json.load(f)
+                self.assertEqual(report['meta']['velocity_rules'], not no_velocity)
+                statuses[no_velocity] = set(report['scenarios']['send_money']['statuses'])
+        self.assertEqual(statuses, {False: {'429'}, True: {'201'}})
@@ -0,0 +1,77 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+from accounts.models import StoredBlob, User, UserProfile
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def png(color):
+    buffer = BytesIO()
+    Image.new('RGB', (64, 64), color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, BACKGROUND_TASKS_EAGER=True)
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def make_profile(self, username, data=None):
+        user = User.objects.create_user(username=username, email=f'{username}@example.com', password='Mediapass123!')
+        profile = UserProfile(user=user, first_name=username, last_name='Media')
+        if data is not None:
+            profile.profile_picture = SimpleUploadedFile(f'{username}.png', data, content_type='image/png')
+        profile.save()
+        return profile
+
+    def test_identical_uploads_share_one_refcounted_blob(self):
+        data = png((1, 2, 3))
+        a = self.make_profile('media_a', data)
+        b = self.make_profile('media_b', data)
+        self.assertEqual(a.profile_picture.name, b.profile_picture.name)
+        self.assertRegex(a.profile_picture.name, r'^cas/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.png$')
+        self.assertEqual(StoredBlob.objects.get(name=a.profile_picture.name).refcount, 2)
+
+        name = a.profile_picture.name
+        a = UserProfile.objects.get(pk=a.pk)
+        a.profile_picture = SimpleUploadedFile('new.png', png((9, 9, 9)), content_type='image/png')
+        a.save()
+        self.assertEqual(StoredBlob.objects.get(name=name).refcount, 1)
+
+        UserProfile.objects.get(pk=b.pk).delete()
+        self.assertEqual(StoredBlob.objects.get(name=name).refcount, 0)
+        call_command('gc_media', '--grace-minutes', '-1', stdout=StringIO())
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(default_storage.exists(name.replace('.png', '__thumb.webp')))
+        self.assertTrue(default_storage.exists(a.profile_picture.name))
+
+    def test_migrate_command_moves_legacy_files(self):
+        profile = self.make_profile('media_legacy')
+        legacy = os.path.join(MEDIA_ROOT, 'profile_pictures', 'legacy.png')
+        os.makedirs(os.path.dirname(legacy), exist_ok=True)
+        with open(legacy, 'wb') as fh:
+            fh.write(png((5, 5, 5)))
+        UserProfile.objects.filter(pk=profile.pk).update(profile_picture='profile_pictures/legacy.png')
+
+        call_command('migrate_media_to_cas', stdout=StringIO())
+        name = UserProfile.objects.get(pk=profile.pk).profile_picture.name
+        self.assertTrue(name.startswith('cas/'))
+        self.assertTrue(default_storage.exists(name))
+        self.assertFalse(os.path.exists(legacy))
+        self.assertEqual(StoredBlob.objects.get(name=name).refcount, 1)
+
+    def test_recount_repairs_drift(self):
+        profile = self.make_profile('media_drift', png((7, 7, 7)))
+        StoredBlob.objects.filter(name=profile.profile_picture.name).update(refcount=5)
+        call_command('gc_media', '--recount', stdout=StringIO())
+        self.assertEqual(StoredBlob.objects.get(name=profile.profile_picture.name).refcount, 1)
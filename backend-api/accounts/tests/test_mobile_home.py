@@ -0,0 +1,82 @@
+from decimal import Decimal
+
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from accounts.models import User, UserProfile, Wallet
+from transactions.models import Transaction
+
+
+class MobileHomeTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='homeuser',
+            email='home@example.com',
+            password='Homepass123!',
+            phone_number='+50937000001',
+            is_active=True
+        )
+        self.profile = UserProfile.objects.create(user=self.user, first_name='Home', last_name='User')
+        self.wallet = Wallet.objects.create(user=self.user, balance=Decimal('500.00'))
+        self.other = User.objects.create_user(username='other', email='other@example.com', password='Otherpass123!')
+        Transaction.objects.create(
+            transaction_type='send', sender=self.user, receiver=self.other,
+            amount=Decimal('50.00'), fee=Decimal('0.50'), total_amount=Decimal('50.50'),
+            reference_number='TXNHOME01', status='completed'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.url = reverse('mobile_home')
+
+    def get(self, **extra):
+        return self.client.get(self.url, HTTP_AUTHORIZATION=f'Token {self.token.key}', **extra)
+
+    def test_home_combines_profile_stats_transactions_and_pin(self):
+        resp = self.get()
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['wallet']['balance'], '500.00')
+        self.assertEqual(resp.data['stats']['monthly_transactions'], 1)
+        self.assertEqual(resp.data['stats']['recent_transaction'], '-50.00 HTG')
+        self.assertEqual(len(resp.data['recent_transactions']), 1)
+        self.assertFalse(resp.data['pin']['has_pin'])
+        self.assertTrue(resp.has_header('ETag'))
+
+    def test_matching_etag_returns_304_without_building_payload(self):
+        etag = self.get()['ETag']
+        # token lookup + validator query only
+        with self.assertNumQueries(2):
+            resp = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp['ETag'], etag)
+
+    def test_etag_changes_when_wallet_or_transactions_change(self):
+        etag = self.get()['ETag']
+        self.wallet.balance = Decimal('400.00')
+        self.wallet.save()
+        resp = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp['ETag'], etag)
+
+        etag = resp['ETag']
+        Transaction.objects.create(
+            transaction_type='send', sender=self.other, receiver=self.user,
+            amount=Decimal('10.00'), total_amount=Decimal('10.00'),
+            reference_number='TXNHOME02', status='completed'
+        )
+        resp = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['stats']['recent_transaction'], '+10.00 HTG')
+
+    def test_etag_changes_when_a_transaction_status_changes(self):
+        tx = Transaction.objects.create(
+            transaction_type='send', sender=self.user, receiver=self.other,
+            amount=Decimal('20.00'), total_amount=Decimal('20.00'),
+            reference_number='TXNHOME03', status='pending'
+        )
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        tx.status = 'failed'
+        tx.save()
+        resp = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['recent_transactions'][0]['status'], 'failed')
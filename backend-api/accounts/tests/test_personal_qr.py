@@ -0,0 +1,57 @@
+import base64
+import json
+
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from accounts.models import User
+
+
+class PersonalQRTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='qruser', email='qr@example.com', password='Qrpass123!',
+            phone_number='+50937000010', first_name='Kòd', last_name='Pèsonèl'
+        )
+        self.token = Token.objects.create(user=self.user).key
+        self.url = reverse('generate_personal_qr_code')
+
+    def get(self, **params):
+        return self.client.get(self.url, params, HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def test_payload_is_deterministic_and_png_is_cached(self):
+        first = self.get()
+        self.assertEqual(first.status_code, 200)
+        payload = json.loads(first.data['qr_data'])
+        self.assertEqual(payload['type'], 'personal_receive')
+        self.assertNotIn('timestamp', payload)
+        self.assertTrue(base64.b64decode(first.data['qr_image']).startswith(b'\x89PNG'))
+
+        # warm request: token lookup only, nothing rendered or queried for the QR
+        with self.assertNumQueries(1):
+            second = self.get()
+        self.assertEqual(second.data['qr_data'], first.data['qr_data'])
+        self.assertEqual(second.data['qr_image'], first.data['qr_image'])
+
+    def test_size_and_svg_variants(self):
+        small = self.get(size=3)
+        large = self.get(size=16)
+        self.assertEqual(small.data['box_size'], 4)
+        self.assertNotEqual(small.data['qr_image'], large.data['qr_image'])
+
+        svg = self.get(image_format='svg', raw=1)
+        self.assertEqual(svg['Content-Type'], 'image/svg+xml')
+        self.assertIn(b'<svg', svg.content)
+        again = self.client.get(self.url, {'image_format': 'svg', 'raw': 1},
+                                HTTP_AUTHORIZATION=f'Token {self.token}', HTTP_IF_NONE_MATCH=svg['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_phone_or_name_change_invalidates_renders(self):
+        before = self.get()
+        self.user.phone_number = '+50937000011'
+        self.user.save()
+        after = self.get()
+        self.assertNotEqual(before.data['qr_image'], after.data['qr_image'])
+        self.assertEqual(json.loads(after.data['qr_data'])['phone'], '+50937000011')
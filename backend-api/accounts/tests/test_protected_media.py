@@ -0,0 +1,74 @@
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from accounts.models import IdentityDocument, User, UserProfile
+
+MEDIA_ROOT = tempfile.mkdtemp()
+PAYLOAD = bytes(range(256)) * 40
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ProtectedMediaTests(APITestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='docowner', email='docowner@example.com', password='Docpass123!')
+        UserProfile.objects.create(user=self.owner, first_name='Doc', last_name='Owner', id_document_type='passport')
+        IdentityDocument.objects.create(
+            user=self.owner, document_type='passport',
+            front_image=SimpleUploadedFile('front.pdf', b'%PDF-1.4\n' + PAYLOAD, content_type='application/pdf'),
+        )
+        self.admin = User.objects.create_user(username='docadmin', email='docadmin@example.com', password='Adminpass123!', user_type='admin')
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {Token.objects.create(user=self.admin).key}'}
+        self.url = reverse('admin_download_document', kwargs={'user_id': self.owner.id})
+
+    def signed_url(self):
+        resp = self.client.get(self.url, **self.auth)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotIn('127.0.0.1:8000', resp.data['download_url'])
+        self.assertTrue(resp.data['filename'].endswith('_front.pdf'))
+        return resp.data['download_url']
+
+    def test_signed_url_serves_ranges_and_revalidates(self):
+        url = self.signed_url()
+        full = self.client.get(url)
+        self.assertEqual(full.status_code, 200)
+        body = b''.join(full.streaming_content)
+        self.assertTrue(body.startswith(b'%PDF'))
+        self.assertEqual(full['Accept-Ranges'], 'bytes')
+        self.assertIn('attachment', full['Content-Disposition'])
+
+        part = self.client.get(url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(part.status_code, 206)
+        self.assertEqual(part['Content-Range'], f'bytes 10-19/{len(body)}')
+        self.assertEqual(b''.join(part.streaming_content), body[10:20])
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=full['ETag']).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_RANGE=f'bytes={len(body) + 5}-').status_code, 416)
+
+    def test_tampered_or_expired_tokens_are_refused(self):
+        url = self.signed_url()
+        self.assertEqual(self.client.get(url[:-3] + 'xx/').status_code, 403)
+        with mock.patch('accounts.utils.media_utils.time.time', return_value=time.time() + 3600):
+            self.assertEqual(self.client.get(url).status_code, 403)
+
+    @override_settings(MEDIA_DELIVERY='x-accel')
+    def test_direct_download_hands_off_to_front_server(self):
+        resp = self.client.get(self.url + '?direct=1', **self.auth)
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp['X-Accel-Redirect'].startswith('/protected-media/cas/'))
+        self.assertEqual(resp.content, b'')
+
+    def test_non_admin_cannot_mint_urls(self):
+        token = Token.objects.create(user=self.owner).key
+        self.assertEqual(self.client.get(self.url, HTTP_AUTHORIZATION=f'Token {token}').status_code, 403)
@@ -0,0 +1,72 @@
+import json
+import time
+from decimal import Decimal
+
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from accounts.models import EnterpriseProfile, User, UserProfile, Wallet
+from accounts.utils.qr_utils import COMPACT_QR_PREFIX, encode_payment_qr
+from transactions.models import Transaction
+
+
+class CompactQRPaymentTests(APITestCase):
+    def setUp(self):
+        self.payer = User.objects.create_user(username='payer', email='payer@example.com', password='Payerpass123!')
+        profile = UserProfile.objects.create(user=self.payer, first_name='Pa', last_name='Yer')
+        profile.set_pin('2468')
+        Wallet.objects.create(user=self.payer, balance=Decimal('1000.00'))
+        self.merchant = User.objects.create_user(
+            username='machann', email='machann@example.com', password='Machann123!',
+            phone_number='+50937000020', first_name='Ti', last_name='Machann'
+        )
+        Wallet.objects.create(user=self.merchant, balance=Decimal('0.00'))
+        self.payer_token = Token.objects.create(user=self.payer).key
+        self.merchant_token = Token.objects.create(user=self.merchant).key
+
+    def pay(self, qr_data):
+        return self.client.post(reverse('process_qr_payment'), {'qr_data': qr_data, 'pin': '2468'},
+                                HTTP_AUTHORIZATION=f'Token {self.payer_token}')
+
+    def test_generated_code_is_compact_and_pays(self):
+        resp = self.client.post(reverse('generate_qr_code'), {'amount': '100.00', 'description': 'Diri'},
+                                HTTP_AUTHORIZATION=f'Token {self.merchant_token}')
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.data['qr_data'].startswith(COMPACT_QR_PREFIX))
+        self.assertNotIn('{', resp.data['qr_data'])
+
+        paid = self.pay(resp.data['qr_data'])
+        self.assertEqual(paid.status_code, 200)
+        self.assertEqual(Wallet.objects.get(user=self.merchant).balance, Decimal('100.00'))
+
+    def test_tampered_and_expired_codes_rejected_before_db(self):
+        code = encode_payment_qr(self.merchant.id, amount='50')
+        tampered = code[:-3] + ('AAA' if not code.endswith('AAA') else 'BBB')
+        expired = encode_payment_qr(self.merchant.id, amount='50', now=time.time() - 3600)
+        for qr_data in (tampered, expired):
+            # token lookup only
+            with self.assertNumQueries(1):
+                resp = self.pay(qr_data)
+            self.assertEqual(resp.status_code, 400)
+        self.assertEqual(Wallet.objects.get(user=self.merchant).balance, Decimal('0.00'))
+
+    def test_legacy_json_codes_still_accepted(self):
+        legacy = json.dumps({
+            'type': 'payment_request', 'user_id': str(self.merchant.id), 'phone': self.merchant.phone_number,
+            'name': 'Ti Machann', 'amount': '25', 'description': '', 'timestamp': '2025-01-01T00:00:00'
+        })
+        self.assertEqual(self.pay(legacy).status_code, 200)
+        self.assertEqual(Wallet.objects.get(user=self.merchant).balance, Decimal('25.00'))
+
+    def test_receiver_limits_are_consumed(self):
+        self.merchant.user_type = 'enterprise'
+        self.merchant.save(update_fields=['user_type'])
+        EnterpriseProfile.objects.create(user=self.merchant, company_name='Ti Machann', company_registration_number='RC-QR-1',
+                                         business_type='retail', monthly_transaction_limit=Decimal('150.00'))
+        self.assertEqual(self.pay(encode_payment_qr(self.merchant.id, amount='100')).status_code, 200)
+        resp = self.pay(encode_payment_qr(self.merchant.id, amount='100'))
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.data['error'], 'Antrepriz la rive nan limit tranzaksyon mwa li')
+        self.assertEqual(Wallet.objects.get(user=self.merchant).balance, Decimal('100.00'))
+        self.assertEqual(EnterpriseProfile.objects.get(user=self.merchant).current_month_volume, Decimal('100.00'))
+        self.assertEqual(Transaction.objects.filter(sender=self.payer).count(), 1)
@@ -0,0 +1,83 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from accounts.models import IdentityDocument, User, UserProfile
+from accounts.utils.review_queue import queue_counts
+
+
+class ReviewQueueTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.reviewers = []
+        for name in ('rev_a', 'rev_b'):
+            admin = User.objects.create_user(username=name, email=f'{name}@example.com', password='Reviewpass123!', user_type='admin')
+            self.reviewers.append((admin, {'HTTP_AUTHORIZATION': f'Token {Token.objects.create(user=admin).key}'}))
+        self.docs = []
+        for i in range(5):
+            user = User.objects.create_user(username=f'applicant{i}', email=f'applicant{i}@example.com', password='Applicant123!')
+            UserProfile.objects.create(user=user, first_name=f'Applicant{i}', last_name='Test')
+            self.docs.append(IdentityDocument.objects.create(user=user, document_type='cin', document_number=f'CIN-{i}'))
+
+    def claim(self, reviewer, limit):
+        resp = self.client.post(reverse('admin_review_queue_claim'), {'limit': limit}, format='json', **reviewer[1])
+        self.assertEqual(resp.status_code, 200)
+        return [int(d['id']) for d in resp.data['documents']]
+
+    def listing(self, reviewer, **params):
+        return self.client.get(reverse('admin_review_queue'), params, **reviewer[1])
+
+    def test_concurrent_reviewers_get_disjoint_batches(self):
+        first = self.claim(self.reviewers[0], 2)
+        second = self.claim(self.reviewers[1], 2)
+        self.assertEqual(first, [d.id for d in self.docs[:2]])
+        self.assertEqual(second, [d.id for d in self.docs[2:4]])
+
+        remaining = self.listing(self.reviewers[0]).data['documents']
+        self.assertEqual([int(d['id']) for d in remaining], [self.docs[4].id])
+        mine = self.listing(self.reviewers[1], mine=1).data['documents']
+        self.assertEqual([int(d['id']) for d in mine], second)
+
+        # an expired lease goes back to the pool
+        IdentityDocument.objects.filter(id=first[0]).update(claim_expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.claim(self.reviewers[1], 5), [first[0]] + second + [self.docs[4].id])
+
+    def test_keyset_pages_cover_queue_once(self):
+        seen, cursor = [], None
+        for _ in range(3):
+            params = {'limit': 2, **({'after': cursor} if cursor else {})}
+            resp = self.listing(self.reviewers[0], **params)
+            seen += [int(d['id']) for d in resp.data['documents']]
+            cursor = resp.data['next_cursor']
+        self.assertIsNone(cursor)
+        self.assertEqual(seen, [d.id for d in self.docs])
+        self.assertEqual(self.listing(self.reviewers[0], after='@@bad').status_code, 400)
+
+    def test_decision_respects_lease_and_updates_counts(self):
+        doc = self.docs[0]
+        self.claim(self.reviewers[0], 1)
+        self.assertEqual(queue_counts()['pending'], 5)
+
+        url = reverse('admin_approve_document', args=[doc.user_id])
+        body = {'action': 'approve', 'document_id': doc.id}
+        resp = self.client.post(url, body, format='json', **self.reviewers[1][1])
+        self.assertEqual(resp.status_code, 409)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.post(url, body, format='json', **self.reviewers[0][1])
+        self.assertEqual(resp.status_code, 200)
+        doc.refresh_from_db()
+        self.assertEqual((doc.status, doc.claimed_by_id), ('verified', None))
+
+        with self.assertNumQueries(0):
+            counts = queue_counts()
+        self.assertEqual((counts['pending'], counts['verified']), (4, 1))
+
+    def test_release_returns_documents(self):
+        claimed = self.claim(self.reviewers[0], 3)
+        resp = self.client.post(reverse('admin_review_queue_release'), {'document_ids': claimed[:2]}, format='json', **self.reviewers[0][1])
+        self.assertEqual(resp.data['released'], 2)
+        self.assertEqual(self.claim(self.reviewers[1], 2), claimed[:2])
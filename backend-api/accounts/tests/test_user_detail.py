@@ -0,0 +1,85 @@
+from decimal import Decimal
+from itertools import count
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from accounts.models import IdentityDocument, LoginActivity, SecurityActivity, User, UserProfile, Wallet
+from transactions.models import AgentTransaction, Transaction
+
+_refs = count()
+
+
+class UserDetailSectionsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(username='u360admin', email='u360admin@example.com', password='Adminpass123!', user_type='admin')
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {Token.objects.create(user=self.admin).key}'}
+        self.agent = User.objects.create_user(username='u360agent', email='u360agent@example.com', password='Agentpass123!', user_type='agent')
+        UserProfile.objects.create(user=self.agent, first_name='Agent', last_name='360')
+        Wallet.objects.create(user=self.agent, balance=Decimal('250.00'))
+        self.clients = [
+            User.objects.create_user(username=f'u360client{i}', email=f'u360client{i}@example.com', password='Clientpass123!')
+            for i in range(2)
+        ]
+        IdentityDocument.objects.create(user=self.agent, document_type='cin', document_number='U360-1')
+        LoginActivity.objects.create(user=self.agent, success=True, ip_address='10.0.0.1')
+        SecurityActivity.objects.create(user=self.agent, event_type='password_change', metadata={'via': 'app'})
+
+    def move(self, sender, receiver, amount, kind='deposit'):
+        return Transaction.objects.create(
+            transaction_type=kind, sender=sender, receiver=receiver, amount=Decimal(amount),
+            total_amount=Decimal(amount), reference_number=f'U360-{next(_refs)}', status='completed',
+        )
+
+    def detail(self, **params):
+        return self.client.get(reverse('admin_user_details', args=[self.agent.id]), params, **self.auth)
+
+    def test_full_payload_shape_and_stats(self):
+        tx = self.move(self.agent, self.clients[0], '100.00')
+        self.move(self.clients[1], self.agent, '40.00', kind='send')
+        AgentTransaction.objects.create(agent=self.agent, transaction=tx, commission_earned=Decimal('2.50'), commission_rate=Decimal('2.50'))
+
+        data = self.detail().data
+        self.assertEqual(data['wallet']['balance'], '250.00')
+        self.assertEqual(data['profile']['kyc_status'], 'pending')
+        self.assertEqual([t['amount'] for t in data['recent_transactions']], [40.0, 100.0])
+        self.assertEqual([a['type'] for a in data['activity_history']], ['password_change', 'login_success'])
+        self.assertEqual(data['activity_history'][0]['meta'], {'via': 'app'})
+        self.assertEqual(data['activity_history'][1]['meta'], {'success': True})
+        self.assertEqual(data['identity_documents_summary']['pending'], 1)
+        self.assertEqual(data['agent_stats'], {
+            'total_transactions': 2, 'total_commission': 2.5, 'active_clients': 2, 'monthly_volume': 140.0,
+        })
+        self.assertIsNotNone(data['last_login'])
+
+    def test_queries_are_bounded_and_stats_cached_until_new_transaction(self):
+        for _ in range(3):
+            self.move(self.clients[0], self.agent, '10.00')
+        with CaptureQueriesContext(connection) as cold:
+            self.detail()
+        for _ in range(20):
+            self.move(self.clients[1], self.agent, '10.00')
+        cache.clear()
+        with CaptureQueriesContext(connection) as cold_bigger:
+            self.detail()
+        with CaptureQueriesContext(connection) as warm:
+            stats = self.detail().data['agent_stats']
+        self.assertEqual(len(cold), len(cold_bigger))
+        self.assertEqual(len(warm), len(cold) - 1)
+        self.assertEqual(stats['total_transactions'], 23)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.move(self.clients[0], self.agent, '10.00')
+        self.assertEqual(self.detail().data['agent_stats']['total_transactions'], 24)
+
+    def test_sections_selector(self):
+        data = self.detail(sections='wallet,stats').data
+        self.assertIn('wallet', data)
+        self.assertIn('agent_stats', data)
+        for key in ('profile', 'recent_transactions', 'activity_history', 'identity_documents'):
+            self.assertNotIn(key, data)
+        self.assertEqual(self.detail(sections='wallet,nope').status_code, 400)
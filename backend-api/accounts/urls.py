@@ -14,6 +14,7 @@ urlpatterns = [
     path('login/', views.LoginView.as_view(), name='login'),
     path('logout/', views.LogoutView.as_view(), name='logout'),
     path('profile/', views.ProfileView.as_view(), name='profile'),
+    path('home/', views.mobile_home, name='mobile_home'),
     
     # User verification
     path('verify-email/', views.VerifyEmailView.as_view(), name='verify_email'),
@@ -24,8 +25,16 @@ urlpatterns = [
     
     # Document management
     path('upload-document/', views.UploadDocumentView.as_view(), name='upload_document'),
+    path('uploads/', views.ChunkedUploadView.as_view(), name='chunked_upload_init'),
+    path('uploads/<uuid:upload_id>/', views.ChunkedUploadDetailView.as_view(), name='chunked_upload_detail'),
+    path('uploads/<uuid:upload_id>/finalize/', views.ChunkedUploadFinalizeView.as_view(), name='chunked_upload_finalize'),
+    path('media/<str:token>/', views.media_download, name='media_download'),
     path('admin/review-documents/', views.AdminReviewDocumentsView.as_view(), name='admin_review_documents'),
+    path('admin/review-queue/', views.AdminReviewQueueView.as_view(), name='admin_review_queue'),
+    path('admin/review-queue/claim/', views.AdminReviewQueueClaimView.as_view(), name='admin_review_queue_claim'),
+    path('admin/review-queue/release/', views.AdminReviewQueueReleaseView.as_view(), name='admin_review_queue_release'),
     path('admin/approve-document/<str:user_id>/', views.AdminApproveDocumentView.as_view(), name='admin_approve_document'),
+    path('admin/documents/bulk-decision/', views.AdminBulkDocumentDecisionView.as_view(), name='admin_bulk_document_decision'),
     
     # Admin endpoints
     path('admin/users/', views.AdminUserListView.as_view(), name='admin_user_list'),
@@ -0,0 +1,57 @@
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from accounts.storage import is_addressed_name
+
+# Every model field that can point at a stored blob
+MEDIA_FIELDS = (
+    ('accounts.UserProfile', ('profile_picture', 'id_document_image', 'id_document_front', 'id_document_back')),
+    ('accounts.IdentityDocument', ('front_image', 'back_image', 'legacy_single_image')),
+)
+
+
+def media_models():
+    from django.apps import apps
+    return [(apps.get_model(label), fields) for label, fields in MEDIA_FIELDS]
+
+
+def incref(name):
+    from accounts.models import StoredBlob
+    if not is_addressed_name(name):
+        return
+    if StoredBlob.objects.filter(name=name).update(refcount=F('refcount') + 1, updated_at=timezone.now()):
+        return
+    try:
+        with transaction.atomic():
+            StoredBlob.objects.create(name=name, refcount=1)
+    except IntegrityError:
+        StoredBlob.objects.filter(name=name).update(refcount=F('refcount') + 1, updated_at=timezone.now())
+
+
+def decref(name):
+    from accounts.models import StoredBlob
+    if not is_addressed_name(name):
+        return
+    StoredBlob.objects.filter(name=name, refcount__gt=0).update(refcount=F('refcount') - 1, updated_at=timezone.now())
+
+
+def drop_unused_variants(name):
+    """Delete the image variants of a replaced or deleted file, unless another row still
+    references its blob (the blob file itself is left to gc_media)."""
+    from accounts.models import StoredBlob
+    from accounts.utils.image_utils import delete_variants
+    if is_addressed_name(name) and StoredBlob.objects.filter(name=name, refcount__gt=0).exists():
+        return
+    delete_variants(name)
+
+
+def count_references():
+    """Mark phase for GC: {blob name: number of rows referencing it} straight from the tables."""
+    counts = Counter()
+    for model, fields in media_models():
+        for row in model.objects.values_list(*fields).iterator(chunk_size=2000):
+            counts.update(name for name in row if is_addressed_name(name))
+    return counts
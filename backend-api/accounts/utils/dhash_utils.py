@@ -0,0 +1,198 @@
+import threading
+
+from django.core.files.storage import default_storage
+
+_MASK64 = (1 << 64) - 1
+
+# Image fields that hold identity-document pictures, per model label
+DOCUMENT_IMAGE_FIELDS = {
+    'accounts.IdentityDocument': ('front_image', 'back_image', 'legacy_single_image'),
+    'accounts.UserProfile': ('id_document_image', 'id_document_front', 'id_document_back'),
+}
+
+# Max Hamming distance (of 64 bits) still reported as "same photo": survives re-compression,
+# resizing and mild crops, while different documents are typically > 20 bits apart.
+DEFAULT_MAX_DISTANCE = 8
+
+
+def dhash_image(img) -> int:
+    """64-bit difference hash: grayscale 9x8 thumbnail, one bit per horizontal gradient sign."""
+    from PIL import Image, ImageOps
+
+    img = ImageOps.exif_transpose(img).convert('L').resize((9, 8), Image.LANCZOS)
+    pixels = list(img.getdata())
+    value = 0
+    for row in range(8):
+        offset = row * 9
+        for col in range(8):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def dhash_path(path) -> int:
+    """Hash a file on local disk (used by backfill worker processes, no Django needed)."""
+    from PIL import Image
+
+    with Image.open(path) as img:
+        return dhash_image(img)
+
+
+def dhash_stored(name) -> int:
+    from PIL import Image
+
+    with default_storage.open(name, 'rb') as fh:
+        with Image.open(fh) as img:
+            return dhash_image(img)
+
+
+def to_signed(value: int) -> int:
+    """Unsigned 64-bit -> signed, to fit a BigIntegerField."""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def hamming(a: int, b: int) -> int:
+    return bin((a ^ b) & _MASK64).count('1')
+
+
+def source_key(label, pk, field):
+    return f"{label.split('.')[-1].lower()}:{pk}:{field}"
+
+
+class BKTree:
+    """Burkhard-Keller tree over Hamming distance. Each node is [hash, payloads, {distance: child}];
+    a radius-r query only descends into children whose edge distance is within r of d(query, node).
+    """
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, value, payload):
+        self.size += 1
+        if self.root is None:
+            self.root = [value, [payload], {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(payload)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [payload], {}]
+                return
+            node = child
+
+    def search(self, value, max_distance):
+        """[(distance, payload)] within `max_distance`, closest first."""
+        if self.root is None:
+            return []
+        found = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= max_distance:
+                found.extend((distance, payload) for payload in node[1])
+            low, high = distance - max_distance, distance + max_distance
+            stack.extend(child for edge, child in node[2].items() if low <= edge <= high)
+        found.sort(key=lambda item: item[0])
+        return found
+
+
+class DocumentHashIndex:
+    """Process-local BK-tree over DocumentImageHash rows.
+
+    Rows are append-only, so the tree catches up by loading ids above its watermark before
+    each query (one indexed range scan, usually empty). Deleted/replaced rows are filtered
+    out by re-checking candidate ids against the table.
+    """
+
+    def __init__(self):
+        self.tree = BKTree()
+        self.max_id = 0
+        self.lock = threading.Lock()
+
+    def _sync(self):
+        from accounts.models import DocumentImageHash
+
+        rows = (
+            DocumentImageHash.objects.filter(id__gt=self.max_id)
+            .order_by('id').values_list('id', 'dhash', 'user_id')
+        )
+        for row_id, dhash, user_id in rows.iterator(chunk_size=5000):
+            self.tree.add(dhash & _MASK64, (row_id, user_id))
+            self.max_id = row_id
+
+    def find(self, dhash, max_distance=DEFAULT_MAX_DISTANCE, exclude_user_id=None):
+        """[{'hash_id', 'user_id', 'distance'}] of stored images within `max_distance` bits."""
+        return self.find_many([(dhash, exclude_user_id)], max_distance)[0]
+
+    def find_many(self, queries, max_distance=DEFAULT_MAX_DISTANCE):
+        """find() for each (dhash, exclude_user_id) in `queries`, in order: one sync and one
+        live-id query for the whole batch."""
+        from accounts.models import DocumentImageHash
+
+        with self.lock:
+            self._sync()
+            found = [self.tree.search(dhash & _MASK64, max_distance) for dhash, _ in queries]
+        found = [
+            [(d, p) for d, p in candidates if exclude_user_id is None or str(p[1]) != str(exclude_user_id)]
+            for candidates, (_, exclude_user_id) in zip(found, queries)
+        ]
+        ids = {p[0] for candidates in found for _, p in candidates}
+        live = set(DocumentImageHash.objects.filter(id__in=ids).values_list('id', flat=True)) if ids else set()
+        return [
+            [{'hash_id': p[0], 'user_id': str(p[1]), 'distance': d} for d, p in candidates if p[0] in live]
+            for candidates in found
+        ]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_document_hash_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = DocumentHashIndex()
+    return _index
+
+
+def reset_document_hash_index():
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def index_document_image(label, pk, field):
+    """Hash one document image and record it (background task after upload)."""
+    from django.apps import apps
+    from django.db import transaction
+    from accounts.models import DocumentImageHash, IdentityDocument
+    from accounts.utils.image_utils import is_image_name
+
+    model = apps.get_model(label)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return None
+    name = getattr(instance, field).name
+    key = source_key(label, pk, field)
+    if not name or not is_image_name(name) or not default_storage.exists(name):
+        DocumentImageHash.objects.filter(source_key=key).delete()
+        return None
+
+    value = dhash_stored(name)
+    with transaction.atomic():
+        DocumentImageHash.objects.filter(source_key=key).delete()
+        return DocumentImageHash.objects.create(
+            user_id=instance.user_id,
+            document=instance if isinstance(instance, IdentityDocument) else None,
+            source_key=key,
+            field=field,
+            name=name,
+            dhash=to_signed(value),
+        )
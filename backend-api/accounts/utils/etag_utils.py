@@ -0,0 +1,73 @@
+import functools
+import hashlib
+
+from django.http import HttpRequest
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework.request import Request
+
+
+def make_etag(*parts) -> str:
+    """Build a quoted strong ETag from cheap validator values (timestamps, ids, counters).
+    None values are kept as empty slots so ('a', None) and (None, 'a') stay distinct.
+    """
+    raw = '|'.join('' if p is None else (p.isoformat() if hasattr(p, 'isoformat') else str(p)) for p in parts)
+    return quote_etag(hashlib.sha1(raw.encode('utf-8')).hexdigest())
+
+
+def latest(*values):
+    """Newest non-null datetime among `values` (for Last-Modified), or None."""
+    present = [v for v in values if v is not None]
+    return max(present) if present else None
+
+
+def conditional_response(validators):
+    """Conditional GET for DRF function views and APIView methods.
+
+    `validators(request, *args, **kwargs)` runs after authentication and must be cheap (one
+    narrow query). It returns None to skip conditional handling (e.g. caller not authorized,
+    so the view answers normally), or `(etag_parts, last_modified)` where etag_parts is an
+    iterable fed to make_etag() and last_modified an aware datetime or None.
+
+    Matching If-None-Match / If-Modified-Since short-circuits with 304 before the view runs;
+    200 responses get ETag/Last-Modified so clients can revalidate next time.
+    Apply it below @api_view/@permission_classes so request.user is already resolved.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def _wrapped(*args, **kwargs):
+            is_method = not isinstance(args[0], (Request, HttpRequest))
+            request = args[1] if is_method else args[0]
+            view_args = args[2:] if is_method else args[1:]
+            if request.method not in ('GET', 'HEAD'):
+                return view(*args, **kwargs)
+
+            result = validators(request, *view_args, **kwargs)
+            if result is None:
+                return view(*args, **kwargs)
+            parts, last_modified = result
+            # Full path keeps ?limit=/?sections= variants of one URL apart; the user keeps
+            # per-user bodies with equal validators (e.g. two empty lists) apart
+            etag = make_etag(request.get_full_path(), getattr(request.user, 'pk', None), *parts)
+            last_modified_ts = int(last_modified.timestamp()) if last_modified else None
+
+            conditional = get_conditional_response(request, etag=etag, last_modified=last_modified_ts)
+            if conditional is not None:
+                conditional['ETag'] = etag
+                if last_modified_ts is not None:
+                    conditional['Last-Modified'] = http_date(last_modified_ts)
+                conditional['Cache-Control'] = 'private, no-cache'
+                patch_vary_headers(conditional, ['Authorization'])
+                return conditional
+
+            response = view(*args, **kwargs)
+            if response.status_code == 200:
+                response['ETag'] = etag
+                if last_modified_ts is not None:
+                    response['Last-Modified'] = http_date(last_modified_ts)
+                if not response.has_header('Cache-Control'):
+                    response['Cache-Control'] = 'private, no-cache'
+                patch_vary_headers(response, ['Authorization'])
+            return response
+        return _wrapped
+    return decorator
@@ -0,0 +1,133 @@
+import os
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+# Longest edge in pixels per variant; images are never upscaled
+IMAGE_VARIANTS = {
+    'thumb': 160,
+    'medium': 640,
+    'full': 1600,
+}
+VARIANT_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.tif', '.tiff'}
+
+_READY_PREFIX = 'imgvar'
+
+
+def is_image_name(name) -> bool:
+    return os.path.splitext(name or '')[1].lower() in IMAGE_EXTENSIONS
+
+
+def variant_name(original_name: str, variant: str, fmt: str) -> str:
+    """`documents/id.png` -> `documents/id__thumb.webp` (stored next to the original)."""
+    stem, _ = os.path.splitext(original_name)
+    return f"{stem}__{variant}.{'jpg' if fmt == 'jpeg' else fmt}"
+
+
+def _ready_key(original_name):
+    return f"{_READY_PREFIX}:{original_name}"
+
+
+def _to_rgb(img):
+    from PIL import Image
+
+    if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+        img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.split()[-1])
+        return background
+    return img.convert('RGB')
+
+
+def _strip_original(name, img, source_format):
+    """Rewrite the original without EXIF (GPS, device serials) once it has been oriented."""
+    buffer = BytesIO()
+    save_kwargs = {'quality': 95} if source_format == 'JPEG' else {}
+    out = img if source_format != 'JPEG' else img.convert('RGB')
+    out.save(buffer, format=source_format, **save_kwargs)
+    default_storage.delete(name)
+    default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def process_image(name: str) -> dict:
+    """Generate stripped thumb/medium/full variants in WebP and JPEG for a stored image.
+
+    Runs in the background after upload (see cash_ti_machann.tasks). Non-image files (PDF
+    documents) are skipped. Returns {variant: {fmt: storage name}}.
+    """
+    from PIL import Image, ImageOps
+
+    if not name or not is_image_name(name) or not default_storage.exists(name):
+        return {}
+
+    with default_storage.open(name, 'rb') as fh:
+        img = Image.open(fh)
+        source_format = img.format
+        has_exif = bool(img.info.get('exif')) or bool(img.getexif())
+        img = ImageOps.exif_transpose(img)
+        img.load()
+
+    if has_exif and source_format in ('JPEG', 'PNG', 'WEBP'):
+        _strip_original(name, img, source_format)
+
+    base = _to_rgb(img)
+    produced = {}
+    for variant, edge in IMAGE_VARIANTS.items():
+        resized = base.copy()
+        resized.thumbnail((edge, edge), Image.LANCZOS)
+        produced[variant] = {}
+        for fmt, (pil_format, options) in VARIANT_FORMATS.items():
+            buffer = BytesIO()
+            resized.save(buffer, format=pil_format, **options)
+            target = variant_name(name, variant, fmt)
+            if default_storage.exists(target):
+                default_storage.delete(target)
+            produced[variant][fmt] = default_storage.save(target, ContentFile(buffer.getvalue()))
+
+    cache.set(_ready_key(name), True, None)
+    return produced
+
+
+def delete_variants(name: str):
+    if not name:
+        return
+    for variant in IMAGE_VARIANTS:
+        for fmt in VARIANT_FORMATS:
+            target = variant_name(name, variant, fmt)
+            if default_storage.exists(target):
+                default_storage.delete(target)
+    cache.delete(_ready_key(name))
+
+
+def variants_ready(name: str) -> bool:
+    """Cheap readiness check: shared cache first, one storage stat on a miss."""
+    if not name or not is_image_name(name):
+        return False
+    if cache.get(_ready_key(name)):
+        return True
+    if default_storage.exists(variant_name(name, 'thumb', 'webp')):
+        cache.set(_ready_key(name), True, None)
+        return True
+    return False
+
+
+def variant_urls(field_file, url_for=None):
+    """URLs of the processed variants for an ImageField value, or None while still pending.
+
+    `url_for(name)` maps a storage name to a URL (public or signed, see media_utils);
+    defaults to the storage URL. Shape: {'thumb': {'webp': url, 'jpeg': url}, 'medium': {...}, 'full': {...}}.
+    """
+    name = getattr(field_file, 'name', None)
+    if not variants_ready(name):
+        return None
+    url_for = url_for or default_storage.url
+    return {
+        variant: {fmt: url_for(variant_name(name, variant, fmt)) for fmt in VARIANT_FORMATS}
+        for variant in IMAGE_VARIANTS
+    }
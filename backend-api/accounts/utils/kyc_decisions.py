@@ -0,0 +1,133 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .review_queue import bump_count, held_by_other
+
+DECISION_STATUS = {'approve': 'verified', 'reject': 'rejected'}
+
+APPROVED_SUBJECT = 'Dokiman Ou Apwouve - Cash Ti Machann'
+APPROVED_BODY = 'Bonjou {name},\n\nDokiman ou an apwouve ak siksè. Kont ou vin konplètman verifye kounye a.'
+REJECTED_SUBJECT = 'Dokiman Ou Rejte - Cash Ti Machann'
+REJECTED_BODY = 'Bonjou {name},\n\nDokiman ou an rejte. Rezon: {reason}\n\nTanpri upload yon nouvo dokiman ki pi klè.'
+
+
+def max_batch():
+    return getattr(settings, 'KYC_BULK_DECISION_MAX', 1000)
+
+
+def parse_decisions(items):
+    """Split raw [{document_id, action, reason}] into ({doc_id: (action, reason)}, errors)."""
+    decisions, errors = {}, []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({'index': index, 'error': 'Desizyon pa valid'})
+            continue
+        try:
+            doc_id = int(str(item.get('document_id')))
+        except (TypeError, ValueError):
+            errors.append({'index': index, 'error': 'document_id pa valid'})
+            continue
+        action = item.get('action')
+        if action not in DECISION_STATUS:
+            errors.append({'index': index, 'document_id': doc_id, 'error': 'Aksyon pa valid. Itilize "approve" oswa "reject".'})
+            continue
+        decisions[doc_id] = (action, (item.get('reason') or '').strip())
+    return decisions, errors
+
+
+def apply_decisions(reviewer, decisions):
+    """Decide many IdentityDocuments at once.
+
+    Documents are written with one bulk_update; profiles/users are then recomputed with two
+    UPDATEs per outcome (verified if the user has any verified document, rejected otherwise,
+    the same rule as the single approve/reject views). Returns (summary, errors, notices)
+    where notices feed send_decision_emails().
+    """
+    from accounts.models import IdentityDocument, User, UserProfile
+
+    now = timezone.now()
+    errors = []
+    with transaction.atomic():
+        docs = list(
+            IdentityDocument.objects.select_for_update()
+            .filter(id__in=list(decisions))
+            .only('id', 'user_id', 'status', 'notes', 'claimed_by', 'claim_expires_at')
+        )
+        found = {doc.id for doc in docs}
+        errors += [{'document_id': doc_id, 'error': 'Dokiman pa jwenn'} for doc_id in decisions if doc_id not in found]
+
+        changed, transitions, reasons = [], [], {}
+        for doc in docs:
+            if held_by_other(doc, reviewer, now):
+                errors.append({'document_id': doc.id, 'error': 'Yon lòt revizè ap revize dokiman sa a'})
+                continue
+            action, reason = decisions[doc.id]
+            new_status = DECISION_STATUS[action]
+            if action == 'reject':
+                reason = reason or 'Pa gen rezon ki bay'
+                doc.notes = f"{doc.notes or ''}\nRezon Rejte: {reason}".strip()
+                reasons.setdefault(doc.user_id, reason)
+            transitions.append((doc.status, new_status))
+            doc.status = new_status
+            doc.claimed_by = None
+            doc.claim_expires_at = None
+            doc.updated_at = now
+            changed.append(doc)
+
+        IdentityDocument.objects.bulk_update(
+            changed, ['status', 'notes', 'claimed_by', 'claim_expires_at', 'updated_at'], batch_size=500
+        )
+
+        affected = {doc.user_id for doc in changed}
+        verified = set(
+            IdentityDocument.objects.filter(user_id__in=affected, status='verified')
+            .values_list('user_id', flat=True).distinct()
+        )
+        rejected = affected - verified
+        for user_ids, profile_status in ((verified, 'verified'), (rejected, 'rejected')):
+            if user_ids:
+                UserProfile.objects.filter(user_id__in=user_ids).update(verification_status=profile_status, updated_at=now)
+                User.objects.filter(id__in=user_ids).update(is_verified=profile_status == 'verified', updated_at=now)
+
+        notices = [
+            (email, first_name, user_id in verified, reasons.get(user_id, ''))
+            for user_id, email, first_name in UserProfile.objects.filter(user_id__in=affected)
+            .values_list('user_id', 'user__email', 'first_name')
+            if email
+        ]
+
+        # bulk_update skips save()/signals: move the cached queue counters ourselves
+        def bump():
+            for old, new in transitions:
+                if old != new:
+                    bump_count(old, -1)
+                    bump_count(new, 1)
+        transaction.on_commit(bump)
+
+    summary = {
+        'processed': len(changed),
+        'approved': sum(1 for doc in changed if doc.status == 'verified'),
+        'rejected': sum(1 for doc in changed if doc.status == 'rejected'),
+        'users_verified': len(verified),
+        'users_rejected': len(rejected),
+    }
+    return summary, errors, notices
+
+
+def send_decision_emails(notices):
+    """One SMTP connection for the whole batch (runs as a background task)."""
+    from django.core.mail import EmailMessage, get_connection
+
+    messages = [
+        EmailMessage(
+            APPROVED_SUBJECT if approved else REJECTED_SUBJECT,
+            APPROVED_BODY.format(name=name) if approved else REJECTED_BODY.format(name=name, reason=reason),
+            settings.DEFAULT_FROM_EMAIL,
+            [email],
+        )
+        for email, name, approved, reason in notices
+    ]
+    if messages:
+        get_connection(fail_silently=True).send_messages(messages)
+    return len(messages)
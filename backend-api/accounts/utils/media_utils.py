@@ -0,0 +1,184 @@
+import mimetypes
+import os
+import re
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+_SALT = 'accounts.media'
+_EXPIRY_STEP = 60
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def media_url_ttl():
+    return getattr(settings, 'MEDIA_URL_TTL_SECONDS', 300)
+
+
+def signed_media_url(name, request=None, ttl=None, download=False):
+    """Short-lived URL that serves `name` without an API token (usable in <img src>).
+
+    Admin screens get one per document/thumbnail in the listing payload, so a page of
+    thumbnails loads without a per-image API round trip. Absolute when `request` is given.
+    """
+    if not name:
+        return None
+    # Expiry rounded up to the minute so repeated listings reuse the same URL (browser cache hits)
+    expires = (int(time.time()) + (ttl or media_url_ttl())) // _EXPIRY_STEP * _EXPIRY_STEP + _EXPIRY_STEP
+    payload = {'n': name, 'e': expires}
+    if download:
+        payload['d'] = 1
+    path = reverse('media_download', args=[signing.dumps(payload, salt=_SALT, compress=True)])
+    return request.build_absolute_uri(path) if request is not None else path
+
+
+def signing_window():
+    """Start of the minute whose signed URLs share an expiry, as an aware datetime.
+
+    A payload embedding signed URLs can be revalidated (ETag/Last-Modified) only within one
+    window: a copy cached from an earlier one carries URLs that may already have expired.
+    """
+    return datetime.fromtimestamp(int(time.time()) // _EXPIRY_STEP * _EXPIRY_STEP, tz=dt_timezone.utc)
+
+
+def document_url(request, field_file, **kwargs):
+    """Signed URL for an ImageField/FileField value, or None when empty."""
+    return signed_media_url(getattr(field_file, 'name', None), request, **kwargs) if field_file else None
+
+
+def signed_url_builder(request, **kwargs):
+    """`url_for(name)` callable for image_utils.variant_urls()."""
+    return lambda name: signed_media_url(name, request, **kwargs)
+
+
+def public_url_builder(request):
+    return lambda name: request.build_absolute_uri(default_storage.url(name))
+
+
+def unsign_media_token(token):
+    """Storage name (and download flag) for a valid, unexpired token; None otherwise."""
+    try:
+        payload = signing.loads(token, salt=_SALT)
+    except signing.BadSignature:
+        return None
+    if not isinstance(payload, dict) or payload.get('e', 0) < time.time():
+        return None
+    return payload.get('n'), bool(payload.get('d'))
+
+
+class _RangeFile:
+    """Iterates `length` bytes of an open file starting at `start` (one block in memory)."""
+    block_size = 64 * 1024
+
+    def __init__(self, fh, start, length):
+        self.fh = fh
+        self.remaining = length
+        fh.seek(start)
+
+    def __iter__(self):
+        while self.remaining > 0:
+            block = self.fh.read(min(self.block_size, self.remaining))
+            if not block:
+                break
+            self.remaining -= len(block)
+            yield block
+
+    def close(self):
+        self.fh.close()
+
+
+def _parse_range(header, size):
+    match = _RANGE_RE.match(header.strip())
+    if not match or size == 0:
+        return None
+    first, last = match.groups()
+    if first == '' and last == '':
+        return None
+    if first == '':
+        start = max(size - int(last), 0)  # suffix range: last N bytes
+        end = size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        return 'unsatisfiable'
+    return start, end
+
+
+def serve_media(request, name, as_attachment=False, filename=None, max_age=None):
+    """Send a stored file after the caller has been authorized.
+
+    MEDIA_DELIVERY = 'x-accel' (nginx X-Accel-Redirect to MEDIA_ACCEL_PREFIX) or 'x-sendfile'
+    (Apache/lighttpd) hands the transfer to the front server; the default 'django' streams
+    with FileResponse, honouring ETag/If-None-Match, Last-Modified and single byte ranges.
+    """
+    if not name or not default_storage.exists(name):
+        return HttpResponse(status=404)
+
+    cache_control = f"private, max-age={max_age if max_age is not None else media_url_ttl()}"
+    disposition = None
+    if as_attachment or filename:
+        disposition = f"{'attachment' if as_attachment else 'inline'}; filename=\"{filename or os.path.basename(name)}\""
+
+    mode = getattr(settings, 'MEDIA_DELIVERY', 'django')
+    if mode in ('x-accel', 'x-sendfile'):
+        response = HttpResponse()
+        if mode == 'x-accel':
+            response['X-Accel-Redirect'] = getattr(settings, 'MEDIA_ACCEL_PREFIX', '/protected-media/') + name
+        else:
+            response['X-Sendfile'] = default_storage.path(name)
+        # Let the front server pick the type from the file itself
+        del response['Content-Type']
+        response['Cache-Control'] = cache_control
+        if disposition:
+            response['Content-Disposition'] = disposition
+        return response
+
+    full_path = default_storage.path(name)
+    stat = os.stat(full_path)
+    size = stat.st_size
+    etag = quote_etag(f"{size:x}-{stat.st_mtime_ns:x}")
+    last_modified = int(stat.st_mtime)
+
+    conditional = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if conditional is not None:
+        conditional['ETag'] = etag
+        conditional['Cache-Control'] = cache_control
+        return conditional
+
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if range_header:
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if not if_range or if_range == etag:
+            byte_range = _parse_range(range_header, size)
+
+    if byte_range == 'unsatisfiable':
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f"bytes */{size}"
+        return response
+
+    fh = default_storage.open(name, 'rb')
+    if byte_range:
+        start, end = byte_range
+        response = FileResponse(_RangeFile(fh, start, end - start + 1), status=206)
+        response['Content-Range'] = f"bytes {start}-{end}/{size}"
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Type'] = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    else:
+        response = FileResponse(fh)
+        response['Content-Length'] = str(size)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = cache_control
+    if disposition:
+        response['Content-Disposition'] = disposition
+    return response
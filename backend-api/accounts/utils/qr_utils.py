@@ -0,0 +1,216 @@
+import base64
+import hashlib
+import hmac
+import json
+import struct
+import time
+import uuid
+from decimal import Decimal
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.crypto import salted_hmac
+
+# Bump when the personal payload layout changes so old renders are never served
+PERSONAL_QR_VERSION = 1
+
+PNG_BOX_SIZES = (4, 6, 8, 10, 12, 16)
+DEFAULT_BOX_SIZE = 10
+QR_BORDER = 4
+
+_ARTIFACT_PREFIX = 'qr:art'
+_POINTER_PREFIX = 'qr:personal'
+
+
+def personal_qr_payload(user) -> dict:
+    """Receiving identity encoded in a personal QR. No timestamp: same user data, same QR."""
+    return {
+        'type': 'personal_receive',
+        'v': PERSONAL_QR_VERSION,
+        'user_id': str(user.id),
+        'phone': user.phone_number,
+        'name': f"{user.first_name} {user.last_name}".strip(),
+    }
+
+
+def encode_payload(payload: dict) -> str:
+    """Canonical JSON (sorted keys, no spaces) so equal payloads always hash the same."""
+    return json.dumps(payload, sort_keys=True, separators=(',', ':'))
+
+
+def payload_digest(qr_string: str) -> str:
+    return hashlib.sha256(qr_string.encode('utf-8')).hexdigest()[:32]
+
+
+def _artifact_key(digest, fmt, box_size):
+    return f"{_ARTIFACT_PREFIX}:{digest}:{fmt}:{box_size if fmt == 'png' else 'vec'}"
+
+
+def _artifact_keys(digest):
+    return [_artifact_key(digest, 'png', size) for size in PNG_BOX_SIZES] + [_artifact_key(digest, 'svg', None)]
+
+
+def _build_qr(qr_string):
+    import qrcode
+
+    qr = qrcode.QRCode(
+        version=None,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=DEFAULT_BOX_SIZE,
+        border=QR_BORDER,
+    )
+    qr.add_data(qr_string)
+    qr.make(fit=True)
+    return qr
+
+
+def render_png(qr_string: str, box_size: int = DEFAULT_BOX_SIZE) -> bytes:
+    qr = _build_qr(qr_string)
+    qr.box_size = box_size
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffer = BytesIO()
+    img.save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def render_svg(qr_string: str) -> bytes:
+    from qrcode.image.svg import SvgPathImage
+
+    img = _build_qr(qr_string).make_image(image_factory=SvgPathImage)
+    buffer = BytesIO()
+    img.save(buffer)
+    return buffer.getvalue()
+
+
+def normalize_box_size(value) -> int:
+    """Snap a requested box size to the nearest supported one (bounds the variant count)."""
+    try:
+        requested = int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_BOX_SIZE
+    return min(PNG_BOX_SIZES, key=lambda size: (abs(size - requested), size))
+
+
+def get_personal_qr(user, fmt='png', box_size=DEFAULT_BOX_SIZE):
+    """Return (qr_string, digest, image_bytes) for the user's personal QR.
+
+    Renders are cached without expiry under the payload's content hash, so a warm request
+    is one cache read; a phone/name change yields a new hash and
+    invalidate_personal_qr() drops the stale renders.
+    """
+    qr_string = encode_payload(personal_qr_payload(user))
+    digest = payload_digest(qr_string)
+    key = _artifact_key(digest, fmt, box_size)
+
+    image = cache.get(key)
+    if image is None:
+        image = render_svg(qr_string) if fmt == 'svg' else render_png(qr_string, box_size)
+        cache.set(key, image, None)
+        cache.set(f"{_POINTER_PREFIX}:{user.id}", digest, None)
+    return qr_string, digest, image
+
+
+def invalidate_personal_qr(user_id, keep_digest=None):
+    """Drop cached renders for the user's previous payload (unless it is still current)."""
+    pointer = f"{_POINTER_PREFIX}:{user_id}"
+    digest = cache.get(pointer)
+    if digest is None or digest == keep_digest:
+        return False
+    cache.delete_many(_artifact_keys(digest) + [pointer])
+    return True
+
+
+# --- Compact signed payment codes -------------------------------------------------------
+#
+# CTM1:<base32(body + mac)>, body = version, kind, receiver uuid, amount in cents, expiry
+# (unix seconds) and a short description. Base32 stays inside the QR alphanumeric charset,
+# so the code fits a much lower QR version than the legacy JSON blob.
+
+COMPACT_QR_PREFIX = 'CTM1:'
+_COMPACT_VERSION = 1
+_KIND_CODES = {'payment_request': 1, 'personal_receive': 2}
+_KIND_NAMES = {code: name for name, code in _KIND_CODES.items()}
+_HEADER = struct.Struct('>BB16sII')
+_MAC_BYTES = 10
+_MAX_DESCRIPTION_BYTES = 48
+
+
+class QRPayloadError(ValueError):
+    """Raised for codes that cannot be trusted; `reason` is 'invalid', 'tampered' or 'expired'."""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def _payload_mac(body: bytes) -> bytes:
+    return salted_hmac('accounts.qr_payment', body, algorithm='sha256').digest()[:_MAC_BYTES]
+
+
+def encode_payment_qr(user_id, amount=None, description='', kind='payment_request', ttl=None, now=None) -> str:
+    """Sign a compact payment code for `user_id`. `ttl` seconds defaults to QR_PAYMENT_TTL_SECONDS."""
+    ttl = getattr(settings, 'QR_PAYMENT_TTL_SECONDS', 900) if ttl is None else ttl
+    expires = int(now if now is not None else time.time()) + int(ttl)
+    cents = int((Decimal(str(amount)) * 100).to_integral_value()) if amount not in (None, '') else 0
+    if not 0 <= cents <= 0xFFFFFFFF:
+        raise ValueError('amount out of range for a QR code')
+    desc = (description or '').encode('utf-8')[:_MAX_DESCRIPTION_BYTES].decode('utf-8', 'ignore').encode('utf-8')
+
+    body = _HEADER.pack(_COMPACT_VERSION, _KIND_CODES[kind], uuid.UUID(str(user_id)).bytes, cents, expires)
+    body += bytes([len(desc)]) + desc
+    token = base64.b32encode(body + _payload_mac(body)).decode('ascii').rstrip('=')
+    return COMPACT_QR_PREFIX + token
+
+
+def decode_payment_qr(qr_string: str, now=None) -> dict:
+    """Verify and unpack a payment code without touching the database.
+
+    Compact codes are checked for MAC and expiry; anything else is parsed as a legacy JSON
+    code (unsigned, kept for QRs printed before the compact format).
+    Returns {'type', 'user_id', 'amount', 'description', 'expires_at', 'signed'}.
+    """
+    qr_string = (qr_string or '').strip()
+    if not qr_string.upper().startswith(COMPACT_QR_PREFIX):
+        try:
+            legacy = json.loads(qr_string)
+        except (TypeError, ValueError):
+            raise QRPayloadError('invalid')
+        if not isinstance(legacy, dict) or 'user_id' not in legacy:
+            raise QRPayloadError('invalid')
+        return {
+            'type': legacy.get('type'),
+            'user_id': str(legacy['user_id']),
+            'amount': legacy.get('amount', 0),
+            'description': legacy.get('description', ''),
+            'expires_at': None,
+            'signed': False,
+        }
+
+    token = qr_string[len(COMPACT_QR_PREFIX):].upper()
+    try:
+        raw = base64.b32decode(token + '=' * (-len(token) % 8))
+    except ValueError:
+        raise QRPayloadError('invalid')
+    if len(raw) < _HEADER.size + 1 + _MAC_BYTES:
+        raise QRPayloadError('invalid')
+
+    body, mac = raw[:-_MAC_BYTES], raw[-_MAC_BYTES:]
+    if not hmac.compare_digest(mac, _payload_mac(body)):
+        raise QRPayloadError('tampered')
+
+    version, kind, user_bytes, cents, expires = _HEADER.unpack_from(body)
+    desc_len = body[_HEADER.size]
+    if version != _COMPACT_VERSION or kind not in _KIND_NAMES or len(body) != _HEADER.size + 1 + desc_len:
+        raise QRPayloadError('invalid')
+    if expires < int(now if now is not None else time.time()):
+        raise QRPayloadError('expired')
+
+    return {
+        'type': _KIND_NAMES[kind],
+        'user_id': str(uuid.UUID(bytes=user_bytes)),
+        'amount': Decimal(cents).scaleb(-2),
+        'description': body[_HEADER.size + 1:].decode('utf-8', 'ignore'),
+        'expires_at': expires,
+        'signed': True,
+    }
@@ -0,0 +1,146 @@
+import base64
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+_COUNT_PREFIX = 'kyc:queue:count'
+# Counters are nudged by signals and rebuilt from one GROUP BY when they expire, so any
+# drift (queryset.update(), crashed on_commit) heals within this window.
+COUNT_TTL = 300
+
+
+def lease_seconds():
+    return getattr(settings, 'KYC_REVIEW_LEASE_SECONDS', 600)
+
+
+def queue_order(queryset):
+    """Oldest submission first; (created_at, id) is the keyset and matches the status index."""
+    return queryset.order_by('created_at', 'id')
+
+
+def available_q(reviewer=None, now=None):
+    """Pending documents nobody holds a live lease on (plus the reviewer's own leases)."""
+    now = now or timezone.now()
+    free = Q(claimed_by__isnull=True) | Q(claim_expires_at__isnull=True) | Q(claim_expires_at__lte=now)
+    if reviewer is not None:
+        free |= Q(claimed_by=reviewer)
+    return Q(status='pending') & free
+
+
+def claim_documents(reviewer, limit, lease=None):
+    """Lease up to `limit` of the oldest available documents to `reviewer`; returns their ids.
+
+    On PostgreSQL/MySQL the candidates are locked with SELECT … FOR UPDATE SKIP LOCKED, so
+    concurrent reviewers each get a disjoint batch without waiting on each other. SQLite has
+    no row locks (writers are serialized), so each candidate is taken with a conditional
+    UPDATE that only succeeds while it is still free — the same outcome, one row at a time.
+    Claiming again extends the reviewer's existing leases.
+    """
+    from accounts.models import IdentityDocument
+
+    now = timezone.now()
+    expires = now + timedelta(seconds=lease or lease_seconds())
+    available = queue_order(IdentityDocument.objects.filter(available_q(reviewer, now)))
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(available.select_for_update(skip_locked=True, of=('self',)).values_list('id', flat=True)[:limit])
+            IdentityDocument.objects.filter(id__in=ids).update(claimed_by=reviewer, claim_expires_at=expires, updated_at=now)
+        return ids
+
+    ids = []
+    # Over-fetch a little: rows taken by someone else between the read and the UPDATE are skipped
+    for doc_id in available.values_list('id', flat=True)[:limit * 2]:
+        taken = IdentityDocument.objects.filter(available_q(reviewer, now), id=doc_id).update(
+            claimed_by=reviewer, claim_expires_at=expires, updated_at=now
+        )
+        if taken:
+            ids.append(doc_id)
+            if len(ids) == limit:
+                break
+    return ids
+
+
+def release_documents(reviewer, ids=None):
+    """Give back the reviewer's leases (all of them, or just `ids`). Returns how many."""
+    from accounts.models import IdentityDocument
+
+    held = IdentityDocument.objects.filter(claimed_by=reviewer, status='pending')
+    if ids is not None:
+        held = held.filter(id__in=ids)
+    return held.update(claimed_by=None, claim_expires_at=None, updated_at=timezone.now())
+
+
+def held_by_other(document, reviewer, now=None):
+    """True while someone other than `reviewer` holds a live lease on `document`."""
+    now = now or timezone.now()
+    return bool(
+        document.claimed_by_id and document.claimed_by_id != reviewer.pk
+        and document.claim_expires_at and document.claim_expires_at > now
+    )
+
+
+def encode_cursor(document):
+    raw = f"{document.created_at.isoformat()}|{document.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(created_at, id) from a cursor string; ValueError when it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created, pk = raw.split('|')
+        created_at = parse_datetime(created)
+        if created_at is None:
+            raise ValueError(cursor)
+        return created_at, int(pk)
+    except (TypeError, UnicodeDecodeError, base64.binascii.Error) as exc:
+        raise ValueError(cursor) from exc
+
+
+def after_cursor_q(cursor):
+    created_at, pk = decode_cursor(cursor)
+    return Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+
+
+def _count_key(status):
+    return f"{_COUNT_PREFIX}:{status}"
+
+
+def queue_counts():
+    """{status: documents} from the cache; one aggregate query when a counter has expired."""
+    from django.db.models import Count
+    from accounts.models import IdentityDocument
+
+    statuses = [choice for choice, _ in IdentityDocument.STATUS_CHOICES]
+    cached = cache.get_many([_count_key(s) for s in statuses])
+    if len(cached) == len(statuses):
+        return {s: max(cached[_count_key(s)], 0) for s in statuses}
+
+    counts = dict.fromkeys(statuses, 0)
+    counts.update(IdentityDocument.objects.values_list('status').annotate(n=Count('id')).order_by())
+    cache.set_many({_count_key(s): n for s, n in counts.items()}, COUNT_TTL)
+    return counts
+
+
+def forget_counts():
+    """Drop the cached counters after writes that skip the signals (bulk_create, update());
+    the next queue_counts() recounts."""
+    from accounts.models import IdentityDocument
+
+    cache.delete_many([_count_key(s) for s, _ in IdentityDocument.STATUS_CHOICES])
+
+
+def bump_count(status, delta):
+    """Adjust a cached counter in place; a missing counter is left for queue_counts() to rebuild."""
+    if not status:
+        return
+    try:
+        cache.incr(_count_key(status), delta)
+    except ValueError:
+        pass
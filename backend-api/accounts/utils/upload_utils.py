@@ -0,0 +1,137 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+READ_BLOCK = 64 * 1024
+
+# Leading bytes -> content type. Only what the KYC/profile endpoints accept.
+_SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'%PDF-', 'application/pdf'),
+)
+EXTENSIONS = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/gif': '.gif',
+    'image/webp': '.webp',
+    'application/pdf': '.pdf',
+}
+
+
+# Bytes needed to tell every signature apart (WebP: 'RIFF' + size + 'WEBP')
+SNIFF_BYTES = 12
+
+
+def sniff_content_type(head: bytes):
+    """Content type from the file's magic bytes (never from the client-declared type)."""
+    for signature, content_type in _SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if len(head) >= 12 and head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+
+def staging_dir():
+    path = getattr(settings, 'CHUNKED_UPLOAD_DIR', None) or os.path.join(tempfile.gettempdir(), 'ctm-uploads')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def staging_path(session_id):
+    return os.path.join(staging_dir(), f"{session_id}.part")
+
+
+# Running SHA-256 per open session, so consecutive chunks hitting the same worker are hashed
+# once. A worker that missed earlier chunks rebuilds the state from the staged file.
+_HASHERS = OrderedDict()
+_HASHERS_LOCK = threading.Lock()
+_MAX_HASHERS = 256
+
+
+def _hasher_at(session_id, offset, path):
+    with _HASHERS_LOCK:
+        cached = _HASHERS.pop(session_id, None)
+    if cached is not None and cached[0] == offset:
+        return cached[1]
+    hasher = hashlib.sha256()
+    remaining = offset
+    if remaining:
+        with open(path, 'rb') as fh:
+            while remaining:
+                block = fh.read(min(READ_BLOCK, remaining))
+                if not block:
+                    break
+                hasher.update(block)
+                remaining -= len(block)
+    return hasher
+
+
+def _remember_hasher(session_id, offset, hasher):
+    with _HASHERS_LOCK:
+        _HASHERS[session_id] = (offset, hasher)
+        _HASHERS.move_to_end(session_id)
+        while len(_HASHERS) > _MAX_HASHERS:
+            _HASHERS.popitem(last=False)
+
+
+def forget_session(session_id):
+    with _HASHERS_LOCK:
+        _HASHERS.pop(session_id, None)
+    try:
+        os.remove(staging_path(session_id))
+    except FileNotFoundError:
+        pass
+
+
+def append_chunk(session_id, received, offset, stream, length, limit):
+    """Stream `length` bytes of `stream` (starting at file offset `offset`) into the staged file.
+
+    Bytes before `received` were already stored (a retransmit after a lost ack) and are read
+    off the wire and discarded. Writing stops at `limit` (declared total size). Memory use is
+    one READ_BLOCK regardless of chunk size. Returns the new received offset.
+    """
+    path = staging_path(session_id)
+    hasher = _hasher_at(session_id, received, path)
+    skip = received - offset
+    remaining = length
+    with open(path, 'r+b' if os.path.exists(path) else 'w+b') as fh:
+        # Drop anything past the acknowledged offset left by an interrupted write
+        fh.truncate(received)
+        fh.seek(received)
+        position = received
+        while remaining > 0:
+            block = stream.read(min(READ_BLOCK, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            if skip > 0:
+                dropped = min(skip, len(block))
+                block = block[dropped:]
+                skip -= dropped
+            if not block:
+                continue
+            if position + len(block) > limit:
+                raise ValueError('chunk exceeds declared size')
+            fh.write(block)
+            hasher.update(block)
+            position += len(block)
+    _remember_hasher(session_id, position, hasher)
+    return position
+
+
+def staged_head(session_id, size=SNIFF_BYTES):
+    """First `size` bytes staged so far (for content sniffing)."""
+    with open(staging_path(session_id), 'rb') as fh:
+        return fh.read(size)
+
+
+def final_digest(session_id, received):
+    return _hasher_at(session_id, received, staging_path(session_id)).hexdigest()
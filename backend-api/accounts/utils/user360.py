@@ -0,0 +1,347 @@
+"""Sections of the admin "User 360" detail (AdminUserDetailView).
+
+Every section is one query (or zero, from cache) built on the user row that
+load_user() fetched together with profile, wallet and residence country. The view
+assembles whatever `?sections=` asks for; SECTIONS lists the defaults in payload order.
+"""
+
+from django.core.cache import cache
+from django.db.models import (
+    BooleanField, Case, CharField, Count, JSONField, OuterRef, Q, Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .image_utils import variant_urls
+from .media_utils import document_url, signed_url_builder
+
+STATS_TTL = 600
+ACTIVITY_LIMIT = 40
+TRANSACTION_LIMIT = 20
+
+TRANSACTION_TYPE_LABELS = {
+    'deposit': 'Depo',
+    'withdrawal': 'Retire',
+    'send': 'Voye',
+    'receive': 'Resevwa',
+    'recharge': 'Rechaj',
+    'bill_payment': 'Peman Bòdwo',
+    'topup': 'Top-Up Telefòn',
+    'commission': 'Komisyon',
+    'exchange': 'Chanj',
+}
+
+
+def load_user(user_id):
+    """User + profile + country + wallet + last successful login, in one query."""
+    from accounts.models import LoginActivity, User
+
+    last_success = LoginActivity.objects.filter(user=OuterRef('pk'), success=True).order_by('-timestamp')
+    return (
+        User.objects.select_related('profile', 'profile__residence_country', 'wallet')
+        .annotate(last_success_login=Subquery(last_success.values('timestamp')[:1]))
+        .get(id=user_id)
+    )
+
+
+def _related(user, name):
+    try:
+        return getattr(user, name)
+    except Exception:
+        return None
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def last_login(user):
+    return user.last_login or user.last_success_login
+
+
+def profile_section(request, user):
+    profile = _related(user, 'profile')
+    if profile is None:
+        return {'profile': None}
+    country = profile.residence_country
+    return {'profile': {
+        'phone': user.phone_number,  # Phone is stored in User model
+        'date_of_birth': _iso(profile.date_of_birth),
+        'address': profile.address,
+        'city': profile.city,
+        'country': profile.country,
+        'residence_country_code': country.iso2 if country else None,
+        'residence_country_name': country.name if country else None,
+        'residence_country_display': f"{country.name_kreol or country.name} ({country.iso2})" if country else None,
+        'country_display': (country.name_kreol or country.name) if country else profile.country,
+        'id_document_type': profile.id_document_type,
+        'id_document_number': profile.id_document_number,
+        'id_document_image': document_url(request, profile.id_document_image),
+        'id_document_front': document_url(request, profile.id_document_front),
+        'id_document_back': document_url(request, profile.id_document_back),
+        'verification_status': profile.verification_status,
+        'kyc_status': profile.verification_status,
+        'is_email_verified': profile.is_email_verified,
+        'is_phone_verified': profile.is_phone_verified,
+        # Aliases for frontend backward compatibility
+        'email_verified': profile.is_email_verified,
+        'phone_verified': profile.is_phone_verified,
+        'created_at': _iso(profile.created_at),
+        'updated_at': _iso(profile.updated_at),
+    }}
+
+
+def wallet_section(request, user):
+    from transactions.fx import pocket_balances
+
+    wallet = _related(user, 'wallet')
+    if wallet is None:
+        return {'wallet': None}
+    return {'wallet': {
+        'balance': str(wallet.balance),
+        'currency': wallet.currency,
+        'balances': {currency: str(balance) for currency, balance in pocket_balances(wallet).items()},
+        'is_active': wallet.is_active,
+        'created_at': _iso(wallet.created_at),
+    }}
+
+
+def security_section(request, user):
+    profile = _related(user, 'profile')
+    return {'security': {
+        'email_verified': profile.is_email_verified if profile else None,
+        'phone_verified': profile.is_phone_verified if profile else None,
+        'last_login': _iso(last_login(user)),
+        'two_factor_enabled': False,  # Placeholder until 2FA implemented
+        'password_last_changed': None,
+    }}
+
+
+def transactions_section(request, user):
+    from transactions.models import Transaction
+
+    txns = Transaction.objects.filter(Q(sender=user) | Q(receiver=user)).only(
+        'id', 'transaction_type', 'amount', 'description', 'status', 'created_at', 'reference_number', 'sender_id',
+    ).order_by('-created_at')[:TRANSACTION_LIMIT]
+    recent = []
+    for t in txns:
+        # Signed from this user's point of view: money leaving (send/withdrawal as sender) is negative
+        outgoing = t.transaction_type in ('send', 'withdrawal') and t.sender_id == user.id
+        recent.append({
+            'id': str(t.id),
+            'type': TRANSACTION_TYPE_LABELS.get(t.transaction_type, t.transaction_type.title()),
+            'amount': float(-t.amount if outgoing else t.amount),
+            'description': t.description or '',
+            'status': t.status,
+            'created_at': _iso(t.created_at),
+            'reference_number': t.reference_number,
+        })
+    return {'recent_transactions': recent}
+
+
+def activity_section(request, user):
+    """Logins and security events merged newest-first by one UNION query."""
+    from accounts.models import LoginActivity, SecurityActivity
+
+    columns = ('kind', 'timestamp', 'ip_address', 'user_agent', 'meta', 'ok')
+    security = SecurityActivity.objects.filter(user=user).annotate(
+        kind=Coalesce('event_type', Value('')), meta=Coalesce('metadata', Value(None, output_field=JSONField())),
+        ok=Value(None, output_field=BooleanField()),
+    ).values_list(*columns).order_by()
+    logins = LoginActivity.objects.filter(user=user).annotate(
+        kind=Case(When(success=True, then=Value('login_success')), default=Value('login_fail'), output_field=CharField()),
+        meta=Value(None, output_field=JSONField()), ok=Coalesce('success', Value(False)),
+    ).values_list(*columns).order_by()
+
+    history = []
+    for kind, timestamp, ip_address, user_agent, meta, ok in security.union(logins, all=True).order_by('-timestamp')[:ACTIVITY_LIMIT]:
+        history.append({
+            'type': kind,
+            'timestamp': timestamp.isoformat(),
+            'ip_address': ip_address,
+            'user_agent': user_agent[:120] if user_agent else None,
+            'meta': {'success': ok} if kind in ('login_success', 'login_fail') else (meta or {}),
+        })
+    return {'activity_history': history}
+
+
+def _profile_document(user, profile, front, back):
+    return {
+        'id': f"doc_profile_{user.id}",
+        'document_type': profile.id_document_type or 'unknown',
+        'document_number': profile.id_document_number or '',
+        'issue_date': '',
+        'expiry_date': '',
+        'issuing_authority': 'Government of Haiti',
+        'status': profile.verification_status or 'pending',
+        'uploaded_at': _iso(profile.created_at) or '',
+        'verified_at': _iso(profile.updated_at) if profile.verification_status == 'verified' else None,
+        'rejection_reason': None,
+        'front_image_url': front,
+        'back_image_url': back,
+    }
+
+
+def documents_section(request, user):
+    from accounts.models import IdentityDocument
+
+    url_for = signed_url_builder(request)
+    documents = []
+    for doc in IdentityDocument.objects.filter(user=user).order_by('-created_at'):
+        front = doc.front_image or doc.legacy_single_image
+        documents.append({
+            'id': str(doc.id),
+            'document_type': doc.document_type or 'unknown',
+            'document_number': doc.document_number or '',
+            'issue_date': '',
+            'expiry_date': '',
+            'issuing_authority': 'Government of Haiti',
+            'status': doc.status,
+            'uploaded_at': _iso(doc.created_at),
+            'verified_at': _iso(doc.updated_at) if doc.status == 'verified' else None,
+            'rejection_reason': None,
+            'front_image_url': document_url(request, front),
+            'back_image_url': document_url(request, doc.back_image),
+            'front_image_variants': variant_urls(front, url_for),
+            'back_image_variants': variant_urls(doc.back_image, url_for),
+        })
+
+    profile = _related(user, 'profile')
+    if not documents and profile is not None:
+        if profile.id_document_front or profile.id_document_back:
+            documents.append(_profile_document(
+                user, profile, document_url(request, profile.id_document_front), document_url(request, profile.id_document_back)
+            ))
+        elif profile.id_document_image:
+            documents.append(_profile_document(user, profile, document_url(request, profile.id_document_image), None))
+
+    return {
+        'identity_documents': documents,
+        'identity_documents_summary': {
+            'total': len(documents),
+            'pending': sum(1 for d in documents if d['status'] == 'pending'),
+            'verified': sum(1 for d in documents if d['status'] == 'verified'),
+            'rejected': sum(1 for d in documents if d['status'] == 'rejected'),
+        },
+    }
+
+
+def stats_cache_key(user_id):
+    return f"user360:stats:{user_id}:{timezone.now().strftime('%Y-%m')}"
+
+
+def invalidate_stats(*user_ids):
+    cache.delete_many([stats_cache_key(uid) for uid in user_ids if uid])
+
+
+def _scalar(queryset, aggregate):
+    """Aggregate over `queryset` as a correlated scalar subquery (no GROUP BY column)."""
+    return Subquery(queryset.order_by().annotate(_one=Value(1)).values('_one').annotate(v=aggregate).values('v')[:1])
+
+
+def _compute_stats(user):
+    from accounts.models import User
+    from transactions.fx import to_base_sql
+    from transactions.models import AgentTransaction, Transaction
+
+    now = timezone.now()
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    involved = Transaction.objects.filter(Q(sender=OuterRef('pk')) | Q(receiver=OuterRef('pk')))
+    row = User.objects.filter(pk=user.pk).values('pk').annotate(
+        total_transactions=_scalar(involved, Count('id')),
+        monthly_volume=_scalar(involved.filter(created_at__gte=month_start), Sum(to_base_sql())),
+        payments_received=_scalar(
+            Transaction.objects.filter(receiver=OuterRef('pk'), transaction_type__in=['receive', 'deposit']), Sum(to_base_sql())
+        ),
+        client_senders=_scalar(involved.filter(sender__user_type='client'), Count('sender', distinct=True)),
+        client_receivers=_scalar(involved.filter(receiver__user_type='client'), Count('receiver', distinct=True)),
+        total_commission=_scalar(AgentTransaction.objects.filter(agent=OuterRef('pk')), Sum('commission_earned')),
+    ).get()
+
+    if user.user_type == 'agent':
+        return {'agent_stats': {
+            'total_transactions': row['total_transactions'] or 0,
+            'total_commission': float(row['total_commission'] or 0),
+            'active_clients': (row['client_senders'] or 0) + (row['client_receivers'] or 0),
+            'monthly_volume': float(row['monthly_volume'] or 0),
+        }}
+    return {'enterprise_stats': {
+        'total_transactions': row['total_transactions'] or 0,
+        'monthly_volume': float(row['monthly_volume'] or 0),
+        'total_payments_received': float(row['payments_received'] or 0),
+        'active_services': 0,  # Placeholder until services model exists
+        'customer_count': row['client_senders'] or 0,
+    }}
+
+
+def stats_section(request, user):
+    """Agent/enterprise aggregates: one statement of scalar subqueries, cached per month and
+    dropped whenever a transaction involving the user is written (see accounts.signals)."""
+    if user.user_type not in ('agent', 'enterprise'):
+        return {}
+    key = stats_cache_key(user.pk)
+    stats = cache.get(key)
+    if stats is None:
+        stats = _compute_stats(user)
+        cache.set(key, stats, STATS_TTL)
+    return stats
+
+
+def risk_section(request, user):
+    """Latest offline anomaly score (transactions/anomaly.py); None until the user is scored."""
+    from transactions.models import UserRiskScore
+
+    risk = UserRiskScore.objects.filter(user=user).first()
+    if risk is None:
+        return {'risk': None}
+    return {'risk': {
+        'score': risk.score,
+        'flags': risk.flags,
+        'features': risk.features,
+        'transactions_seen': risk.transactions_seen,
+        'computed_at': _iso(risk.computed_at),
+    }}
+
+
+SECTIONS = {
+    'profile': profile_section,
+    'wallet': wallet_section,
+    'security': security_section,
+    'transactions': transactions_section,
+    'activity': activity_section,
+    'documents': documents_section,
+    'stats': stats_section,
+    'risk': risk_section,
+}
+
+
+# Sections whose payload embeds signed media URLs (they expire, see media_utils.signing_window)
+SIGNED_URL_SECTIONS = ('profile', 'documents')
+
+
+def parse_sections(raw):
+    """Names from `?sections=a,b` (all when absent); ValueError on an unknown name."""
+    if not raw:
+        return list(SECTIONS)
+    names = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SECTIONS]
+    if unknown:
+        raise ValueError(', '.join(unknown))
+    return names
+
+
+def build_user_detail(request, user, sections):
+    data = {
+        'id': str(user.id),
+        'username': user.username,
+        'email': user.email,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'user_type': user.user_type,
+        'is_active': user.is_active,
+        'date_joined': user.date_joined.isoformat(),
+        'last_login': _iso(last_login(user)),
+    }
+    for name in sections:
+        data.update(SECTIONS[name](request, user))
+    return data
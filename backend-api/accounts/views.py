@@ -47,7 +47,7 @@ class AdminRecentActivityView(APIView):
                     activities.append({
                         'action': 'Tranzaksyon',
                         'user': f"{sender_name} → {receiver_name}",
-                        'amount': f"{t.amount} HTG",
+                        'amount': f"{t.amount} {t.currency}",
                         'time': t.created_at.strftime('%d/%m/%Y %H:%M'),
                         'ts': int(t.created_at.timestamp()),
                         'type': 'transaction'
@@ -163,9 +163,9 @@ from django.db.models import Q
 from django.conf import settings
 import random
 import string
-from .models import User, UserProfile, Wallet, IdentityDocument, Country, LoginActivity
+from .models import User, UserProfile, Wallet, IdentityDocument, normalize_document_number, Country, LoginActivity, SecurityActivity
 from transactions.models import Transaction, WalletHistory
-from django.db.models import Sum, Count, Q
+from django.db.models import Sum, Count, Q, OuterRef, Subquery
 
 # Admin dashboard summary stats endpoint
 class AdminDashboardStatsView(APIView):
@@ -188,7 +188,13 @@ class AdminDashboardStatsView(APIView):
         merchants_inactive = User.objects.filter(user_type='enterprise', is_active=False).count()
         total_users = total_clients + total_agents + total_enterprises
         total_transactions = Transaction.objects.count()
-        total_volume = Transaction.objects.aggregate(total=Sum('amount'))['total'] or 0
+        # Converted to HTG inside the SUM, with the per-currency totals from one GROUP BY
+        from transactions.fx import BASE_CURRENCY, to_base_sql
+        total_volume = Transaction.objects.aggregate(total=Sum(to_base_sql()))['total'] or 0
+        volume_by_currency = {
+            row['currency']: row['total']
+            for row in Transaction.objects.order_by().values('currency').annotate(total=Sum('amount'))
+        }
         pending_approvals = IdentityDocument.objects.filter(status='pending').count()
 
         return Response({
@@ -198,6 +204,8 @@ class AdminDashboardStatsView(APIView):
             'totalEnterprises': total_enterprises,
             'totalTransactions': total_transactions,
             'totalVolume': total_volume,
+            'volumeCurrency': BASE_CURRENCY,
+            'volumeByCurrency': volume_by_currency,
             'pendingApprovals': pending_approvals,
             # breakdowns
             'clientsActive': clients_active,
@@ -210,8 +218,16 @@ class AdminDashboardStatsView(APIView):
 from decimal import Decimal
 from django.db import transaction as db_transaction
 from django.utils import timezone
+from datetime import timedelta
 import uuid
 from .utils.country_utils import normalize_country_name
+from .utils.etag_utils import conditional_response, latest
+from .utils.image_utils import variant_urls
+from .utils.media_utils import document_url, public_url_builder, serve_media, signed_url_builder, unsign_media_token
+from .utils.review_queue import (
+    after_cursor_q, available_q, claim_documents, encode_cursor, held_by_other, lease_seconds, queue_counts,
+    queue_order, release_documents,
+)
 from .serializers import UserSerializer, UserProfileSerializer, RegisterSerializer
 
 class RegisterView(APIView):
@@ -350,7 +366,7 @@ class RegisterView(APIView):
 
             # Create IdentityDocument record for better tracking (optional files)
             try:
-                if id_document_front or id_document_back or id_document:
+                if id_document_front or id_document_back or id_document or normalize_document_number(data.get('id_document_number')):
                     IdentityDocument.objects.create(
                         user=user,
                         document_type=data.get('id_document_type', '') or 'unknown',
@@ -543,9 +559,78 @@ class LogoutView(APIView):
                 'error': 'Erè nan dekoneksyon an'
             }, status=status.HTTP_400_BAD_REQUEST)
 
+def _profile_payload(request, user, profile, wallet, last_login):
+    """Shared `user`/`profile`/`wallet` blocks used by ProfileView and the mobile home endpoint."""
+    residence_country_code = None
+    residence_country_name = None
+    if profile.residence_country_id:
+        residence_country_code = profile.residence_country.iso2
+        residence_country_name = profile.residence_country.name
+
+    # Build absolute URL for profile picture if present
+    profile_picture_url = None
+    try:
+        if profile.profile_picture and hasattr(profile.profile_picture, 'url'):
+            profile_picture_url = request.build_absolute_uri(profile.profile_picture.url)
+    except Exception:
+        profile_picture_url = None
+
+    return {
+        'user': {
+            'id': str(user.id),
+            'email': user.email,
+            'phone_number': user.phone_number,
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+            'user_type': user.user_type,
+            'last_login': last_login.isoformat() if last_login else None,
+        },
+        'profile': {
+            'first_name': profile.first_name,
+            'last_name': profile.last_name,
+            'date_of_birth': profile.date_of_birth,
+            'address': profile.address,
+            'city': profile.city,
+            'country': profile.country,  # legacy textual country
+            'residence_country_code': residence_country_code,
+            'residence_country_name': residence_country_name,
+            'verification_status': profile.verification_status,
+            'is_email_verified': profile.is_email_verified,
+            'is_phone_verified': profile.is_phone_verified,
+            # Persisted profile picture information
+            'profile_picture_url': profile_picture_url,
+            'profile_picture_variants': variant_urls(profile.profile_picture, public_url_builder(request)),
+            'preferred_language': getattr(profile, 'preferred_language', None),
+        },
+        'wallet': {
+            'balance': str(wallet.balance),
+            'currency': wallet.currency,
+            'is_active': wallet.is_active,
+        }
+    }
+
+
+def _pin_status_payload(profile):
+    return {
+        'has_pin': profile.has_pin(),
+        'pin_attempts': profile.pin_attempts,
+        'pin_locked': bool(profile.pin_locked_until and profile.pin_locked_until > timezone.now()) if profile.pin_locked_until else False
+    }
+
+
+def _account_validators(request, *args, **kwargs):
+    """Validators for payloads built from the user row, profile and wallet (one query)."""
+    row = User.objects.filter(pk=request.user.pk).values(
+        'updated_at', 'last_login', 'profile__updated_at', 'wallet__updated_at'
+    ).first() or {}
+    stamps = (row.get('updated_at'), row.get('last_login'), row.get('profile__updated_at'), row.get('wallet__updated_at'))
+    return stamps, latest(*stamps)
+
+
 class ProfileView(APIView):
     permission_classes = [IsAuthenticated]
     
+    @conditional_response(_account_validators)
     def get(self, request):
         try:
             user = request.user
@@ -565,63 +650,17 @@ class ProfileView(APIView):
             except Wallet.DoesNotExist:
                 wallet = Wallet.objects.create(user=user, balance=0.00)
 
-            residence_country_code = None
-            residence_country_name = None
-            if profile.residence_country_id:
-                residence_country_code = profile.residence_country.iso2
-                residence_country_name = profile.residence_country.name
-
-            # Build absolute URL for profile picture if present
-            profile_picture_url = None
-            try:
-                if profile.profile_picture and hasattr(profile.profile_picture, 'url'):
-                    profile_picture_url = request.build_absolute_uri(profile.profile_picture.url)
-            except Exception:
-                profile_picture_url = None
-
             # Determine real last successful login: prefer user.last_login; fallback to latest successful LoginActivity
             real_last_login = user.last_login
             if not real_last_login:
                 try:
-                    from django.utils import timezone as _tz
                     latest_success = user.login_activities.filter(success=True).order_by('-timestamp').values_list('timestamp', flat=True).first()
                     if latest_success:
                         real_last_login = latest_success
                 except Exception:
                     pass
 
-            data = {
-                'user': {
-                    'id': str(user.id),
-                    'email': user.email,
-                    'phone_number': user.phone_number,
-                    'first_name': user.first_name,
-                    'last_name': user.last_name,
-                    'user_type': user.user_type,
-                    'last_login': real_last_login.isoformat() if real_last_login else None,
-                },
-                'profile': {
-                    'first_name': profile.first_name,
-                    'last_name': profile.last_name,
-                    'date_of_birth': profile.date_of_birth,
-                    'address': profile.address,
-                    'city': profile.city,
-                    'country': profile.country,  # legacy textual country
-                    'residence_country_code': residence_country_code,
-                    'residence_country_name': residence_country_name,
-                    'verification_status': profile.verification_status,
-                    'is_email_verified': profile.is_email_verified,
-                    'is_phone_verified': profile.is_phone_verified,
-                    # Persisted profile picture information
-                    'profile_picture_url': profile_picture_url,
-                    'preferred_language': getattr(profile, 'preferred_language', None),
-                },
-                'wallet': {
-                    'balance': str(wallet.balance),
-                    'currency': wallet.currency,
-                    'is_active': wallet.is_active,
-                }
-            }
+            data = _profile_payload(request, user, profile, wallet, real_last_login)
             return Response(data, status=status.HTTP_200_OK)
         except Exception as e:
             return Response({
@@ -998,7 +1037,7 @@ class AdminCreateUserView(APIView):
 
             # Create IdentityDocument record if any provided
             try:
-                if id_document_front or id_document_back or id_document:
+                if id_document_front or id_document_back or id_document or normalize_document_number(data.get('id_document_number')):
                     IdentityDocument.objects.create(
                         user=user,
                         document_type=data.get('id_document_type', '') or 'unknown',
@@ -1229,329 +1268,63 @@ class AdminChangeUserTypeView(APIView):
             return Response({'error': f'Erè nan chanjman tip la: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _admin_user_detail_validators(request, user_id):
+    if request.user.user_type != 'admin':
+        return None
+    from django.core.exceptions import ValidationError
+    from transactions.models import AgentTransaction
+    from .utils.media_utils import signing_window
+    from .utils.user360 import SIGNED_URL_SECTIONS, parse_sections
+    try:
+        sections = parse_sections(request.query_params.get('sections'))
+    except ValueError:
+        return None  # view answers 400
+    involved = Transaction.objects.filter(Q(sender=OuterRef('pk')) | Q(receiver=OuterRef('pk')))
+    try:
+        row = User.objects.filter(pk=user_id).values(
+            'updated_at', 'last_login', 'profile__updated_at', 'wallet__updated_at', 'risk_score__computed_at'
+        ).annotate(
+            tx_updated=Subquery(involved.order_by('-updated_at').values('updated_at')[:1]),
+            login_at=Subquery(LoginActivity.objects.filter(user=OuterRef('pk')).order_by('-timestamp').values('timestamp')[:1]),
+            security_at=Subquery(SecurityActivity.objects.filter(user=OuterRef('pk')).order_by('-timestamp').values('timestamp')[:1]),
+            docs_updated=Subquery(IdentityDocument.objects.filter(user=OuterRef('pk')).order_by('-updated_at').values('updated_at')[:1]),
+            commission_at=Subquery(AgentTransaction.objects.filter(agent=OuterRef('pk')).order_by('-created_at').values('created_at')[:1]),
+        ).first()
+    except (ValueError, ValidationError):
+        return None
+    if row is None:
+        return None  # view answers 404
+    # Month boundary moves the agent/enterprise monthly_volume stats
+    month_start = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    stamps = (row['updated_at'], row['last_login'], row['profile__updated_at'], row['wallet__updated_at'],
+              row['tx_updated'], row['docs_updated'], row['risk_score__computed_at'],
+              row['login_at'], row['security_at'], row['commission_at'], month_start)
+    if any(name in SIGNED_URL_SECTIONS for name in sections):
+        # Document URLs in the body are signed with a short TTL; don't revalidate a copy past its window
+        stamps += (signing_window(),)
+    return stamps, latest(*stamps)
+
+
 class AdminUserDetailView(APIView):
+    """User 360 for admins. `?sections=profile,wallet,security,transactions,activity,documents,stats,risk`
+    picks what to build (default: all); each section is a single query, see utils/user360.py."""
     permission_classes = [IsAuthenticated]
     
+    @conditional_response(_admin_user_detail_validators)
     def get(self, request, user_id):
         # Check if user is admin
         if request.user.user_type != 'admin':
             return Response({'error': 'Aksè refize - Admin sèlman'}, status=status.HTTP_403_FORBIDDEN)
-        
-        try:
-            user = User.objects.get(id=user_id)
-            
-        # Get user profile
-            try:
-                profile = user.profile
-                profile_data = {
-                    'phone': user.phone_number,  # Phone is stored in User model
-                    'date_of_birth': profile.date_of_birth.isoformat() if profile.date_of_birth else None,
-                    'address': profile.address,
-                    'city': profile.city,
-                    'country': profile.country,
-                    # Residence country enriched fields
-                    'residence_country_code': profile.residence_country.iso2 if getattr(profile, 'residence_country', None) else None,
-                    'residence_country_name': profile.residence_country.name if getattr(profile, 'residence_country', None) else None,
-                    'residence_country_display': (
-                        f"{profile.residence_country.name_kreol or profile.residence_country.name} ({profile.residence_country.iso2})"
-                        if getattr(profile, 'residence_country', None) else None
-                    ),
-                    'country_display': (
-                        (profile.residence_country.name_kreol or profile.residence_country.name)
-                        if getattr(profile, 'residence_country', None) else profile.country
-                    ),
-                    'id_document_type': profile.id_document_type,
-                    'id_document_number': profile.id_document_number,
-                    'id_document_image': profile.id_document_image.url if profile.id_document_image else None,
-                    'id_document_front': profile.id_document_front.url if hasattr(profile, 'id_document_front') and profile.id_document_front else None,
-                    'id_document_back': profile.id_document_back.url if hasattr(profile, 'id_document_back') and profile.id_document_back else None,
-                    'verification_status': profile.verification_status,
-                    'kyc_status': profile.verification_status,
-                    'is_email_verified': profile.is_email_verified,
-                    'is_phone_verified': profile.is_phone_verified,
-                    # Aliases for frontend backward compatibility
-                    'email_verified': profile.is_email_verified,
-                    'phone_verified': profile.is_phone_verified,
-                    'created_at': profile.created_at.isoformat() if profile.created_at else None,
-                    'updated_at': profile.updated_at.isoformat() if profile.updated_at else None,
-                }
-            except:
-                profile_data = None
-            
-            # Get wallet info
-            try:
-                wallet = user.wallet
-                wallet_data = {
-                    'balance': str(wallet.balance),
-                    'currency': wallet.currency,
-                    'is_active': wallet.is_active,
-                    'created_at': wallet.created_at.isoformat() if wallet.created_at else None,
-                }
-            except:
-                wallet_data = None
-            
-            # Get recent transactions (real data)
-            try:
-                from transactions.models import Transaction
-                # Fetch last 20 transactions where user is sender or receiver (or involved in deposit/withdrawal)
-                txns = Transaction.objects.filter(
-                    Q(sender=user) | Q(receiver=user)
-                ).order_by('-created_at')[:20]
-
-                type_map = {
-                    'deposit': 'Depo',
-                    'withdrawal': 'Retire',
-                    'send': 'Voye',
-                    'receive': 'Resevwa',
-                    'recharge': 'Rechaj',
-                    'bill_payment': 'Peman Bòdwo',
-                    'topup': 'Top-Up Telefòn',
-                }
-                recent_transactions = []
-                for t in txns:
-                    # Sign amount from perspective of this user:
-                    #  - If user is sender in send/withdrawal => negative
-                    #  - If user is receiver in receive/deposit => positive
-                    #  - For other types use natural sign (t.amount)
-                    signed_amount = t.amount
-                    if t.transaction_type in ['send'] and t.sender_id == user.id:
-                        signed_amount = -t.amount
-                    elif t.transaction_type in ['receive'] and t.receiver_id == user.id:
-                        signed_amount = t.amount
-                    elif t.transaction_type == 'withdrawal' and t.sender_id == user.id:
-                        signed_amount = -t.amount
-                    elif t.transaction_type == 'deposit' and t.receiver_id == user.id:
-                        signed_amount = t.amount
-                    # Fallback: deposits credited to receiver, withdrawals debited from sender already handled
-                    recent_transactions.append({
-                        'id': str(t.id),
-                        'type': type_map.get(t.transaction_type, t.transaction_type.title()),
-                        'amount': float(signed_amount),
-                        'description': t.description or '',
-                        'status': t.status,
-                        'created_at': t.created_at.isoformat() if t.created_at else None,
-                        'reference_number': t.reference_number,
-                    })
-            except Exception as e:
-                print(f"Error loading transactions for admin detail: {e}")
-                recent_transactions = []
-            
-            # Get login & security activity history
-            try:
-                login_acts = list(user.login_activities.all()[:25])
-            except Exception as e:
-                print(f"Error loading login activities: {e}")
-                login_acts = []
-            try:
-                from .models import SecurityActivity
-                sec_acts = list(user.security_activities.all()[:25])
-            except Exception as e:
-                print(f"Error loading security activities: {e}")
-                sec_acts = []
-
-            # Normalize activities into unified structure
-            activity_history = []
-            for a in login_acts:
-                activity_history.append({
-                    'type': 'login_success' if a.success else 'login_fail',
-                    'timestamp': a.timestamp.isoformat(),
-                    'ip_address': a.ip_address,
-                    'user_agent': a.user_agent[:120] if a.user_agent else None,
-                    'meta': {
-                        'success': a.success,
-                    }
-                })
-            for s in sec_acts:
-                activity_history.append({
-                    'type': s.event_type,
-                    'timestamp': s.timestamp.isoformat(),
-                    'ip_address': s.ip_address,
-                    'user_agent': s.user_agent[:120] if s.user_agent else None,
-                    'meta': s.metadata or {}
-                })
-            # Sort combined list by timestamp desc
-            try:
-                activity_history.sort(key=lambda x: x['timestamp'], reverse=True)
-            except Exception:
-                pass
-            
-            # Build identity documents from model first; fallback to profile if none
-            identity_documents = []
-            try:
-                docs = IdentityDocument.objects.filter(user=user).order_by('-created_at')
-                def abs_url(u):
-                    if not u:
-                        return None
-                    return u if u.startswith('http') else f"http://127.0.0.1:8000{u}"
-                for doc in docs:
-                    identity_documents.append({
-                        'id': str(doc.id),
-                        'document_type': doc.document_type or 'unknown',
-                        'document_number': doc.document_number or '',
-                        'issue_date': '',
-                        'expiry_date': '',
-                        'issuing_authority': 'Government of Haiti',
-                        'status': doc.status,
-                        'uploaded_at': doc.created_at.isoformat() if doc.created_at else None,
-                        'verified_at': doc.updated_at.isoformat() if doc.status == 'verified' else None,
-                        'rejection_reason': None,
-                        'front_image_url': abs_url(doc.front_image.url) if doc.front_image else abs_url(doc.legacy_single_image.url) if doc.legacy_single_image else None,
-                        'back_image_url': abs_url(doc.back_image.url) if doc.back_image else None,
-                    })
-            except Exception as e:
-                print(f"Error loading IdentityDocuments: {e}")
-
-            if not identity_documents and profile_data:
-                # Helper to absolutize URLs
-                def abs_url(u):
-                    if not u:
-                        return None
-                    return u if u.startswith('http') else f"http://127.0.0.1:8000{u}"
-                legacy_url = profile_data.get('id_document_image')
-                front_url = profile_data.get('id_document_front')
-                back_url = profile_data.get('id_document_back')
-                if front_url or back_url:
-                    identity_documents.append({
-                        'id': f"doc_profile_{user.id}",
-                        'document_type': profile_data.get('id_document_type', 'unknown'),
-                        'document_number': profile_data.get('id_document_number', ''),
-                        'issue_date': '',
-                        'expiry_date': '',
-                        'issuing_authority': 'Government of Haiti',
-                        'status': profile_data.get('verification_status', 'pending'),
-                        'uploaded_at': profile_data.get('created_at', ''),
-                        'verified_at': profile_data.get('updated_at') if profile_data.get('verification_status') == 'verified' else None,
-                        'rejection_reason': None,
-                        'front_image_url': abs_url(front_url),
-                        'back_image_url': abs_url(back_url),
-                    })
-                elif legacy_url:
-                    identity_documents.append({
-                        'id': f"doc_profile_{user.id}",
-                        'document_type': profile_data.get('id_document_type', 'unknown'),
-                        'document_number': profile_data.get('id_document_number', ''),
-                        'issue_date': '',
-                        'expiry_date': '',
-                        'issuing_authority': 'Government of Haiti',
-                        'status': profile_data.get('verification_status', 'pending'),
-                        'uploaded_at': profile_data.get('created_at', ''),
-                        'verified_at': profile_data.get('updated_at') if profile_data.get('verification_status') == 'verified' else None,
-                        'rejection_reason': None,
-                        'front_image_url': abs_url(legacy_url),
-                        'back_image_url': None,
-                    })
-            # Always build a summary so frontend pa montre 'Pa gen dokiman upload' lè gen dokiman
-            try:
-                identity_documents_summary = {
-                    'total': len(identity_documents),
-                    'pending': sum(1 for d in identity_documents if d.get('status') == 'pending'),
-                    'verified': sum(1 for d in identity_documents if d.get('status') == 'verified'),
-                    'rejected': sum(1 for d in identity_documents if d.get('status') == 'rejected'),
-                }
-            except Exception:
-                identity_documents_summary = {
-                    'total': 0,
-                    'pending': 0,
-                    'verified': 0,
-                    'rejected': 0,
-                }
-            
-            # Determine real last successful login (fallback to login activities)
-            real_last_login = user.last_login
-            if not real_last_login:
-                try:
-                    real_last_login = user.login_activities.filter(success=True).order_by('-timestamp').values_list('timestamp', flat=True).first() or real_last_login
-                except Exception:
-                    pass
-
-            user_data = {
-                'id': str(user.id),
-                'username': user.username,
-                'email': user.email,
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-                'user_type': user.user_type,
-                'is_active': user.is_active,
-                'date_joined': user.date_joined.isoformat(),
-                'last_login': real_last_login.isoformat() if real_last_login else None,
-                'profile': profile_data,
-                'wallet': wallet_data,
-                'security': {
-                    'email_verified': getattr(profile_data, 'get', lambda k, d=None: profile_data[k] if profile_data else None)('is_email_verified') if profile_data else None,
-                    'phone_verified': getattr(profile_data, 'get', lambda k, d=None: profile_data[k] if profile_data else None)('is_phone_verified') if profile_data else None,
-                    'last_login': real_last_login.isoformat() if real_last_login else None,
-                    'two_factor_enabled': False,  # Placeholder until 2FA implemented
-                    'password_last_changed': None,  # Could be tracked later
-                },
-                'recent_transactions': recent_transactions,
-                'activity_history': activity_history[:40],  # cap to 40 recent events
-                'identity_documents': identity_documents,
-                'identity_documents_summary': identity_documents_summary,
-            }
 
-            # Compute role-specific stats so frontend pa rete vid
-            try:
-                from transactions.models import Transaction, AgentTransaction
-                from django.db.models import Sum, Count
-                from django.utils import timezone
-                now = timezone.now()
-                month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            except Exception:
-                Transaction = None
-                AgentTransaction = None
-                month_start = None
-
-            if user.user_type == 'agent' and Transaction and AgentTransaction:
-                try:
-                    # All transactions where the agent participated as sender or receiver
-                    base_qs = Transaction.objects.filter(Q(sender=user) | Q(receiver=user))
-                    month_qs = base_qs.filter(created_at__gte=month_start) if month_start else base_qs
-                    commission_qs = AgentTransaction.objects.filter(agent=user)
-                    commission_total = commission_qs.aggregate(total=Sum('commission_earned'))['total'] or 0
-                    active_clients = (
-                        base_qs.filter(sender__user_type='client').values('sender').distinct().count() +
-                        base_qs.filter(receiver__user_type='client').values('receiver').distinct().count()
-                    )
-                    user_data['agent_stats'] = {
-                        'total_transactions': base_qs.count(),
-                        'total_commission': float(commission_total),
-                        'active_clients': active_clients,
-                        'monthly_volume': float(month_qs.aggregate(total=Sum('amount'))['total'] or 0),
-                    }
-                except Exception as e:
-                    print(f"Agent stats error: {e}")
-                    user_data['agent_stats'] = {
-                        'total_transactions': 0,
-                        'total_commission': 0,
-                        'active_clients': 0,
-                        'monthly_volume': 0,
-                    }
+        from .utils.user360 import build_user_detail, load_user, parse_sections
+        try:
+            sections = parse_sections(request.query_params.get('sections'))
+        except ValueError as e:
+            return Response({'error': f'Seksyon pa valid: {e}'}, status=status.HTTP_400_BAD_REQUEST)
 
-            if user.user_type == 'enterprise' and Transaction:
-                try:
-                    base_qs = Transaction.objects.filter(Q(sender=user) | Q(receiver=user))
-                    month_qs = base_qs.filter(created_at__gte=month_start) if month_start else base_qs
-                    payments_received = base_qs.filter(receiver=user, transaction_type__in=['receive','deposit']).aggregate(total=Sum('amount'))['total'] or 0
-                    customer_count = base_qs.filter(sender__user_type='client').values('sender').distinct().count()
-                    user_data['enterprise_stats'] = {
-                        'total_transactions': base_qs.count(),
-                        'monthly_volume': float(month_qs.aggregate(total=Sum('amount'))['total'] or 0),
-                        'total_payments_received': float(payments_received),
-                        'active_services': 0,  # Placeholder until services model exists
-                        'customer_count': customer_count,
-                    }
-                except Exception as e:
-                    print(f"Enterprise stats error: {e}")
-                    user_data['enterprise_stats'] = {
-                        'total_transactions': 0,
-                        'monthly_volume': 0,
-                        'total_payments_received': 0,
-                        'active_services': 0,
-                        'customer_count': 0,
-                    }
-            
-            return Response(user_data, status=status.HTTP_200_OK)
-            
+        try:
+            user = load_user(user_id)
+            return Response(build_user_detail(request, user, sections), status=status.HTTP_200_OK)
         except User.DoesNotExist:
             return Response({'error': 'Itilizatè pa jwenn'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
@@ -1802,6 +1575,27 @@ class AdminUpdateUserView(APIView):
             return Response({'error': f"Erè nan chanjman an: {e.__class__.__name__}: {str(e) or 'Erè enkoni'}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _document_number_taken(number, user):
+    """True when another user already holds `number` (compared normalized; one unique-index lookup).
+    Legacy profile numbers are folded into IdentityDocument, see _record_document_number."""
+    key = normalize_document_number(number)
+    if not key:
+        return False
+    return IdentityDocument.objects.filter(normalized_number=key).exclude(user=user).exists()
+
+
+def _record_document_number(user, number, document_type=None):
+    """Mirror a number set on the legacy UserProfile field into IdentityDocument, which owns uniqueness."""
+    key = normalize_document_number(number)
+    if not key or IdentityDocument.objects.filter(user=user, normalized_number=key).exists():
+        return
+    doc = IdentityDocument.objects.filter(user=user, normalized_number__isnull=True).order_by('-created_at').first()
+    if doc is None:
+        doc = IdentityDocument(user=user, document_type=document_type or 'unknown', status='pending')
+    doc.document_number = number
+    doc.save()
+
+
 class UploadDocumentView(APIView):
     permission_classes = [IsAuthenticated]
     
@@ -1831,22 +1625,22 @@ class UploadDocumentView(APIView):
             
             # Validate uniqueness of provided document number (check both legacy profile field and IdentityDocument table)
             provided_number = request.data.get('id_document_number', '').strip()
-            if provided_number:
-                from .models import IdentityDocument, UserProfile
-                if IdentityDocument.objects.filter(document_number__iexact=provided_number).exists() or \
-                   UserProfile.objects.filter(id_document_number__iexact=provided_number).exclude(user=request.user).exists():
-                    return Response({'error': 'Nimewo dokiman sa a deja egziste.'}, status=status.HTTP_400_BAD_REQUEST)
+            if _document_number_taken(provided_number, request.user):
+                return Response({'error': 'Nimewo dokiman sa a deja egziste.'}, status=status.HTTP_400_BAD_REQUEST)
 
             # Update profile with document (legacy single image path)
             profile.id_document_image = id_document
             profile.id_document_type = request.data.get('id_document_type', '')
             profile.id_document_number = provided_number
             profile.verification_status = 'pending'
-            profile.save()
+            with db_transaction.atomic():
+                profile.save()
+                _record_document_number(request.user, provided_number, profile.id_document_type)
             
             return Response({
                 'message': 'Dokiman upload ak siksè. Y ap revize li kounye a.',
-                'verification_status': profile.verification_status
+                'verification_status': profile.verification_status,
+                'document_variants': variant_urls(profile.id_document_image, signed_url_builder(request))
             }, status=status.HTTP_200_OK)
             
         except Exception as e:
@@ -1855,7 +1649,46 @@ class UploadDocumentView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _document_duplicates(user_ids):
+    """{user_id: [{'user_id', 'user_name', 'email', 'distance'}]} of other accounts whose ID
+    images have a near-identical difference hash to these users' (one batched BK-tree
+    lookup, see dhash_utils)."""
+    from .models import DocumentImageHash
+    from .utils.dhash_utils import get_document_hash_index
+
+    rows = list(DocumentImageHash.objects.filter(user_id__in=user_ids).values_list('user_id', 'dhash'))
+    results = get_document_hash_index().find_many([(dhash, user_id) for user_id, dhash in rows])
+    closest = {}
+    for (user_id, _), hits in zip(rows, results):
+        owner = str(user_id)
+        for hit in hits:
+            seen = closest.setdefault(owner, {})
+            if hit['user_id'] not in seen or hit['distance'] < seen[hit['user_id']]:
+                seen[hit['user_id']] = hit['distance']
+
+    other_ids = {uid for hits in closest.values() for uid in hits}
+    others = {
+        str(u.id): u for u in User.objects.filter(id__in=other_ids).only('id', 'first_name', 'last_name', 'email')
+    }
+    return {
+        owner: sorted(
+            (
+                {
+                    'user_id': uid,
+                    'user_name': f"{others[uid].first_name} {others[uid].last_name}".strip(),
+                    'email': others[uid].email,
+                    'distance': distance,
+                }
+                for uid, distance in hits.items() if uid in others
+            ),
+            key=lambda item: item['distance']
+        )
+        for owner, hits in closest.items()
+    }
+
+
 class AdminReviewDocumentsView(APIView):
+    """Legacy full list of pending profiles; reviewers should use the leased queue (admin/review-queue/)."""
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
@@ -1880,17 +1713,13 @@ class AdminReviewDocumentsView(APIView):
                 .select_related('user')
             )
             
+            profiles = list(profiles)
+            duplicates = _document_duplicates([p.user_id for p in profiles])
+
             documents_data = []
             for profile in profiles:
                 # Prefer front image, then back, then legacy single
-                raw_url = (
-                    (profile.id_document_front.url if profile.id_document_front else None)
-                    or (profile.id_document_back.url if profile.id_document_back else None)
-                    or (profile.id_document_image.url if profile.id_document_image else None)
-                )
-                abs_url = (
-                    raw_url if (raw_url or '').startswith('http') else f"http://127.0.0.1:8000{raw_url}" if raw_url else None
-                )
+                shown = profile.id_document_front or profile.id_document_back or profile.id_document_image
 
                 documents_data.append({
                     'user_id': str(profile.user.id),
@@ -1899,9 +1728,11 @@ class AdminReviewDocumentsView(APIView):
                     'phone': profile.user.phone_number,
                     'id_document_type': profile.id_document_type,
                     'id_document_number': profile.id_document_number,
-                    'id_document_url': abs_url,
+                    'id_document_url': document_url(request, shown),
+                    'id_document_variants': variant_urls(shown, signed_url_builder(request)) if shown else None,
                     'submitted_date': profile.updated_at,
-                    'verification_status': profile.verification_status
+                    'verification_status': profile.verification_status,
+                    'possible_duplicates': duplicates.get(str(profile.user_id), []),
                 })
             
             return Response({
@@ -1915,6 +1746,118 @@ class AdminReviewDocumentsView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+REVIEW_PAGE_SIZE = 25
+REVIEW_PAGE_MAX = 100
+
+
+def _review_document_payload(request, doc, duplicates):
+    shown = doc.front_image or doc.legacy_single_image or doc.back_image
+    return {
+        'id': str(doc.id),
+        'user_id': str(doc.user_id),
+        'user_name': f"{doc.user.first_name} {doc.user.last_name}".strip() or doc.user.username,
+        'email': doc.user.email,
+        'phone': doc.user.phone_number,
+        'document_type': doc.document_type,
+        'document_number': doc.document_number,
+        'status': doc.status,
+        'front_image_url': document_url(request, doc.front_image or doc.legacy_single_image),
+        'back_image_url': document_url(request, doc.back_image),
+        'variants': variant_urls(shown, signed_url_builder(request)) if shown else None,
+        'submitted_date': doc.created_at,
+        'claimed_by': str(doc.claimed_by_id) if doc.claimed_by_id else None,
+        'claim_expires_at': doc.claim_expires_at,
+        'possible_duplicates': duplicates.get(str(doc.user_id), []),
+    }
+
+
+def _review_page_size(value, default=REVIEW_PAGE_SIZE):
+    try:
+        return max(1, min(int(value), REVIEW_PAGE_MAX))
+    except (TypeError, ValueError):
+        return default
+
+
+class AdminReviewQueueView(APIView):
+    """Pending identity documents, oldest first, keyset-paginated with ?after=<next_cursor>.
+
+    Lists what is still free to claim (?mine=1: the caller's own leases) plus cached
+    per-status counts. Reviewers take work through the claim endpoint, not from this list.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        if request.user.user_type != 'admin':
+            return Response({'error': 'Pa gen otorizasyon'}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            limit = _review_page_size(request.query_params.get('limit'))
+            if request.query_params.get('mine') in ('1', 'true'):
+                docs = IdentityDocument.objects.filter(status='pending', claimed_by=request.user, claim_expires_at__gt=timezone.now())
+            else:
+                docs = IdentityDocument.objects.filter(available_q())
+            cursor = request.query_params.get('after')
+            if cursor:
+                try:
+                    docs = docs.filter(after_cursor_q(cursor))
+                except ValueError:
+                    return Response({'error': 'Kòsè paj la pa valid'}, status=status.HTTP_400_BAD_REQUEST)
+
+            page = list(queue_order(docs).select_related('user')[:limit + 1])
+            has_more = len(page) > limit
+            page = page[:limit]
+            duplicates = _document_duplicates({doc.user_id for doc in page})
+            return Response({
+                'documents': [_review_document_payload(request, doc, duplicates) for doc in page],
+                'next_cursor': encode_cursor(page[-1]) if has_more else None,
+                'counts': queue_counts(),
+            }, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({'error': f'Erè nan jwenn dokiman yo: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class AdminReviewQueueClaimView(APIView):
+    """POST {limit}: lease the oldest free documents to the caller for KYC_REVIEW_LEASE_SECONDS."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        if request.user.user_type != 'admin':
+            return Response({'error': 'Pa gen otorizasyon'}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            ids = claim_documents(request.user, _review_page_size(request.data.get('limit'), default=10))
+            docs = list(queue_order(IdentityDocument.objects.filter(id__in=ids)).select_related('user'))
+            duplicates = _document_duplicates({doc.user_id for doc in docs})
+            return Response({
+                'documents': [_review_document_payload(request, doc, duplicates) for doc in docs],
+                'lease_seconds': lease_seconds(),
+                'counts': queue_counts(),
+            }, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({'error': f'Erè nan pran dokiman yo: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class AdminReviewQueueReleaseView(APIView):
+    """POST {document_ids?}: hand leased documents back to the queue (all of the caller's by default)."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        if request.user.user_type != 'admin':
+            return Response({'error': 'Pa gen otorizasyon'}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            ids = request.data.get('document_ids')
+            if ids is not None:
+                try:
+                    ids = [int(doc_id) for doc_id in ids]
+                except (TypeError, ValueError):
+                    return Response({'error': 'document_ids pa valid'}, status=status.HTTP_400_BAD_REQUEST)
+            released = release_documents(request.user, ids)
+            return Response({'released': released}, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({'error': f'Erè nan lage dokiman yo: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 class AdminApproveDocumentView(APIView):
     permission_classes = [IsAuthenticated]
     
@@ -1954,6 +1897,10 @@ class AdminApproveDocumentView(APIView):
                     # Only attempt if looks like an integer (skip legacy IDs like doc_profile_<id>)
                     doc_pk = int(str(document_id))
                     doc_obj = IdentityDocument.objects.filter(user=user, id=doc_pk).first()
+                    if doc_obj and held_by_other(doc_obj, request.user):
+                        return Response({
+                            'error': 'Yon lòt revizè ap revize dokiman sa a'
+                        }, status=status.HTTP_409_CONFLICT)
                     if doc_obj:
                         if action == 'approve':
                             doc_obj.status = 'verified'
@@ -1964,17 +1911,13 @@ class AdminApproveDocumentView(APIView):
                                 existing = (doc_obj.notes or '')
                                 doc_obj.notes = f"{existing}\nRezon Rejte: {reason}".strip()
                         doc_obj.save()
-                        def abs_url(u):
-                            if not u:
-                                return None
-                            return u if u.startswith('http') else f"http://127.0.0.1:8000{u}"
                         updated_doc_payload = {
                             'id': str(doc_obj.id),
                             'status': doc_obj.status,
                             'document_type': doc_obj.document_type,
                             'document_number': doc_obj.document_number,
-                            'front_image_url': abs_url(doc_obj.front_image.url) if doc_obj.front_image else abs_url(doc_obj.legacy_single_image.url) if doc_obj.legacy_single_image else None,
-                            'back_image_url': abs_url(doc_obj.back_image.url) if doc_obj.back_image else None,
+                            'front_image_url': document_url(request, doc_obj.front_image or doc_obj.legacy_single_image),
+                            'back_image_url': document_url(request, doc_obj.back_image),
                         }
                 except (ValueError, TypeError):
                     # Ignore invalid document id format
@@ -2048,6 +1991,12 @@ class AdminRejectDocumentView(APIView):
 
             reason = request.data.get('reason', 'Pa gen rezon ki bay')
             document_id = request.data.get('document_id')
+            if str(document_id or '').isdigit():
+                leased = IdentityDocument.objects.filter(user=user, id=int(document_id)).first()
+                if leased and held_by_other(leased, request.user):
+                    return Response({
+                        'error': 'Yon lòt revizè ap revize dokiman sa a'
+                    }, status=status.HTTP_409_CONFLICT)
 
             profile.verification_status = 'rejected'
             user.is_verified = False
@@ -2064,17 +2013,13 @@ class AdminRejectDocumentView(APIView):
                         existing = (doc_obj.notes or '')
                         doc_obj.notes = f"{existing}\nRezon Rejte: {reason}".strip()
                         doc_obj.save()
-                        def abs_url(u):
-                            if not u:
-                                return None
-                            return u if u.startswith('http') else f"http://127.0.0.1:8000{u}"
                         updated_doc_payload = {
                             'id': str(doc_obj.id),
                             'status': doc_obj.status,
                             'document_type': doc_obj.document_type,
                             'document_number': doc_obj.document_number,
-                            'front_image_url': abs_url(doc_obj.front_image.url) if doc_obj.front_image else abs_url(doc_obj.legacy_single_image.url) if doc_obj.legacy_single_image else None,
-                            'back_image_url': abs_url(doc_obj.back_image.url) if doc_obj.back_image else None,
+                            'front_image_url': document_url(request, doc_obj.front_image or doc_obj.legacy_single_image),
+                            'back_image_url': document_url(request, doc_obj.back_image),
                         }
                 except (ValueError, TypeError):
                     pass
@@ -2113,7 +2058,35 @@ class AdminRejectDocumentView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class AdminBulkDocumentDecisionView(APIView):
+    """POST {decisions: [{document_id, action: approve|reject, reason}]}: decide many documents in
+    a few set-based queries; notification emails go out afterwards as one background batch."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        if request.user.user_type != 'admin':
+            return Response({'error': 'Pa gen otorizasyon'}, status=status.HTTP_403_FORBIDDEN)
+
+        from cash_ti_machann import tasks
+        from .utils.kyc_decisions import apply_decisions, max_batch, parse_decisions, send_decision_emails
+        try:
+            items = request.data.get('decisions')
+            if not isinstance(items, list) or not items:
+                return Response({'error': 'Lis desizyon obligatwa'}, status=status.HTTP_400_BAD_REQUEST)
+            if len(items) > max_batch():
+                return Response({'error': f'Twòp desizyon (maksimòm {max_batch()})'}, status=status.HTTP_400_BAD_REQUEST)
+
+            decisions, errors = parse_decisions(items)
+            summary, apply_errors, notices = apply_decisions(request.user, decisions)
+            tasks.submit(send_decision_emails, notices)
+            return Response({**summary, 'errors': errors + apply_errors}, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({'error': f'Erè nan prosesis la: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 class AdminDownloadDocumentView(APIView):
+    """Authorize once, then hand out a short-lived signed download URL (default) or, with
+    ?direct=1, send the file from here (X-Accel-Redirect/X-Sendfile or ranged FileResponse)."""
     permission_classes = [IsAuthenticated]
     
     def get(self, request, user_id):
@@ -2124,45 +2097,45 @@ class AdminDownloadDocumentView(APIView):
             }, status=status.HTTP_403_FORBIDDEN)
         
         try:
+            import os
+            from .utils.media_utils import media_url_ttl, signed_media_url
+
             user = User.objects.get(id=user_id)
             profile = user.profile
 
             # Try IdentityDocument first (most recent)
             doc = IdentityDocument.objects.filter(user=user).order_by('-created_at').first()
             doc_field = None
-            document_url = None
+            stored = None
             if doc:
                 if doc.front_image:
-                    doc_field = 'front'
-                    document_url = doc.front_image.url
+                    doc_field, stored = 'front', doc.front_image
                 elif doc.back_image:
-                    doc_field = 'back'
-                    document_url = doc.back_image.url
+                    doc_field, stored = 'back', doc.back_image
                 elif doc.legacy_single_image:
-                    doc_field = 'legacy'
-                    document_url = doc.legacy_single_image.url
+                    doc_field, stored = 'legacy', doc.legacy_single_image
 
             # Fallback to profile if needed
-            if not document_url:
-                if hasattr(profile, 'id_document_front') and profile.id_document_front:
-                    doc_field = 'front'
-                    document_url = profile.id_document_front.url
-                elif hasattr(profile, 'id_document_back') and profile.id_document_back:
-                    doc_field = 'back'
-                    document_url = profile.id_document_back.url
+            if not stored:
+                if profile.id_document_front:
+                    doc_field, stored = 'front', profile.id_document_front
+                elif profile.id_document_back:
+                    doc_field, stored = 'back', profile.id_document_back
                 elif profile.id_document_image:
-                    doc_field = 'legacy'
-                    document_url = profile.id_document_image.url
+                    doc_field, stored = 'legacy', profile.id_document_image
                 else:
                     return Response({'error': 'Pa gen dokiman pou download'}, status=status.HTTP_404_NOT_FOUND)
-            
-            # Return file info for download
-            if not document_url.startswith('http'):
-                document_url = f"http://127.0.0.1:8000{document_url}"
-                
+
+            extension = os.path.splitext(stored.name)[1] or '.jpg'
+            filename = f"document_{user.username}_{profile.id_document_type or 'id'}_{doc_field}{extension}"
+
+            if request.query_params.get('direct') in ('1', 'true'):
+                return serve_media(request, stored.name, as_attachment=True, filename=filename)
+
             return Response({
-                'download_url': document_url,
-                'filename': f"document_{user.username}_{profile.id_document_type or 'id'}_{doc_field}.jpg",
+                'download_url': signed_media_url(stored.name, request, download=True),
+                'expires_in': media_url_ttl(),
+                'filename': filename,
                 'document_type': profile.id_document_type,
                 'document_number': profile.id_document_number
             }, status=status.HTTP_200_OK)
@@ -2177,6 +2150,19 @@ class AdminDownloadDocumentView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def media_download(request, token):
+    """Serve a stored file named by a signed, short-lived token (no API token needed, so the
+    URL works in <img src>). The signature is the authorization; see media_utils.signed_media_url."""
+    from django.http import JsonResponse
+    if request.method not in ('GET', 'HEAD'):
+        return JsonResponse({'error': 'Metòd pa pèmèt'}, status=405)
+    resolved = unsign_media_token(token)
+    if resolved is None:
+        return JsonResponse({'error': 'Lyen an ekspire oswa li pa valid'}, status=403)
+    name, download = resolved
+    return serve_media(request, name, as_attachment=download)
+
+
 class AdminUpdateIdentityDocumentView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -2200,6 +2186,9 @@ class AdminUpdateIdentityDocumentView(APIView):
                 doc.document_type = request.data.get('document_type') or doc.document_type
             if 'document_number' in request.data:
                 doc.document_number = request.data.get('document_number') or doc.document_number
+                key = normalize_document_number(doc.document_number)
+                if key and IdentityDocument.objects.filter(normalized_number=key).exclude(pk=doc.pk).exists():
+                    return Response({'error': 'Nimewo dokiman sa a deja egziste.'}, status=status.HTTP_400_BAD_REQUEST)
 
             # If multipart with files
             if hasattr(request, 'FILES'):
@@ -2212,12 +2201,6 @@ class AdminUpdateIdentityDocumentView(APIView):
 
             doc.save()
 
-            # Build response payload
-            def abs_url(u):
-                if not u:
-                    return None
-                return u if u.startswith('http') else f"http://127.0.0.1:8000{u}"
-
             return Response({
                 'message': 'Dokiman mete ajou',
                 'document': {
@@ -2225,8 +2208,8 @@ class AdminUpdateIdentityDocumentView(APIView):
                     'document_type': doc.document_type,
                     'document_number': doc.document_number,
                     'status': doc.status,
-                    'front_image_url': abs_url(doc.front_image.url) if doc.front_image else None,
-                    'back_image_url': abs_url(doc.back_image.url) if doc.back_image else None,
+                    'front_image_url': document_url(request, doc.front_image),
+                    'back_image_url': document_url(request, doc.back_image),
                 }
             }, status=status.HTTP_200_OK)
 
@@ -2264,22 +2247,22 @@ class AdminUploadDocumentView(APIView):
                 }, status=status.HTTP_400_BAD_REQUEST)
             
             provided_number = request.data.get('id_document_number', '').strip()
-            if provided_number:
-                from .models import IdentityDocument, UserProfile
-                if IdentityDocument.objects.filter(document_number__iexact=provided_number).exists() or \
-                   UserProfile.objects.filter(id_document_number__iexact=provided_number).exclude(user=user).exists():
-                    return Response({'error': 'Nimewo dokiman sa a deja egziste.'}, status=status.HTTP_400_BAD_REQUEST)
+            if _document_number_taken(provided_number, user):
+                return Response({'error': 'Nimewo dokiman sa a deja egziste.'}, status=status.HTTP_400_BAD_REQUEST)
 
             # Update profile with new document
             profile.id_document_image = id_document
             profile.id_document_type = request.data.get('id_document_type', '')
             profile.id_document_number = provided_number
             profile.verification_status = 'pending'  # Reset to pending for review
-            profile.save()
+            with db_transaction.atomic():
+                profile.save()
+                _record_document_number(user, provided_number, profile.id_document_type)
             
             return Response({
                 'message': 'Dokiman upload ak siksè',
-                'document_url': profile.id_document_image.url if profile.id_document_image else None
+                'document_url': document_url(request, profile.id_document_image),
+                'document_variants': variant_urls(profile.id_document_image, signed_url_builder(request))
             }, status=status.HTTP_200_OK)
             
         except User.DoesNotExist:
@@ -2292,6 +2275,228 @@ class AdminUploadDocumentView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+# Resumable uploads: POST uploads/ (init) -> PATCH uploads/<id>/ with Upload-Offset (append)
+# -> POST uploads/<id>/finalize/. GET uploads/<id>/ returns the acknowledged offset so a
+# client that lost its connection resumes from there instead of starting over.
+
+CHUNKED_UPLOAD_TARGETS = {
+    # target: (owner, field, allowed content types)
+    'profile_picture': ('profile', 'profile_picture', {'image/jpeg', 'image/png', 'image/gif', 'image/webp'}),
+    'id_document': ('profile', 'id_document_image', {'image/jpeg', 'image/png', 'application/pdf'}),
+    'id_document_front': ('profile', 'id_document_front', {'image/jpeg', 'image/png', 'application/pdf'}),
+    'id_document_back': ('profile', 'id_document_back', {'image/jpeg', 'image/png', 'application/pdf'}),
+    'document_front': ('document', 'front_image', {'image/jpeg', 'image/png', 'application/pdf'}),
+    'document_back': ('document', 'back_image', {'image/jpeg', 'image/png', 'application/pdf'}),
+}
+
+
+def _upload_session_payload(session):
+    return {
+        'upload_id': str(session.id),
+        'target': session.target,
+        'offset': session.received,
+        'total_size': session.total_size,
+        'content_type': session.content_type or None,
+        'status': session.status,
+        'expires_at': session.expires_at.isoformat(),
+        'max_chunk_size': getattr(settings, 'CHUNKED_UPLOAD_MAX_CHUNK', 512 * 1024),
+    }
+
+
+def _get_upload_session(request, upload_id, lock=False):
+    from .models import UploadSession
+    qs = UploadSession.objects.select_for_update() if lock else UploadSession.objects
+    try:
+        return qs.get(id=upload_id, user=request.user)
+    except UploadSession.DoesNotExist:
+        return None
+
+
+class ChunkedUploadView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        from .models import UploadSession
+        try:
+            target = request.data.get('target', '')
+            if target not in CHUNKED_UPLOAD_TARGETS:
+                return Response({'error': 'Sib upload pa valid'}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                total_size = int(request.data.get('size', 0))
+            except (TypeError, ValueError):
+                total_size = 0
+            if total_size <= 0:
+                return Response({'error': 'Gwosè fichye a obligatwa'}, status=status.HTTP_400_BAD_REQUEST)
+            if total_size > 5 * 1024 * 1024:
+                return Response({'error': 'Fichye a twò gwo. Maksimòm 5MB.'}, status=status.HTTP_400_BAD_REQUEST)
+
+            document = None
+            if CHUNKED_UPLOAD_TARGETS[target][0] == 'document':
+                document = IdentityDocument.objects.filter(id=request.data.get('document_id') or 0, user=request.user).first()
+                if document is None:
+                    return Response({'error': 'Dokiman pa jwenn'}, status=status.HTTP_404_NOT_FOUND)
+
+            metadata = {}
+            if target.startswith('id_document'):
+                metadata = {
+                    'id_document_type': request.data.get('id_document_type', ''),
+                    'id_document_number': (request.data.get('id_document_number', '') or '').strip(),
+                }
+                if _document_number_taken(metadata['id_document_number'], request.user):
+                    return Response({'error': 'Nimewo dokiman sa a deja egziste.'}, status=status.HTTP_400_BAD_REQUEST)
+
+            session = UploadSession.objects.create(
+                user=request.user,
+                target=target,
+                document=document,
+                filename=(request.data.get('filename', '') or '')[:255],
+                total_size=total_size,
+                expected_sha256=(request.data.get('sha256', '') or '').lower()[:64],
+                metadata=metadata,
+                expires_at=timezone.now() + timedelta(hours=getattr(settings, 'CHUNKED_UPLOAD_TTL_HOURS', 24)),
+            )
+            return Response(_upload_session_payload(session), status=status.HTTP_201_CREATED)
+        except Exception as e:
+            return Response({'error': f'Erè nan kòmanse upload la: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ChunkedUploadDetailView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, upload_id):
+        session = _get_upload_session(request, upload_id)
+        if session is None:
+            return Response({'error': 'Upload pa jwenn'}, status=status.HTTP_404_NOT_FOUND)
+        response = Response(_upload_session_payload(session))
+        response['Upload-Offset'] = str(session.received)
+        return response
+
+    def patch(self, request, upload_id):
+        from .utils.upload_utils import SNIFF_BYTES, append_chunk, forget_session, sniff_content_type, staged_head
+        try:
+            try:
+                offset = int(request.headers.get('Upload-Offset', ''))
+                length = int(request.META.get('CONTENT_LENGTH') or 0)
+            except ValueError:
+                return Response({'error': 'Header Upload-Offset obligatwa'}, status=status.HTTP_400_BAD_REQUEST)
+            if length <= 0:
+                return Response({'error': 'Moso fichye a vid'}, status=status.HTTP_400_BAD_REQUEST)
+            if length > getattr(settings, 'CHUNKED_UPLOAD_MAX_CHUNK', 512 * 1024):
+                return Response({'error': 'Moso fichye a twò gwo'}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+            with db_transaction.atomic():
+                session = _get_upload_session(request, upload_id, lock=True)
+                if session is None:
+                    return Response({'error': 'Upload pa jwenn'}, status=status.HTTP_404_NOT_FOUND)
+                if session.status != 'open' or session.expires_at <= timezone.now():
+                    return Response({'error': 'Upload sa a fèmen'}, status=status.HTTP_410_GONE)
+                if offset < 0 or offset > session.received:
+                    # Gap: client must resume from the acknowledged offset
+                    response = Response({'error': 'Offset pa kòrèk', 'offset': session.received}, status=status.HTTP_409_CONFLICT)
+                    response['Upload-Offset'] = str(session.received)
+                    return response
+
+                try:
+                    received = append_chunk(session.id, session.received, offset, request.stream, length, session.total_size)
+                except ValueError:
+                    return Response({'error': 'Moso fichye a depase gwosè ki te deklare a'}, status=status.HTTP_400_BAD_REQUEST)
+
+                # Sniff once enough bytes are staged, however small the first chunks were
+                if not session.content_type and (received >= SNIFF_BYTES or received == session.total_size):
+                    sniffed = sniff_content_type(staged_head(session.id))
+                    if sniffed not in CHUNKED_UPLOAD_TARGETS[session.target][2]:
+                        session.status = 'aborted'
+                        session.save(update_fields=['status', 'updated_at'])
+                        forget_session(session.id)
+                        return Response({'error': 'Tip fichye pa aksèpte'}, status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+                    session.content_type = sniffed
+
+                session.received = received
+                session.save(update_fields=['received', 'content_type', 'updated_at'])
+
+            response = Response(_upload_session_payload(session))
+            response['Upload-Offset'] = str(session.received)
+            return response
+        except Exception as e:
+            return Response({'error': f'Erè nan upload moso fichye a: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def delete(self, request, upload_id):
+        from .utils.upload_utils import forget_session
+        session = _get_upload_session(request, upload_id)
+        if session is None:
+            return Response({'error': 'Upload pa jwenn'}, status=status.HTTP_404_NOT_FOUND)
+        if session.status == 'open':
+            session.status = 'aborted'
+            session.save(update_fields=['status', 'updated_at'])
+        forget_session(session.id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ChunkedUploadFinalizeView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, upload_id):
+        from django.core.files import File
+        from .utils.upload_utils import EXTENSIONS, final_digest, forget_session, staging_path
+        try:
+            with db_transaction.atomic():
+                session = _get_upload_session(request, upload_id, lock=True)
+                if session is None:
+                    return Response({'error': 'Upload pa jwenn'}, status=status.HTTP_404_NOT_FOUND)
+                if session.status != 'open':
+                    return Response({'error': 'Upload sa a fèmen'}, status=status.HTTP_410_GONE)
+                if session.received != session.total_size:
+                    return Response({'error': 'Upload la poko fini', 'offset': session.received}, status=status.HTTP_409_CONFLICT)
+
+                digest = final_digest(session.id, session.received)
+                if session.expected_sha256 and session.expected_sha256 != digest:
+                    return Response({'error': 'SHA-256 fichye a pa koresponn'}, status=status.HTTP_400_BAD_REQUEST)
+
+                owner_kind, field_name, _ = CHUNKED_UPLOAD_TARGETS[session.target]
+                if owner_kind == 'document':
+                    owner = IdentityDocument.objects.select_for_update().get(pk=session.document_id)
+                else:
+                    owner, _ = UserProfile.objects.select_for_update().get_or_create(
+                        user=request.user,
+                        defaults={'first_name': request.user.first_name or request.user.username, 'last_name': request.user.last_name or ''}
+                    )
+                    if session.target.startswith('id_document'):
+                        number = session.metadata.get('id_document_number', '')
+                        if _document_number_taken(number, request.user):
+                            return Response({'error': 'Nimewo dokiman sa a deja egziste.'}, status=status.HTTP_400_BAD_REQUEST)
+                        owner.id_document_type = session.metadata.get('id_document_type', '') or owner.id_document_type
+                        owner.id_document_number = number or owner.id_document_number
+                        owner.verification_status = 'pending'
+
+                # Assigning an uncommitted File lets save() store it (and fires the image pipeline).
+                # If save() fails the blob is left alone: other rows may share it, and gc_media
+                # collects it if nothing does.
+                stored_name = f"{session.id.hex}{EXTENSIONS.get(session.content_type, '')}"
+                with open(staging_path(session.id), 'rb') as fh:
+                    setattr(owner, field_name, File(fh, name=stored_name))
+                    owner.save()
+                if session.target.startswith('id_document'):
+                    _record_document_number(request.user, owner.id_document_number, owner.id_document_type)
+
+                session.status = 'complete'
+                session.sha256 = digest
+                session.save(update_fields=['status', 'sha256', 'updated_at'])
+
+            forget_session(session.id)
+            stored = getattr(owner, field_name)
+            url_for = public_url_builder(request) if session.target == 'profile_picture' else signed_url_builder(request)
+            return Response({
+                'message': 'Fichye a upload ak siksè',
+                'upload_id': str(session.id),
+                'sha256': digest,
+                'content_type': session.content_type,
+                'url': url_for(stored.name) if stored else None,
+                'variants': variant_urls(stored, url_for),
+            }, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({'error': f'Erè nan fini upload la: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 class RequestVerificationView(APIView):
     permission_classes = [IsAuthenticated]
     
@@ -2437,66 +2642,112 @@ def pin_status(request):
     """Check if user has set a PIN"""
     try:
         profile = request.user.profile
-        return Response({
-            'has_pin': profile.has_pin(),
-            'pin_attempts': profile.pin_attempts,
-            'pin_locked': bool(profile.pin_locked_until and profile.pin_locked_until > timezone.now()) if profile.pin_locked_until else False
-        })
+        return Response(_pin_status_payload(profile))
     except Exception as e:
         return Response({'error': f'Erè nan estatistik PIN: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _mobile_home_validators(request):
+    """Wallet/profile timestamps plus the newest transaction updated_at, in one query."""
+    user = request.user
+    now = timezone.now()
+    # Newest updated_at (not the newest row) so a status change on an existing transaction counts
+    tx_updated = Transaction.objects.filter(Q(sender=user) | Q(receiver=user)).order_by('-updated_at').values('updated_at')[:1]
+    row = User.objects.filter(pk=user.pk).values(
+        'updated_at', 'last_login', 'profile__updated_at', 'profile__pin_locked_until', 'wallet__updated_at'
+    ).annotate(tx_updated=Subquery(tx_updated)).first() or {}
+    locked_until = row.get('profile__pin_locked_until')
+    stamps = (row.get('updated_at'), row.get('last_login'), row.get('profile__updated_at'), row.get('wallet__updated_at'),
+              row.get('tx_updated'))
+    parts = stamps + (
+        bool(locked_until and locked_until > now),
+        now.date(),  # rolling 30-day count in stats moves with the calendar
+    )
+    return parts, latest(*stamps)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@conditional_response(_mobile_home_validators)
+def mobile_home(request):
+    """Launch payload for the mobile apps in one call: profile, wallet, stats, last 5 transactions, PIN status.
+    Answers If-None-Match with 304 from a single validator query, before any payload is built.
+    """
+    try:
+        from transactions.serializers import TransactionSerializer
+
+        user = request.user
+        involved = Q(sender=user) | Q(receiver=user)
+        now = timezone.now()
+
+        account = User.objects.select_related('profile__residence_country', 'wallet').get(pk=user.pk)
+        try:
+            profile = account.profile
+        except UserProfile.DoesNotExist:
+            profile = UserProfile.objects.create(user=account, first_name=account.first_name or '', last_name=account.last_name or '')
+        try:
+            wallet = account.wallet
+        except Wallet.DoesNotExist:
+            wallet = Wallet.objects.create(user=account, balance=0.00)
+
+        real_last_login = account.last_login
+        if not real_last_login:
+            real_last_login = account.login_activities.filter(success=True).order_by('-timestamp').values_list('timestamp', flat=True).first()
+
+        recent = list(Transaction.objects.filter(involved).select_related('sender', 'receiver').order_by('-created_at')[:5])
+        monthly_transactions = Transaction.objects.filter(involved, created_at__gte=now - timedelta(days=30)).count()
+
+        recent_amount = '0 HTG'
+        if recent:
+            last = recent[0]
+            if last.receiver_id == account.id and last.sender_id != account.id and last.converted_amount is not None:
+                recent_amount = f"+{last.converted_amount} {last.converted_currency}"
+            else:
+                sign = '+' if last.receiver_id == account.id else '-'
+                recent_amount = f"{sign}{last.amount} {last.currency}"
+
+        data = _profile_payload(request, account, profile, wallet, real_last_login)
+        data['stats'] = {
+            'monthly_transactions': monthly_transactions,
+            'recent_transaction': recent_amount,
+            'balance': str(wallet.balance),
+            'wallet_id': str(wallet.id),
+        }
+        data['recent_transactions'] = TransactionSerializer(recent, many=True).data
+        data['pin'] = _pin_status_payload(profile)
+        return Response(data)
+    except Exception as e:
+        return Response({'error': f'Erè nan chajman ekran akèy la: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def generate_qr_code(request):
-    """Generate QR code for receiving money"""
+    """Generate a signed, short-lived QR code for receiving money"""
     try:
-        import qrcode
-        import json
         import base64
-        from io import BytesIO
-        from django.utils import timezone
-        
+        from .utils.qr_utils import encode_payment_qr, render_png
+
         amount = request.data.get('amount', '')
         description = request.data.get('description', '')
-        
-        # Create QR code data
-        qr_data = {
-            'type': 'payment_request',
-            'user_id': str(request.user.id),
-            'phone': request.user.phone_number,
-            'name': f"{request.user.first_name} {request.user.last_name}".strip(),
-            'amount': amount,
-            'description': description,
-            'timestamp': timezone.now().isoformat()
-        }
-        
-        qr_string = json.dumps(qr_data)
-        
-        # Generate QR code image
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(qr_string)
-        qr.make(fit=True)
-        
-        # Create image
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Convert to base64
-        buffer = BytesIO()
-        img.save(buffer, format='PNG')
-        img_str = base64.b64encode(buffer.getvalue()).decode()
-        
+
+        try:
+            if amount not in ('', None) and Decimal(str(amount)) < 0:
+                raise ValueError
+            qr_string = encode_payment_qr(request.user.id, amount=amount, description=description)
+        except (ValueError, ArithmeticError):
+            return Response({'error': 'Montan pa valid'}, status=status.HTTP_400_BAD_REQUEST)
+
+        img_str = base64.b64encode(render_png(qr_string)).decode()
+        expires_in = getattr(settings, 'QR_PAYMENT_TTL_SECONDS', 900)
+
         return Response({
             'qr_data': qr_string,
             'qr_image': img_str,
+            'expires_at': (timezone.now() + timedelta(seconds=expires_in)).isoformat(),
             'display_info': {
-                'name': qr_data['name'],
-                'phone': qr_data['phone'],
+                'name': f"{request.user.first_name} {request.user.last_name}".strip(),
+                'phone': request.user.phone_number,
                 'amount': amount,
                 'description': description
             }
@@ -2509,43 +2760,38 @@ def generate_qr_code(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def generate_personal_qr_code(request):
-    """Generate a personal QR that encodes the user's receiving identity (no amount/description)."""
+    """Personal receive QR (no amount/description), served from the render cache.
+
+    ?image_format=png|svg, ?size=<box size> (snapped to PNG_BOX_SIZES), ?raw=1 returns the image
+    itself with an ETag instead of base64 JSON.
+    """
     try:
-        import qrcode
-        import json
         import base64
-        from io import BytesIO
-        from django.utils import timezone
-
-        qr_data = {
-            'type': 'personal_receive',
-            'user_id': str(request.user.id),
-            'phone': request.user.phone_number,
-            'name': f"{request.user.first_name} {request.user.last_name}".strip(),
-            'timestamp': timezone.now().isoformat()
-        }
-        qr_string = json.dumps(qr_data)
-
-        # Generate QR image
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(qr_string)
-        qr.make(fit=True)
-        img = qr.make_image(fill_color="black", back_color="white")
-        buffer = BytesIO()
-        img.save(buffer, format='PNG')
-        img_str = base64.b64encode(buffer.getvalue()).decode()
+        from django.http import HttpResponse
+        from .utils.qr_utils import get_personal_qr, normalize_box_size
+
+        fmt = 'svg' if request.query_params.get('image_format') == 'svg' else 'png'
+        box_size = normalize_box_size(request.query_params.get('size'))
+        qr_string, digest, image = get_personal_qr(request.user, fmt=fmt, box_size=box_size)
+
+        if request.query_params.get('raw') in ('1', 'true'):
+            etag = f'"{digest}-{fmt}-{box_size}"'
+            if etag in request.headers.get('If-None-Match', ''):
+                response = HttpResponse(status=304)
+            else:
+                response = HttpResponse(image, content_type='image/svg+xml' if fmt == 'svg' else 'image/png')
+            response['ETag'] = etag
+            response['Cache-Control'] = 'private, max-age=86400'
+            return response
 
         return Response({
             'qr_data': qr_string,
-            'qr_image': img_str,
+            'qr_image': base64.b64encode(image).decode(),
+            'format': fmt,
+            'box_size': box_size if fmt == 'png' else None,
             'display_info': {
-                'name': qr_data['name'],
-                'phone': qr_data['phone']
+                'name': f"{request.user.first_name} {request.user.last_name}".strip(),
+                'phone': request.user.phone_number
             }
         })
     except Exception as e:
@@ -2563,16 +2809,27 @@ def process_qr_payment(request):
         if not qr_data or not pin:
             return Response({'error': 'Done QR ak PIN obligatwa'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Parse QR data
-        import json
+        # Verify signature/expiry (or parse legacy JSON) before any database work
+        from .utils.qr_utils import QRPayloadError, decode_payment_qr
         try:
-            payment_info = json.loads(qr_data)
-        except:
-            return Response({'error': 'Kòd QR pa valid'}, status=status.HTTP_400_BAD_REQUEST)
+            payment_info = decode_payment_qr(qr_data)
+        except QRPayloadError as e:
+            messages = {
+                'expired': 'Kòd QR la ekspire',
+                'tampered': 'Kòd QR la pa otantik',
+            }
+            return Response({'error': messages.get(e.reason, 'Kòd QR pa valid')}, status=status.HTTP_400_BAD_REQUEST)
         
         if payment_info.get('type') != 'payment_request':
             return Response({'error': 'Tip kòd QR pa bon'}, status=status.HTTP_400_BAD_REQUEST)
         
+        try:
+            amount = Decimal(str(payment_info.get('amount') or 0))
+        except ArithmeticError:
+            amount = Decimal('0')
+        if amount <= 0:
+            return Response({'error': 'Montan pa valid'}, status=status.HTTP_400_BAD_REQUEST)
+        
         # Get receiver
         try:
             receiver = User.objects.get(id=payment_info['user_id'])
@@ -2588,44 +2845,57 @@ def process_qr_payment(request):
         if not pin_valid:
             return Response({'error': pin_message}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Process payment
-        amount = Decimal(str(payment_info.get('amount', 0)))
-        if amount <= 0:
-            return Response({'error': 'Montan pa valid'}, status=status.HTTP_400_BAD_REQUEST)
-        
         # Check balance
         sender_wallet = request.user.wallet
-        fee = amount * Decimal('0.01')
+        from transactions.fees import compute_fee
+        fee = compute_fee('qr_payment', amount, request.user)
         total_amount = amount + fee
         
         if sender_wallet.balance < total_amount:
             return Response({'error': 'Ou pa gen ase lajan'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Create transaction
-        from transactions.models import Transaction
-        import uuid
-        transaction = Transaction.objects.create(
-            transaction_type='send',
-            sender=request.user,
-            receiver=receiver,
-            amount=amount,
-            fee=fee,
-            total_amount=total_amount,
-            reference_number=f"QR{uuid.uuid4().hex[:8].upper()}",
-            description=f"QR Payment: {payment_info.get('description', '')}",
-            status='completed'
-        )
-        
-        # Update wallets
-        sender_wallet.balance -= total_amount
-        sender_wallet.save()
-        
-        receiver_wallet = receiver.wallet
-        receiver_wallet.balance += amount
-        receiver_wallet.save()
+        from transactions import velocity
+        try:
+            velocity.check('qr_payment', request.user, amount, receiver=receiver, request=request)
+        except velocity.VelocityBlocked as e:
+            return Response({'error': e.message}, status=status.HTTP_429_TOO_MANY_REQUESTS)
         
-        transaction.processed_at = timezone.now()
-        transaction.save()
+        from transactions.limits import LimitExceeded, check_and_consume
+        from transactions.models import Transaction
+        try:
+            with db_transaction.atomic():
+                # Both wallets locked in id order, so two payments between the same pair can't deadlock
+                wallets = {w.user_id: w for w in Wallet.objects.select_for_update().filter(
+                    user_id__in=[request.user.pk, receiver.pk]).order_by('id')}
+                sender_wallet, receiver_wallet = wallets.get(request.user.pk), wallets.get(receiver.pk)
+                if receiver_wallet is None:
+                    return Response({'error': 'Wallet destinatè a pa jwenn'}, status=status.HTTP_400_BAD_REQUEST)
+                if sender_wallet.balance < total_amount:
+                    return Response({'error': 'Ou pa gen ase lajan'}, status=status.HTTP_400_BAD_REQUEST)
+                
+                # Agent/enterprise limits count money in both directions, as in send_money
+                check_and_consume(request.user, amount)
+                check_and_consume(receiver, amount)
+                
+                transaction = Transaction.objects.create(
+                    transaction_type='send',
+                    sender=request.user,
+                    receiver=receiver,
+                    amount=amount,
+                    fee=fee,
+                    total_amount=total_amount,
+                    reference_number=f"QR{uuid.uuid4().hex[:8].upper()}",
+                    description=f"QR Payment: {payment_info.get('description', '')}",
+                    status='completed',
+                    processed_at=timezone.now()
+                )
+                
+                sender_wallet.balance -= total_amount
+                sender_wallet.save()
+                receiver_wallet.balance += amount
+                receiver_wallet.save()
+        except LimitExceeded as e:
+            return Response({'error': e.message}, status=e.status_code)
         
         return Response({
             'message': 'Peman QR reisi!',
@@ -2703,8 +2973,29 @@ def verify_2fa(request):
         return Response({'error': f'Erè nan verifikasyon 2FA: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _security_validators(request):
+    row = User.objects.filter(pk=request.user.pk).values('profile__updated_at', 'profile__pin_locked_until').annotate(
+        latest_activity_id=Subquery(
+            SecurityActivity.objects.filter(user=OuterRef('pk')).order_by('-timestamp').values('id')[:1]
+        )
+    ).first() or {}
+    locked_until = row.get('profile__pin_locked_until')
+    parts = (
+        row.get('profile__updated_at'),
+        bool(locked_until and locked_until > timezone.now()),
+        row.get('latest_activity_id'),
+        # device_info echoes the caller's address and agent
+        request.META.get('REMOTE_ADDR'),
+        request.META.get('HTTP_USER_AGENT'),
+    )
+    # No Last-Modified: the lock expiring and the caller's device change the body without
+    # any row changing, so only the ETag can tell
+    return parts, None
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_response(_security_validators)
 def security_overview(request):
     """Get security overview for user"""
     try:
@@ -2881,6 +3172,7 @@ def change_password(request):
 
 @api_view(['GET', 'PUT'])
 @permission_classes([IsAuthenticated])
+@conditional_response(_account_validators)
 def get_user_profile(request):
     """Get or update complete user profile information including profile picture"""
     try:
@@ -2973,7 +3265,9 @@ def upload_profile_photo(request):
         return Response({
             'success': True,
             'message': 'Foto profil chanje ak siksè',
-            'profile_picture_url': profile.profile_picture.url if profile.profile_picture else None
+            'profile_picture_url': profile.profile_picture.url if profile.profile_picture else None,
+            # None until the background resize finishes; clients fall back to the original
+            'profile_picture_variants': variant_urls(profile.profile_picture)
         })
         
     except Exception as e:
@@ -3030,8 +3324,14 @@ def update_language(request):
         print(f"Error in update_language: {error_details}")
         return Response({'error': f'Erè nan chanjman lang: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+def _language_validators(request):
+    updated_at = UserProfile.objects.filter(user=request.user).values_list('updated_at', flat=True).first()
+    return (updated_at,), updated_at
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_response(_language_validators)
 def get_user_language(request):
     """Get user's current language preference"""
     try:
@@ -0,0 +1,168 @@
+"""Month-end agent commission run (manage.py run_agent_commissions).
+
+1. record_missing_commissions(): completed agent cash-in/cash-out transactions of the
+   period without an AgentCommission (older than the engine in agents/services.py, or made
+   by other paths) get one. The rate and agent come from one annotated query; rows are
+   written with bulk_create, a chunk at a time.
+2. pay_commissions(): one GROUP BY over the period's unpaid commissions gives every
+   agent's total. Agents are paid in batches, each batch one database transaction: payout
+   Transactions, wallet balances, WalletHistory, is_paid flags and the run's resume point
+   (CommissionRun.last_agent_id). An interrupted run resumes after the last batch that
+   committed; a completed period is never paid twice.
+"""
+
+import calendar
+import uuid
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, Exists, F, Max, OuterRef, Q, Subquery, Sum, When
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import AgentCommission, CommissionRun
+from .services import CENT
+
+BATCH_SIZE = 500
+
+
+def month_period(value):
+    """'2025-03' -> (date(2025, 3, 1), date(2025, 3, 31)); ValueError when malformed."""
+    year, month = (int(part) for part in value.split('-'))
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def previous_month(today=None):
+    today = today or timezone.localdate()
+    year, month = (today.year, today.month - 1) if today.month > 1 else (today.year - 1, 12)
+    return month_period(f'{year}-{month:02d}')
+
+
+def eligible_transactions(period_start, period_end):
+    """Completed cash-ins (agent sends) and cash-outs (agent receives) finished in the period,
+    annotated with agent_id, the agent's current rate and done_on."""
+    from accounts.models import AgentProfile
+    from transactions.models import Transaction
+
+    return Transaction.objects.annotate(
+        agent_id=Case(When(transaction_type='deposit', then=F('sender_id')), default=F('receiver_id')),
+        done_on=TruncDate(Coalesce('processed_at', 'created_at')),
+    ).filter(
+        Q(transaction_type='deposit', sender__user_type='agent') | Q(transaction_type='withdrawal', receiver__user_type='agent'),
+        status='completed', done_on__range=(period_start, period_end),
+    ).annotate(
+        rate=Subquery(AgentProfile.objects.filter(user_id=OuterRef('agent_id')).values('commission_rate')[:1]),
+    )
+
+
+def record_missing_commissions(run, batch_size=BATCH_SIZE):
+    """AgentCommission (+ AgentTransaction) for eligible transactions that lack one. Each
+    chunk removes its rows from the query, so re-running after a crash just continues."""
+    from transactions.models import AgentTransaction
+
+    missing = eligible_transactions(run.period_start, run.period_end).filter(rate__isnull=False).exclude(
+        Exists(AgentCommission.objects.filter(transaction=OuterRef('pk')))
+    ).order_by('created_at').values_list('id', 'agent_id', 'amount', 'rate')
+
+    created = 0
+    while True:
+        chunk = list(missing[:batch_size])
+        if not chunk:
+            return created
+        with transaction.atomic():
+            tracked = set(AgentTransaction.objects.filter(transaction_id__in=[row[0] for row in chunk]).values_list('transaction_id', flat=True))
+            commissions, records = [], []
+            for tx_id, agent_id, amount, rate in chunk:
+                earned = (amount * rate / Decimal('100')).quantize(CENT, rounding=ROUND_HALF_UP)
+                commissions.append(AgentCommission(
+                    agent_id=agent_id, transaction_id=tx_id, commission_amount=earned, commission_rate=rate,
+                    period_start=run.period_start, period_end=run.period_end,
+                ))
+                if tx_id not in tracked:
+                    records.append(AgentTransaction(agent_id=agent_id, transaction_id=tx_id, commission_earned=earned, commission_rate=rate))
+            AgentCommission.objects.bulk_create(commissions)
+            AgentTransaction.objects.bulk_create(records)
+            CommissionRun.objects.filter(pk=run.pk).update(commissions_created=F('commissions_created') + len(commissions))
+        created += len(commissions)
+
+
+def _pay_batch(run_id, totals, ceiling, now):
+    from accounts.models import Wallet
+    from accounts.utils.user360 import invalidate_stats
+    from transactions.models import Transaction, WalletHistory
+
+    with transaction.atomic():
+        # The locked run row serializes concurrent runs; agents at or below its watermark are paid
+        run = CommissionRun.objects.select_for_update().get(pk=run_id)
+        if run.last_agent_id is not None:
+            totals = [row for row in totals if row['agent_id'] > run.last_agent_id]
+        if not totals:
+            return run
+        wallets = {w.user_id: w for w in Wallet.objects.select_for_update().filter(user_id__in=[row['agent_id'] for row in totals])}
+        payable = [row for row in totals if row['agent_id'] in wallets and row['total'] > 0]
+
+        label = run.period_start.strftime('%Y-%m')
+        payouts, history = [], []
+        for row in payable:
+            wallet = wallets[row['agent_id']]
+            tx = Transaction(
+                transaction_type='commission', receiver_id=row['agent_id'], amount=row['total'], fee=Decimal('0'),
+                total_amount=row['total'], reference_number=f"CM{uuid.uuid4().hex[:10].upper()}", status='completed',
+                processed_at=now, description=f"Komisyon {label} ({row['count']} tranzaksyon)",
+            )
+            before = wallet.balance
+            wallet.balance = before + row['total']
+            wallet.updated_at = now
+            payouts.append(tx)
+            history.append(WalletHistory(
+                wallet=wallet, transaction=tx, operation_type='credit', amount=row['total'],
+                balance_before=before, balance_after=wallet.balance,
+            ))
+        Transaction.objects.bulk_create(payouts)
+        WalletHistory.objects.bulk_create(history)
+        Wallet.objects.bulk_update([wallets[row['agent_id']] for row in payable], ['balance', 'updated_at'])
+
+        paid_ids = [row['agent_id'] for row in payable]
+        AgentCommission.objects.filter(
+            agent_id__in=paid_ids, period_start=run.period_start, period_end=run.period_end, is_paid=False, id__lte=ceiling,
+        ).update(is_paid=True, paid_at=now)
+
+        run.last_agent_id = totals[-1]['agent_id']
+        run.agents_paid += len(payable)
+        run.total_paid += sum((row['total'] for row in payable), Decimal('0'))
+        run.save(update_fields=['last_agent_id', 'agents_paid', 'total_paid'])
+        # bulk_create skips the Transaction signals that drop cached agent stats
+        transaction.on_commit(lambda: invalidate_stats(*paid_ids))
+    return run
+
+
+def pay_commissions(run, batch_size=BATCH_SIZE):
+    """Credit every agent's unpaid commission total for the period, `batch_size` agents per transaction."""
+    now = timezone.now()
+    unpaid = AgentCommission.objects.filter(period_start=run.period_start, period_end=run.period_end, is_paid=False)
+    # Only commissions that exist now are summed and flagged; any written meanwhile stay unpaid
+    ceiling = unpaid.aggregate(top=Max('id'))['top']
+    if ceiling is None:
+        return run
+    if run.last_agent_id is not None:
+        unpaid = unpaid.filter(agent_id__gt=run.last_agent_id)
+    totals = list(
+        unpaid.filter(id__lte=ceiling).values('agent_id')
+        .annotate(total=Sum('commission_amount'), count=Count('id')).order_by('agent_id')
+    )
+    for index in range(0, len(totals), batch_size):
+        run = _pay_batch(run.pk, totals[index:index + batch_size], ceiling, now)
+    return run
+
+
+def run_commissions(period_start, period_end, batch_size=BATCH_SIZE):
+    """Record and pay a period's commissions once. Returns (run, already_completed)."""
+    run, _ = CommissionRun.objects.get_or_create(period_start=period_start, period_end=period_end)
+    if run.status == 'completed':
+        return run, True
+    record_missing_commissions(run, batch_size)
+    run = pay_commissions(CommissionRun.objects.get(pk=run.pk), batch_size)
+    CommissionRun.objects.filter(pk=run.pk).update(status='completed', completed_at=timezone.now())
+    run.refresh_from_db()
+    return run, False
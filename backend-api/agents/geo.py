@@ -0,0 +1,237 @@
+"""Nearest-agent lookup over AgentLocation.
+
+Every location stores the geohash of its coordinates (AgentLocation.geohash, indexed).
+A geohash cell is a key range — all points inside cell "d7q8" have hashes between "d7q8"
+and "d7q8{" — so a radius search covers the circle's bounding box with a couple dozen
+cells and reads them as index range scans. k-NN runs radius searches from 1 km, growing
+the radius until the circle holds k locations (those are then exactly the k nearest).
+Distances are haversine; opening hours are checked in Python on the few candidates.
+"""
+
+import math
+import re
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db.models import FloatField, Q
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+PRECISION = 9  # stored hashes: cells of about 5 m
+MAX_CELLS = 24  # index ranges per lookup
+START_RADIUS_KM = 1.0  # first k-NN circle, grown until it holds k locations
+EARTH_RADIUS_KM = 6371.0
+HALF_CIRCUMFERENCE_KM = math.pi * EARTH_RADIUS_KM
+KM_PER_DEGREE = 111.32
+
+DAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+_RANGE = re.compile(r'^(\d{1,2})(?::(\d{2}))?\s*-\s*(\d{1,2})(?::(\d{2}))?$')
+
+
+def encode(lat, lon, precision=PRECISION):
+    lat_lo, lat_hi, lon_lo, lon_hi = -90.0, 90.0, -180.0, 180.0
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            value = value * 2 + (lon >= mid)
+            lon_lo, lon_hi = (mid, lon_hi) if lon >= mid else (lon_lo, mid)
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            value = value * 2 + (lat >= mid)
+            lat_lo, lat_hi = (mid, lat_hi) if lat >= mid else (lat_lo, mid)
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+
+def location_geohash(latitude, longitude):
+    if latitude is None or longitude is None:
+        return ''
+    return encode(float(latitude), float(longitude))
+
+
+def cell_degrees(precision):
+    """(height, width) of a cell in degrees."""
+    lon_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 - lon_bits
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def cover_cells(lat, lon, radius_km):
+    """Cells covering the bounding box of the circle, at the finest precision that needs no
+    more than MAX_CELLS of them; None when the box spans the globe (scan everything)."""
+    dlat = radius_km / KM_PER_DEGREE
+    edge_lat = min(abs(lat) + dlat, 89.9)
+    dlon = radius_km / (KM_PER_DEGREE * math.cos(math.radians(edge_lat)))
+    if dlat >= 90 or dlon >= 180:
+        return None
+    south, north = max(lat - dlat, -90.0), min(lat + dlat, 90.0 - 1e-9)
+    west, east = lon - dlon, lon + dlon
+    for precision in range(PRECISION, 0, -1):
+        height, width = cell_degrees(precision)
+        rows = range(math.floor((south + 90) / height), math.floor((north + 90) / height) + 1)
+        cols = range(math.floor((west + 180) / width), math.floor((east + 180) / width) + 1)
+        if len(rows) * len(cols) <= MAX_CELLS:
+            break
+    return {
+        encode((row + 0.5) * height - 90, ((col + 0.5) * width) % 360.0 - 180, precision)
+        for row in rows for col in cols
+    }
+
+
+def _successor(cell):
+    """Next cell of the same precision in geohash (z-order) order; None after the last one."""
+    for index in range(len(cell) - 1, -1, -1):
+        digit = BASE32.index(cell[index])
+        if digit < len(BASE32) - 1:
+            return cell[:index] + BASE32[digit + 1] + BASE32[0] * (len(cell) - index - 1)
+    return None
+
+
+def cell_ranges(cells):
+    """Cells merged into [low, high) key ranges: neighbours in z-order share one range."""
+    ranges = []
+    for cell in sorted(cells):
+        if ranges and ranges[-1][2] == cell:
+            ranges[-1][1:] = [cell + '{', _successor(cell)]
+        else:
+            ranges.append([cell, cell + '{', _successor(cell)])
+    return [(low, high) for low, high, _ in ranges]
+
+
+def cells_q(cells):
+    query = Q()
+    for low, high in cell_ranges(cells):
+        query |= Q(geohash__gte=low, geohash__lt=high)
+    return query
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _minutes(hour, minute):
+    return int(hour) * 60 + int(minute or 0)
+
+
+def parse_hours(value):
+    """'8:00-17:00', '8-12, 14-18', '24h' or 'closed' -> [(start, end)] in minutes; None if unreadable."""
+    text = str(value or '').strip().lower()
+    if text in ('', 'closed', 'fèmen', 'ferme'):
+        return []
+    if text in ('24h', '24/7', 'open', '00:00-24:00'):
+        return [(0, 24 * 60)]
+    ranges = []
+    for part in text.split(','):
+        match = _RANGE.match(part.strip())
+        if not match:
+            return None
+        ranges.append((_minutes(*match.group(1, 2)), _minutes(*match.group(3, 4))))
+    return ranges
+
+
+def local_now():
+    return timezone.now().astimezone(ZoneInfo(getattr(settings, 'AGENT_HOURS_TIME_ZONE', 'America/Port-au-Prince')))
+
+
+def is_open(operating_hours, at):
+    """True/False from the `operating_hours` JSON ({'monday': '8:00-17:00', ...}) at local
+    datetime `at`; None when the location has no readable hours."""
+    if not isinstance(operating_hours, dict) or not operating_hours:
+        return None
+    day = at.weekday()
+    minute = at.hour * 60 + at.minute
+    today = parse_hours(operating_hours.get(DAYS[day]))
+    yesterday = parse_hours(operating_hours.get(DAYS[day - 1]))
+    if today is None:
+        return None
+    for start, end in today:
+        if start <= minute < end if start < end else minute >= start:
+            return True
+    # Overnight ranges (22:00-02:00) spill into the next morning
+    return any(start > end and minute < end for start, end in yesterday or [])
+
+
+FIELDS = (
+    'id', 'name', 'address', 'city', 'department', 'phone_number', 'latitude', 'longitude',
+    'operating_hours', 'is_active', 'agent__agent_profile__agent_code',
+)
+
+
+def nearest(lat, lon, k=10, radius_km=None, department=None, active_only=True, open_at=None):
+    """Locations around (lat, lon), closest first: the k nearest, or with `radius_km` the
+    (up to k) nearest within the radius. `open_at` (local datetime) keeps only locations
+    whose hours say they are open then. Returns [(distance_km, row)] with `row` a dict."""
+    from .models import AgentLocation
+
+    base = AgentLocation.objects.exclude(geohash='')
+    if active_only:
+        base = base.filter(is_active=True)
+    if department:
+        base = base.filter(department__iexact=department)
+
+    # Coordinates as floats straight from the database: no Decimal per candidate row
+    base = base.annotate(lat=Cast('latitude', FloatField()), lon=Cast('longitude', FloatField()))
+    columns = ('id', 'lat', 'lon') + (('operating_hours',) if open_at is not None else ())
+
+    def candidates(radius):
+        """(distance, id) of every matching location in the cells covering the circle."""
+        cells = cover_cells(lat, lon, radius)
+        found = []
+        for row in (base if cells is None else base.filter(cells_q(cells))).values_list(*columns):
+            if open_at is not None and not is_open(row[3], open_at):
+                continue
+            found.append((haversine_km(lat, lon, row[1], row[2]), row[0]))
+        found.sort()
+        return found
+
+    if radius_km is not None:
+        nearest_ids = [hit for hit in candidates(radius_km) if hit[0] <= radius_km][:k]
+    else:
+        # k-NN: the circle's hits are exact. When it holds fewer than k but its covering
+        # cells returned k or more, the k-th of those bounds the answer: one more search at
+        # that radius finishes. Otherwise grow the radius from the density seen so far.
+        radius = START_RADIUS_KM
+        while True:
+            found = candidates(radius)
+            inside = [hit for hit in found if hit[0] <= radius]
+            if len(inside) >= k or radius >= HALF_CIRCUMFERENCE_KM:
+                nearest_ids = inside[:k]
+                break
+            if len(found) >= k:
+                radius = found[k - 1][0]
+            elif found:
+                # density of what the cells held: aim for a circle expected to hold k
+                radius *= max(1.5, 1.2 * math.sqrt(4 * k / (math.pi * len(found))))
+            else:
+                radius *= 4
+
+    ids = [pk for _, pk in nearest_ids]
+    rows = {row['id']: row for row in AgentLocation.objects.filter(id__in=ids).values(*FIELDS)} if ids else {}
+    return [(distance, rows[pk]) for distance, pk in nearest_ids]
+
+
+def location_payload(distance, row, at=None):
+    return {
+        'id': row['id'],
+        'name': row['name'],
+        'agent_code': row['agent__agent_profile__agent_code'],
+        'address': row['address'],
+        'city': row['city'],
+        'department': row['department'],
+        'phone_number': row['phone_number'],
+        'latitude': str(row['latitude']),
+        'longitude': str(row['longitude']),
+        'distance_km': round(distance, 3),
+        'is_active': row['is_active'],
+        'operating_hours': row['operating_hours'] or {},
+        'open_now': is_open(row['operating_hours'], at or local_now()),
+    }
@@ -0,0 +1,84 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from accounts.models import User
+from agents.geo import haversine_km, local_now, location_geohash, nearest
+from agents.models import AgentLocation
+
+# Haiti's bounding box
+LAT_RANGE = (18.02, 20.09)
+LON_RANGE = (-74.48, -71.62)
+DEPARTMENTS = ['Ouest', 'Nord', 'Sud', 'Artibonite', 'Centre', 'Grand\'Anse', 'Nippes', 'Nord-Est', 'Nord-Ouest', 'Sud-Est']
+HOURS = [
+    {day: '8:00-17:00' for day in ('monday', 'tuesday', 'wednesday', 'thursday', 'friday')} | {'saturday': '8:00-12:00', 'sunday': 'closed'},
+    {day: '24h' for day in ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')},
+    {},
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark nearest-agent lookups (k-NN, radius, open now) over synthetic locations; nothing is kept'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--locations', type=int, default=50000, help='Synthetic locations to create')
+        parser.add_argument('--queries', type=int, default=200, help='Lookups per scenario')
+        parser.add_argument('--k', type=int, default=10)
+        parser.add_argument('--radius-km', type=float, default=5.0)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            self._seed(rng, options['locations'])
+            points = [(rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE)) for _ in range(options['queries'])]
+            self._check(points[:5], options['k'])
+            now = local_now()
+            self.stdout.write(f"locations={AgentLocation.objects.count()} queries={len(points)}")
+            for label, kwargs in (
+                (f"k-NN k={options['k']}", {'k': options['k']}),
+                (f"radius {options['radius_km']} km", {'k': 50, 'radius_km': options['radius_km']}),
+                (f"k-NN k={options['k']} open now", {'k': options['k'], 'open_at': now}),
+                (f"k-NN k={options['k']} department", {'k': options['k'], 'department': 'Ouest'}),
+            ):
+                self._report(label, [self._time(lambda: nearest(lat, lon, **kwargs)) for lat, lon in points])
+            # Synthetic rows only exist for the run
+            transaction.set_rollback(True)
+
+    def _seed(self, rng, count):
+        agent = User.objects.create_user(username=f'bench-agent-{rng.randrange(10 ** 9)}', password=None, user_type='agent')
+        batch = []
+        for index in range(count):
+            lat = Decimal(f'{rng.uniform(*LAT_RANGE):.6f}')
+            lon = Decimal(f'{rng.uniform(*LON_RANGE):.6f}')
+            batch.append(AgentLocation(
+                agent=agent, name=f'Bench {index}', address='-', city='-', department=rng.choice(DEPARTMENTS),
+                latitude=lat, longitude=lon, operating_hours=rng.choice(HOURS),
+                is_active=rng.random() > 0.05, geohash=location_geohash(lat, lon),
+            ))
+        AgentLocation.objects.bulk_create(batch, batch_size=2000)
+
+    def _check(self, points, k):
+        """Indexed results must equal a linear scan of every active location."""
+        rows = list(AgentLocation.objects.filter(is_active=True).values_list('id', 'latitude', 'longitude'))
+        for lat, lon in points:
+            expected = sorted(rows, key=lambda r: haversine_km(lat, lon, float(r[1]), float(r[2])))[:k]
+            got = [row['id'] for _, row in nearest(lat, lon, k=k)]
+            if got != [r[0] for r in expected]:
+                raise CommandError(f'k-NN mismatch at ({lat:.5f}, {lon:.5f})')
+
+    @staticmethod
+    def _time(fn):
+        started = time.perf_counter()
+        fn()
+        return (time.perf_counter() - started) * 1000
+
+    def _report(self, label, timings):
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        line = f"{label}: p50 {statistics.median(timings):.2f} ms, p95 {p95:.2f} ms, max {timings[-1]:.2f} ms"
+        self.stdout.write(self.style.SUCCESS(line) if p95 < 10 else self.style.WARNING(line))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from agents.services import release_expired_cash_outs
+
+
+class Command(BaseCommand):
+    help = 'Give clients back the holds of agent withdrawals whose code expired unconfirmed (run every minute from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=500, help='Most expired withdrawals to release in this run')
+
+    def handle(self, *args, **options):
+        released = release_expired_cash_outs(options['limit'])
+        self.stdout.write(f"released={released}")
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from agents.commissions import BATCH_SIZE, month_period, previous_month, run_commissions
+
+
+class Command(BaseCommand):
+    help = "Record and pay a month's agent commissions (once per month; resumes an interrupted run)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period', help='Month to pay as YYYY-MM (defaults to last month)')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Transactions / agents per database transaction')
+
+    def handle(self, *args, **options):
+        try:
+            period_start, period_end = month_period(options['period']) if options['period'] else previous_month()
+        except ValueError:
+            raise CommandError('--period must look like 2025-03')
+        if period_end >= timezone.localdate():
+            raise CommandError(f"{period_start:%Y-%m} is not over yet")
+
+        run, already = run_commissions(period_start, period_end, options['batch_size'])
+        if already:
+            self.stdout.write(f"{period_start:%Y-%m} was already paid on {run.completed_at:%Y-%m-%d %H:%M}")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"{period_start:%Y-%m}: {run.commissions_created} commissions recorded, "
+            f"{run.agents_paid} agents paid, {run.total_paid} HTG"
+        ))
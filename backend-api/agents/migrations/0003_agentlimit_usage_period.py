@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0002_agentfloatshard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agentlimit',
+            name='usage_period',
+            field=models.CharField(blank=True, default='', max_length=10),
+        ),
+    ]
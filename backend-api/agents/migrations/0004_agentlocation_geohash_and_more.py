@@ -0,0 +1,65 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:59
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+PRECISION = 9
+
+
+def location_geohash(latitude, longitude):
+    """Frozen copy of agents.geo.location_geohash at the time of this migration."""
+    if latitude is None or longitude is None:
+        return ''
+    lat, lon = float(latitude), float(longitude)
+    lat_lo, lat_hi, lon_lo, lon_hi = -90.0, 90.0, -180.0, 180.0
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < PRECISION:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            value = value * 2 + (lon >= mid)
+            lon_lo, lon_hi = (mid, lon_hi) if lon >= mid else (lon_lo, mid)
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            value = value * 2 + (lat >= mid)
+            lat_lo, lat_hi = (mid, lat_hi) if lat >= mid else (lat_lo, mid)
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+
+def backfill_geohashes(apps, schema_editor):
+    AgentLocation = apps.get_model('agents', 'AgentLocation')
+    locations = AgentLocation.objects.using(schema_editor.connection.alias)
+    last_pk = 0
+    while True:
+        batch = list(locations.filter(pk__gt=last_pk).order_by('pk').only('pk', 'latitude', 'longitude')[:BATCH_SIZE])
+        if not batch:
+            break
+        for location in batch:
+            location.geohash = location_geohash(location.latitude, location.longitude)
+        locations.bulk_update(batch, ['geohash'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0003_agentlimit_usage_period'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agentlocation',
+            name='geohash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=12),
+        ),
+        migrations.AddIndex(
+            model_name='agentlocation',
+            index=models.Index(fields=['geohash'], name='agents_agen_geohash_3c5f40_idx'),
+        ),
+        migrations.RunPython(backfill_geohashes, migrations.RunPython.noop),
+    ]
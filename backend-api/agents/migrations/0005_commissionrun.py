@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0004_agentlocation_geohash_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommissionRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField()),
+                ('status', models.CharField(choices=[('running', 'Running'), ('completed', 'Completed')], default='running', max_length=20)),
+                ('last_agent_id', models.UUIDField(blank=True, null=True)),
+                ('commissions_created', models.PositiveIntegerField(default=0)),
+                ('agents_paid', models.PositiveIntegerField(default=0)),
+                ('total_paid', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'unique_together': {('period_start', 'period_end')},
+            },
+        ),
+    ]
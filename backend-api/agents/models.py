@@ -15,9 +15,22 @@ class AgentLocation(models.Model):
     phone_number = models.CharField(max_length=15, null=True, blank=True)
     is_active = models.BooleanField(default=True)
     operating_hours = models.JSONField(default=dict, null=True, blank=True)  # Store opening hours
+    # Geohash of latitude/longitude, kept by save(); nearest-agent lookups scan it by cell (agents/geo.py)
+    geohash = models.CharField(max_length=12, blank=True, default='', editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [models.Index(fields=['geohash'])]
+    
+    def save(self, *args, **kwargs):
+        from .geo import location_geohash
+        self.geohash = location_geohash(self.latitude, self.longitude)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geohash'}
+        super().save(*args, **kwargs)
+    
     def __str__(self):
         return f"{self.name} - {self.city}"
 
@@ -31,6 +44,8 @@ class AgentCashFlow(models.Model):
     agent = models.ForeignKey(User, on_delete=models.CASCADE, related_name='cash_flows')
     operation_type = models.CharField(max_length=20, choices=OPERATION_TYPES)
     amount = models.DecimalField(max_digits=12, decimal_places=2)
+    # E-float of the rows the operation locked: one AgentFloatShard, or the whole float when
+    # the operation had to lock every shard (exact either way; see agents/services.py)
     balance_before = models.DecimalField(max_digits=12, decimal_places=2)
     balance_after = models.DecimalField(max_digits=12, decimal_places=2)
     reference_number = models.CharField(max_length=50, unique=True)
@@ -58,6 +73,30 @@ class AgentCommission(models.Model):
     def __str__(self):
         return f"Commission {self.agent.username} - {self.commission_amount} HTG"
 
+class CommissionRun(models.Model):
+    """One month-end commission payout (agents/commissions.py). Unique per period, so the
+    payout happens once; last_agent_id is the resume point after an interrupted run."""
+    STATUS_CHOICES = (
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+    )
+    
+    period_start = models.DateField()
+    period_end = models.DateField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running')
+    last_agent_id = models.UUIDField(null=True, blank=True)  # agents up to this id are paid
+    commissions_created = models.PositiveIntegerField(default=0)
+    agents_paid = models.PositiveIntegerField(default=0)
+    total_paid = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    started_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        unique_together = ['period_start', 'period_end']
+    
+    def __str__(self):
+        return f"Commission run {self.period_start} - {self.period_end} ({self.status})"
+
 class AgentLimit(models.Model):
     LIMIT_TYPES = (
         ('daily_transaction', 'Daily Transaction Limit'),
@@ -71,6 +110,8 @@ class AgentLimit(models.Model):
     limit_amount = models.DecimalField(max_digits=15, decimal_places=2)
     current_usage = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
     reset_period = models.CharField(max_length=20, choices=[('daily', 'Daily'), ('monthly', 'Monthly'), ('never', 'Never')])
+    # Window current_usage belongs to ('2025-03-14', '2025-03', '' for never); see transactions/limits.py
+    usage_period = models.CharField(max_length=10, blank=True, default='')
     last_reset = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -81,3 +122,32 @@ class AgentLimit(models.Model):
     
     def __str__(self):
         return f"{self.agent.username} - {self.limit_type}: {self.limit_amount} HTG"
+
+class AgentFloatShard(models.Model):
+    """One slice of an agent's e-float. The float is the sum of the agent's shards; each
+    cash-in/cash-out locks a single shard, so concurrent operations at a busy agent don't
+    queue on one balance row (see agents/services.py)."""
+    agent = models.ForeignKey(User, on_delete=models.CASCADE, related_name='float_shards')
+    slot = models.PositiveSmallIntegerField()
+    balance = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['agent', 'slot']
+        ordering = ['agent', 'slot']
+
+    def __str__(self):
+        return f"{self.agent.username} float #{self.slot}: {self.balance} HTG"
+
+class CashOutCode(models.Model):
+    """Confirmation code of a pending agent withdrawal. Only the client is shown the code;
+    the row keeps a keyed hash of it, when it expires and how many wrong entries it took
+    (agents/services.py)."""
+    transaction = models.OneToOneField('transactions.Transaction', on_delete=models.CASCADE, primary_key=True, related_name='cash_out_code')
+    code_hash = models.CharField(max_length=64)
+    expires_at = models.DateTimeField()
+    failed_attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Cash-out code for {self.transaction_id}"
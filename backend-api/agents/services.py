@@ -0,0 +1,389 @@
+"""Agent cash-in / cash-out engine.
+
+Every operation runs in one database transaction that moves value between the client's
+wallet and the agent's e-float, writes the Transaction, WalletHistory and AgentCashFlow
+rows, records commission and consumes the agent's limit counters (transactions/limits.py).
+
+The e-float is split into AGENT_FLOAT_SHARDS rows (AgentFloatShard). An operation locks one
+shard, picked at random among those not already locked (SKIP LOCKED), so a busy agent's
+concurrent operations don't queue behind a single balance row. Limit counters are updated
+with conditional UPDATEs as the last statements, so their row locks are held only for the
+commit.
+
+A cash-out is held from the client's wallet until the agent enters the withdrawal's
+reference and the one-time code only the client was shown (CashOutCode keeps its hash).
+An expired code (found at confirmation, or by the release_expired_cash_outs command), one
+entered wrong AGENT_CASH_OUT_CODE_MAX_ATTEMPTS times, or the client cancelling the withdrawal
+releases the hold back to the client.
+"""
+
+import calendar
+import random
+import secrets
+import uuid
+from datetime import timedelta
+from decimal import ROUND_DOWN, ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from transactions.fees import compute_fee
+from transactions.limits import LimitExceeded, check_and_consume
+
+from .models import AgentCashFlow, AgentCommission, AgentFloatShard, CashOutCode
+
+CENT = Decimal('0.01')
+CODE_DIGITS = 6
+
+
+class AgentOperationError(Exception):
+    """Rejected operation; `message` is user-facing, `status_code` the HTTP status to answer with."""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def shard_count():
+    return getattr(settings, 'AGENT_FLOAT_SHARDS', 8)
+
+
+def _reference(prefix):
+    return f"{prefix}{uuid.uuid4().hex[:10].upper()}"
+
+
+def _code_hash(reference, code):
+    return salted_hmac('agents.cash_out_code', f'{reference}:{code}', algorithm='sha256').hexdigest()
+
+
+def get_agent_profile(user):
+    """Approved AgentProfile of `user`, or AgentOperationError(403)."""
+    from accounts.models import AgentProfile
+
+    profile = AgentProfile.objects.filter(user=user, is_approved=True).first() if user.user_type == 'agent' else None
+    if profile is None:
+        raise AgentOperationError('Se ajan apwouve sèlman ki ka fè operasyon sa a', 403)
+    return profile
+
+
+def ensure_shards(agent):
+    AgentFloatShard.objects.bulk_create(
+        [AgentFloatShard(agent=agent, slot=slot) for slot in range(shard_count())], ignore_conflicts=True
+    )
+
+
+def float_balance(agent):
+    return AgentFloatShard.objects.filter(agent=agent).aggregate(total=Sum('balance'))['total'] or Decimal('0.00')
+
+
+def _credit_float(agent, amount):
+    """Add to one shard, preferring one no other transaction holds. Returns that shard's
+    (balance before, balance after)."""
+    shards = AgentFloatShard.objects.filter(agent=agent)
+    shard = None
+    if connection.features.has_select_for_update_skip_locked:
+        shard = shards.select_for_update(skip_locked=True).order_by('?').first()
+    if shard is None:
+        ensure_shards(agent)
+        shard = shards.select_for_update().filter(slot=random.randrange(shard_count())).first()
+    AgentFloatShard.objects.filter(id=shard.id).update(balance=F('balance') + amount, updated_at=timezone.now())
+    return shard.balance, shard.balance + amount
+
+
+def _debit_float(agent, amount):
+    """Take `amount` from a single shard that can cover it; when the float is fragmented
+    (no shard large enough), lock all shards in slot order and drain them largest first.
+    Returns (balance before, balance after) of what was locked: the one shard, or the whole float."""
+    now = timezone.now()
+    covering = AgentFloatShard.objects.filter(agent=agent, balance__gte=amount)
+    if connection.features.has_select_for_update_skip_locked:
+        candidates = list(covering.select_for_update(skip_locked=True).order_by('?').values_list('id', flat=True)[:1])
+    else:
+        candidates = list(covering.values_list('id', flat=True))
+        random.shuffle(candidates)
+    for shard_id in candidates:
+        # Re-read under the lock: still correct if the balance moved since it was listed
+        shard = AgentFloatShard.objects.select_for_update().filter(id=shard_id, balance__gte=amount).first()
+        if shard is not None:
+            AgentFloatShard.objects.filter(id=shard.id).update(balance=F('balance') - amount, updated_at=now)
+            return shard.balance, shard.balance - amount
+
+    shards = list(AgentFloatShard.objects.select_for_update().filter(agent=agent).order_by('slot'))
+    total = sum((s.balance for s in shards), Decimal('0'))
+    if total < amount:
+        raise AgentOperationError('Ajan an pa gen ase e-float pou operasyon sa a')
+    remaining = amount
+    for shard in sorted(shards, key=lambda s: s.balance, reverse=True):
+        take = min(shard.balance, remaining)
+        if take > 0:
+            AgentFloatShard.objects.filter(id=shard.id).update(balance=F('balance') - take, updated_at=now)
+            remaining -= take
+        if remaining == 0:
+            break
+    return total, total - amount
+
+
+def _consume_limits(agent, amount, operation):
+    try:
+        check_and_consume(agent, amount, operation)
+    except LimitExceeded as e:
+        raise AgentOperationError(e.message, e.status_code)
+
+
+def _record_commission(agent_profile, tx, now):
+    from transactions.models import AgentTransaction
+
+    rate = agent_profile.commission_rate
+    earned = (tx.amount * rate / Decimal('100')).quantize(CENT, rounding=ROUND_HALF_UP)
+    today = now.date()
+    AgentCommission.objects.create(
+        agent=agent_profile.user, transaction=tx, commission_amount=earned, commission_rate=rate,
+        period_start=today.replace(day=1),
+        period_end=today.replace(day=calendar.monthrange(today.year, today.month)[1]),
+    )
+    # Feeds the existing agent stats (admin User 360)
+    AgentTransaction.objects.create(agent=agent_profile.user, transaction=tx, commission_earned=earned, commission_rate=rate)
+    return earned
+
+
+def _cash_flow(agent, operation, amount, balances, reference, processed_by, notes=''):
+    """AgentCashFlow row; `balances` is (before, after) of the float rows the operation locked."""
+    before, after = balances
+    return AgentCashFlow.objects.create(
+        agent=agent, operation_type=operation, amount=amount, balance_before=before, balance_after=after,
+        reference_number=reference, notes=notes, processed_by=processed_by,
+    )
+
+
+def _validate_amount(amount):
+    try:
+        amount = Decimal(str(amount)).quantize(CENT)
+    except Exception:
+        raise AgentOperationError('Montan pa valid')
+    if amount <= 0:
+        raise AgentOperationError('Montan an dwe pi gwo pase 0')
+    return amount
+
+
+def _locked_wallet(user):
+    from accounts.models import Wallet
+
+    wallet = Wallet.objects.select_for_update().filter(user=user).first()
+    if wallet is None:
+        raise AgentOperationError('Wallet pa jwenn')
+    if not wallet.is_active:
+        raise AgentOperationError('Pòtmonnè a bloke, ou pa ka fè operasyon.')
+    return wallet
+
+
+def _wallet_entry(wallet, tx, operation, amount):
+    from transactions.models import WalletHistory
+
+    before = wallet.balance
+    wallet.balance = before + amount if operation == 'credit' else before - amount
+    wallet.save(update_fields=['balance', 'updated_at'])
+    WalletHistory.objects.create(
+        wallet=wallet, transaction=tx, operation_type=operation, amount=amount,
+        balance_before=before, balance_after=wallet.balance,
+    )
+
+
+def cash_in(agent_profile, client, amount, processed_by=None):
+    """Client hands the agent cash; the agent's e-float pays it into the client's wallet."""
+    from transactions.models import Transaction
+
+    agent = agent_profile.user
+    amount = _validate_amount(amount)
+    if client.pk == agent.pk:
+        raise AgentOperationError('Ajan pa ka fè depo pou tèt li')
+
+    now = timezone.now()
+    with transaction.atomic():
+        wallet = _locked_wallet(client)
+        tx = Transaction.objects.create(
+            transaction_type='deposit', sender=agent, receiver=client, amount=amount, fee=Decimal('0'),
+            total_amount=amount, reference_number=_reference('CI'), status='completed', processed_at=now,
+            description=f'Depo kach nan ajan {agent_profile.agent_code}',
+        )
+        _wallet_entry(wallet, tx, 'credit', amount)
+        balances = _debit_float(agent, amount)
+        _cash_flow(agent, 'cash_in', amount, balances, tx.reference_number, processed_by or agent)
+        commission = _record_commission(agent_profile, tx, now)
+        _consume_limits(agent, amount, 'cash_in')
+    return tx, commission
+
+
+def request_cash_out(client, agent_code, amount):
+    """Hold amount + fee from the client's wallet. Returns (transaction, agent profile, code):
+    the agent pays out the cash after confirming the reference with `code`, which is shown
+    to the client only."""
+    from accounts.models import AgentProfile
+    from transactions.models import Transaction
+
+    amount = _validate_amount(amount)
+    agent_profile = AgentProfile.objects.select_related('user').filter(
+        agent_code__iexact=(agent_code or '').strip(), is_approved=True
+    ).first()
+    if agent_profile is None:
+        raise AgentOperationError('Ajan pa jwenn', 404)
+    if agent_profile.user_id == client.pk:
+        raise AgentOperationError('Ou pa ka retire lajan nan pwòp kòd ajan ou')
+
+    fee = compute_fee('agent_withdrawal', amount, client)
+    total = amount + fee
+    code = f'{secrets.randbelow(10 ** CODE_DIGITS):0{CODE_DIGITS}d}'
+    with transaction.atomic():
+        wallet = _locked_wallet(client)
+        if wallet.balance < total:
+            raise AgentOperationError(f'Balans ou insifizant (bezwen {total} HTG ak frè)')
+        _consume_limits(client, amount, 'withdrawal')
+        tx = Transaction.objects.create(
+            transaction_type='withdrawal', sender=client, receiver=agent_profile.user, amount=amount, fee=fee,
+            total_amount=total, reference_number=_reference('AW'), status='pending',
+            description=f'Retire lajan nan ajan {agent_profile.agent_code}',
+        )
+        _wallet_entry(wallet, tx, 'debit', total)
+        CashOutCode.objects.create(
+            transaction=tx, code_hash=_code_hash(tx.reference_number, code),
+            expires_at=timezone.now() + timedelta(seconds=settings.AGENT_CASH_OUT_CODE_TTL_SECONDS),
+        )
+    return tx, agent_profile, code
+
+
+def _release_cash_out(tx, now):
+    """Give a held withdrawal back to the client."""
+    from accounts.models import Wallet
+
+    tx.status = 'cancelled'
+    tx.processed_at = now
+    tx.save(update_fields=['status', 'processed_at', 'updated_at'])
+    wallet = Wallet.objects.select_for_update().filter(user_id=tx.sender_id).first()
+    if wallet is not None:
+        _wallet_entry(wallet, tx, 'credit', tx.total_amount)
+
+
+def cancel_cash_out(client, reference):
+    """Client withdraws their own pending cash-out before an agent confirms it; the hold
+    goes back to their wallet."""
+    from transactions.models import Transaction
+
+    with transaction.atomic():
+        tx = Transaction.objects.select_for_update().filter(
+            reference_number=(reference or '').strip().upper(), sender=client, transaction_type='withdrawal',
+        ).first()
+        if tx is None:
+            raise AgentOperationError('Retrè sa a pa jwenn', 404)
+        if tx.status != 'pending':
+            raise AgentOperationError('Retrè sa a deja trete', 409)
+        CashOutCode.objects.filter(transaction=tx).delete()
+        _release_cash_out(tx, timezone.now())
+    return tx
+
+
+def release_expired_cash_outs(limit=None):
+    """Release the holds of withdrawals whose code expired without the agent confirming
+    (run periodically by the release_expired_cash_outs command). Returns how many were released."""
+    from transactions.models import Transaction
+
+    now = timezone.now()
+    due = CashOutCode.objects.filter(expires_at__lte=now).order_by('expires_at').values_list('transaction_id', flat=True)
+    released = 0
+    for transaction_id in list(due[:limit] if limit else due):
+        with transaction.atomic():
+            tx = Transaction.objects.select_for_update().filter(id=transaction_id, status='pending').first()
+            # Re-checked under the lock: the agent may have confirmed, or the client cancelled, meanwhile
+            if tx is None or not CashOutCode.objects.filter(transaction=tx, expires_at__lte=now).delete()[0]:
+                continue
+            _release_cash_out(tx, now)
+            released += 1
+    return released
+
+
+def confirm_cash_out(agent_profile, reference, code, processed_by=None):
+    """Agent confirms a pending withdrawal addressed to them with the client's code and
+    hands over the cash; the held amount moves into their e-float."""
+    from transactions.models import Transaction
+
+    agent = agent_profile.user
+    now = timezone.now()
+    rejected = None
+    with transaction.atomic():
+        tx = Transaction.objects.select_for_update().filter(
+            reference_number=(reference or '').strip().upper(), receiver=agent, transaction_type='withdrawal',
+        ).first()
+        if tx is None:
+            raise AgentOperationError('Retrè sa a pa jwenn', 404)
+        if tx.status != 'pending':
+            raise AgentOperationError('Retrè sa a deja trete', 409)
+        stored = CashOutCode.objects.filter(transaction=tx).first()
+        if stored is None:
+            raise AgentOperationError('Kòd retrè a pa kòrèk')
+
+        release = False
+        if stored.expires_at <= now:
+            rejected, release = AgentOperationError('Kòd retrè a ekspire; lajan an retounen bay kliyan an', 410), True
+        elif not constant_time_compare(stored.code_hash, _code_hash(tx.reference_number, (code or '').strip())):
+            stored.failed_attempts += 1
+            release = stored.failed_attempts >= settings.AGENT_CASH_OUT_CODE_MAX_ATTEMPTS
+            rejected = (AgentOperationError('Twòp move kòd; retrè a anile e lajan an retounen bay kliyan an', 429)
+                        if release else AgentOperationError('Kòd retrè a pa kòrèk'))
+
+        # A rejection is committed, not rolled back: the attempt count and a released hold must stick
+        if release:
+            stored.delete()
+            _release_cash_out(tx, now)
+        elif rejected is not None:
+            stored.save(update_fields=['failed_attempts'])
+        else:
+            stored.delete()
+            tx.status = 'completed'
+            tx.processed_at = now
+            tx.save(update_fields=['status', 'processed_at', 'updated_at'])
+            balances = _credit_float(agent, tx.amount)
+            _cash_flow(agent, 'cash_out', tx.amount, balances, tx.reference_number, processed_by or agent)
+            commission = _record_commission(agent_profile, tx, now)
+            _consume_limits(agent, tx.amount, 'cash_out')
+    if rejected is not None:
+        raise rejected
+    return tx, commission
+
+
+def move_float(agent_profile, amount, direction):
+    """Float management: 'in' moves money from the agent's wallet into the e-float (spread
+    over the shards), 'out' moves it back."""
+    from transactions.models import Transaction
+
+    agent = agent_profile.user
+    amount = _validate_amount(amount)
+    if direction not in ('in', 'out'):
+        raise AgentOperationError('Direksyon dwe "in" oswa "out"')
+
+    now = timezone.now()
+    with transaction.atomic():
+        wallet = _locked_wallet(agent)
+        ensure_shards(agent)
+        if direction == 'in' and wallet.balance < amount:
+            raise AgentOperationError('Ou pa gen ase lajan nan wallet ou')
+        tx = Transaction.objects.create(
+            transaction_type='recharge', sender=agent, receiver=agent, amount=amount, fee=Decimal('0'),
+            total_amount=amount, reference_number=_reference('FM'), status='completed', processed_at=now,
+            description='Wallet -> e-float' if direction == 'in' else 'E-float -> wallet',
+        )
+        if direction == 'in':
+            _wallet_entry(wallet, tx, 'debit', amount)
+            shards = list(AgentFloatShard.objects.select_for_update().filter(agent=agent).order_by('slot'))
+            before = sum((shard.balance for shard in shards), Decimal('0'))
+            balances = before, before + amount
+            share = (amount / len(shards)).quantize(CENT, rounding=ROUND_DOWN)
+            for index, shard in enumerate(shards):
+                part = amount - share * (len(shards) - 1) if index == 0 else share
+                AgentFloatShard.objects.filter(id=shard.id).update(balance=F('balance') + part, updated_at=now)
+        else:
+            balances = _debit_float(agent, amount)
+            _wallet_entry(wallet, tx, 'credit', amount)
+        _cash_flow(agent, 'float_management', amount, balances, tx.reference_number, agent, tx.description)
+    return tx
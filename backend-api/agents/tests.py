@@ -1,3 +1,296 @@
-from django.test import TestCase
+import random
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from accounts.models import AgentProfile, User, UserProfile, Wallet
+from agents.geo import haversine_km, is_open, nearest
+from agents.models import AgentCashFlow, AgentCommission, AgentFloatShard, AgentLimit, AgentLocation, CashOutCode, CommissionRun
+from agents.services import float_balance
+from transactions.models import AgentTransaction, Transaction, WalletHistory
+
+
+class AgentEngineTests(APITestCase):
+    def setUp(self):
+        self.agent = User.objects.create_user(username='engineagent', email='engineagent@example.com', password='Agentpass123!', user_type='agent')
+        self.agent_profile = AgentProfile.objects.create(user=self.agent, agent_code='AGT777', commission_rate=Decimal('2.50'), is_approved=True, location='Ajan Mache Fè')
+        self.agent_wallet = Wallet.objects.create(user=self.agent, balance=Decimal('10000.00'))
+        self.client_user = User.objects.create_user(username='engineclient', email='engineclient@example.com', password='Clientpass123!', phone_number='50937000001')
+        UserProfile.objects.create(user=self.client_user, first_name='Kliyan', last_name='Test').set_pin('1234')
+        self.client_wallet = Wallet.objects.create(user=self.client_user, balance=Decimal('500.00'))
+        self.agent_auth = {'HTTP_AUTHORIZATION': f'Token {Token.objects.create(user=self.agent).key}'}
+        self.client_auth = {'HTTP_AUTHORIZATION': f'Token {Token.objects.create(user=self.client_user).key}'}
+
+    def fund(self, amount='8000'):
+        resp = self.client.post(reverse('agent_float'), {'amount': amount, 'direction': 'in'}, format='json', **self.agent_auth)
+        self.assertEqual(resp.status_code, 201)
+
+    def cash_in(self, amount):
+        return self.client.post(reverse('agent_cash_in'), {'client_phone': '50937000001', 'amount': amount}, format='json', **self.agent_auth)
+
+    def test_float_is_spread_over_shards(self):
+        self.fund()
+        self.assertEqual(AgentFloatShard.objects.filter(agent=self.agent).count(), 8)
+        self.assertEqual(set(AgentFloatShard.objects.values_list('balance', flat=True)), {Decimal('1000.00')})
+        self.agent_wallet.refresh_from_db()
+        self.assertEqual(self.agent_wallet.balance, Decimal('2000.00'))
+        self.assertEqual(AgentCashFlow.objects.get(operation_type='float_management').balance_after, Decimal('8000.00'))
+
+    def test_cash_in_moves_float_to_client_and_records_commission(self):
+        self.fund()
+        # larger than any single shard: drained across shards
+        resp = self.cash_in('1500')
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.data['commission'], '37.50')
+        self.assertEqual(self.cash_in('400').status_code, 201)
+
+        self.client_wallet.refresh_from_db()
+        self.assertEqual(self.client_wallet.balance, Decimal('2400.00'))
+        self.assertEqual(float_balance(self.agent), Decimal('6100.00'))
+        first, second = AgentCashFlow.objects.filter(operation_type='cash_in').order_by('id')
+        self.assertEqual((first.balance_before, first.balance_after), (Decimal('8000.00'), Decimal('6500.00')))
+        # one covering shard (500 or 1000 left after the drain) was locked: its own balances
+        self.assertIn(second.balance_before, {Decimal('500.00'), Decimal('1000.00')})
+        self.assertEqual(second.balance_before - second.balance_after, Decimal('400.00'))
+        tx = Transaction.objects.get(reference_number=resp.data['reference_number'])
+        self.assertEqual((tx.transaction_type, tx.status, tx.total_amount), ('deposit', 'completed', Decimal('1500.00')))
+        self.assertEqual(AgentCommission.objects.filter(agent=self.agent).count(), 2)
+        self.assertEqual(AgentTransaction.objects.filter(agent=self.agent).count(), 2)
+
+    def test_limits_and_insufficient_float_roll_back_everything(self):
+        self.fund('1000')
+        AgentLimit.objects.create(agent=self.agent, limit_type='daily_transaction', limit_amount=Decimal('600'), reset_period='daily')
+        self.assertEqual(self.cash_in('400').status_code, 201)
+        resp = self.cash_in('300')
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.data['error'], 'Ajan an rive nan limit jounen li')
+        self.assertEqual(self.cash_in('5000').status_code, 400)
+
+        self.client_wallet.refresh_from_db()
+        self.assertEqual(self.client_wallet.balance, Decimal('900.00'))
+        self.assertEqual(float_balance(self.agent), Decimal('600.00'))
+        self.assertEqual(AgentLimit.objects.get(agent=self.agent).current_usage, Decimal('400.00'))
+        self.assertEqual(Transaction.objects.filter(transaction_type='deposit').count(), 1)
+
+    def withdraw(self, amount='200'):
+        resp = self.client.post(reverse('agent_withdrawal'), {'agent_code': 'agt777', 'amount': amount, 'pin': '1234'}, format='json', **self.client_auth)
+        self.assertEqual(resp.status_code, 200)
+        return resp.data['reference_number'], resp.data['confirmation_code']
+
+    def confirm(self, reference, code, auth=None):
+        return self.client.post(reverse('agent_cash_out_confirm'), {'reference_number': reference, 'confirmation_code': code},
+                                format='json', **(auth or self.agent_auth))
+
+    def test_cash_out_is_held_then_confirmed_by_the_agent(self):
+        reference, code = self.withdraw()
+        self.assertNotEqual(code, reference)
+        self.assertNotIn(code, CashOutCode.objects.get().code_hash)
+        self.client_wallet.refresh_from_db()
+        self.assertEqual(self.client_wallet.balance, Decimal('275.00'))
+
+        self.assertEqual(self.confirm(reference, code, self.client_auth).status_code, 403)
+        resp = self.confirm(reference.lower(), code)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(float_balance(self.agent), Decimal('200.00'))
+        self.assertEqual(Transaction.objects.get(reference_number=reference).status, 'completed')
+        self.assertFalse(CashOutCode.objects.exists())
+        self.assertEqual(self.confirm(reference, code).status_code, 409)
+
+    def test_agent_cannot_confirm_with_the_reference_alone(self):
+        reference, code = self.withdraw()
+        self.assertEqual(self.confirm(reference, '').status_code, 400)
+        self.assertEqual(self.confirm(reference, reference).status_code, 400)
+        self.assertEqual(Transaction.objects.get(reference_number=reference).status, 'pending')
+        self.assertEqual(CashOutCode.objects.get().failed_attempts, 2)
+        self.assertEqual(float_balance(self.agent), Decimal('0'))
+
+    def test_repeated_wrong_codes_release_the_hold(self):
+        reference, code = self.withdraw()
+        wrong = f'{(int(code) + 1) % 10 ** 6:06d}'
+        for _ in range(4):
+            self.assertEqual(self.confirm(reference, wrong).status_code, 400)
+        self.assertEqual(self.confirm(reference, wrong).status_code, 429)
+        self.assertEqual(self.confirm(reference, code).status_code, 409)
+        self.assertEqual(Transaction.objects.get(reference_number=reference).status, 'cancelled')
+        self.client_wallet.refresh_from_db()
+        self.assertEqual(self.client_wallet.balance, Decimal('500.00'))
+
+    def test_expired_code_releases_the_hold(self):
+        reference, code = self.withdraw()
+        CashOutCode.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.confirm(reference, code).status_code, 410)
+        self.assertEqual(Transaction.objects.get(reference_number=reference).status, 'cancelled')
+        self.client_wallet.refresh_from_db()
+        self.assertEqual(self.client_wallet.balance, Decimal('500.00'))
+        self.assertEqual(float_balance(self.agent), Decimal('0'))
+
+    def test_expired_holds_are_released_without_an_agent_attempt(self):
+        stale, _ = self.withdraw()
+        fresh, _ = self.withdraw()
+        CashOutCode.objects.filter(transaction__reference_number=stale).update(expires_at=timezone.now() - timedelta(seconds=1))
+        out = StringIO()
+        call_command('release_expired_cash_outs', stdout=out)
+        self.assertIn('released=1', out.getvalue())
+        self.assertEqual(Transaction.objects.get(reference_number=stale).status, 'cancelled')
+        self.assertEqual(Transaction.objects.get(reference_number=fresh).status, 'pending')
+        self.client_wallet.refresh_from_db()
+        self.assertEqual(self.client_wallet.balance, Decimal('275.00'))
+
+        call_command('release_expired_cash_outs', stdout=out)
+        self.client_wallet.refresh_from_db()
+        self.assertEqual(self.client_wallet.balance, Decimal('275.00'))
+
+    def test_client_can_cancel_a_pending_withdrawal(self):
+        reference, code = self.withdraw()
+        url = reverse('cancel_agent_withdrawal')
+        self.assertEqual(self.client.post(url, {'reference_number': reference}, format='json', **self.agent_auth).status_code, 404)
+        resp = self.client.post(url, {'reference_number': reference.lower()}, format='json', **self.client_auth)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['refunded'], '225.00')
+        self.client_wallet.refresh_from_db()
+        self.assertEqual(self.client_wallet.balance, Decimal('500.00'))
+        self.assertFalse(CashOutCode.objects.exists())
+        self.assertEqual(self.confirm(reference, code).status_code, 409)
+        self.assertEqual(self.client.post(url, {'reference_number': reference}, format='json', **self.client_auth).status_code, 409)
+        self.assertEqual(float_balance(self.agent), Decimal('0'))
+
+    def test_withdrawal_needs_a_real_agent_and_correct_pin(self):
+        url = reverse('agent_withdrawal')
+        self.assertEqual(self.client.post(url, {'agent_code': 'A001234', 'amount': '200', 'pin': '1234'}, format='json', **self.client_auth).status_code, 404)
+        self.assertEqual(self.client.post(url, {'agent_code': 'AGT777', 'amount': '200', 'pin': '9999'}, format='json', **self.client_auth).status_code, 400)
+        self.client_wallet.refresh_from_db()
+        self.assertEqual(self.client_wallet.balance, Decimal('500.00'))
+
+
+class NearbyAgentTests(APITestCase):
+    def setUp(self):
+        self.agent = User.objects.create_user(username='geoagent', email='geoagent@example.com', password='Agentpass123!', user_type='agent')
+        AgentProfile.objects.create(user=self.agent, agent_code='AGT555', is_approved=True)
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {Token.objects.create(user=self.agent).key}'}
+
+    def place(self, name, lat, lon, **extra):
+        return AgentLocation.objects.create(
+            agent=self.agent, name=name, address='-', city='-', department=extra.pop('department', 'Ouest'),
+            latitude=Decimal(f'{lat:.6f}'), longitude=Decimal(f'{lon:.6f}'), **extra,
+        )
+
+    def test_geohash_follows_coordinates(self):
+        location = self.place('Mache', 18.5392, -72.3364)
+        self.assertEqual(location.geohash, 'd7k93yynx')
+        location.latitude, location.longitude = Decimal('19.759'), Decimal('-72.198')
+        location.save(update_fields=['latitude', 'longitude'])
+        location.refresh_from_db()
+        self.assertEqual(location.geohash, 'd7s8mj508')
+
+    def test_nearest_matches_a_linear_scan(self):
+        rng = random.Random(7)
+        for index in range(300):
+            self.place(f'P{index}', rng.uniform(18.0, 20.0), rng.uniform(-74.4, -71.7), is_active=index % 10 != 0,
+                       department='Nord' if index % 3 == 0 else 'Ouest')
+        rows = list(AgentLocation.objects.values_list('id', 'latitude', 'longitude', 'is_active', 'department'))
+        for lat, lon in [(18.54, -72.34), (19.76, -72.2), (18.2, -73.75), (25.0, -80.0)]:
+            by_distance = sorted(rows, key=lambda r: haversine_km(lat, lon, float(r[1]), float(r[2])))
+            active = [r[0] for r in by_distance if r[3]]
+            self.assertEqual([row['id'] for _, row in nearest(lat, lon, k=7)], active[:7])
+            self.assertEqual([row['id'] for _, row in nearest(lat, lon, k=5, department='nord')],
+                             [r[0] for r in by_distance if r[3] and r[4] == 'Nord'][:5])
+            in_radius = [r[0] for r in by_distance if r[3] and haversine_km(lat, lon, float(r[1]), float(r[2])) <= 25]
+            self.assertEqual([row['id'] for _, row in nearest(lat, lon, k=50, radius_km=25)], in_radius[:50])
+
+    def test_operating_hours(self):
+        hours = {'monday': '8:00-17:00', 'friday': '22:00-02:00', 'saturday': '9-12, 14-18', 'sunday': 'closed'}
+        monday, saturday = datetime(2025, 3, 10, 9, 30), datetime(2025, 3, 15, 1, 0)
+        self.assertTrue(is_open(hours, monday))
+        self.assertFalse(is_open(hours, monday.replace(hour=17)))
+        self.assertTrue(is_open(hours, saturday))  # Friday's overnight range
+        self.assertFalse(is_open(hours, saturday.replace(hour=13)))
+        self.assertTrue(is_open(hours, saturday.replace(hour=15)))
+        self.assertFalse(is_open(hours, datetime(2025, 3, 16, 12, 0)))
+        self.assertIsNone(is_open({}, monday))
+
+    def test_nearby_endpoint(self):
+        always = {day: '24h' for day in ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')}
+        near = self.place('Toupre', 18.5400, -72.3370, operating_hours=always)
+        self.place('Fèmen', 18.5401, -72.3371, operating_hours={'monday': 'closed'})
+        self.place('Lwen', 19.7600, -72.2000, department='Nord')
+        url = reverse('nearby_agents')
+
+        resp = self.client.get(url, {'lat': '18.5392', 'lon': '-72.3364', 'k': 2}, **self.auth)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['count'], 2)
+        self.assertEqual(resp.data['results'][0]['id'], near.id)
+        self.assertEqual(resp.data['results'][0]['agent_code'], 'AGT555')
+        self.assertTrue(resp.data['results'][0]['open_now'])
+
+        resp = self.client.get(url, {'lat': '18.5392', 'lon': '-72.3364', 'open_now': 'true'}, **self.auth)
+        self.assertEqual([r['name'] for r in resp.data['results']], ['Toupre'])
+        resp = self.client.get(url, {'lat': '18.5392', 'lon': '-72.3364', 'radius_km': 5}, **self.auth)
+        self.assertEqual(resp.data['count'], 2)
+        self.assertEqual(self.client.get(url, {'lat': '18.5'}, **self.auth).status_code, 400)
+        self.assertEqual(self.client.get(url, {'lat': '18.5', 'lon': '-72.3', 'k': 500}, **self.auth).status_code, 400)
+
+
+class CommissionRunTests(APITestCase):
+    PERIOD = (date(2025, 1, 1), date(2025, 1, 31))
+
+    def setUp(self):
+        self.client_user = User.objects.create_user(username='commclient', email='commclient@example.com', password='Clientpass123!')
+        self.agents = []
+        for index, rate in enumerate(('2.00', '3.00')):
+            agent = User.objects.create_user(username=f'commagent{index}', email=f'commagent{index}@example.com', password='Agentpass123!', user_type='agent')
+            AgentProfile.objects.create(user=agent, agent_code=f'AGC{index}', commission_rate=Decimal(rate), is_approved=True)
+            Wallet.objects.create(user=agent, balance=Decimal('100.00'))
+            self.agents.append(agent)
+        self.agents.sort(key=lambda agent: agent.pk)
+
+    def transaction(self, agent, amount, commission=None):
+        tx = Transaction.objects.create(
+            transaction_type='deposit', sender=agent, receiver=self.client_user, amount=Decimal(amount), total_amount=Decimal(amount),
+            reference_number=f'T{Transaction.objects.count()}', status='completed', processed_at=datetime(2025, 1, 15, 12, tzinfo=dt_timezone.utc),
+        )
+        if commission is not None:
+            AgentCommission.objects.create(agent=agent, transaction=tx, commission_amount=Decimal(commission), commission_rate=Decimal('2.00'),
+                                           period_start=self.PERIOD[0], period_end=self.PERIOD[1])
+        return tx
+
+    def balance(self, agent):
+        return Wallet.objects.get(user=agent).balance
+
+    def test_run_records_missing_commissions_and_pays_once(self):
+        first, second = self.agents
+        self.transaction(first, '1000', commission='20.00')
+        legacy = self.transaction(second, '500')  # no commission recorded yet
+        call_command('run_agent_commissions', period='2025-01', batch_size=1, stdout=StringIO())
+
+        rate = AgentProfile.objects.get(user=second).commission_rate
+        self.assertEqual(AgentCommission.objects.get(transaction=legacy).commission_amount, Decimal('500') * rate / 100)
+        self.assertTrue(AgentTransaction.objects.filter(transaction=legacy).exists())
+        self.assertEqual(self.balance(first), Decimal('120.00'))
+        self.assertEqual(self.balance(second), Decimal('100.00') + Decimal('500') * rate / 100)
+        self.assertFalse(AgentCommission.objects.filter(is_paid=False).exists())
+        self.assertEqual(Transaction.objects.filter(transaction_type='commission').count(), 2)
+        self.assertEqual(WalletHistory.objects.filter(operation_type='credit').count(), 2)
+        run = CommissionRun.objects.get()
+        self.assertEqual((run.status, run.commissions_created, run.agents_paid), ('completed', 1, 2))
+
+        call_command('run_agent_commissions', period='2025-01', stdout=StringIO())
+        self.assertEqual(self.balance(first), Decimal('120.00'))
+        self.assertEqual(Transaction.objects.filter(transaction_type='commission').count(), 2)
+
+    def test_interrupted_run_resumes_after_its_watermark(self):
+        first, second = self.agents
+        self.transaction(first, '1000', commission='20.00')
+        self.transaction(second, '1000', commission='30.00')
+        # First batch committed before the crash
+        CommissionRun.objects.create(period_start=self.PERIOD[0], period_end=self.PERIOD[1], last_agent_id=first.pk, agents_paid=1)
+        call_command('run_agent_commissions', period='2025-01', stdout=StringIO())
+
+        self.assertEqual(self.balance(first), Decimal('100.00'))
+        self.assertEqual(self.balance(second), Decimal('130.00'))
+        self.assertEqual(CommissionRun.objects.get().agents_paid, 2)
@@ -2,5 +2,8 @@ from django.urls import path
 from . import views
 
 urlpatterns = [
-    # Agent endpoints will be added here
+    path('float/', views.agent_float, name='agent_float'),
+    path('cash-in/', views.agent_cash_in, name='agent_cash_in'),
+    path('cash-out/confirm/', views.agent_cash_out_confirm, name='agent_cash_out_confirm'),
+    path('nearby/', views.nearby_agents, name='nearby_agents'),
 ]
@@ -1,3 +1,143 @@
-from django.shortcuts import render
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
-# Create your views here.
+from .models import AgentFloatShard, AgentLimit
+from .services import AgentOperationError, cash_in, confirm_cash_out, float_balance, get_agent_profile, move_float
+
+
+def _error(exc):
+    return Response({'error': exc.message}, status=exc.status_code)
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def agent_float(request):
+    """GET: e-float total, shards and limit usage. POST {amount, direction: in|out}: move money
+    between the agent's wallet and e-float."""
+    try:
+        profile = get_agent_profile(request.user)
+        if request.method == 'POST':
+            tx = move_float(profile, request.data.get('amount'), request.data.get('direction', 'in'))
+            return Response({
+                'message': 'E-float mete ajou',
+                'reference_number': tx.reference_number,
+                'float_balance': str(float_balance(request.user)),
+            }, status=status.HTTP_201_CREATED)
+
+        return Response({
+            'agent_code': profile.agent_code,
+            'float_balance': str(float_balance(request.user)),
+            'shards': [
+                {'slot': slot, 'balance': str(balance)}
+                for slot, balance in AgentFloatShard.objects.filter(agent=request.user).values_list('slot', 'balance')
+            ],
+            'limits': [
+                {
+                    'limit_type': limit.limit_type,
+                    'limit_amount': str(limit.limit_amount),
+                    'current_usage': str(limit.current_usage),
+                    'reset_period': limit.reset_period,
+                }
+                for limit in AgentLimit.objects.filter(agent=request.user, is_active=True)
+            ],
+        })
+    except AgentOperationError as e:
+        return _error(e)
+    except Exception as e:
+        return Response({'error': f'Erè nan e-float la: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def agent_cash_in(request):
+    """Client deposits cash with the agent: {client_phone, amount}."""
+    from accounts.models import User
+
+    try:
+        profile = get_agent_profile(request.user)
+        identifier = (request.data.get('client_phone') or '').strip()
+        lookup = {'email': identifier} if '@' in identifier else {'phone_number': identifier}
+        client = User.objects.filter(**lookup).first() if identifier else None
+        if client is None:
+            return Response({'error': 'Kliyan pa jwenn'}, status=status.HTTP_404_NOT_FOUND)
+
+        tx, commission = cash_in(profile, client, request.data.get('amount'))
+        return Response({
+            'success': True,
+            'message': 'Depo fèt ak siksè',
+            'reference_number': tx.reference_number,
+            'amount': str(tx.amount),
+            'client': f"{client.first_name} {client.last_name}".strip() or client.username,
+            'commission': str(commission),
+            'float_balance': str(float_balance(request.user)),
+        }, status=status.HTTP_201_CREATED)
+    except AgentOperationError as e:
+        return _error(e)
+    except Exception as e:
+        return Response({'error': f'Erè nan depo a: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def agent_cash_out_confirm(request):
+    """Agent confirms a client's withdrawal before handing over the cash: {reference_number, confirmation_code}."""
+    try:
+        profile = get_agent_profile(request.user)
+        tx, commission = confirm_cash_out(profile, request.data.get('reference_number'), request.data.get('confirmation_code'))
+        client = tx.sender
+        return Response({
+            'success': True,
+            'message': 'Retrè konfime. Bay kliyan an lajan an.',
+            'reference_number': tx.reference_number,
+            'amount': str(tx.amount),
+            'client': f"{client.first_name} {client.last_name}".strip() or client.username,
+            'commission': str(commission),
+            'float_balance': str(float_balance(request.user)),
+        })
+    except AgentOperationError as e:
+        return _error(e)
+    except Exception as e:
+        return Response({'error': f'Erè nan konfimasyon retrè a: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+NEARBY_MAX_RESULTS = 50
+NEARBY_MAX_RADIUS_KM = 200
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def nearby_agents(request):
+    """Closest agent locations: ?lat=&lon= plus optional k (default 10), radius_km,
+    department and open_now=true. Admins may add include_inactive=true."""
+    from .geo import local_now, location_payload, nearest
+
+    params = request.query_params
+    try:
+        lat, lon = float(params['lat']), float(params['lon'])
+        k = int(params.get('k', 10))
+        radius_km = float(params['radius_km']) if params.get('radius_km') else None
+    except (KeyError, TypeError, ValueError):
+        return Response({'error': 'lat ak lon obligatwa (k ak radius_km dwe nimewo)'}, status=status.HTTP_400_BAD_REQUEST)
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return Response({'error': 'Kowòdone yo pa valid'}, status=status.HTTP_400_BAD_REQUEST)
+    if not 1 <= k <= NEARBY_MAX_RESULTS:
+        return Response({'error': f'k dwe ant 1 ak {NEARBY_MAX_RESULTS}'}, status=status.HTTP_400_BAD_REQUEST)
+    if radius_km is not None and not 0 < radius_km <= NEARBY_MAX_RADIUS_KM:
+        return Response({'error': f'radius_km dwe ant 0 ak {NEARBY_MAX_RADIUS_KM}'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        now = local_now()
+        open_only = params.get('open_now', '').lower() in ('1', 'true', 'yes')
+        include_inactive = request.user.user_type == 'admin' and params.get('include_inactive', '').lower() in ('1', 'true', 'yes')
+        hits = nearest(
+            lat, lon, k=k, radius_km=radius_km, department=params.get('department') or None,
+            active_only=not include_inactive, open_at=now if open_only else None,
+        )
+        return Response({
+            'count': len(hits),
+            'results': [location_payload(distance, row, now) for distance, row in hits],
+        })
+    except Exception as e:
+        return Response({'error': f'Erè nan rechèch ajan yo: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,246 @@
+"""
+Endpoint load tests and latency reports (manage.py benchmark_endpoints).
+
+SCENARIOS names the endpoints under test and how to build one request for an actor — a
+client user made by manage.py generate_dataset, so its password and PIN are known. run()
+forks worker processes that each loop over the weighted scenarios until the deadline,
+either against a running server (HttpClient: requests over keep-alive connections) or in
+process through the Django test client (TestClient), and time every request.
+
+Latencies go into a Histogram: log-linear buckets, SUB_BUCKETS per doubling (~9% wide)
+from MIN_SECONDS, so it is a small dict of counters that merges across processes, and
+percentiles are read off the cumulative counts. summarize() turns the merged results into
+the JSON report; compare() diffs two reports and lists regressions.
+
+Velocity rules (transactions/velocity.py) apply as in production. In process every actor
+connects from its own address (REMOTE_ADDR), so the per-IP rules see a spread of clients;
+against a server they see the driver machine's one address. Either way, send_money answers
+429 once an actor passes its per-user burst limit; the command can run the test client
+without the rules (--no-velocity) to measure the endpoint alone.
+"""
+
+import math
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from django.db import connections
+from django.urls import reverse
+
+
+class Histogram:
+    SUB_BUCKETS = 8
+    MIN_SECONDS = 1e-5
+
+    def __init__(self):
+        self.counts = Counter()
+        self.total = 0.0
+        self.max = 0.0
+
+    @classmethod
+    def _index(cls, seconds):
+        return max(0, int(math.log2(max(seconds, cls.MIN_SECONDS) / cls.MIN_SECONDS) * cls.SUB_BUCKETS))
+
+    @classmethod
+    def upper(cls, index):
+        """Upper bound (seconds) of bucket `index`."""
+        return cls.MIN_SECONDS * 2 ** ((index + 1) / cls.SUB_BUCKETS)
+
+    def record(self, seconds):
+        self.counts[self._index(seconds)] += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    @property
+    def count(self):
+        return sum(self.counts.values())
+
+    def percentile(self, percent):
+        """Seconds under which `percent`% of the samples fall (to within a bucket); 0 when empty."""
+        count = self.count
+        if not count:
+            return 0.0
+        rank = max(1, math.ceil(percent / 100 * count))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self.upper(index), self.max)
+        return self.max
+
+    def merge(self, other):
+        self.counts.update(other.counts)
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def to_dict(self):
+        return {'sum': self.total, 'max': self.max, 'buckets': sorted(self.counts.items())}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        histogram.counts.update({int(index): count for index, count in data['buckets']})
+        histogram.total, histogram.max = data['sum'], data['max']
+        return histogram
+
+
+class Scenario:
+    """One endpoint: `build(actor, rng, context)` gives the query (GET) or JSON body (POST);
+    `auth` is 'actor', 'admin' or None."""
+
+    def __init__(self, url_name, method, build, auth='actor', weight=1):
+        self.url_name = url_name
+        self.method = method
+        self.build = build
+        self.auth = auth
+        self.weight = weight
+
+
+def _send_money(actor, rng, context):
+    receiver = rng.choice(context['phones'])
+    if receiver == actor['phone']:
+        receiver = context['phones'][(context['phones'].index(receiver) + 1) % len(context['phones'])]
+    return {'receiver_phone': receiver, 'amount': str(rng.choice((10, 25, 50, 100, 250))), 'pin': context['pin']}
+
+
+SCENARIOS = {
+    'login': Scenario('login', 'POST', lambda actor, rng, context: {'email': actor['username'], 'password': context['password']}, auth=None),
+    'send_money': Scenario('send_money', 'POST', _send_money, weight=3),
+    'search_users': Scenario('search_users', 'GET', lambda actor, rng, context: {'q': rng.choice(context['queries'])}, weight=4),
+    'admin_all_transactions': Scenario(
+        'admin_all_transactions', 'GET', lambda actor, rng, context: {'page': rng.randint(1, 5)}, auth='admin',
+    ),
+    'admin_dashboard_stats': Scenario('admin_dashboard_stats', 'GET', lambda actor, rng, context: {}, auth='admin'),
+}
+
+
+class HttpClient:
+    def __init__(self, base_url):
+        import requests
+
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+
+    def request(self, method, path, data, headers, address):
+        # `address` cannot be chosen over the network: the server sees this machine's
+        if method == 'GET':
+            response = self.session.get(self.base_url + path, params=data, headers=headers, timeout=60)
+        else:
+            response = self.session.post(self.base_url + path, json=data, headers=headers, timeout=60)
+        return response.status_code
+
+
+class TestClient:
+    """The whole Django stack in process, minus the network and the server."""
+
+    def __init__(self):
+        from rest_framework.test import APIClient
+
+        self.client = APIClient()
+
+    def request(self, method, path, data, headers, address):
+        extra = {'HTTP_' + name.upper().replace('-', '_'): value for name, value in headers.items()}
+        extra['REMOTE_ADDR'] = address
+        if method == 'GET':
+            return self.client.get(path, data, **extra).status_code
+        return self.client.post(path, data, format='json', **extra).status_code
+
+
+def _worker(names, actors, context, duration, warmup, base_url, seed):
+    """Closed loop: one request at a time until the deadline. {scenario: (histogram, statuses)}."""
+    rng = random.Random(seed)
+    client = HttpClient(base_url) if base_url else TestClient()
+    scenarios = [SCENARIOS[name] for name in names]
+    weights = [scenario.weight for scenario in scenarios]
+    paths = {name: reverse(SCENARIOS[name].url_name) for name in names}
+    results = {name: (Histogram(), Counter()) for name in names}
+    measure_from = time.perf_counter() + warmup
+    deadline = measure_from + duration
+    while time.perf_counter() < deadline:
+        index = rng.choices(range(len(scenarios)), weights)[0]
+        scenario, name = scenarios[index], names[index]
+        actor = rng.choice(actors)
+        headers = {}
+        if scenario.auth:
+            headers['Authorization'] = f"Token {context['admin_token'] if scenario.auth == 'admin' else actor['token']}"
+        data = scenario.build(actor, rng, context)
+        started = time.perf_counter()
+        try:
+            status = client.request(scenario.method, paths[name], data, headers, actor['ip'])
+        except Exception as e:
+            status = e.__class__.__name__
+        elapsed = time.perf_counter() - started
+        if started < measure_from:
+            continue
+        histogram, statuses = results[name]
+        statuses[str(status)] += 1
+        if isinstance(status, int) and status < 400:
+            histogram.record(elapsed)
+    return {name: (histogram.to_dict(), dict(statuses)) for name, (histogram, statuses) in results.items()}
+
+
+def run(names, actors, context, processes=1, duration=30, warmup=2, base_url=None, seed=0):
+    """Drive the scenarios from `processes` workers; {scenario: (Histogram, Counter of statuses)}."""
+    args = (names, actors, context, duration, warmup, base_url)
+    if processes == 1:
+        outputs = [_worker(*args, seed)]
+    else:
+        connections.close_all()  # forked workers must not share our connection
+        with ProcessPoolExecutor(processes, mp_context=get_context('fork')) as pool:
+            outputs = list(pool.map(_worker, *zip(*[args + (seed + n,) for n in range(processes)])))
+    merged = {name: (Histogram(), Counter()) for name in names}
+    for output in outputs:
+        for name, (histogram, statuses) in output.items():
+            merged[name][0].merge(Histogram.from_dict(histogram))
+            merged[name][1].update(statuses)
+    return merged
+
+
+def summarize(results, duration):
+    """The per-scenario section of the report."""
+    report = {}
+    for name, (histogram, statuses) in results.items():
+        requests = sum(statuses.values())
+        report[name] = {
+            'requests': requests,
+            'errors': requests - histogram.count,
+            'statuses': dict(sorted(statuses.items())),
+            'throughput_rps': round(histogram.count / duration, 2),
+            'latency_ms': {
+                'mean': round(histogram.total / histogram.count * 1000, 3) if histogram.count else 0.0,
+                **{f'p{p}': round(histogram.percentile(p) * 1000, 3) for p in (50, 90, 99)},
+                'max': round(histogram.max * 1000, 3),
+            },
+            'histogram': histogram.to_dict(),
+        }
+    return report
+
+
+def percent_change(old, new):
+    return (new - old) / old * 100 if old else 0.0
+
+
+def compare(base, new, threshold=10.0):
+    """(rows, regressions) for the scenarios in both reports. A regression is p50 or p99
+    slower, or throughput lower, by more than `threshold` percent, or a higher error rate."""
+    rows, regressions = [], []
+    for name in sorted(set(base['scenarios']) & set(new['scenarios'])):
+        old, current = base['scenarios'][name], new['scenarios'][name]
+        row = {
+            'scenario': name,
+            'p50': (old['latency_ms']['p50'], current['latency_ms']['p50']),
+            'p99': (old['latency_ms']['p99'], current['latency_ms']['p99']),
+            'throughput_rps': (old['throughput_rps'], current['throughput_rps']),
+            'error_rate': tuple(round(r['errors'] / r['requests'], 4) if r['requests'] else 0.0 for r in (old, current)),
+        }
+        rows.append(row)
+        for metric in ('p50', 'p99'):
+            if percent_change(*row[metric]) > threshold:
+                regressions.append(f'{name}: {metric} {row[metric][0]} -> {row[metric][1]} ms')
+        if -percent_change(*row['throughput_rps']) > threshold:
+            regressions.append(f"{name}: throughput {row['throughput_rps'][0]} -> {row['throughput_rps'][1]} req/s")
+        if row['error_rate'][1] > row['error_rate'][0] + 0.01:
+            regressions.append(f"{name}: error rate {row['error_rate'][0]:.2%} -> {row['error_rate'][1]:.2%}")
+    return rows, regressions
@@ -120,6 +120,26 @@ else:
     }
 
 
+# Cache
+# Shared Redis cache when REDIS_URL is set; per-process memory cache otherwise (dev/tests).
+
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'cash-ti-machann',
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -161,6 +181,24 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Protected media (ID documents) goes through signed, short-lived URLs (api/auth/media/<token>/).
+# MEDIA_DELIVERY: 'django' streams with Range/ETag support; behind nginx use 'x-accel' with
+#   location /protected-media/ { internal; alias <MEDIA_ROOT>/; }
+# or 'x-sendfile' for Apache/lighttpd so app workers are released immediately.
+MEDIA_DELIVERY = os.environ.get('MEDIA_DELIVERY', 'django')
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+MEDIA_URL_TTL_SECONDS = int(os.environ.get('MEDIA_URL_TTL_SECONDS', 300))
+
+# Uploads are stored by content hash under media/cas/ab/cd/ (deduplicated, see accounts/storage.py)
+STORAGES = {
+    'default': {
+        'BACKEND': 'accounts.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -193,3 +231,72 @@ CORS_ALLOW_CREDENTIALS = True
 # Email settings (configure for production)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'  # For development
 DEFAULT_FROM_EMAIL = 'noreply@cashtimachann.com'
+
+# Lifetime of signed payment-request QR codes (seconds)
+QR_PAYMENT_TTL_SECONDS = int(os.environ.get('QR_PAYMENT_TTL_SECONDS', 900))
+
+# In-process background jobs (see cash_ti_machann/tasks.py)
+BACKGROUND_TASK_WORKERS = int(os.environ.get('BACKGROUND_TASK_WORKERS', 4))
+BACKGROUND_TASKS_EAGER = os.environ.get('BACKGROUND_TASKS_EAGER') == '1'
+
+# Top-up and bill providers (transactions/providers.py). A provider without base_url is
+# served by the sandbox adapter, which settles with a made-up reference (development only).
+PAYMENT_PROVIDERS = {
+    name: {
+        'base_url': os.environ.get(f'{name.upper()}_API_URL', ''),
+        'api_key': os.environ.get(f'{name.upper()}_API_KEY', ''),
+        # Takes batches at {path}/batch: operations are grouped (see below) instead of sent one by one
+        'batch': os.environ.get(f'{name.upper()}_API_BATCH') == '1',
+    }
+    for name in ('digicel', 'natcom', 'edh', 'dinepa', 'bills')
+}
+PROVIDER_CONNECT_TIMEOUT = float(os.environ.get('PROVIDER_CONNECT_TIMEOUT', 3.05))
+PROVIDER_READ_TIMEOUT = float(os.environ.get('PROVIDER_READ_TIMEOUT', 15))
+PROVIDER_POOL_SIZE = BACKGROUND_TASK_WORKERS
+# Consecutive failures that open a provider's circuit, and seconds before a trial call
+PROVIDER_BREAKER_THRESHOLD = 5
+PROVIDER_BREAKER_RESET_SECONDS = 30
+# Attempts before a payment the provider never confirmed is refunded
+PROVIDER_MAX_ATTEMPTS = 5
+# Batching providers: a batch goes out when it holds PROVIDER_BATCH_SIZE operations or
+# PROVIDER_BATCH_WINDOW_SECONDS after its first one, whichever comes first
+PROVIDER_BATCH_SIZE = int(os.environ.get('PROVIDER_BATCH_SIZE', 100))
+PROVIDER_BATCH_WINDOW_SECONDS = float(os.environ.get('PROVIDER_BATCH_WINDOW_SECONDS', 5))
+
+# Velocity rules checked before send, QR payment and agent withdrawal (transactions/velocity.py).
+# dimension: user | receiver | device | ip; window: 1m | 1h | 24h; amounts in HTG;
+# action 'block' refuses the payment, 'review' lets it through and logs it for review.
+VELOCITY_RULES = [
+    {'name': 'user_burst', 'dimension': 'user', 'window': '1m', 'max_count': 5, 'action': 'block'},
+    {'name': 'user_hourly_count', 'dimension': 'user', 'window': '1h', 'max_count': 30, 'action': 'review'},
+    {'name': 'user_hourly_amount', 'dimension': 'user', 'window': '1h', 'max_amount': 100000, 'action': 'review'},
+    {'name': 'user_daily_amount', 'dimension': 'user', 'window': '24h', 'max_amount': 250000, 'action': 'block'},
+    {'name': 'receiver_fan_in', 'dimension': 'receiver', 'window': '1h', 'max_count': 50, 'action': 'review'},
+    {'name': 'device_burst', 'dimension': 'device', 'window': '1m', 'max_count': 10, 'action': 'block'},
+    {'name': 'ip_hourly_count', 'dimension': 'ip', 'window': '1h', 'max_count': 200, 'action': 'review'},
+]
+# Reverse proxies in front of Django that append to X-Forwarded-For; 0 means REMOTE_ADDR is the client
+TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', 0))
+
+# Offline anomaly scoring (manage.py score_transaction_anomalies): amounts just under this
+# HTG threshold count toward structuring; local hours for night activity use this zone
+ANOMALY_REPORTING_THRESHOLD = 100000
+ANOMALY_TIME_ZONE = 'America/Port-au-Prince'
+
+# Resumable uploads (accounts/uploads/): staging dir, max bytes per PATCH, session lifetime
+CHUNKED_UPLOAD_DIR = os.environ.get('CHUNKED_UPLOAD_DIR')  # None: system temp dir
+CHUNKED_UPLOAD_MAX_CHUNK = int(os.environ.get('CHUNKED_UPLOAD_MAX_CHUNK', 512 * 1024))
+CHUNKED_UPLOAD_TTL_HOURS = 24
+
+# KYC review queue: how long a claimed document stays reserved for its reviewer (seconds)
+KYC_REVIEW_LEASE_SECONDS = int(os.environ.get('KYC_REVIEW_LEASE_SECONDS', 600))
+# Largest batch accepted by admin/documents/bulk-decision/
+KYC_BULK_DECISION_MAX = 1000
+
+# Rows each agent's e-float is split over (agents.AgentFloatShard); more rows, less lock contention
+AGENT_FLOAT_SHARDS = int(os.environ.get('AGENT_FLOAT_SHARDS', 8))
+# Agent cash-out confirmation codes: lifetime (seconds) and wrong entries before the withdrawal is released
+AGENT_CASH_OUT_CODE_TTL_SECONDS = int(os.environ.get('AGENT_CASH_OUT_CODE_TTL_SECONDS', 1800))
+AGENT_CASH_OUT_CODE_MAX_ATTEMPTS = 5
+# Local time AgentLocation.operating_hours are written in (nearby agents' open_now)
+AGENT_HOURS_TIME_ZONE = 'America/Port-au-Prince'
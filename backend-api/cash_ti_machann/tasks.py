@@ -0,0 +1,53 @@
+"""
+Minimal in-process background work for post-commit jobs (image variants, notifications,
+provider calls). Jobs run on a shared thread pool once the surrounding transaction commits,
+so workers never see rows that were rolled back.
+
+Set BACKGROUND_TASKS_EAGER = True to run jobs inline (tests, management commands).
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'BACKGROUND_TASK_WORKERS', 4),
+                    thread_name_prefix='ctm-task',
+                )
+    return _executor
+
+
+def _run(fn, args, kwargs):
+    try:
+        return fn(*args, **kwargs)
+    except Exception:
+        logger.exception('Background task %s failed', getattr(fn, '__name__', fn))
+    finally:
+        # Worker threads hold their own DB connections; don't leak them between jobs
+        close_old_connections()
+
+
+def submit(fn, *args, **kwargs):
+    """Run `fn(*args, **kwargs)` in the background after the current transaction commits."""
+    if getattr(settings, 'BACKGROUND_TASKS_EAGER', False):
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            logger.exception('Background task %s failed', getattr(fn, '__name__', fn))
+            return None
+    transaction.on_commit(lambda: _get_executor().submit(_run, fn, args, kwargs))
+    return None
@@ -0,0 +1,58 @@
+"""
+Process-local values rebuilt when a shared version number moves.
+
+Small, rarely edited tables (fee schedule, ...) are compiled once into an in-memory
+structure per worker. A version counter in the shared cache says when that copy is stale:
+writers call bump() after commit, readers compare versions at most every
+`check_interval` seconds. The hot path is a clock read; every few seconds it is one
+cache get; a rebuild happens only after a change.
+"""
+
+import threading
+import time
+
+from django.core.cache import cache
+
+
+class VersionedValue:
+    def __init__(self, name, build, check_interval=5.0):
+        self.key = f'versioned:{name}'
+        self._build = build
+        self._interval = check_interval
+        self._lock = threading.Lock()
+        self._value = None
+        self._version = None
+        self._checked_at = float('-inf')
+
+    def _shared_version(self):
+        version = cache.get(self.key)
+        if version is None:
+            # Seeded from the clock so an evicted counter never comes back as an old version
+            cache.add(self.key, time.time_ns(), None)
+            version = cache.get(self.key)
+        return version
+
+    def get(self):
+        now = time.monotonic()
+        if self._value is not None and now - self._checked_at < self._interval:
+            return self._value
+        with self._lock:
+            version = self._shared_version()
+            if self._value is None or version != self._version:
+                self._value = self._build()
+                self._version = version
+            self._checked_at = now
+        return self._value
+
+    @property
+    def version(self):
+        self.get()
+        return self._version
+
+    def bump(self):
+        """Mark every process's copy stale; this process rebuilds on its next get()."""
+        try:
+            cache.incr(self.key)
+        except ValueError:
+            cache.add(self.key, time.time_ns(), None)
+        self._checked_at = float('-inf')
@@ -5,7 +5,7 @@ import django
 from django.conf import settings
 
 # Add the project directory to the Python path
-sys.path.append('/Users/herlytache/Desktop/Cash Ti Machann/backend-api')
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # Set the Django settings module
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cash_ti_machann.settings')
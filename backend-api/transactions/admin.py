@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Transaction, PhoneTopUp, BillPayment, AgentTransaction, WalletHistory
+from .models import Transaction, PhoneTopUp, BillPayment, AgentTransaction, WalletHistory, FeeSchedule, ExchangeRate, ProviderFulfilment, VelocityDecision, UserRiskScore
 
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
@@ -34,3 +34,35 @@ class WalletHistoryAdmin(admin.ModelAdmin):
     list_filter = ('operation_type', 'created_at')
     search_fields = ('wallet__user__username', 'transaction__reference_number')
     readonly_fields = ('created_at',)
+
+@admin.register(FeeSchedule)
+class FeeScheduleAdmin(admin.ModelAdmin):
+    list_display = ('operation', 'user_type', 'min_amount', 'percent', 'flat_fee', 'minimum_fee', 'maximum_fee', 'is_active')
+    list_filter = ('operation', 'user_type', 'is_active')
+    readonly_fields = ('created_at', 'updated_at')
+
+@admin.register(ExchangeRate)
+class ExchangeRateAdmin(admin.ModelAdmin):
+    list_display = ('base_currency', 'quote_currency', 'rate', 'updated_at')
+    readonly_fields = ('updated_at',)
+
+@admin.register(ProviderFulfilment)
+class ProviderFulfilmentAdmin(admin.ModelAdmin):
+    list_display = ('transaction', 'provider', 'attempts', 'next_attempt_at', 'last_error')
+    list_filter = ('provider',)
+    search_fields = ('transaction__reference_number',)
+    readonly_fields = ('created_at', 'updated_at')
+
+@admin.register(VelocityDecision)
+class VelocityDecisionAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'operation', 'user', 'amount', 'decision', 'reviewed')
+    list_filter = ('decision', 'operation', 'reviewed')
+    search_fields = ('user__username', 'ip_address', 'device_id')
+    readonly_fields = ('created_at',)
+
+@admin.register(UserRiskScore)
+class UserRiskScoreAdmin(admin.ModelAdmin):
+    list_display = ('user', 'score', 'flags', 'transactions_seen', 'computed_at')
+    search_fields = ('user__username',)
+    ordering = ('-score',)
+    readonly_fields = ('computed_at',)
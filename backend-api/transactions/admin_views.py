@@ -5,9 +5,10 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.db.models import Q
 from django.core.paginator import Paginator
-from .models import Transaction
+from .models import Transaction, VelocityDecision
 from .serializers import TransactionSerializer
 from accounts.models import User
+from accounts.utils.etag_utils import conditional_response, latest
 import uuid
 from datetime import datetime, time
 from django.utils import timezone
@@ -160,8 +161,23 @@ def admin_all_transactions(request):
             'error': f'Erè nan jwenn tranzaksyon yo: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+def _admin_transaction_validators(request, transaction_id):
+    if request.user.user_type != 'admin':
+        return None
+    try:
+        row = Transaction.objects.filter(id=transaction_id).values(
+            'updated_at', 'sender__updated_at', 'receiver__updated_at'
+        ).first()
+    except Exception:
+        return None
+    if row is None:
+        return None  # view answers 404
+    stamps = (row['updated_at'], row['sender__updated_at'], row['receiver__updated_at'])
+    return stamps, latest(*stamps)
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_response(_admin_transaction_validators)
 def admin_transaction_detail(request, transaction_id):
     """Get detailed information about a specific transaction"""
     
@@ -252,6 +268,7 @@ def admin_update_transaction_status(request, transaction_id):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_response(_admin_transaction_validators)
 def admin_transaction_history(request, transaction_id):
     """Get transaction history"""
     
@@ -295,4 +312,70 @@ def admin_transaction_history(request, transaction_id):
     except Exception as e:
         return Response({
             'error': f'Erè nan jwenn istwa tranzaksyon an: {str(e)}'
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def _velocity_payload(decision):
+    return {
+        'id': decision.id,
+        'user': decision.user.username if decision.user else None,
+        'receiver': decision.receiver.username if decision.receiver else None,
+        'operation': decision.operation,
+        'amount': str(decision.amount),
+        'decision': decision.decision,
+        'rules': decision.rules,
+        'device_id': decision.device_id,
+        'ip_address': decision.ip_address,
+        'reviewed': decision.reviewed,
+        'reviewed_by': decision.reviewed_by.username if decision.reviewed_by else None,
+        'reviewed_at': decision.reviewed_at.isoformat() if decision.reviewed_at else None,
+        'created_at': decision.created_at.isoformat(),
+    }
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def admin_velocity_decisions(request):
+    """Payments flagged or blocked by the velocity rules; ?reviewed=false&decision=block"""
+    if request.user.user_type != 'admin':
+        return Response({'error': 'Pa gen otorizasyon'}, status=status.HTTP_403_FORBIDDEN)
+    
+    decisions = VelocityDecision.objects.select_related('user', 'receiver', 'reviewed_by')
+    reviewed = request.GET.get('reviewed', '').strip().lower()
+    if reviewed in ('true', 'false'):
+        decisions = decisions.filter(reviewed=reviewed == 'true')
+    decision_filter = request.GET.get('decision', '').strip()
+    if decision_filter:
+        decisions = decisions.filter(decision=decision_filter)
+    
+    try:
+        page = int(request.GET.get('page', 1))
+        limit = int(request.GET.get('limit', 20))
+    except ValueError:
+        return Response({'error': 'Paj oswa limit pa valid'}, status=status.HTTP_400_BAD_REQUEST)
+    if page < 1 or limit < 1:
+        return Response({'error': 'Paj oswa limit pa valid'}, status=status.HTTP_400_BAD_REQUEST)
+    paginator = Paginator(decisions, limit)
+    page_obj = paginator.get_page(page)
+    return Response({
+        'results': [_velocity_payload(decision) for decision in page_obj],
+        'count': paginator.count,
+        'page': page_obj.number,
+        'total_pages': paginator.num_pages,
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def admin_review_velocity_decision(request, decision_id):
+    """Mark a velocity decision as reviewed"""
+    if request.user.user_type != 'admin':
+        return Response({'error': 'Pa gen otorizasyon'}, status=status.HTTP_403_FORBIDDEN)
+    
+    updated = VelocityDecision.objects.filter(id=decision_id, reviewed=False).update(
+        reviewed=True, reviewed_by=request.user, reviewed_at=timezone.now(),
+    )
+    if not updated and not VelocityDecision.objects.filter(id=decision_id).exists():
+        return Response({'error': 'Desizyon pa jwenn'}, status=status.HTTP_404_NOT_FOUND)
+    decision = VelocityDecision.objects.select_related('user', 'receiver', 'reviewed_by').get(id=decision_id)
+    return Response(_velocity_payload(decision), status=status.HTTP_200_OK)
@@ -0,0 +1,101 @@
+"""Fee evaluation from the FeeSchedule table.
+
+The active schedule is compiled into a FeeTable: per (operation, user_type) a sorted tuple
+of tier lower bounds and a parallel tuple of (percent, flat, minimum, maximum). A fee is a
+dict lookup, a bisect and a little Decimal arithmetic — no query. The table is rebuilt
+when the schedule's version moves (cash_ti_machann/versioned.py); saving or deleting a
+FeeSchedule row bumps it (accounts/signals.py).
+"""
+
+from bisect import bisect_right
+from decimal import ROUND_HALF_UP, Decimal
+
+from cash_ti_machann.versioned import VersionedValue
+
+from .fx import BASE_CURRENCY, convert
+
+CENT = Decimal('0.01')
+ZERO = Decimal('0.00')
+HUNDRED = Decimal('100')
+
+# The fee comes out of the amount (the wallet is credited amount - fee) instead of on top
+FEE_DEDUCTED = {'card_deposit'}
+
+
+class FeeTable:
+    __slots__ = ('_entries',)
+
+    def __init__(self, rows):
+        grouped = {}
+        for row in sorted(rows, key=lambda r: (r['operation'], r['user_type'], r['min_amount'])):
+            grouped.setdefault((row['operation'], row['user_type']), []).append(row)
+        self._entries = {
+            key: (
+                tuple(row['min_amount'] for row in tiers),
+                tuple((row['percent'], row['flat_fee'], row['minimum_fee'], row['maximum_fee']) for row in tiers),
+            )
+            for key, tiers in grouped.items()
+        }
+
+    def fee(self, operation, amount, user_type=''):
+        entry = self._entries.get((operation, user_type)) or self._entries.get((operation, ''))
+        if entry is None:
+            return ZERO
+        bounds, tiers = entry
+        index = bisect_right(bounds, amount) - 1
+        if index < 0:
+            return ZERO
+        percent, flat, minimum, maximum = tiers[index]
+        fee = amount * percent / HUNDRED + flat
+        if minimum is not None and fee < minimum:
+            fee = minimum
+        if maximum is not None and fee > maximum:
+            fee = maximum
+        return fee.quantize(CENT, rounding=ROUND_HALF_UP)
+
+    def describe(self):
+        """The compiled tiers as plain data, for clients that quote offline."""
+        return [
+            {
+                'operation': operation,
+                'user_type': user_type,
+                'tiers': [
+                    {
+                        'min_amount': str(bound), 'percent': str(percent), 'flat_fee': str(flat),
+                        'minimum_fee': None if minimum is None else str(minimum),
+                        'maximum_fee': None if maximum is None else str(maximum),
+                    }
+                    for bound, (percent, flat, minimum, maximum) in zip(bounds, tiers)
+                ],
+            }
+            for (operation, user_type), (bounds, tiers) in sorted(self._entries.items())
+        ]
+
+
+def _compile():
+    from .models import FeeSchedule
+
+    return FeeTable(FeeSchedule.objects.filter(is_active=True).values(
+        'operation', 'user_type', 'min_amount', 'percent', 'flat_fee', 'minimum_fee', 'maximum_fee',
+    ))
+
+
+fee_table = VersionedValue('fee_schedule', _compile)
+
+
+def compute_fee(operation, amount, user=None, currency=None):
+    """Fee for `amount` in `currency`; tiers are in HTG, so other currencies are converted
+    there and the fee converted back (RateUnavailable without a rate)."""
+    user_type = getattr(user, 'user_type', '') or ''
+    if currency is None or currency == BASE_CURRENCY:
+        return fee_table.get().fee(operation, amount, user_type)
+    fee = fee_table.get().fee(operation, convert(amount, currency, BASE_CURRENCY)[0], user_type)
+    return convert(fee, BASE_CURRENCY, currency)[0]
+
+
+def quote(operation, amount, user=None, currency=None):
+    """{'fee', 'total_amount', 'net_amount'}: what the payer is charged and what lands."""
+    fee = compute_fee(operation, amount, user, currency)
+    if operation in FEE_DEDUCTED:
+        return {'fee': fee, 'total_amount': amount, 'net_amount': amount - fee}
+    return {'fee': fee, 'total_amount': amount + fee, 'net_amount': amount}
@@ -0,0 +1,277 @@
+"""Asynchronous fulfilment of phone top-ups and bill payments.
+
+The request path reserves the money — wallet debited, limits consumed, transaction saved as
+'processing' with a ProviderFulfilment row — and hands fulfil() to the background pool
+(cash_ti_machann/tasks.py), so the response never waits on a provider. fulfil() calls the
+provider adapter (transactions/providers.py) outside any database transaction, then:
+
+- settles: transaction 'completed', provider reference stored;
+- refunds: the provider refused, or never confirmed within PROVIDER_MAX_ATTEMPTS
+  attempts — transaction 'failed', wallet credited back, limits released;
+- reschedules: a transient failure (timeout, 5xx, open circuit) sets next_attempt_at with
+  exponential backoff; manage.py retry_provider_fulfilment picks those up.
+
+An attempt is claimed with a conditional UPDATE that pushes next_attempt_at past the call's
+timeout, so a worker and the retry command never call the provider for the same attempt,
+and a worker that dies mid-call is retried once the lease runs out. The reference number
+goes to the provider as idempotency key, so a repeated call never charges twice.
+
+Batching providers (PAYMENT_PROVIDERS[...]['batch']) are not called per operation: enqueue()
+counts the operation for its provider, and flush() claims the provider's due operations
+(PROVIDER_BATCH_SIZE at a time, tagged with one batch_id), sends them in one submit_batch()
+call and reconciles the per-item results in bulk. A batch goes out when it is full or
+PROVIDER_BATCH_WINDOW_SECONDS after its first operation; the retry command flushes too.
+"""
+
+import logging
+import threading
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import F
+from django.utils import timezone
+
+from cash_ti_machann import tasks
+
+from . import fx
+from .limits import undo_consume
+from .models import BillPayment, PhoneTopUp, ProviderFulfilment, Transaction
+from .providers import BILL_PROVIDERS, ProviderDeclined, ProviderError, get_provider
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_SECONDS = 30
+MAX_BACKOFF_SECONDS = 3600
+
+
+def provider_for(transaction):
+    if transaction.transaction_type == 'topup':
+        return transaction.phone_topup.carrier
+    return BILL_PROVIDERS.get(transaction.bill_payment.bill_type, 'bills')
+
+
+def enqueue(transaction):
+    """Record the pending fulfilment and start it (or count it toward its provider's next
+    batch) once the caller's transaction commits."""
+    job = ProviderFulfilment.objects.create(
+        transaction=transaction, provider=provider_for(transaction), next_attempt_at=timezone.now(),
+    )
+    if get_provider(job.provider).batch:
+        tasks.submit(batcher.note, job.provider)
+    else:
+        tasks.submit(fulfil, transaction.pk)
+
+
+def _lease():
+    return timedelta(seconds=settings.PROVIDER_CONNECT_TIMEOUT + settings.PROVIDER_READ_TIMEOUT + 30)
+
+
+def _claim(transaction_id, now):
+    return ProviderFulfilment.objects.filter(
+        transaction_id=transaction_id, transaction__status='processing', next_attempt_at__lte=now,
+    ).update(attempts=F('attempts') + 1, next_attempt_at=now + _lease(), updated_at=now)
+
+
+def fulfil(transaction_id):
+    """One provider attempt for a 'processing' top-up or bill payment; returns the outcome."""
+    if not _claim(transaction_id, timezone.now()):
+        return None
+    job = ProviderFulfilment.objects.select_related('transaction').get(transaction_id=transaction_id)
+    tx = job.transaction
+    provider = get_provider(job.provider)
+    try:
+        if tx.transaction_type == 'topup':
+            reference = provider.topup(tx, tx.phone_topup)
+        else:
+            reference = provider.pay_bill(tx, tx.bill_payment)
+    except ProviderDeclined as e:
+        return refund(tx.pk, e.message)
+    except ProviderError as e:
+        return _failed_attempt(job, e.message, e.retry_after)
+    return settle(tx.pk, reference)
+
+
+def _failed_attempt(job, message, retry_after=None):
+    """Back off after a transient failure, or refund once the attempts are used up."""
+    if job.attempts >= settings.PROVIDER_MAX_ATTEMPTS:
+        return refund(job.transaction_id, message)
+    delay = min(BACKOFF_SECONDS * 2 ** (job.attempts - 1), MAX_BACKOFF_SECONDS)
+    ProviderFulfilment.objects.filter(pk=job.pk).update(
+        next_attempt_at=timezone.now() + timedelta(seconds=max(delay, retry_after or 0)),
+        last_error=message[:255], updated_at=timezone.now(),
+    )
+    logger.warning('Provider %s attempt %s for %s failed: %s', job.provider, job.attempts, job.transaction_id, message)
+    return 'retry'
+
+
+def _locked_processing(transaction_id):
+    return Transaction.objects.select_for_update().filter(pk=transaction_id, status='processing').first()
+
+
+def settle(transaction_id, reference):
+    with db_transaction.atomic():
+        tx = _locked_processing(transaction_id)
+        if tx is None:
+            return None
+        if tx.transaction_type == 'topup':
+            tx.phone_topup.carrier_reference = reference
+            tx.phone_topup.save(update_fields=['carrier_reference'])
+        else:
+            tx.bill_payment.provider_reference = reference
+            tx.bill_payment.save(update_fields=['provider_reference'])
+        tx.status = 'completed'
+        tx.processed_at = timezone.now()
+        tx.save(update_fields=['status', 'processed_at', 'updated_at'])
+        ProviderFulfilment.objects.filter(transaction_id=tx.pk).update(last_error='', updated_at=tx.processed_at)
+    return 'completed'
+
+
+def settle_many(kind, references):
+    """settle() for a batch: {transaction id: provider reference}, written in bulk."""
+    from accounts.utils.user360 import invalidate_stats
+
+    now = timezone.now()
+    with db_transaction.atomic():
+        locked = dict(Transaction.objects.select_for_update().filter(
+            pk__in=list(references), status='processing',
+        ).values_list('pk', 'sender_id'))
+        if not locked:
+            return 0
+        if kind == 'topup':
+            details = list(PhoneTopUp.objects.filter(transaction_id__in=list(locked)))
+            for detail in details:
+                detail.carrier_reference = references[detail.transaction_id]
+            PhoneTopUp.objects.bulk_update(details, ['carrier_reference'])
+        else:
+            details = list(BillPayment.objects.filter(transaction_id__in=list(locked)))
+            for detail in details:
+                detail.provider_reference = references[detail.transaction_id]
+            BillPayment.objects.bulk_update(details, ['provider_reference'])
+        Transaction.objects.filter(pk__in=list(locked)).update(status='completed', processed_at=now, updated_at=now)
+        ProviderFulfilment.objects.filter(transaction_id__in=list(locked)).update(last_error='', updated_at=now)
+        # update() skips the Transaction signals that drop cached stats
+        senders = set(locked.values())
+        db_transaction.on_commit(lambda: invalidate_stats(*senders))
+    return len(locked)
+
+
+def refund(transaction_id, reason):
+    """Fail the transaction and give the reserved money and limit usage back."""
+    with db_transaction.atomic():
+        tx = _locked_processing(transaction_id)
+        if tx is None:
+            return None
+        wallet = tx.sender.wallet
+        fx.credit(wallet, wallet.currency, tx.total_amount)
+        undo_consume(tx.sender, tx.amount, tx.created_at)
+        tx.status = 'failed'
+        tx.processed_at = timezone.now()
+        tx.save(update_fields=['status', 'processed_at', 'updated_at'])
+        ProviderFulfilment.objects.filter(transaction_id=tx.pk).update(last_error=reason[:255], updated_at=tx.processed_at)
+    return 'refunded'
+
+
+def due(now=None):
+    """Fulfilments whose next attempt is due, oldest first."""
+    return ProviderFulfilment.objects.filter(
+        transaction__status='processing', next_attempt_at__lte=now or timezone.now(),
+    ).order_by('next_attempt_at')
+
+
+def batching_providers():
+    return [name for name in settings.PAYMENT_PROVIDERS if get_provider(name).batch]
+
+
+def _claim_batch(provider, kind, now, size):
+    """Tag up to `size` due operations of one provider and kind with a new batch id."""
+    batch_id = uuid.uuid4()
+    ids = list(ProviderFulfilment.objects.filter(
+        provider=provider, transaction__transaction_type=kind, transaction__status='processing', next_attempt_at__lte=now,
+    ).order_by('next_attempt_at').values_list('pk', flat=True)[:size])
+    if not ids:
+        return []
+    ProviderFulfilment.objects.filter(pk__in=ids, next_attempt_at__lte=now).update(
+        batch_id=batch_id, attempts=F('attempts') + 1, next_attempt_at=now + _lease(), updated_at=now,
+    )
+    related = 'transaction__phone_topup' if kind == 'topup' else 'transaction__bill_payment'
+    return list(ProviderFulfilment.objects.filter(batch_id=batch_id).select_related('transaction', related))
+
+
+def _send_batch(provider, kind, jobs):
+    outcomes = Counter()
+    try:
+        results = provider.submit_batch(kind, [job.transaction for job in jobs])
+    except ProviderError as e:
+        outcomes.update(_failed_attempt(job, e.message, e.retry_after) for job in jobs)
+        return outcomes
+    settled = {}
+    for job in jobs:
+        result = results.get(job.transaction.reference_number)
+        if result is None:
+            outcomes[_failed_attempt(job, f'{provider.name}: pa gen rezilta nan lo a')] += 1
+        elif result[0]:
+            settled[job.transaction_id] = result[1]
+        else:
+            outcomes[refund(job.transaction_id, result[1])] += 1
+    if settled:
+        outcomes['completed'] += settle_many(kind, settled)
+    return outcomes
+
+
+def flush(provider_name, now=None):
+    """Send every due operation of a batching provider, a full batch per call. Returns the
+    outcome counts ('completed', 'refunded', 'retry')."""
+    provider = get_provider(provider_name)
+    size = settings.PROVIDER_BATCH_SIZE
+    batcher.clear(provider_name)
+    outcomes = Counter()
+    for kind in ('topup', 'bill_payment'):
+        while True:
+            jobs = _claim_batch(provider_name, kind, now or timezone.now(), size)
+            if jobs:
+                outcomes += _send_batch(provider, kind, jobs)
+            if len(jobs) < size:
+                break
+    return outcomes
+
+
+class Batcher:
+    """Counts operations waiting for each batching provider and flushes a provider's batch
+    when it is full or when its window, started by the first operation, closes. The
+    count is only a trigger: flush() reads what to send from the database."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._timers = {}
+
+    def note(self, provider):
+        with self._lock:
+            count = self._pending.get(provider, 0) + 1
+            full = count >= settings.PROVIDER_BATCH_SIZE
+            self._pending[provider] = count
+            # Inline (eager) tasks have no window: batches go out when full or from the retry command
+            if not full and provider not in self._timers and not getattr(settings, 'BACKGROUND_TASKS_EAGER', False):
+                timer = threading.Timer(settings.PROVIDER_BATCH_WINDOW_SECONDS, self._window_closed, [provider])
+                timer.daemon = True
+                self._timers[provider] = timer
+                timer.start()
+        if full:
+            flush(provider)
+
+    def clear(self, provider):
+        """Forget the waiting count and window: a flush is sending everything due."""
+        with self._lock:
+            self._pending[provider] = 0
+            timer = self._timers.pop(provider, None)
+        if timer is not None:
+            timer.cancel()
+
+    def _window_closed(self, provider):
+        tasks.submit(flush, provider)
+
+
+batcher = Batcher()
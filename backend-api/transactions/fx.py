@@ -0,0 +1,132 @@
+"""Exchange rates and per-currency wallet pockets.
+
+ExchangeRate rows are compiled into a RateTable — a dict from (from, to) to a Decimal rate,
+with the inverse of every row filled in when it has no row of its own — and kept per
+process behind a VersionedValue (cash_ti_machann/versioned.py); saving or deleting a rate
+bumps the version (accounts/signals.py). A conversion is a dict lookup and a multiply.
+
+A wallet holds its home currency on Wallet.balance and every other currency in a
+WalletBalance pocket. debit() and credit() move a pocket with one conditional UPDATE, so a
+cross-currency transfer is a debit, a conversion and a credit inside one atomic block.
+
+Fee tiers, limits and admin totals are in BASE_CURRENCY; to_base_sql() converts a
+Transaction's amount in the database so aggregates stay one query.
+"""
+
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db.models import Case, DecimalField, F, Value, When
+from django.utils import timezone
+
+from cash_ti_machann.versioned import VersionedValue
+
+BASE_CURRENCY = 'HTG'
+CENT = Decimal('0.01')
+RATE_PLACES = Decimal('0.00000001')
+ONE = Decimal('1')
+
+
+class RateUnavailable(Exception):
+    def __init__(self, from_currency, to_currency):
+        self.message = f'Pa gen to chanj pou {from_currency} -> {to_currency}'
+        super().__init__(self.message)
+
+
+class InsufficientFunds(Exception):
+    def __init__(self, currency):
+        self.message = f'Ou pa gen ase lajan {currency} nan wallet ou'
+        super().__init__(self.message)
+
+
+class RateTable:
+    __slots__ = ('_rates',)
+
+    def __init__(self, rows):
+        rates = {}
+        for base, quote, rate in rows:
+            if rate > 0:
+                rates.setdefault((quote, base), (ONE / rate).quantize(RATE_PLACES))
+        for base, quote, rate in rows:
+            if rate > 0:
+                rates[(base, quote)] = rate
+        self._rates = rates
+
+    def rate(self, from_currency, to_currency):
+        if from_currency == to_currency:
+            return ONE
+        rate = self._rates.get((from_currency, to_currency))
+        if rate is None:
+            raise RateUnavailable(from_currency, to_currency)
+        return rate
+
+    def rates_to(self, currency):
+        """{from_currency: rate} for every currency convertible to `currency`."""
+        return {source: rate for (source, target), rate in self._rates.items() if target == currency}
+
+    def describe(self):
+        return [
+            {'from': source, 'to': target, 'rate': str(rate)}
+            for (source, target), rate in sorted(self._rates.items())
+        ]
+
+
+def _compile():
+    from .models import ExchangeRate
+
+    return RateTable(list(ExchangeRate.objects.values_list('base_currency', 'quote_currency', 'rate')))
+
+
+exchange_rates = VersionedValue('exchange_rates', _compile)
+
+
+def convert(amount, from_currency, to_currency):
+    """(converted amount rounded to the cent, rate used); RateUnavailable without a rate."""
+    rate = exchange_rates.get().rate(from_currency, to_currency)
+    return (amount * rate).quantize(CENT, rounding=ROUND_HALF_UP), rate
+
+
+def to_base(amount, currency):
+    return convert(amount, currency, BASE_CURRENCY)[0]
+
+
+def to_base_sql(amount='amount', currency='currency', target=BASE_CURRENCY):
+    """`amount` converted to `target` as a SQL expression, rates inlined from the cache.
+    Rows in a currency without a rate come out NULL, so Sum() leaves them out."""
+    whens = [When(**{currency: target}, then=F(amount))]
+    whens += [
+        When(**{currency: source}, then=F(amount) * Value(rate))
+        for source, rate in sorted(exchange_rates.get().rates_to(target).items())
+    ]
+    return Case(*whens, default=Value(None), output_field=DecimalField(max_digits=20, decimal_places=2))
+
+
+def pocket_balances(wallet):
+    """{currency: balance} of every pocket, home currency first."""
+    balances = {wallet.currency: wallet.balance}
+    balances.update(wallet.balances.exclude(currency=wallet.currency).order_by('currency').values_list('currency', 'balance'))
+    return balances
+
+
+def _pocket(wallet, currency):
+    from accounts.models import Wallet, WalletBalance
+
+    if currency == wallet.currency:
+        return Wallet.objects.filter(pk=wallet.pk)
+    return WalletBalance.objects.filter(wallet=wallet, currency=currency)
+
+
+def debit(wallet, currency, amount):
+    """Take `amount` from the `currency` pocket; InsufficientFunds if it holds less."""
+    if not _pocket(wallet, currency).filter(balance__gte=amount).update(
+        balance=F('balance') - amount, updated_at=timezone.now(),
+    ):
+        raise InsufficientFunds(currency)
+
+
+def credit(wallet, currency, amount):
+    """Add `amount` to the `currency` pocket, opening it on first use."""
+    from accounts.models import WalletBalance
+
+    if currency != wallet.currency:
+        WalletBalance.objects.get_or_create(wallet=wallet, currency=currency)
+    _pocket(wallet, currency).update(balance=F('balance') + amount, updated_at=timezone.now())
@@ -0,0 +1,137 @@
+"""Windowed limit counters: AgentLimit, AgentProfile monthly volume and EnterpriseProfile
+monthly transaction limit.
+
+Each counter stores the key of the window its usage belongs to ('2025-03-14' for daily,
+'2025-03' for monthly, '' for never) next to the usage. Nothing resets counters on a
+schedule: the first consume() in a new window sees a stale key and counts from zero, in
+the same conditional UPDATE that checks the limit and adds the amount. No row is read
+before it is written, so concurrent payments can't both slip under a limit.
+
+Money paths call check_and_consume() inside their transaction.atomic(), so usage is
+rolled back together with the payment when anything after it fails.
+"""
+
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+LIMIT_MESSAGES = {
+    'single_transaction': 'Montan an depase limit pa tranzaksyon ajan an',
+    'daily_transaction': 'Ajan an rive nan limit jounen li',
+    'monthly_transaction': 'Ajan an rive nan limit mwa li',
+    'cash_balance': 'Ajan an rive nan limit kach li ka kenbe',
+}
+AGENT_VOLUME_MESSAGE = 'Ajan an rive nan limit volim mwa li'
+ENTERPRISE_VOLUME_MESSAGE = 'Antrepriz la rive nan limit tranzaksyon mwa li'
+
+
+class LimitExceeded(Exception):
+    """A limit would be overrun; `message` is user-facing."""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def period_key(reset_period, now=None):
+    now = timezone.localtime(now or timezone.now())
+    if reset_period == 'daily':
+        return now.strftime('%Y-%m-%d')
+    if reset_period == 'monthly':
+        return now.strftime('%Y-%m')
+    return ''
+
+
+def consume(queryset, amount, key, usage='current_usage', limit='limit_amount', period='usage_period', extra=None):
+    """Add `amount` to the counter of the rows in `queryset` if it stays within the limit.
+
+    A row whose period is not `key` counts from zero and moves to `key`. Returns True when
+    the counter was updated, False when the limit (or a missing row) refused it.
+    """
+    current = Q(**{period: key})
+    within = (current & Q(**{f'{usage}__lte': F(limit) - amount})) | (~current & Q(**{f'{limit}__gte': amount}))
+    return bool(queryset.filter(within).update(**{
+        usage: Case(When(current, then=F(usage) + amount), default=Value(amount)),
+        period: key,
+        **(extra or {}),
+    }))
+
+
+def release(queryset, amount, key, usage='current_usage', period='usage_period', extra=None):
+    """Give `amount` back to a counter still in window `key`; one that rolled over is left alone."""
+    return queryset.filter(**{period: key}).update(**{usage: F(usage) - amount, **(extra or {})})
+
+
+def _consume_agent(user, amount, operation, now):
+    from accounts.models import AgentProfile
+    from agents.models import AgentLimit
+
+    month = period_key('monthly', now)
+    profiles = AgentProfile.objects.filter(user=user)
+    if not consume(profiles, amount, month, usage='current_month_volume', limit='monthly_limit',
+                   period='volume_period', extra={'updated_at': now}) and profiles.exists():
+        raise LimitExceeded(AGENT_VOLUME_MESSAGE)
+
+    # Volume limits count both directions; cash_balance tracks the cash in the agent's
+    # drawer (up on cash-in, down on cash-out)
+    for limit in AgentLimit.objects.filter(agent=user, is_active=True).order_by('id'):
+        if limit.limit_type == 'single_transaction':
+            if amount > limit.limit_amount:
+                raise LimitExceeded(LIMIT_MESSAGES['single_transaction'])
+            continue
+        key = period_key(limit.reset_period, now)
+        rows = AgentLimit.objects.filter(id=limit.id)
+        if limit.limit_type == 'cash_balance' and operation == 'cash_out':
+            release(rows, amount, key, extra={'updated_at': now})
+            continue
+        stamp = {'updated_at': now, 'last_reset': Case(When(usage_period=key, then=F('last_reset')), default=Value(now))}
+        if not consume(rows, amount, key, extra=stamp):
+            raise LimitExceeded(LIMIT_MESSAGES.get(limit.limit_type, 'Limit ajan an depase'))
+
+
+def _consume_enterprise(user, amount, now):
+    from accounts.models import EnterpriseProfile
+
+    profiles = EnterpriseProfile.objects.filter(user=user)
+    if not consume(profiles, amount, period_key('monthly', now), usage='current_month_volume',
+                   limit='monthly_transaction_limit', period='volume_period',
+                   extra={'updated_at': now}) and profiles.exists():
+        raise LimitExceeded(ENTERPRISE_VOLUME_MESSAGE)
+
+
+def check_and_consume(user, amount, operation=None, now=None):
+    """Charge `amount` against every limit that applies to `user` or raise LimitExceeded.
+
+    `operation` is the agent operation ('cash_in'/'cash_out') when it matters for the
+    cash_balance limit. Clients have no windowed limits. Must run inside the caller's
+    transaction.atomic(): a refusal after some counters were bumped relies on the rollback.
+    """
+    if user is None:
+        return
+    now = now or timezone.now()
+    if user.user_type == 'agent':
+        _consume_agent(user, amount, operation, now)
+    elif user.user_type == 'enterprise':
+        _consume_enterprise(user, amount, now)
+
+
+def undo_consume(user, amount, consumed_at):
+    """Give back what check_and_consume(user, amount) charged at `consumed_at`, for a payment
+    that failed after it committed (not for agent cash-outs, which release cash_balance).
+    Counters whose window has rolled over since are left alone."""
+    from accounts.models import AgentProfile, EnterpriseProfile
+    from agents.models import AgentLimit
+
+    if user is None:
+        return
+    now = timezone.now()
+    month = period_key('monthly', consumed_at)
+    if user.user_type == 'agent':
+        release(AgentProfile.objects.filter(user=user), amount, month, usage='current_month_volume',
+                period='volume_period', extra={'updated_at': now})
+        for limit in AgentLimit.objects.filter(agent=user, is_active=True).exclude(limit_type='single_transaction'):
+            release(AgentLimit.objects.filter(id=limit.id), amount, period_key(limit.reset_period, consumed_at),
+                    extra={'updated_at': now})
+    elif user.user_type == 'enterprise':
+        release(EnterpriseProfile.objects.filter(user=user), amount, month, usage='current_month_volume',
+                period='volume_period', extra={'updated_at': now})
@@ -0,0 +1,24 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from transactions.fulfilment import batching_providers, due, flush, fulfil
+
+
+class Command(BaseCommand):
+    help = 'Retry top-ups and bill payments whose provider call is due (run every minute from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=200, help='Most single (non-batched) operations to attempt in this run')
+
+    def handle(self, *args, **options):
+        batched = batching_providers()
+        outcomes = Counter()
+        for provider in batched:
+            outcomes += flush(provider)
+        single = due().exclude(provider__in=batched).values_list('transaction_id', flat=True)
+        outcomes.update(fulfil(transaction_id) for transaction_id in list(single[:options['limit']]))
+        outcomes.pop(None, None)  # claimed by someone else meanwhile
+        self.stdout.write(
+            f"completed={outcomes['completed']} refunded={outcomes['refunded']} retry={outcomes['retry']}"
+        )
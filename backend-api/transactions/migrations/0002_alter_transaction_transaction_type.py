@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='transaction_type',
+            field=models.CharField(choices=[('send', 'Send Money'), ('receive', 'Receive Money'), ('topup', 'Phone Top Up'), ('bill_payment', 'Bill Payment'), ('recharge', 'Account Recharge'), ('withdrawal', 'Withdrawal'), ('deposit', 'Deposit'), ('commission', 'Agent Commission')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0002_alter_transaction_transaction_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeeSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('operation', models.CharField(choices=[('send', 'Send Money'), ('qr_payment', 'QR Payment'), ('topup', 'Phone Top Up'), ('bill_payment', 'Bill Payment'), ('card_deposit', 'Card Deposit'), ('agent_withdrawal', 'Agent Withdrawal'), ('merchant_payment', 'Merchant Payment')], max_length=30)),
+                ('user_type', models.CharField(blank=True, default='', max_length=20)),
+                ('min_amount', models.DecimalField(decimal_places=2, default=0.0, max_digits=12)),
+                ('percent', models.DecimalField(decimal_places=3, default=0.0, max_digits=6)),
+                ('flat_fee', models.DecimalField(decimal_places=2, default=0.0, max_digits=10)),
+                ('minimum_fee', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('maximum_fee', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['operation', 'user_type', 'min_amount'],
+                'unique_together': {('operation', 'user_type', 'min_amount')},
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:40
+
+from decimal import Decimal
+
+from django.db import migrations
+
+# The fees the views used to hardcode: (operation, percent, flat_fee)
+DEFAULT_FEES = [
+    ('send', Decimal('1.000'), Decimal('0.00')),
+    ('qr_payment', Decimal('1.000'), Decimal('0.00')),
+    ('topup', Decimal('0.000'), Decimal('5.00')),
+    ('bill_payment', Decimal('0.500'), Decimal('0.00')),
+    ('card_deposit', Decimal('2.500'), Decimal('10.00')),
+    ('agent_withdrawal', Decimal('0.000'), Decimal('25.00')),
+    ('merchant_payment', Decimal('0.000'), Decimal('0.00')),
+]
+
+
+def seed_fee_schedule(apps, schema_editor):
+    FeeSchedule = apps.get_model('transactions', 'FeeSchedule')
+    for operation, percent, flat_fee in DEFAULT_FEES:
+        FeeSchedule.objects.using(schema_editor.connection.alias).get_or_create(
+            operation=operation, user_type='', min_amount=Decimal('0.00'),
+            defaults={'percent': percent, 'flat_fee': flat_fee},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0003_feeschedule'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_fee_schedule, migrations.RunPython.noop),
+    ]
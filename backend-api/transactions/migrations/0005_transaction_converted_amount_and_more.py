@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0004_seed_fee_schedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='converted_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='converted_currency',
+            field=models.CharField(blank=True, max_length=3, null=True),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='exchange_rate',
+            field=models.DecimalField(blank=True, decimal_places=8, max_digits=18, null=True),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='transaction_type',
+            field=models.CharField(choices=[('send', 'Send Money'), ('receive', 'Receive Money'), ('topup', 'Phone Top Up'), ('bill_payment', 'Bill Payment'), ('recharge', 'Account Recharge'), ('withdrawal', 'Withdrawal'), ('deposit', 'Deposit'), ('commission', 'Agent Commission'), ('exchange', 'Currency Exchange')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='ExchangeRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('base_currency', models.CharField(max_length=3)),
+                ('quote_currency', models.CharField(max_length=3)),
+                ('rate', models.DecimalField(decimal_places=8, max_digits=18)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('base_currency', 'quote_currency')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0006_providerfulfilment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='providerfulfilment',
+            name='batch_id',
+            field=models.UUIDField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:28
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('transactions', '0007_providerfulfilment_batch_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VelocityDecision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('operation', models.CharField(max_length=30)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('decision', models.CharField(choices=[('review', 'Review'), ('block', 'Block')], max_length=10)),
+                ('rules', models.JSONField(default=list)),
+                ('device_id', models.CharField(blank=True, default='', max_length=64)),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('reviewed', models.BooleanField(default=False)),
+                ('reviewed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('receiver', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('reviewed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='velocity_decisions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['reviewed', 'created_at'], name='transaction_reviewe_9bc9b4_idx')],
+            },
+        ),
+    ]
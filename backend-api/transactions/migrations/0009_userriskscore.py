@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:32
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0023_walletbalance'),
+        ('transactions', '0008_velocitydecision'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserRiskScore',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='risk_score', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('score', models.FloatField(db_index=True)),
+                ('flags', models.JSONField(default=list)),
+                ('features', models.JSONField(default=dict)),
+                ('transactions_seen', models.PositiveIntegerField(default=0)),
+                ('computed_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
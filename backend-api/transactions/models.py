@@ -13,6 +13,8 @@ class Transaction(models.Model):
         ('recharge', 'Account Recharge'),
         ('withdrawal', 'Withdrawal'),
         ('deposit', 'Deposit'),
+        ('commission', 'Agent Commission'),
+        ('exchange', 'Currency Exchange'),
     )
     
     STATUS_CHOICES = (
@@ -31,6 +33,10 @@ class Transaction(models.Model):
     fee = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     total_amount = models.DecimalField(max_digits=12, decimal_places=2)  # amount + fee
     currency = models.CharField(max_length=3, default='HTG')
+    # Cross-currency transfers: what the receiving side got, and at which rate
+    converted_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    converted_currency = models.CharField(max_length=3, null=True, blank=True)
+    exchange_rate = models.DecimalField(max_digits=18, decimal_places=8, null=True, blank=True)
     reference_number = models.CharField(max_length=50, unique=True)
     description = models.TextField(null=True, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
@@ -80,6 +86,62 @@ class BillPayment(models.Model):
     def __str__(self):
         return f"{self.bill_type} - {self.account_number}"
 
+class ProviderFulfilment(models.Model):
+    """Delivery of a top-up or bill payment by its provider (transactions/fulfilment.py).
+    The transaction stays 'processing' until the provider confirms or refuses it."""
+    transaction = models.OneToOneField(Transaction, on_delete=models.CASCADE, related_name='fulfilment')
+    provider = models.CharField(max_length=20)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(db_index=True)
+    last_error = models.CharField(max_length=255, blank=True, default='')
+    # Batch that claimed the latest attempt (batching providers only)
+    batch_id = models.UUIDField(null=True, blank=True, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.provider} - {self.transaction.reference_number} ({self.attempts})"
+
+class VelocityDecision(models.Model):
+    """A payment that tripped a velocity rule (transactions/velocity.py), kept for review."""
+    DECISIONS = (
+        ('review', 'Review'),
+        ('block', 'Block'),
+    )
+    
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='velocity_decisions')
+    receiver = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    operation = models.CharField(max_length=30)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    decision = models.CharField(max_length=10, choices=DECISIONS)
+    rules = models.JSONField(default=list)  # [{rule, action, count, amount}] that fired
+    device_id = models.CharField(max_length=64, blank=True, default='')
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    reviewed = models.BooleanField(default=False)
+    reviewed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    reviewed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['reviewed', 'created_at'])]
+    
+    def __str__(self):
+        return f"{self.decision} {self.operation} {self.amount} ({self.created_at:%Y-%m-%d %H:%M})"
+
+class UserRiskScore(models.Model):
+    """Offline anomaly score of a user's transaction history (transactions/anomaly.py),
+    rewritten by each run of manage.py score_transaction_anomalies."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='risk_score')
+    score = models.FloatField(db_index=True)  # 0-100
+    flags = models.JSONField(default=list)  # ['mule', 'structuring', ...]
+    features = models.JSONField(default=dict)
+    transactions_seen = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField(db_index=True)
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.score:.1f}"
+
 class AgentTransaction(models.Model):
     agent = models.ForeignKey(User, on_delete=models.CASCADE, related_name='agent_transactions')
     transaction = models.ForeignKey(Transaction, on_delete=models.CASCADE, related_name='agent_records')
@@ -109,3 +171,52 @@ class WalletHistory(models.Model):
     
     def __str__(self):
         return f"{self.operation_type} {self.amount} - {self.wallet.user.username}"
+
+class ExchangeRate(models.Model):
+    """1 base_currency = rate quote_currency. The reverse direction uses 1 / rate unless it
+    has its own row. Cached in memory by transactions/fx.py."""
+    base_currency = models.CharField(max_length=3)
+    quote_currency = models.CharField(max_length=3)
+    rate = models.DecimalField(max_digits=18, decimal_places=8)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['base_currency', 'quote_currency']
+    
+    def __str__(self):
+        return f"1 {self.base_currency} = {self.rate} {self.quote_currency}"
+
+class FeeSchedule(models.Model):
+    """One fee tier: applies to amounts from min_amount up to the next tier of the same
+    operation/user_type. Fee = amount * percent / 100 + flat_fee, clamped to
+    [minimum_fee, maximum_fee]. A user_type row set replaces the default ('') tiers for
+    that kind of user. Compiled into an in-memory table by transactions/fees.py.
+    """
+    OPERATIONS = (
+        ('send', 'Send Money'),
+        ('qr_payment', 'QR Payment'),
+        ('topup', 'Phone Top Up'),
+        ('bill_payment', 'Bill Payment'),
+        ('card_deposit', 'Card Deposit'),
+        ('agent_withdrawal', 'Agent Withdrawal'),
+        ('merchant_payment', 'Merchant Payment'),
+    )
+    
+    operation = models.CharField(max_length=30, choices=OPERATIONS)
+    user_type = models.CharField(max_length=20, blank=True, default='')  # '' = everyone
+    min_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
+    percent = models.DecimalField(max_digits=6, decimal_places=3, default=0.000)
+    flat_fee = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    minimum_fee = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    maximum_fee = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['operation', 'user_type', 'min_amount']
+        ordering = ['operation', 'user_type', 'min_amount']
+    
+    def __str__(self):
+        who = self.user_type or 'all'
+        return f"{self.operation} ({who}) from {self.min_amount}: {self.percent}% + {self.flat_fee}"
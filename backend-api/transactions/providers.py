@@ -0,0 +1,241 @@
+"""Provider adapters for phone top-ups and bill payments (Digicel, Natcom, EDH, DINEPA, ...).
+
+Every provider is an HTTP API configured in settings.PAYMENT_PROVIDERS. One
+requests.Session per provider keeps a pool of keep-alive connections shared by the
+fulfilment workers; every call has connect and read timeouts, and a CircuitBreaker per
+provider stops calling one that keeps failing, letting a single trial call through once
+the cool-down has passed.
+
+Protocol: POST {base_url}/topups or {base_url}/payments with a JSON body keyed by our
+reference number (the provider's idempotency key, so a retried call never charges twice),
+answered with {"status": "success", "reference": "..."} or {"status": "failed", "message": "..."}.
+Providers configured with 'batch' also take many items per call at {path}/batch
+(submit_batch); transactions/fulfilment.py groups their operations.
+"""
+
+import threading
+import time
+import uuid
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+# Bill types with a dedicated provider; the rest go through the generic 'bills' aggregator
+BILL_PROVIDERS = {'electricity': 'edh', 'water': 'dinepa'}
+
+
+class ProviderError(Exception):
+    """Transient failure (timeout, connection error, 5xx, open circuit); retried later."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.message = message
+        self.retry_after = retry_after
+
+
+class ProviderDeclined(Exception):
+    """The provider refused the payment (unknown number or account, ...); refunded."""
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+class CircuitBreaker:
+    """closed -> (threshold consecutive failures) -> open -> (reset_timeout) -> one trial call."""
+
+    def __init__(self, threshold, reset_timeout, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+
+    @property
+    def is_open(self):
+        return self._opened_at is not None
+
+    def before_call(self):
+        """Raise ProviderError while the circuit is open; admit one trial call after the cool-down."""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self._opened_at + self.reset_timeout - self._clock()
+            if remaining > 0 or self._trial:
+                raise ProviderError('Sèvis founisè a pa disponib kounye a', retry_after=max(remaining, 1))
+            self._trial = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.threshold:
+                self._opened_at = self._clock()
+            self._trial = False
+
+
+class HttpProvider:
+    def __init__(self, name, base_url, api_key='', timeout=(3.05, 15), pool_size=4,
+                 breaker_threshold=5, breaker_reset=30, batch=False):
+        self.name = name
+        self.batch = batch
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset)
+        self.session = requests.Session()
+        # Retries are ours (fulfilment reschedules), not urllib3's
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if api_key:
+            self.session.headers['Authorization'] = f'Bearer {api_key}'
+
+    def _request(self, path, payload):
+        """The JSON body of a 2xx answer; ProviderError when the provider is unreachable or
+        failing, ProviderDeclined for any other non-2xx answer."""
+        self.breaker.before_call()
+        try:
+            response = self.session.post(f'{self.base_url}{path}', json=payload, timeout=self.timeout)
+        except requests.RequestException as e:
+            self.breaker.record_failure()
+            raise ProviderError(f'{self.name}: {e.__class__.__name__}')
+        if response.status_code >= 500 or response.status_code == 429:
+            self.breaker.record_failure()
+            retry_after = response.headers.get('Retry-After')
+            raise ProviderError(f'{self.name}: HTTP {response.status_code}',
+                                retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None)
+        # The provider answered: it is up, whatever it says about this payment
+        self.breaker.record_success()
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        if response.status_code >= 400:
+            raise ProviderDeclined(body.get('message') or f'{self.name}: HTTP {response.status_code}')
+        return body
+
+    def _post(self, path, payload):
+        body = self._request(path, payload)
+        if body.get('status') != 'success':
+            raise ProviderDeclined(body.get('message') or f'{self.name}: refize')
+        if not body.get('reference'):
+            raise ProviderError(f'{self.name}: san referans')
+        return str(body['reference'])
+
+    @staticmethod
+    def _topup_item(transaction, topup):
+        return {
+            'reference': transaction.reference_number,
+            'phone': topup.recipient_phone,
+            'amount': str(transaction.amount),
+            'currency': transaction.currency,
+            'message': topup.message or '',
+        }
+
+    @staticmethod
+    def _bill_item(transaction, bill):
+        return {
+            'reference': transaction.reference_number,
+            'bill_type': bill.bill_type,
+            'account_number': bill.account_number,
+            'service_provider': bill.service_provider,
+            'amount': str(transaction.amount),
+            'currency': transaction.currency,
+        }
+
+    def topup(self, transaction, topup):
+        return self._post('/topups', self._topup_item(transaction, topup))
+
+    def pay_bill(self, transaction, bill):
+        return self._post('/payments', self._bill_item(transaction, bill))
+
+    def submit_batch(self, kind, transactions):
+        """Send many top-ups ('topup') or bill payments in one call to {path}/batch.
+
+        Answer: {"results": [{"reference": ours, "status": "success", "provider_reference": ...}
+        or {"reference": ours, "status": "failed", "message": ...}]}. Returns {our reference:
+        (True, provider reference) or (False, message)}; items missing from the answer are
+        left out and retried. A refused batch as a whole is a ProviderError, not a decline.
+        """
+        if kind == 'topup':
+            path, items = '/topups/batch', [self._topup_item(tx, tx.phone_topup) for tx in transactions]
+        else:
+            path, items = '/payments/batch', [self._bill_item(tx, tx.bill_payment) for tx in transactions]
+        try:
+            body = self._request(path, {'items': items})
+        except ProviderDeclined as e:
+            raise ProviderError(e.message)
+        results = {}
+        for item in body.get('results') or []:
+            reference = item.get('reference')
+            if item.get('status') == 'success' and item.get('provider_reference'):
+                results[reference] = (True, str(item['provider_reference']))
+            elif item.get('status') == 'failed':
+                results[reference] = (False, item.get('message') or f'{self.name}: refize')
+        return results
+
+
+class SandboxProvider:
+    """Stands in for a provider without a base_url: settles at once with a made-up reference."""
+
+    batch = False
+
+    def __init__(self, name):
+        self.name = name
+
+    def _reference(self):
+        return f'{self.name.upper()}{uuid.uuid4().hex[:6].upper()}'
+
+    def topup(self, transaction, topup):
+        return self._reference()
+
+    def pay_bill(self, transaction, bill):
+        return self._reference()
+
+    def submit_batch(self, kind, transactions):
+        return {tx.reference_number: (True, self._reference()) for tx in transactions}
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(name):
+    """The process-wide adapter for `name`, built on first use."""
+    provider = _providers.get(name)
+    if provider is None:
+        with _providers_lock:
+            provider = _providers.get(name)
+            if provider is None:
+                config = settings.PAYMENT_PROVIDERS.get(name, {})
+                if config.get('base_url'):
+                    provider = HttpProvider(
+                        name, config['base_url'], config.get('api_key', ''),
+                        timeout=(settings.PROVIDER_CONNECT_TIMEOUT, settings.PROVIDER_READ_TIMEOUT),
+                        pool_size=settings.PROVIDER_POOL_SIZE,
+                        breaker_threshold=settings.PROVIDER_BREAKER_THRESHOLD,
+                        breaker_reset=settings.PROVIDER_BREAKER_RESET_SECONDS,
+                        batch=bool(config.get('batch')),
+                    )
+                else:
+                    provider = SandboxProvider(name)
+                _providers[name] = provider
+    return provider
+
+
+def reset_providers():
+    """Drop the adapters (and their pools) so the next call reads settings again."""
+    with _providers_lock:
+        for provider in _providers.values():
+            session = getattr(provider, 'session', None)
+            if session is not None:
+                session.close()
+        _providers.clear()
@@ -16,7 +16,8 @@ class TransactionSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'transaction_type', 'sender', 'receiver', 'sender_name', 'receiver_name',
             'sender_phone', 'receiver_phone', 'sender_email', 'receiver_email',
-            'amount', 'fee', 'total_amount', 'currency', 'reference_number',
+            'amount', 'fee', 'total_amount', 'currency', 'converted_amount', 'converted_currency',
+            'exchange_rate', 'reference_number',
             'description', 'status', 'created_at', 'updated_at', 'processed_at',
             'display_type'
         ]
@@ -40,7 +41,8 @@ class TransactionSerializer(serializers.ModelSerializer):
             'bill_payment': 'Peye Faktè',
             'recharge': 'Rechaje Kont',
             'withdrawal': 'Retire Lajan',
-            'deposit': 'Depo Lajan'
+            'deposit': 'Depo Lajan',
+            'exchange': 'Chanj Lajan'
         }
         return type_map.get(obj.transaction_type, obj.transaction_type)
 
@@ -1,3 +1,562 @@
-from django.test import TestCase
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
 
-# Create your tests here.
+import numpy as np
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import Sum
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from accounts.models import AgentProfile, EnterpriseProfile, User, UserProfile, Wallet, WalletBalance
+from agents.models import AgentLimit
+from transactions import anomaly, fx, velocity
+from transactions.fees import compute_fee, fee_table, quote
+from transactions.fulfilment import batcher, flush, fulfil
+from transactions.limits import LimitExceeded, check_and_consume, period_key
+from transactions.models import ExchangeRate, FeeSchedule, ProviderFulfilment, Transaction, UserRiskScore, VelocityDecision
+from transactions.providers import CircuitBreaker, ProviderError, reset_providers
+
+
+class WindowedLimitTests(APITestCase):
+    def setUp(self):
+        self.business = User.objects.create_user(username='limitbiz', email='limitbiz@example.com', password='Bizpass123!', user_type='enterprise', phone_number='50938000001')
+        UserProfile.objects.create(user=self.business, first_name='Biz', last_name='Test').set_pin('1234')
+        self.enterprise = EnterpriseProfile.objects.create(
+            user=self.business, company_name='Biz SA', company_registration_number='REG-LIM-1', business_type='retail',
+            monthly_transaction_limit=Decimal('1000.00'),
+        )
+        self.business_wallet = Wallet.objects.create(user=self.business, balance=Decimal('5000.00'))
+        self.payee = User.objects.create_user(username='limitpayee', email='limitpayee@example.com', password='Payeepass123!', phone_number='50938000002')
+        self.payee_wallet = Wallet.objects.create(user=self.payee, balance=Decimal('0.00'))
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {Token.objects.create(user=self.business).key}'}
+
+    def send(self, amount):
+        return self.client.post(reverse('send_money'), {'receiver_phone': '50938000002', 'amount': amount, 'pin': '1234'}, format='json', **self.auth)
+
+    def test_period_keys(self):
+        now = datetime(2025, 3, 14, 18, 30, tzinfo=dt_timezone.utc)
+        self.assertEqual(period_key('daily', now), '2025-03-14')
+        self.assertEqual(period_key('monthly', now), '2025-03')
+        self.assertEqual(period_key('never', now), '')
+
+    def test_enterprise_monthly_limit_refuses_and_rolls_back(self):
+        self.assertEqual(self.send('600').status_code, 201)
+        resp = self.send('500')
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.data['error'], 'Antrepriz la rive nan limit tranzaksyon mwa li')
+
+        self.enterprise.refresh_from_db()
+        self.assertEqual((self.enterprise.current_month_volume, self.enterprise.volume_period), (Decimal('600.00'), period_key('monthly')))
+        self.payee_wallet.refresh_from_db()
+        self.assertEqual(self.payee_wallet.balance, Decimal('600.00'))
+        self.assertEqual(Transaction.objects.filter(sender=self.business).count(), 1)
+
+    def test_stale_window_is_reset_on_first_touch(self):
+        EnterpriseProfile.objects.filter(pk=self.enterprise.pk).update(current_month_volume=Decimal('990.00'), volume_period='2000-01')
+        self.assertEqual(self.send('700').status_code, 201)
+        self.enterprise.refresh_from_db()
+        self.assertEqual((self.enterprise.current_month_volume, self.enterprise.volume_period), (Decimal('700.00'), period_key('monthly')))
+
+    def test_agent_limits_and_volume(self):
+        agent = User.objects.create_user(username='limitagent', email='limitagent@example.com', password='Agentpass123!', user_type='agent')
+        profile = AgentProfile.objects.create(user=agent, agent_code='AGT900', is_approved=True, monthly_limit=Decimal('5000.00'))
+        stale = datetime(2000, 1, 1, tzinfo=dt_timezone.utc)
+        limit = AgentLimit.objects.create(agent=agent, limit_type='daily_transaction', limit_amount=Decimal('600.00'), reset_period='daily', usage_period='2000-01-01', current_usage=Decimal('550.00'))
+        AgentLimit.objects.filter(pk=limit.pk).update(last_reset=stale)
+        AgentLimit.objects.create(agent=agent, limit_type='single_transaction', limit_amount=Decimal('450.00'), reset_period='never')
+
+        check_and_consume(agent, Decimal('400'))
+        limit.refresh_from_db()
+        self.assertEqual((limit.current_usage, limit.usage_period), (Decimal('400.00'), period_key('daily')))
+        self.assertGreater(limit.last_reset, stale)
+        with self.assertRaises(LimitExceeded), transaction.atomic():
+            check_and_consume(agent, Decimal('500'))  # over the single-transaction limit
+        with self.assertRaises(LimitExceeded), transaction.atomic():
+            check_and_consume(agent, Decimal('300'))  # over the daily limit
+
+        # the refused calls were rolled back with their transaction
+        profile.refresh_from_db()
+        self.assertEqual(profile.current_month_volume, Decimal('400.00'))
+
+
+class FeeScheduleTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='feeuser', email='feeuser@example.com', password='Feepass123!')
+        self.agent = User.objects.create_user(username='feeagent', email='feeagent@example.com', password='Agentpass123!', user_type='agent')
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {Token.objects.create(user=self.user).key}'}
+        # Schedule edits are rolled back with the test; make the next test recompile
+        self.addCleanup(fee_table.bump)
+
+    def test_seeded_schedule_keeps_previous_fees(self):
+        amount = Decimal('1000')
+        self.assertEqual(compute_fee('send', amount, self.user), Decimal('10.00'))
+        self.assertEqual(compute_fee('topup', amount, self.user), Decimal('5.00'))
+        self.assertEqual(compute_fee('bill_payment', amount, self.user), Decimal('5.00'))
+        self.assertEqual(compute_fee('agent_withdrawal', amount, self.user), Decimal('25.00'))
+        self.assertEqual(compute_fee('merchant_payment', amount, self.user), Decimal('0.00'))
+        self.assertEqual(quote('card_deposit', amount, self.user), {'fee': Decimal('35.00'), 'total_amount': amount, 'net_amount': Decimal('965.00')})
+
+    def test_tiers_caps_minimums_and_user_type_overrides(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            FeeSchedule.objects.filter(operation='send').update(minimum_fee=Decimal('2.00'))
+            FeeSchedule.objects.create(operation='send', min_amount=Decimal('5000'), percent=Decimal('0.5'), maximum_fee=Decimal('100'))
+            FeeSchedule.objects.create(operation='send', user_type='agent', percent=Decimal('0'), flat_fee=Decimal('3'))
+        self.assertEqual(compute_fee('send', Decimal('50'), self.user), Decimal('2.00'))  # minimum
+        self.assertEqual(compute_fee('send', Decimal('4999.99'), self.user), Decimal('50.00'))
+        self.assertEqual(compute_fee('send', Decimal('5000'), self.user), Decimal('25.00'))  # next tier
+        self.assertEqual(compute_fee('send', Decimal('40000'), self.user), Decimal('100.00'))  # cap
+        self.assertEqual(compute_fee('send', Decimal('40000'), self.agent), Decimal('3.00'))
+
+    def test_table_reloads_only_when_the_version_moves(self):
+        fee_table.get()
+        FeeSchedule.objects.filter(operation='topup').update(flat_fee=Decimal('7.00'))  # no signal, no bump
+        self.assertEqual(compute_fee('topup', Decimal('100'), self.user), Decimal('5.00'))
+        fee_table.bump()
+        self.assertEqual(compute_fee('topup', Decimal('100'), self.user), Decimal('7.00'))
+
+    def test_quote_and_schedule_endpoints(self):
+        resp = self.client.get(reverse('fee_quote'), {'operation': 'send', 'amounts': '100,2500'}, **self.auth)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([(q['fee'], q['total_amount']) for q in resp.data['quotes']], [('1.00', '101.00'), ('25.00', '2525.00')])
+        self.assertEqual(self.client.get(reverse('fee_quote'), {'operation': 'nope', 'amount': '10'}, **self.auth).status_code, 400)
+        self.assertEqual(self.client.get(reverse('fee_quote'), {'operation': 'send', 'amount': '-5'}, **self.auth).status_code, 400)
+
+        resp = self.client.get(reverse('fee_schedule'), **self.auth)
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('send', [entry['operation'] for entry in resp.data['schedules']])
+        again = self.client.get(reverse('fee_schedule'), HTTP_IF_NONE_MATCH=resp['ETag'], **self.auth)
+        self.assertEqual(again.status_code, 304)
+
+
+class MultiCurrencyTests(APITestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ExchangeRate.objects.create(base_currency='USD', quote_currency='HTG', rate=Decimal('132.50'))
+        self.addCleanup(fx.exchange_rates.bump)
+        self.sender = User.objects.create_user(username='fxsender', email='fxsender@example.com', password='Fxpass123!', phone_number='50938100001')
+        UserProfile.objects.create(user=self.sender, first_name='Fx', last_name='Sender').set_pin('1234')
+        self.sender_wallet = Wallet.objects.create(user=self.sender, balance=Decimal('10000.00'))
+        self.usd_pocket = WalletBalance.objects.create(wallet=self.sender_wallet, currency='USD', balance=Decimal('100.00'))
+        self.receiver = User.objects.create_user(username='fxreceiver', email='fxreceiver@example.com', password='Fxpass123!', phone_number='50938100002')
+        self.receiver_wallet = Wallet.objects.create(user=self.receiver, balance=Decimal('0.00'), currency='USD')
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {Token.objects.create(user=self.sender).key}'}
+
+    def test_rates_convert_both_ways_and_reload_on_change(self):
+        self.assertEqual(fx.convert(Decimal('10'), 'USD', 'HTG'), (Decimal('1325.00'), Decimal('132.50')))
+        self.assertEqual(fx.convert(Decimal('1325'), 'HTG', 'USD')[0], Decimal('10.00'))
+        with self.assertRaises(fx.RateUnavailable):
+            fx.convert(Decimal('1'), 'USD', 'EUR')
+        with self.captureOnCommitCallbacks(execute=True):
+            ExchangeRate.objects.filter(base_currency='USD').get().delete()
+        with self.assertRaises(fx.RateUnavailable):
+            fx.convert(Decimal('1'), 'USD', 'HTG')
+
+    def test_rates_endpoint_revalidates(self):
+        first = self.client.get(reverse('exchange_rates'), **self.auth)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(self.client.get(reverse('exchange_rates'), HTTP_IF_NONE_MATCH=first['ETag'], **self.auth).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            ExchangeRate.objects.create(base_currency='EUR', quote_currency='HTG', rate=Decimal('143.00'))
+        self.assertEqual(self.client.get(reverse('exchange_rates'), HTTP_IF_NONE_MATCH=first['ETag'], **self.auth).status_code, 200)
+
+    def test_fee_in_another_currency_uses_htg_tiers(self):
+        # 10 USD = 1325 HTG -> 13.25 HTG fee -> 0.10 USD
+        self.assertEqual(compute_fee('send', Decimal('10'), self.sender, 'USD'), Decimal('0.10'))
+
+    def test_send_converts_into_the_receivers_currency(self):
+        resp = self.client.post(reverse('send_money'), {'receiver_phone': '50938100002', 'amount': '1325', 'pin': '1234'}, format='json', **self.auth)
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual((resp.data['converted_amount'], resp.data['converted_currency']), ('10.00', 'USD'))
+        self.sender_wallet.refresh_from_db()
+        self.receiver_wallet.refresh_from_db()
+        self.assertEqual(self.sender_wallet.balance, Decimal('8661.75'))  # 1325 + 13.25 fee
+        self.assertEqual(self.receiver_wallet.balance, Decimal('10.00'))
+
+    def test_send_from_a_currency_pocket(self):
+        resp = self.client.post(reverse('send_money'), {'receiver_phone': '50938100002', 'amount': '20', 'currency': 'USD', 'pin': '1234'}, format='json', **self.auth)
+        self.assertEqual(resp.status_code, 201)
+        self.usd_pocket.refresh_from_db()
+        self.receiver_wallet.refresh_from_db()
+        self.assertEqual(self.usd_pocket.balance, Decimal('79.80'))
+        self.assertEqual(self.receiver_wallet.balance, Decimal('20.00'))
+        resp = self.client.post(reverse('send_money'), {'receiver_phone': '50938100002', 'amount': '90', 'currency': 'USD', 'pin': '1234'}, format='json', **self.auth)
+        self.assertEqual(resp.status_code, 400)
+
+    def test_exchange_between_own_pockets(self):
+        resp = self.client.post(reverse('exchange_currency'), {'from_currency': 'HTG', 'to_currency': 'USD', 'amount': '2650', 'pin': '1234'}, format='json', **self.auth)
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.data['balances'], {'HTG': '7350.00', 'USD': '120.00'})
+        resp = self.client.post(reverse('exchange_currency'), {'from_currency': 'USD', 'to_currency': 'HTG', 'amount': '500', 'pin': '1234'}, format='json', **self.auth)
+        self.assertEqual(resp.status_code, 400)
+        self.usd_pocket.refresh_from_db()
+        self.assertEqual(self.usd_pocket.balance, Decimal('120.00'))
+        self.assertEqual(Transaction.objects.filter(transaction_type='exchange').count(), 1)
+
+    def test_volume_is_converted_in_sql(self):
+        Transaction.objects.create(transaction_type='send', sender=self.sender, amount=Decimal('1000'), total_amount=Decimal('1000'), reference_number='FXT1')
+        Transaction.objects.create(transaction_type='send', sender=self.sender, amount=Decimal('10'), total_amount=Decimal('10'), currency='USD', reference_number='FXT2')
+        total = Transaction.objects.aggregate(total=Sum(fx.to_base_sql()))['total']
+        self.assertEqual(Decimal(total).quantize(Decimal('0.01')), Decimal('2325.00'))
+
+
+class StubProvider(BaseHTTPRequestHandler):
+    """Local provider API: answers with server.reply = (status, body, delay_seconds). Batch
+    items succeed unless their phone is in server.declined or server.dropped (left out)."""
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.calls.append((self.path, payload))
+        code, body, delay = self.server.reply
+        if self.path.endswith('/batch'):
+            body = {'results': [
+                {'reference': item['reference'], 'status': 'failed', 'message': 'Nimewo pa valid'}
+                if item.get('phone') in self.server.declined else
+                {'reference': item['reference'], 'status': 'success', 'provider_reference': f"B-{item['reference']}"}
+                for item in payload['items'] if item.get('phone') not in self.server.dropped
+            ]}
+        time.sleep(delay)
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client timed out first
+
+    def log_message(self, *args):
+        pass
+
+
+class StubProviderTestCase(APITestCase):
+    provider_settings = {}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubProvider)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.calls = []
+        self.server.reply = (200, {'status': 'success', 'reference': 'DG-778899'}, 0)
+        self.server.declined, self.server.dropped = set(), set()
+        providers = {name: {'base_url': self.url, **self.provider_settings} for name in ('digicel', 'natcom', 'edh', 'dinepa', 'bills')}
+        overrides = override_settings(PAYMENT_PROVIDERS=providers, BACKGROUND_TASKS_EAGER=True, PROVIDER_READ_TIMEOUT=0.3, PROVIDER_MAX_ATTEMPTS=2)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        reset_providers()
+        self.addCleanup(reset_providers)
+        for name in providers:
+            batcher.clear(name)
+        self.user = User.objects.create_user(username='topupuser', email='topupuser@example.com', password='Topup123!')
+        UserProfile.objects.create(user=self.user, first_name='Top', last_name='Up').set_pin('1234')
+        self.wallet = Wallet.objects.create(user=self.user, balance=Decimal('1000.00'))
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {Token.objects.create(user=self.user).key}'}
+
+    def topup(self, amount='100', phone='50937001122'):
+        return self.client.post(reverse('phone_topup'), {'recipient_phone': phone, 'carrier': 'digicel', 'amount': amount}, format='json', **self.auth)
+
+    def balance(self):
+        self.wallet.refresh_from_db()
+        return self.wallet.balance
+
+
+class ProviderFulfilmentTests(StubProviderTestCase):
+
+    def test_topup_settles_with_the_provider_reference(self):
+        resp = self.topup()
+        self.assertEqual(resp.status_code, 202)
+        self.assertEqual((resp.data['transaction']['status'], resp.data['carrier_reference']), ('completed', 'DG-778899'))
+        self.assertEqual(self.server.calls[0][0], '/topups')
+        self.assertEqual(self.server.calls[0][1]['reference'], resp.data['transaction']['reference_number'])
+        self.assertEqual(self.balance(), Decimal('895.00'))
+
+    def test_declined_bill_is_refunded(self):
+        self.server.reply = (422, {'status': 'failed', 'message': 'Kont sa pa egziste'}, 0)
+        resp = self.client.post(reverse('pay_bill'), {
+            'bill_type': 'electricity', 'account_number': 'EDH-1', 'service_provider': 'EDH', 'amount': '200', 'pin': '1234',
+        }, format='json', **self.auth)
+        self.assertEqual(resp.status_code, 202)
+        self.assertEqual(resp.data['transaction']['status'], 'failed')
+        self.assertEqual(self.balance(), Decimal('1000.00'))
+        self.assertEqual(ProviderFulfilment.objects.get().last_error, 'Kont sa pa egziste')
+
+    def test_timeouts_are_retried_then_refunded(self):
+        self.server.reply = (200, {'status': 'success', 'reference': 'LATE'}, 1)
+        resp = self.topup()
+        tx = Transaction.objects.get(reference_number=resp.data['transaction']['reference_number'])
+        self.assertEqual(tx.status, 'processing')
+        self.assertEqual(self.balance(), Decimal('895.00'))
+        job = ProviderFulfilment.objects.get()
+        self.assertEqual(job.attempts, 1)
+        self.assertGreater(job.next_attempt_at, tx.created_at)
+
+        # Not due yet: nothing to do; once due the second timeout exhausts the attempts
+        self.assertIsNone(fulfil(tx.pk))
+        ProviderFulfilment.objects.update(next_attempt_at=tx.created_at - timedelta(seconds=1))
+        out = StringIO()
+        call_command('retry_provider_fulfilment', stdout=out)
+        self.assertIn('refunded=1', out.getvalue())
+        tx.refresh_from_db()
+        self.assertEqual(tx.status, 'failed')
+        self.assertEqual(self.balance(), Decimal('1000.00'))
+
+    def test_response_does_not_wait_for_the_provider(self):
+        self.server.reply = (200, {'status': 'success', 'reference': 'SLOW'}, 2)
+        with override_settings(BACKGROUND_TASKS_EAGER=False), self.captureOnCommitCallbacks() as callbacks:
+            started = time.perf_counter()
+            resp = self.topup()
+            elapsed = time.perf_counter() - started
+        self.assertEqual(resp.status_code, 202)
+        self.assertEqual(resp.data['transaction']['status'], 'processing')
+        self.assertLess(elapsed, 1)
+        self.assertTrue(callbacks)
+        self.assertEqual(self.server.calls, [])
+
+    def test_circuit_breaker_opens_and_admits_one_trial(self):
+        clock = [0.0]
+        breaker = CircuitBreaker(threshold=2, reset_timeout=30, clock=lambda: clock[0])
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+        with self.assertRaises(ProviderError):
+            breaker.before_call()
+        clock[0] = 31
+        breaker.before_call()  # the trial
+        with self.assertRaises(ProviderError):
+            breaker.before_call()  # only one at a time
+        breaker.record_failure()  # trial failed: open again
+        with self.assertRaises(ProviderError):
+            breaker.before_call()
+        clock[0] = 62
+        breaker.before_call()
+        breaker.record_success()
+        breaker.before_call()
+        self.assertFalse(breaker.is_open)
+
+
+@override_settings(PROVIDER_BATCH_SIZE=3)
+class ProviderBatchTests(StubProviderTestCase):
+    provider_settings = {'batch': True}
+
+    def statuses(self):
+        return sorted(Transaction.objects.filter(transaction_type='topup').values_list('status', flat=True))
+
+    def test_a_full_batch_goes_out_in_one_call(self):
+        for phone in ('50937000001', '50937000002'):
+            self.assertEqual(self.topup(phone=phone).data['transaction']['status'], 'processing')
+        self.assertEqual(self.server.calls, [])
+        self.topup(phone='50937000003')
+
+        self.assertEqual([(path, len(body['items'])) for path, body in self.server.calls], [('/topups/batch', 3)])
+        self.assertEqual(self.statuses(), ['completed'] * 3)
+        references = dict(Transaction.objects.values_list('reference_number', 'phone_topup__carrier_reference'))
+        self.assertTrue(all(ours and theirs == f'B-{ours}' for ours, theirs in references.items()))
+        self.assertEqual(len(set(ProviderFulfilment.objects.values_list('batch_id', flat=True))), 1)
+
+    def test_partial_batch_reconciles_each_item(self):
+        self.server.declined, self.server.dropped = {'50937000002'}, {'50937000003'}
+        for phone in ('50937000001', '50937000002'):
+            self.topup(phone=phone)
+        out = StringIO()
+        call_command('retry_provider_fulfilment', stdout=out)  # flushes the open window
+        self.assertIn('completed=1 refunded=1 retry=0', out.getvalue())
+        self.assertEqual(self.balance(), Decimal('895.00'))
+
+        # An item the provider left out of its answer is retried with the next batch
+        self.topup(phone='50937000003')
+        self.assertEqual(flush('digicel'), {'retry': 1})
+        self.assertEqual(self.statuses(), ['completed', 'failed', 'processing'])
+
+    def test_batch_transport_failure_retries_every_item(self):
+        self.server.reply = (503, {}, 0)
+        for phone in ('50937000001', '50937000002', '50937000003'):
+            self.topup(phone=phone)
+        self.assertEqual(self.statuses(), ['processing'] * 3)
+        self.assertEqual(list(ProviderFulfilment.objects.values_list('attempts', flat=True)), [1, 1, 1])
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True, VELOCITY_RULES=[
+    {'name': 'user_burst', 'dimension': 'user', 'window': '1m', 'max_count': 2, 'action': 'block'},
+    {'name': 'user_hourly_amount', 'dimension': 'user', 'window': '1h', 'max_amount': 250, 'action': 'review'},
+    {'name': 'device_burst', 'dimension': 'device', 'window': '1m', 'max_count': 3, 'action': 'block', 'operations': ['send']},
+])
+class VelocityTests(APITestCase):
+    def setUp(self):
+        velocity.get_store().clear()
+        self.addCleanup(velocity.get_store().clear)
+        self.sender = User.objects.create_user(username='velsender', email='velsender@example.com', password='Velpass123!', phone_number='50938200001')
+        UserProfile.objects.create(user=self.sender, first_name='Vel', last_name='Sender').set_pin('1234')
+        self.wallet = Wallet.objects.create(user=self.sender, balance=Decimal('5000.00'))
+        self.receiver = User.objects.create_user(username='velreceiver', email='velreceiver@example.com', password='Velpass123!', phone_number='50938200002')
+        Wallet.objects.create(user=self.receiver, balance=Decimal('0.00'))
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {Token.objects.create(user=self.sender).key}'}
+
+    def send(self, amount='100', **extra):
+        return self.client.post(reverse('send_money'), {'receiver_phone': '50938200002', 'amount': amount, 'pin': '1234'}, format='json', **self.auth, **extra)
+
+    def test_sliding_window_weights_the_previous_window(self):
+        store = velocity.LocalStore()
+        pair = ('user:1', '1m')
+        store.add([pair], 1000, now=60 * 10 + 30)  # window 10
+        store.add([pair], 1000, now=60 * 10 + 50)
+        self.assertEqual(store.read([pair], now=60 * 10 + 59)[pair], (2, 2000))
+        # 15 s into window 11: three quarters of window 10 still overlap
+        self.assertEqual(store.read([pair], now=60 * 11 + 15)[pair], (1.5, 1500))
+        self.assertEqual(store.read([pair], now=60 * 12 + 1)[pair], (0, 0))
+
+    def test_burst_is_blocked_before_the_ledger_and_logged(self):
+        self.assertEqual(self.send().status_code, 201)
+        self.assertEqual(self.send().status_code, 201)
+        resp = self.send()
+        self.assertEqual(resp.status_code, 429)
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('4798.00'))
+        self.assertEqual(Transaction.objects.filter(sender=self.sender).count(), 2)
+        decision = VelocityDecision.objects.get(decision='block')
+        self.assertEqual((decision.user, decision.operation), (self.sender, 'send'))
+        self.assertEqual({hit['rule']: hit['action'] for hit in decision.rules}, {'user_burst': 'block', 'user_hourly_amount': 'review'})
+
+    def test_review_rules_let_the_payment_through(self):
+        self.assertEqual(self.send('200').status_code, 201)
+        self.assertEqual(self.send('100').status_code, 201)
+        decision = VelocityDecision.objects.get()
+        self.assertEqual((decision.decision, decision.rules[0]['amount']), ('review', '300.00'))
+
+        admin = User.objects.create_user(username='veladmin', email='veladmin@example.com', password='Adminpass123!', user_type='admin')
+        admin_auth = {'HTTP_AUTHORIZATION': f'Token {Token.objects.create(user=admin).key}'}
+        resp = self.client.get(reverse('admin_velocity_decisions'), {'reviewed': 'false'}, **admin_auth)
+        self.assertEqual([row['id'] for row in resp.data['results']], [decision.id])
+        resp = self.client.post(reverse('admin_review_velocity_decision', args=[decision.id]), **admin_auth)
+        self.assertEqual((resp.status_code, resp.data['reviewed_by']), (200, 'veladmin'))
+        self.assertEqual(self.client.get(reverse('admin_velocity_decisions'), {'reviewed': 'false'}, **admin_auth).data['count'], 0)
+        self.assertEqual(self.client.get(reverse('admin_velocity_decisions'), {'page': 'x'}, **admin_auth).status_code, 400)
+        self.assertEqual(self.client.get(reverse('admin_velocity_decisions'), {'limit': '0'}, **admin_auth).status_code, 400)
+
+    def test_ip_is_the_connecting_address(self):
+        spoofed = {'HTTP_X_FORWARDED_FOR': '203.0.113.7, 198.51.100.2', 'REMOTE_ADDR': '10.0.0.9'}
+        self.assertEqual(velocity.client_ip(_device_request(spoofed)), '10.0.0.9')
+        with override_settings(TRUSTED_PROXY_COUNT=1):
+            self.assertEqual(velocity.client_ip(_device_request(spoofed)), '198.51.100.2')
+            self.assertIsNone(velocity.client_ip(_device_request({'REMOTE_ADDR': '10.0.0.9'})))
+        with override_settings(TRUSTED_PROXY_COUNT=2):
+            self.assertEqual(velocity.client_ip(_device_request(spoofed)), '203.0.113.7')
+
+        # A bad address is neither counted nor stored
+        with override_settings(TRUSTED_PROXY_COUNT=1):
+            request = _device_request({'HTTP_X_FORWARDED_FOR': 'not-an-ip'})
+            self.assertIsNone(velocity.client_ip(request))
+            with self.settings(VELOCITY_RULES=[{'name': 'ip_any', 'dimension': 'ip', 'window': '1m', 'max_count': 0, 'action': 'review'}]):
+                self.assertEqual(velocity.check('send', self.sender, Decimal('10'), request=request), 'allow')
+
+    def test_device_counts_across_accounts(self):
+        other = User.objects.create_user(username='velother', email='velother@example.com', password='Velpass123!')
+        third = User.objects.create_user(username='velthird', email='velthird@example.com', password='Velpass123!')
+        phone = {'HTTP_X_DEVICE_ID': 'device-abc'}
+        for user in (self.sender, other, other):
+            self.assertEqual(velocity.check('send', user, Decimal('10'), receiver=self.receiver, request=_device_request(phone)), 'allow')
+        with self.assertRaises(velocity.VelocityBlocked) as blocked:
+            velocity.check('send', third, Decimal('10'), request=_device_request(phone))
+        self.assertEqual([hit['rule'] for hit in blocked.exception.hits], ['device_burst'])
+        # The device rule is for sends only
+        self.assertEqual(velocity.check('agent_withdrawal', third, Decimal('10'), request=_device_request(phone)), 'allow')
+
+    def test_evaluation_is_fast(self):
+        request = _device_request({'HTTP_X_DEVICE_ID': 'device-fast'})
+        started = time.perf_counter()
+        for index in range(1000):
+            velocity.check('agent_withdrawal', self.receiver, Decimal('1'), request=request, now=1_000_000 + index * 120)
+        self.assertLess((time.perf_counter() - started) / 1000, 0.001)
+
+
+def _device_request(meta):
+    from django.test import RequestFactory
+
+    return RequestFactory().post('/', **meta)
+
+
+class AnomalyScoringTests(APITestCase):
+    def setUp(self):
+        self.mule = User.objects.create_user(username='mule', email='mule@example.com', password='Mulepass123!')
+        self.boss = User.objects.create_user(username='boss', email='boss@example.com', password='Bosspass123!')
+        self.structurer = User.objects.create_user(username='structurer', email='structurer@example.com', password='Strpass123!')
+        self.regular = User.objects.create_user(username='regular', email='regular@example.com', password='Regpass123!')
+        self.at = datetime(2026, 9, 1, 15, 20, tzinfo=dt_timezone.utc)
+        self.count = 0
+
+    def pay(self, sender, receiver, amount, at=None):
+        self.count += 1
+        tx = Transaction.objects.create(
+            transaction_type='send', sender=sender, receiver=receiver, amount=Decimal(amount), total_amount=Decimal(amount),
+            reference_number=f'ANOM{self.count:06d}', status='completed',
+        )
+        Transaction.objects.filter(pk=tx.pk).update(created_at=at or self.at)
+        return tx
+
+    def test_export_is_columnar(self):
+        self.pay(self.regular, self.boss, '250.50')
+        Transaction.objects.create(transaction_type='topup', sender=self.regular, amount=Decimal('100'), total_amount=Decimal('105'),
+                                   reference_number='ANOMTOPUP', status='completed')
+        self.pay(self.boss, self.regular, '10')
+        Transaction.objects.filter(reference_number='ANOM000002').update(status='failed')
+        history = anomaly.export(chunk_size=1)
+        self.assertEqual(len(history), 2)
+        regular = history.users.index(next(u for u in history.users if str(u).replace('-', '') == self.regular.pk.hex))
+        row = int(np.flatnonzero(history.receiver == -1)[0])
+        self.assertEqual((history.sender[row], history.amount.sum(), history.currencies), (regular, 350.5, ['HTG']))
+        self.assertEqual(int(history.epoch[1 - row]), int(self.at.timestamp()))
+
+    def test_patterns_are_scored_and_shown_to_admins(self):
+        payers = User.objects.bulk_create([User(username=f'payer{index}', email=f'payer{index}@example.com') for index in range(30)])
+        for payer in payers:
+            self.pay(payer, self.mule, '1000')
+        self.pay(self.mule, self.boss, '30000', at=self.at + timedelta(hours=2))
+        for day in range(6):
+            self.pay(self.structurer, self.boss, '95000', at=self.at + timedelta(days=day))
+        self.pay(self.regular, self.boss, '750')
+        UserRiskScore.objects.create(user=self.mule, score=99, computed_at=self.at)  # replaced
+        stale = User.objects.create_user(username='stale', email='stale@example.com', password='Stalepass123!')
+        UserRiskScore.objects.create(user=stale, score=99, computed_at=self.at)  # no activity left: dropped
+
+        self.assertEqual(anomaly.run(), (38, 34))
+        scores = {score.user_id: score for score in UserRiskScore.objects.all()}
+        self.assertNotIn(stale.pk, scores)
+        mule = scores[self.mule.pk]
+        self.assertEqual(set(mule.flags), {'mule', 'burst'})
+        self.assertEqual((mule.features['in_degree'], mule.features['fan_in_burst'], mule.features['pass_through']), (30, 30, 1))
+        self.assertEqual(scores[self.structurer.pk].flags, ['structuring'])
+        self.assertEqual((scores[self.regular.pk].flags, scores[self.regular.pk].score), ([], 0))
+        self.assertGreater(mule.score, scores[self.structurer.pk].score)
+
+        admin = User.objects.create_user(username='riskadmin', email='riskadmin@example.com', password='Adminpass123!', user_type='admin')
+        auth = {'HTTP_AUTHORIZATION': f'Token {Token.objects.create(user=admin).key}'}
+        resp = self.client.get(reverse('admin_user_details', args=[self.mule.id]), {'sections': 'risk'}, **auth)
+        self.assertEqual((resp.data['risk']['score'], resp.data['risk']['transactions_seen']), (mule.score, 31))
+        resp = self.client.get(reverse('admin_user_details', args=[admin.id]), {'sections': 'risk'}, **auth)
+        self.assertIsNone(resp.data['risk'])
+
+    def test_features_are_vectorized(self):
+        history = anomaly.synthetic(200_000, users=10_000)
+        started = time.perf_counter()
+        scores = anomaly.score(anomaly.components(anomaly.features(history)))
+        self.assertLess(time.perf_counter() - started, 5)
+        self.assertEqual(len(scores), 10_000)
+        self.assertEqual(int((scores >= 50).sum()), 0)  # uniform random traffic looks normal
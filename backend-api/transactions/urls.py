@@ -11,9 +11,16 @@ urlpatterns = [
     path('card-deposit/', views.card_deposit, name='card_deposit'),
     path('merchant-payment/', views.merchant_payment, name='merchant_payment'),
     path('agent-withdrawal/', views.agent_withdrawal, name='agent_withdrawal'),
+    path('agent-withdrawal/cancel/', views.cancel_agent_withdrawal, name='cancel_agent_withdrawal'),
+    path('fees/', views.fee_schedule, name='fee_schedule'),
+    path('fees/quote/', views.fee_quote, name='fee_quote'),
+    path('exchange/', views.exchange_currency, name='exchange_currency'),
+    path('exchange-rates/', views.exchange_rates, name='exchange_rates'),
     
     # Admin endpoints
     path('admin/all/', admin_views.admin_all_transactions, name='admin_all_transactions'),
+    path('admin/velocity/', admin_views.admin_velocity_decisions, name='admin_velocity_decisions'),
+    path('admin/velocity/<int:decision_id>/review/', admin_views.admin_review_velocity_decision, name='admin_review_velocity_decision'),
     path('admin/<str:transaction_id>/', admin_views.admin_transaction_detail, name='admin_transaction_detail'),
     path('admin/<str:transaction_id>/status/', admin_views.admin_update_transaction_status, name='admin_update_transaction_status'),
     path('admin/<str:transaction_id>/history/', admin_views.admin_transaction_history, name='admin_transaction_history'),
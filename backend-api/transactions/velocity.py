@@ -0,0 +1,230 @@
+"""Velocity (fraud) counters checked on the money-out paths before the ledger is touched.
+
+For every dimension of a payment — the paying user, the receiver, the device
+(X-Device-Id header) and the client IP — the store keeps a count and an amount per window
+(1m, 1h, 24h) as a sliding window counter: the current fixed window plus the previous one
+weighted by how much of it still overlaps the sliding window. Two numbers per window, no
+per-event log, and one store round trip to read and one to write.
+
+The IP dimension is the connecting address (client_ip(): REMOTE_ADDR, or the hop set by
+settings.TRUSTED_PROXY_COUNT reverse proxies), never a client-supplied header.
+
+Stores: RedisStore (shared by every worker, settings.REDIS_URL) or LocalStore, a
+pure-Python per-process dict used when Redis is not configured or reachable.
+
+Rules come from settings.VELOCITY_RULES: a dimension, a window, max_count and/or
+max_amount (HTG), an action ('block' or 'review') and optionally the operations they apply
+to. check() adds the payment being made to the counters it reads, so "max_count 5 in 1m"
+blocks the sixth. Allowed payments are counted at once, before the ledger post (a payment
+that fails afterwards still counts: a burst of failures is a signal too). Decisions other
+than 'allow' are written to VelocityDecision for review, off the request thread.
+"""
+
+import ipaddress
+import logging
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+
+from cash_ti_machann import tasks
+
+logger = logging.getLogger(__name__)
+
+WINDOWS = {'1m': 60, '1h': 3600, '24h': 86400}
+DIMENSIONS = ('user', 'receiver', 'device', 'ip')
+BLOCK_MESSAGE = 'Twòp tranzaksyon nan yon ti tan. Tanpri eseye pita oswa kontakte sipò.'
+
+
+class VelocityBlocked(Exception):
+    def __init__(self, hits):
+        super().__init__(BLOCK_MESSAGE)
+        self.message = BLOCK_MESSAGE
+        self.hits = hits
+
+
+def _slide(window, now, index, count, cents, prev_count, prev_cents):
+    """(count, cents) over the sliding window from a counter last written in fixed window `index`."""
+    current = int(now // window)
+    if index == current:
+        weight = 1 - (now - current * window) / window
+        return count + prev_count * weight, cents + prev_cents * weight
+    if index == current - 1:
+        weight = 1 - (now - current * window) / window
+        return count * weight, cents * weight
+    return 0, 0
+
+
+class LocalStore:
+    """Per-process counters: {(key, window): [fixed window index, count, cents, previous count, previous cents]}."""
+
+    MAX_ENTRIES = 200_000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+
+    def read(self, pairs, now):
+        with self._lock:
+            return {pair: _slide(WINDOWS[pair[1]], now, *self._data[pair]) if pair in self._data else (0, 0) for pair in pairs}
+
+    def add(self, pairs, cents, now):
+        with self._lock:
+            for pair in pairs:
+                index = int(now // WINDOWS[pair[1]])
+                entry = self._data.get(pair)
+                if entry is None or entry[0] < index - 1:
+                    self._data[pair] = [index, 1, cents, 0, 0]
+                elif entry[0] == index - 1:
+                    self._data[pair] = [index, 1, cents, entry[1], entry[2]]
+                else:
+                    entry[1] += 1
+                    entry[2] += cents
+            if len(self._data) > self.MAX_ENTRIES:
+                self._prune(now)
+
+    def _prune(self, now):
+        self._data = {
+            pair: entry for pair, entry in self._data.items()
+            if entry[0] >= int(now // WINDOWS[pair[1]]) - 1
+        }
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RedisStore:
+    """Counters shared by every worker: one hash {c, a} per key, window and fixed window index."""
+
+    def __init__(self, url):
+        import redis
+
+        self._redis = redis.Redis.from_url(url, socket_timeout=0.05, socket_connect_timeout=0.05)
+
+    @staticmethod
+    def _key(pair, index):
+        return f'velocity:{pair[0]}:{pair[1]}:{index}'
+
+    def read(self, pairs, now):
+        pipe = self._redis.pipeline(transaction=False)
+        for pair in pairs:
+            index = int(now // WINDOWS[pair[1]])
+            pipe.hmget(self._key(pair, index), 'c', 'a')
+            pipe.hmget(self._key(pair, index - 1), 'c', 'a')
+        values = pipe.execute()
+        counts = {}
+        for position, pair in enumerate(pairs):
+            (count, cents), (prev_count, prev_cents) = values[2 * position], values[2 * position + 1]
+            counts[pair] = _slide(WINDOWS[pair[1]], now, int(now // WINDOWS[pair[1]]),
+                                  int(count or 0), int(cents or 0), int(prev_count or 0), int(prev_cents or 0))
+        return counts
+
+    def add(self, pairs, cents, now):
+        pipe = self._redis.pipeline(transaction=False)
+        for pair in pairs:
+            window = WINDOWS[pair[1]]
+            key = self._key(pair, int(now // window))
+            pipe.hincrby(key, 'c', 1)
+            pipe.hincrby(key, 'a', cents)
+            pipe.expire(key, 2 * window)
+        pipe.execute()
+
+
+_local = LocalStore()
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                url = getattr(settings, 'REDIS_URL', None)
+                if url:
+                    try:
+                        _store = RedisStore(url)
+                    except ImportError:
+                        logger.warning('redis is not installed; velocity counters are per process')
+                _store = _store or _local
+    return _store
+
+
+def _guarded(operation, *args):
+    """Run a store call; if the shared store is down, fall back to the local one for it."""
+    store = get_store()
+    try:
+        return getattr(store, operation)(*args)
+    except Exception:
+        if store is _local:
+            raise
+        logger.exception('Velocity store unavailable; using per-process counters')
+        return getattr(_local, operation)(*args)
+
+
+def client_ip(request):
+    """Address the request came from, or None when it is not a valid IP.
+
+    REMOTE_ADDR unless settings.TRUSTED_PROXY_COUNT reverse proxies sit in front; then the
+    X-Forwarded-For hop the outermost of them appended. Entries left of it are whatever the
+    client sent and are never used.
+    """
+    proxies = getattr(settings, 'TRUSTED_PROXY_COUNT', 0)
+    address = request.META.get('REMOTE_ADDR', '')
+    if proxies:
+        hops = [hop.strip() for hop in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if hop.strip()]
+        address = hops[-proxies] if len(hops) >= proxies else ''
+    try:
+        return str(ipaddress.ip_address(address))
+    except ValueError:
+        return None
+
+
+def rules_for(operation):
+    return [rule for rule in settings.VELOCITY_RULES if operation in rule.get('operations', (operation,))]
+
+
+def check(operation, user, amount, receiver=None, request=None, now=None):
+    """Evaluate the velocity rules for a payment of `amount` (HTG) and count it.
+
+    Returns 'allow' or 'review'; raises VelocityBlocked (nothing counted) for 'block'.
+    """
+    now = time.time() if now is None else now
+    values = {
+        'user': getattr(user, 'pk', None),
+        'receiver': getattr(receiver, 'pk', None),
+        'device': (request.META.get('HTTP_X_DEVICE_ID') or '')[:64] if request is not None else None,
+        'ip': client_ip(request) if request is not None else None,
+    }
+    keys = {dimension: f'{dimension}:{value}' for dimension, value in values.items() if value}
+    rules = [rule for rule in rules_for(operation) if rule['dimension'] in keys]
+    cents = int(Decimal(amount) * 100)
+    pairs = {(keys[dimension], window) for dimension in keys for window in WINDOWS}
+
+    counts = _guarded('read', sorted({(keys[rule['dimension']], rule['window']) for rule in rules}), now) if rules else {}
+    hits = []
+    for rule in rules:
+        count, seen_cents = counts[(keys[rule['dimension']], rule['window'])]
+        count, total = count + 1, Decimal(round(seen_cents) + cents) / 100
+        if ('max_count' in rule and count > rule['max_count']) or ('max_amount' in rule and total > Decimal(str(rule['max_amount']))):
+            hits.append({'rule': rule['name'], 'action': rule['action'], 'count': round(count, 2), 'amount': str(total.quantize(Decimal('0.01')))})
+
+    decision = 'block' if any(hit['action'] == 'block' for hit in hits) else 'review' if hits else 'allow'
+    if decision != 'block':
+        _guarded('add', sorted(pairs), cents, now)
+    if decision != 'allow':
+        tasks.submit(_log, operation, values, amount, decision, hits)
+    if decision == 'block':
+        raise VelocityBlocked(hits)
+    return decision
+
+
+def _log(operation, values, amount, decision, hits):
+    from .models import VelocityDecision
+
+    VelocityDecision.objects.create(
+        user_id=values['user'], receiver_id=values['receiver'], operation=operation, amount=amount,
+        decision=decision, rules=hits, device_id=values['device'] or '', ip_address=values['ip'],
+    )
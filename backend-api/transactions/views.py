@@ -2,16 +2,31 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from django.db.models import Q
+from django.db import transaction as db_transaction
+from django.db.models import Q, Max, Count
+from django.utils import timezone
+from . import fulfilment, fx, velocity
+from .fees import compute_fee, fee_table, quote
+from .limits import LimitExceeded, check_and_consume
 from .models import Transaction, PhoneTopUp, BillPayment
 from .serializers import TransactionSerializer, PhoneTopUpSerializer, BillPaymentSerializer
 from accounts.models import Wallet
+from accounts.utils.etag_utils import conditional_response
 import uuid
 from decimal import Decimal
 from datetime import datetime
 
+def _user_transactions_validators(request):
+    # Newest updated_at catches new rows and status changes; the count catches deletions
+    agg = Transaction.objects.filter(Q(sender=request.user) | Q(receiver=request.user)).aggregate(
+        last_updated=Max('updated_at'), total=Count('id')
+    )
+    return (agg['last_updated'], agg['total']), agg['last_updated']
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_response(_user_transactions_validators)
 def user_transactions(request):
     """Get all transactions for the authenticated user"""
     user = request.user
@@ -82,44 +97,67 @@ def send_money(request):
             sender_wallet = request.user.wallet
         except:
             return Response({'error': 'Wallet ou pa jwenn'}, status=status.HTTP_400_BAD_REQUEST)
-            
-        fee = amount * Decimal('0.01')  # 1% fee
+        
+        # Sent from the sender's pocket in `currency` (home currency by default); the
+        # receiver is credited in their wallet's currency
+        currency = (request.data.get('currency') or sender_wallet.currency).upper()
+        if currency not in dict(Wallet.CURRENCY_CHOICES):
+            return Response({'error': 'Deviz pa valid'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        fee = compute_fee('send', amount, request.user, currency)
         total_amount = amount + fee
         
-        if sender_wallet.balance < total_amount:
+        if fx.pocket_balances(sender_wallet).get(currency, 0) < total_amount:
             return Response({'error': 'Ou pa gen ase lajan nan wallet ou'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Create transaction
-        transaction = Transaction.objects.create(
-            transaction_type='send',
-            sender=request.user,
-            receiver=receiver,
-            amount=amount,
-            fee=fee,
-            total_amount=total_amount,
-            reference_number=f"TXN{uuid.uuid4().hex[:8].upper()}",
-            description=description,
-            status='completed'
-        )
-        
-        # Update wallets
-        sender_wallet.balance -= total_amount
-        sender_wallet.save()
-        
         try:
             receiver_wallet = receiver.wallet
         except:
             return Response({'error': 'Wallet destinatè a pa jwenn'}, status=status.HTTP_400_BAD_REQUEST)
-            
-        receiver_wallet.balance += amount
-        receiver_wallet.save()
         
-        transaction.processed_at = datetime.now()
-        transaction.save()
+        received, rate = fx.convert(amount, currency, receiver_wallet.currency)
+        converted = currency != receiver_wallet.currency
+        base_amount = fx.to_base(amount, currency)
+        velocity.check('send', request.user, base_amount, receiver=receiver, request=request)
+        
+        with db_transaction.atomic():
+            # Agent/enterprise limits count money in both directions, in HTG
+            check_and_consume(request.user, base_amount)
+            check_and_consume(receiver, base_amount)
+            
+            # Create transaction
+            transaction = Transaction.objects.create(
+                transaction_type='send',
+                sender=request.user,
+                receiver=receiver,
+                amount=amount,
+                fee=fee,
+                total_amount=total_amount,
+                currency=currency,
+                converted_amount=received if converted else None,
+                converted_currency=receiver_wallet.currency if converted else None,
+                exchange_rate=rate if converted else None,
+                reference_number=f"TXN{uuid.uuid4().hex[:8].upper()}",
+                description=description,
+                status='completed'
+            )
+            
+            # Update wallets: debit re-checks the balance in the same UPDATE
+            fx.debit(sender_wallet, currency, total_amount)
+            fx.credit(receiver_wallet, receiver_wallet.currency, received)
+            
+            transaction.processed_at = datetime.now()
+            transaction.save()
         
         serializer = TransactionSerializer(transaction)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
         
+    except LimitExceeded as e:
+        return Response({'error': e.message}, status=e.status_code)
+    except (fx.RateUnavailable, fx.InsufficientFunds) as e:
+        return Response({'error': e.message}, status=status.HTTP_400_BAD_REQUEST)
+    except velocity.VelocityBlocked as e:
+        return Response({'error': e.message}, status=status.HTTP_429_TOO_MANY_REQUESTS)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -139,44 +177,50 @@ def phone_topup(request):
         
         # Check user's balance
         user_wallet = request.user.wallet
-        fee = Decimal('5.00')  # Fixed 5 HTG fee
+        fee = compute_fee('topup', amount, request.user)
         total_amount = amount + fee
         
         if user_wallet.balance < total_amount:
             return Response({'error': 'Insufficient balance'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Create transaction
-        transaction = Transaction.objects.create(
-            transaction_type='topup',
-            sender=request.user,
-            amount=amount,
-            fee=fee,
-            total_amount=total_amount,
-            reference_number=f"TOP{uuid.uuid4().hex[:8].upper()}",
-            description=f"Phone top-up to {recipient_phone}",
-            status='completed'
-        )
-        
-        # Create phone top-up record
-        PhoneTopUp.objects.create(
-            transaction=transaction,
-            recipient_phone=recipient_phone,
-            carrier=carrier,
-            minutes_amount=int(amount / 2),  # Rough calculation: 1 HTG = 0.5 minutes
-            message=message,
-            carrier_reference=f"{carrier.upper()}{uuid.uuid4().hex[:6].upper()}"
-        )
-        
-        # Update wallet
-        user_wallet.balance -= total_amount
-        user_wallet.save()
-        
-        transaction.processed_at = datetime.now()
-        transaction.save()
+        if carrier not in dict(PhoneTopUp.CARRIERS):
+            return Response({'error': 'Operatè pa valid'}, status=status.HTTP_400_BAD_REQUEST)
         
+        with db_transaction.atomic():
+            check_and_consume(request.user, amount)
+            
+            # Reserve the money; the carrier is called in the background (transactions/fulfilment.py)
+            transaction = Transaction.objects.create(
+                transaction_type='topup',
+                sender=request.user,
+                amount=amount,
+                fee=fee,
+                total_amount=total_amount,
+                reference_number=f"TOP{uuid.uuid4().hex[:8].upper()}",
+                description=f"Phone top-up to {recipient_phone}",
+                status='processing'
+            )
+            
+            # Create phone top-up record
+            PhoneTopUp.objects.create(
+                transaction=transaction,
+                recipient_phone=recipient_phone,
+                carrier=carrier,
+                minutes_amount=int(amount / 2),  # Rough calculation: 1 HTG = 0.5 minutes
+                message=message,
+            )
+            
+            fx.debit(user_wallet, user_wallet.currency, total_amount)
+            fulfilment.enqueue(transaction)
+        
+        transaction.refresh_from_db()
         serializer = PhoneTopUpSerializer(transaction.phone_topup)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
         
+    except LimitExceeded as e:
+        return Response({'error': e.message}, status=e.status_code)
+    except fx.InsufficientFunds:
+        return Response({'error': 'Insufficient balance'}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -214,46 +258,173 @@ def pay_bill(request):
         
         # Check user's balance
         user_wallet = request.user.wallet
-        fee = amount * Decimal('0.005')  # 0.5% fee for bills
+        fee = compute_fee('bill_payment', amount, request.user)
         total_amount = amount + fee
         
         if user_wallet.balance < total_amount:
             return Response({'error': 'Ou pa gen ase lajan nan wallet ou'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Create transaction
-        transaction = Transaction.objects.create(
-            transaction_type='bill_payment',
-            sender=request.user,
-            amount=amount,
-            fee=fee,
-            total_amount=total_amount,
-            reference_number=f"BILL{uuid.uuid4().hex[:8].upper()}",
-            description=f"{bill_type} payment to {service_provider}",
-            status='completed'
-        )
-        
-        # Create bill payment record
-        BillPayment.objects.create(
-            transaction=transaction,
-            bill_type=bill_type,
-            account_number=account_number,
-            service_provider=service_provider,
-            provider_reference=f"{service_provider.upper()}{uuid.uuid4().hex[:6].upper()}"
-        )
-        
-        # Update wallet
-        user_wallet.balance -= total_amount
-        user_wallet.save()
-        
-        transaction.processed_at = datetime.now()
-        transaction.save()
+        with db_transaction.atomic():
+            check_and_consume(request.user, amount)
+            
+            # Reserve the money; the provider is called in the background (transactions/fulfilment.py)
+            transaction = Transaction.objects.create(
+                transaction_type='bill_payment',
+                sender=request.user,
+                amount=amount,
+                fee=fee,
+                total_amount=total_amount,
+                reference_number=f"BILL{uuid.uuid4().hex[:8].upper()}",
+                description=f"{bill_type} payment to {service_provider}",
+                status='processing'
+            )
+            
+            # Create bill payment record
+            BillPayment.objects.create(
+                transaction=transaction,
+                bill_type=bill_type,
+                account_number=account_number,
+                service_provider=service_provider,
+            )
+            
+            fx.debit(user_wallet, user_wallet.currency, total_amount)
+            fulfilment.enqueue(transaction)
         
+        transaction.refresh_from_db()
         serializer = BillPaymentSerializer(transaction.bill_payment)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+        
+    except LimitExceeded as e:
+        return Response({'error': e.message}, status=e.status_code)
+    except fx.InsufficientFunds:
+        return Response({'error': 'Ou pa gen ase lajan nan wallet ou'}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+QUOTE_MAX_AMOUNTS = 50
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def fee_quote(request):
+    """Preview fees: ?operation=send&amount=1500, or several at once with amounts=100,500,2500;
+    &currency=USD quotes in dollars.
+    Quotes come from the in-memory fee table, no query per quote."""
+    from .models import FeeSchedule
+
+    operation = request.query_params.get('operation', '')
+    if operation not in dict(FeeSchedule.OPERATIONS):
+        return Response({'error': 'Operasyon pa valid'}, status=status.HTTP_400_BAD_REQUEST)
+    raw = request.query_params.get('amounts') or request.query_params.get('amount') or ''
+    try:
+        amounts = [Decimal(part.strip()) for part in raw.split(',') if part.strip()]
+    except ArithmeticError:
+        amounts = []
+    if not amounts or len(amounts) > QUOTE_MAX_AMOUNTS or any(not a.is_finite() or a <= 0 for a in amounts):
+        return Response({'error': f'Bay ant 1 ak {QUOTE_MAX_AMOUNTS} montan ki pi gwo pase 0'}, status=status.HTTP_400_BAD_REQUEST)
+
+    currency = request.query_params.get('currency', fx.BASE_CURRENCY).upper()
+    if currency not in dict(Wallet.CURRENCY_CHOICES):
+        return Response({'error': 'Deviz pa valid'}, status=status.HTTP_400_BAD_REQUEST)
+
+    quotes = []
+    try:
+        for amount in amounts:
+            result = quote(operation, amount, request.user, currency)
+            quotes.append({'amount': str(amount), **{key: str(value) for key, value in result.items()}})
+    except fx.RateUnavailable as e:
+        return Response({'error': e.message}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'operation': operation, 'currency': currency, 'quotes': quotes})
+
+
+def _fee_schedule_validators(request):
+    return (fee_table.version, request.user.user_type), None
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@conditional_response(_fee_schedule_validators)
+def fee_schedule(request):
+    """The active fee tiers, so clients can quote offline; revalidate with If-None-Match."""
+    return Response({'version': str(fee_table.version), 'schedules': fee_table.get().describe()})
+
+
+def _exchange_rates_validators(request):
+    return (fx.exchange_rates.version,), None
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@conditional_response(_exchange_rates_validators)
+def exchange_rates(request):
+    """Current exchange rates (inverse directions included); revalidate with If-None-Match."""
+    return Response({'version': str(fx.exchange_rates.version), 'rates': fx.exchange_rates.get().describe()})
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def exchange_currency(request):
+    """Move money between the user's own currency pockets at the current rate"""
+    try:
+        from_currency = str(request.data.get('from_currency', '')).upper()
+        to_currency = str(request.data.get('to_currency', '')).upper()
+        amount = Decimal(str(request.data.get('amount', 0)))
+        pin = request.data.get('pin', '')
+        
+        currencies = dict(Wallet.CURRENCY_CHOICES)
+        if from_currency not in currencies or to_currency not in currencies or from_currency == to_currency:
+            return Response({'error': 'Deviz pa valid'}, status=status.HTTP_400_BAD_REQUEST)
+        if amount <= 0:
+            return Response({'error': 'Montan an dwe pi gwo pase 0'}, status=status.HTTP_400_BAD_REQUEST)
+        if not pin:
+            return Response({'error': 'PIN obligatwa pou tranzaksyon yo'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            profile = request.user.profile
+            wallet = request.user.wallet
+        except Exception:
+            return Response({'error': 'Profil oswa wallet ou pa jwenn'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        pin_valid, pin_message = profile.check_pin(pin)
+        if not pin_valid:
+            return Response({'error': pin_message}, status=status.HTTP_400_BAD_REQUEST)
         
+        converted, rate = fx.convert(amount, from_currency, to_currency)
+        if converted <= 0:
+            return Response({'error': 'Montan an twò piti pou chanje'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        with db_transaction.atomic():
+            transaction = Transaction.objects.create(
+                transaction_type='exchange',
+                sender=request.user,
+                receiver=request.user,
+                amount=amount,
+                fee=Decimal('0'),
+                total_amount=amount,
+                currency=from_currency,
+                converted_amount=converted,
+                converted_currency=to_currency,
+                exchange_rate=rate,
+                reference_number=f"FX{uuid.uuid4().hex[:10].upper()}",
+                description=f"Chanj {amount} {from_currency} -> {converted} {to_currency}",
+                status='completed',
+                processed_at=timezone.now(),
+            )
+            fx.debit(wallet, from_currency, amount)
+            fx.credit(wallet, to_currency, converted)
+        
+        wallet.refresh_from_db()
+        return Response({
+            'transaction': TransactionSerializer(transaction).data,
+            'balances': {currency: str(balance) for currency, balance in fx.pocket_balances(wallet).items()},
+        }, status=status.HTTP_201_CREATED)
+    
+    except (fx.RateUnavailable, fx.InsufficientFunds) as e:
+        return Response({'error': e.message}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def transaction_stats(request):
@@ -320,24 +491,29 @@ def card_deposit(request):
         except:
             return Response({'error': 'Wallet pa jwenn'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Calculate fee (2.5% + 10 HTG)
-        fee = (amount * Decimal('0.025')) + Decimal('10')
+        # Card fee comes out of the deposited amount
+        fee = compute_fee('card_deposit', amount, request.user)
         net_amount = amount - fee
         
-        # Create transaction record
-        transaction = Transaction.objects.create(
-            sender=None,  # External card deposit
-            receiver=request.user,
-            amount=net_amount,
-            transaction_type='card_deposit',
-            status='completed',
-            reference_number=f'CD{uuid.uuid4().hex[:10].upper()}',
-            description=f'Depo ak kat ****{card_number[-4:]} - {cardholder_name}'
-        )
-        
-        # Update wallet balance
-        wallet.balance += net_amount
-        wallet.save()
+        with db_transaction.atomic():
+            check_and_consume(request.user, net_amount)
+            
+            # Create transaction record
+            transaction = Transaction.objects.create(
+                sender=None,  # External card deposit
+                receiver=request.user,
+                amount=net_amount,
+                fee=fee,
+                total_amount=amount,
+                transaction_type='card_deposit',
+                status='completed',
+                reference_number=f'CD{uuid.uuid4().hex[:10].upper()}',
+                description=f'Depo ak kat ****{card_number[-4:]} - {cardholder_name}'
+            )
+            
+            # Update wallet balance
+            wallet.balance += net_amount
+            wallet.save()
         
         return Response({
             'success': True,
@@ -348,6 +524,8 @@ def card_deposit(request):
             'new_balance': str(wallet.balance)
         })
         
+    except LimitExceeded as e:
+        return Response({'error': e.message}, status=e.status_code)
     except Exception as e:
         return Response({'error': f'Erè nan pwosèsman: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -376,7 +554,9 @@ def merchant_payment(request):
             return Response({'error': 'Wallet pa jwenn'}, status=status.HTTP_400_BAD_REQUEST)
         
         # Check balance
-        if wallet.balance < amount:
+        fee = compute_fee('merchant_payment', amount, request.user)
+        total_amount = amount + fee
+        if wallet.balance < total_amount:
             return Response({'error': 'Balans ou insifizant'}, status=status.HTTP_400_BAD_REQUEST)
         
         # In a real implementation, verify merchant exists and is active
@@ -389,20 +569,25 @@ def merchant_payment(request):
         
         merchant_name = merchant_names.get(merchant_code, f'Machann {merchant_code}')
         
-        # Create transaction
-        transaction = Transaction.objects.create(
-            sender=request.user,
-            receiver=None,  # Merchant payment
-            amount=amount,
-            transaction_type='merchant_payment',
-            status='completed',
-            reference_number=f'MP{uuid.uuid4().hex[:10].upper()}',
-            description=f'Peyman nan {merchant_name} - {description}' if description else f'Peyman nan {merchant_name}'
-        )
-        
-        # Update wallet balance
-        wallet.balance -= amount
-        wallet.save()
+        with db_transaction.atomic():
+            check_and_consume(request.user, amount)
+            
+            # Create transaction
+            transaction = Transaction.objects.create(
+                sender=request.user,
+                receiver=None,  # Merchant payment
+                amount=amount,
+                fee=fee,
+                total_amount=total_amount,
+                transaction_type='merchant_payment',
+                status='completed',
+                reference_number=f'MP{uuid.uuid4().hex[:10].upper()}',
+                description=f'Peyman nan {merchant_name} - {description}' if description else f'Peyman nan {merchant_name}'
+            )
+            
+            # Update wallet balance
+            wallet.balance -= total_amount
+            wallet.save()
         
         return Response({
             'success': True,
@@ -410,16 +595,25 @@ def merchant_payment(request):
             'reference_number': transaction.reference_number,
             'merchant_name': merchant_name,
             'amount': str(amount),
+            'fee': str(fee),
             'new_balance': str(wallet.balance)
         })
         
+    except LimitExceeded as e:
+        return Response({'error': e.message}, status=e.status_code)
     except Exception as e:
         return Response({'error': f'Erè nan peyman an: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def agent_withdrawal(request):
-    """Request cash withdrawal from agent with PIN validation"""
+    """Request cash withdrawal from agent with PIN validation.
+
+    Holds amount + fee from the wallet; the agent completes it by confirming the reference
+    with the returned code (agents/cash-out/confirm/), which moves the money into the
+    agent's e-float. The code is only ever returned here, to the client.
+    """
+    from agents.services import AgentOperationError, request_cash_out
     try:
         agent_code = request.data.get('agent_code', '').upper()
         amount = Decimal(str(request.data.get('amount', 0)))
@@ -429,10 +623,6 @@ def agent_withdrawal(request):
         if not all([agent_code, amount, pin]):
             return Response({'error': 'Kòd ajan, kantite ak PIN obligatwa'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Validate agent code format
-        if not agent_code.startswith('A') or len(agent_code) != 7:
-            return Response({'error': 'Kòd ajan pa valab (dwe kòmanse ak A ak gen 7 karaktè)'}, status=status.HTTP_400_BAD_REQUEST)
-        
         # Validate amount
         if amount < 100 or amount > 25000:
             return Response({'error': 'Kantite retire a dwe ant 100 ak 25,000 HTG'}, status=status.HTTP_400_BAD_REQUEST)
@@ -441,74 +631,54 @@ def agent_withdrawal(request):
         from accounts.models import UserProfile
         try:
             profile = UserProfile.objects.get(user=request.user)
-            if not profile.check_pin(pin):
-                return Response({'error': 'PIN an pa kòrèk'}, status=status.HTTP_400_BAD_REQUEST)
+            pin_valid, pin_message = profile.check_pin(pin)
+            if not pin_valid:
+                return Response({'error': pin_message}, status=status.HTTP_400_BAD_REQUEST)
         except UserProfile.DoesNotExist:
             return Response({'error': 'Profil itilizatè pa jwenn'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Get user wallet
         try:
-            wallet = request.user.wallet
-        except:
-            return Response({'error': 'Wallet pa jwenn'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Calculate total with fee (25 HTG fee)
-        fee = Decimal('25')
-        total_amount = amount + fee
-        
-        # Check balance
-        if wallet.balance < total_amount:
-            return Response({'error': f'Balans ou insifizant (bezwen {total_amount} HTG ak frè)'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # In a real implementation, verify agent exists and has enough cash
-        # For demo, simulate agent data
-        agent_names = {
-            'A001234': 'Ajan Delmas 33',
-            'A005678': 'Ajan Pétion-Ville',
-            'A009876': 'Ajan Tabarre'
-        }
-        
-        agent_name = agent_names.get(agent_code, f'Ajan {agent_code}')
-        
-        # Generate confirmation code for agent verification
-        confirmation_code = f'AW{uuid.uuid4().hex[:6].upper()}'
-        
-        # Create withdrawal transaction
-        transaction = Transaction.objects.create(
-            sender=request.user,
-            receiver=None,  # Agent withdrawal
-            amount=amount,
-            transaction_type='agent_withdrawal',
-            status='pending',  # Will be completed when agent confirms
-            reference_number=f'AW{uuid.uuid4().hex[:10].upper()}',
-            description=f'Retire lajan nan {agent_name} - Kòd: {confirmation_code}'
-        )
-        
-        # Create fee transaction
-        fee_transaction = Transaction.objects.create(
-            sender=request.user,
-            receiver=None,
-            amount=fee,
-            transaction_type='withdrawal_fee',
-            status='completed',
-            reference_number=f'FE{uuid.uuid4().hex[:10].upper()}',
-            description='Frè retire lajan'
-        )
-        
-        # Update wallet balance (deduct total amount)
-        wallet.balance -= total_amount
-        wallet.save()
+            velocity.check('agent_withdrawal', request.user, amount, request=request)
+        except velocity.VelocityBlocked as e:
+            return Response({'error': e.message}, status=status.HTTP_429_TOO_MANY_REQUESTS)
         
+        try:
+            transaction, agent, confirmation_code = request_cash_out(request.user, agent_code, amount)
+        except AgentOperationError as e:
+            return Response({'error': e.message}, status=e.status_code)
+
+        agent_name = agent.location or f"Ajan {agent.agent_code}"
         return Response({
             'success': True,
             'message': f'Retire otorize nan {agent_name}!',
             'confirmation_code': confirmation_code,
             'agent_name': agent_name,
-            'amount': str(amount),
-            'fee': str(fee),
+            'amount': str(transaction.amount),
+            'fee': str(transaction.fee),
             'reference_number': transaction.reference_number,
-            'instructions': f'Montre kòd {confirmation_code} ak ID ou bay ajan {agent_name}'
+            'expires_at': transaction.cash_out_code.expires_at.isoformat(),
+            'instructions': f'Montre referans {transaction.reference_number}, kòd {confirmation_code} ak ID ou bay ajan {agent_name}'
         })
         
     except Exception as e:
         return Response({'error': f'Erè nan retire a: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def cancel_agent_withdrawal(request):
+    """Cancel your own agent withdrawal that no agent has confirmed yet: {reference_number}.
+    The held amount and fee go back to the wallet."""
+    from agents.services import AgentOperationError, cancel_cash_out
+    try:
+        transaction = cancel_cash_out(request.user, request.data.get('reference_number'))
+        return Response({
+            'success': True,
+            'message': 'Retrè a anile, lajan an retounen nan pòtmonnè ou.',
+            'reference_number': transaction.reference_number,
+            'refunded': str(transaction.total_amount),
+        })
+    except AgentOperationError as e:
+        return Response({'error': e.message}, status=e.status_code)
+    except Exception as e:
+        return Response({'error': f'Erè nan anilasyon retrè a: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
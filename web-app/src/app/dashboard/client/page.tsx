@@ -4615,7 +4615,7 @@ export default function ClientDashboard() {
                     
                     if (response.ok) {
                       const result = await response.json()
-                      alert(`✅ Retire otorize! Kòd konfimadyon: ${result.confirmation_code}\n\nMontre kòd sa a ak ID ou bay ajan an`)
+                      alert(`✅ Retire otorize! Referans: ${result.reference_number}\nKòd konfimadyon: ${result.confirmation_code}\n\nMontre referans lan, kòd la ak ID ou bay ajan an`)
                       setAgentForm({ agentCode: '', amount: '', pin: '' })
                       setShowAgentPinModal(false)
                       await refreshAll()